@@ -8,7 +8,10 @@ from caja.models import (
     EventCajaProduct,
     EventProduct,
     EventProductStock,
+    EventProductStockArchive,
     EventProductStockRecord,
+    EventProductStockReservation,
+    EventProductStockSnapshot,
 )
 
 
@@ -31,13 +34,35 @@ class EventProductAdmin(admin.ModelAdmin):
 
 @admin.register(EventProductStock)
 class EventProductStockAdmin(admin.ModelAdmin):
-    list_display = ['event_product', 'quantity']
+    list_display = ['event_product', 'quantity', 'reserved']
 
 
 @admin.register(EventProductStockRecord)
 class EventProductStockRecordAdmin(admin.ModelAdmin):
     list_display = ['event_product', 'delta', 'reason', 'balance_after', 'created_at']
     list_filter = ['reason']
+    list_select_related = ['event_product']
+    # Con el historial completo el COUNT(*) de la paginación es lo más caro de la página
+    show_full_result_count = False
+
+
+@admin.register(EventProductStockSnapshot)
+class EventProductStockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['event_product', 'as_of', 'balance', 'net_delta', 'record_count']
+    list_select_related = ['event_product']
+
+
+@admin.register(EventProductStockArchive)
+class EventProductStockArchiveAdmin(admin.ModelAdmin):
+    list_display = ['event_product', 'day', 'reason', 'delta', 'record_count', 'balance_after']
+    list_filter = ['reason']
+    list_select_related = ['event_product']
+
+
+@admin.register(EventProductStockReservation)
+class EventProductStockReservationAdmin(admin.ModelAdmin):
+    list_display = ['event_product', 'quantity', 'status', 'caja_sale', 'expires_at']
+    list_filter = ['status']
 
 
 @admin.register(EventCaja)
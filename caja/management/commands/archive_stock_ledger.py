@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from caja.models import EventProduct, EventProductStockRecord
+from caja.stock_ledger import archive_product_ledger, finished_events
+
+
+class Command(BaseCommand):
+    help = (
+        'Compacta el historial de stock de eventos terminados: los registros anteriores '
+        'al fin del evento pasan a EventProductStockArchive (una fila por producto, día '
+        'y motivo) y se borran, dejando un snapshot con el saldo en el corte.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Días desde que terminó el evento')
+        parser.add_argument('--event', help='Slug de un evento terminado')
+        parser.add_argument('--dry-run', action='store_true', help='Sólo mostrar cuántos registros se archivarían')
+
+    def handle(self, *args, **options):
+        events = finished_events(options['days'])
+        if options['event']:
+            events = events.filter(slug=options['event'])
+            if not events.exists():
+                raise CommandError(
+                    f"{options['event']} no existe o no terminó hace más de {options['days']} días"
+                )
+
+        for event in events.order_by('id'):
+            # Todo lo registrado hasta un día después del fin (cierres y ajustes post evento)
+            before = event.end + timedelta(days=1)
+            products = EventProduct.objects.filter(event=event).order_by('id')
+            if options['dry_run']:
+                count = EventProductStockRecord.objects.filter(
+                    event_product__in=products, created_at__lte=before,
+                ).count()
+                self.stdout.write(f'{event.name}: {count} registros para archivar')
+                continue
+            archived = sum(archive_product_ledger(product, before) for product in products)
+            self.stdout.write(self.style.SUCCESS(f'{event.name}: {archived} registros archivados'))
@@ -0,0 +1,130 @@
+import random
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from caja.models import CajaSale, CajaSaleLine, EventCaja, EventProduct
+from caja.reports import _event_report_key, build_event_report
+from events.models import Event
+from tickets.models import Order, TicketType
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide build_event_report sobre un evento con N órdenes confirmadas y M líneas '
+        'de caja pagas: cantidad de queries y tiempo sin cache y con cache. Falla si '
+        'sin cache supera --budget segundos. Todo corre en una transacción que se '
+        'revierte al final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=50000, help='Órdenes confirmadas del evento')
+        parser.add_argument('--lines', type=int, default=200000, help='Líneas de venta de caja pagas')
+        parser.add_argument('--lines-per-sale', type=int, default=4, help='Líneas por venta de caja')
+        parser.add_argument('--budget', type=float, default=2.0, help='Segundos máximos sin cache')
+
+    def handle(self, *args, **options):
+        results = {}
+        try:
+            with transaction.atomic():
+                event = self._fixture(options['orders'], options['lines'], max(1, options['lines_per_sale']))
+                results['sin cache'] = self._run(event, use_cache=False)
+                cache.delete(_event_report_key(event.pk))
+                self._run(event, use_cache=True)
+                results['con cache'] = self._run(event, use_cache=True)
+                cache.delete(_event_report_key(event.pk))
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        for label, (queries, elapsed) in results.items():
+            self.stdout.write(f'{label}: {queries} queries, {elapsed:.3f}s')
+
+        if results['sin cache'][1] > options['budget']:
+            raise CommandError(
+                f"El reporte tardó {results['sin cache'][1]:.2f}s (presupuesto {options['budget']:.2f}s)"
+            )
+        self.stdout.write(self.style.SUCCESS('Dentro del presupuesto'))
+
+    def _fixture(self, orders, lines, lines_per_sale):
+        now = timezone.now()
+        rng = random.Random(42)
+        event = Event.objects.create(
+            name=f'Benchmark {uuid.uuid4().hex[:8]}',
+            slug=f'benchmark-{uuid.uuid4().hex[:8]}',
+            active=False,
+            start=now + timedelta(days=30),
+            end=now + timedelta(days=31),
+            transfers_enabled_until=now + timedelta(days=29),
+            header_image='events/heros/no-image.jpg',
+            title='Benchmark',
+            description='Benchmark',
+        )
+        # La señal de TicketType crea su EventProduct
+        TicketType.objects.create(event=event, name='Benchmark', price=1000, ticket_count=0)
+        products = list(EventProduct.objects.filter(event=event))
+        products += EventProduct.objects.bulk_create([
+            EventProduct(event=event, name=f'Producto {i}', price=Decimal(100 * (i + 1))) for i in range(5)
+        ])
+        email = f'{uuid.uuid4().hex}@benchmark.invalid'
+        cajero = User.objects.create_user(username=email, email=email)
+
+        order_types = [choice for choice, _ in Order.OrderType.choices]
+        Order.objects.bulk_create([
+            Order(
+                first_name='Bench',
+                last_name='Mark',
+                email='bench@benchmark.invalid',
+                phone='',
+                dni='',
+                amount=Decimal(rng.choice([1000, 2000, 3000])),
+                net_received_amount=Decimal(rng.choice([900, 1800, 2700])),
+                donation_art=Decimal(rng.choice([0, 100])),
+                event=event,
+                status=Order.OrderStatus.CONFIRMED,
+                order_type=rng.choice(order_types),
+                generated_by_admin_user=cajero if rng.random() < 0.3 else None,
+            )
+            for _ in range(orders)
+        ], batch_size=5000)
+
+        caja = EventCaja.objects.create(event=event, name='Benchmark')
+        payment_methods = [choice for choice, _ in CajaSale.PaymentMethod.choices]
+        sales = CajaSale.objects.bulk_create([
+            CajaSale(
+                event_caja=caja,
+                sold_by=cajero,
+                payment_method=rng.choice(payment_methods),
+                status=CajaSale.Status.PAID,
+                total_amount=Decimal(1000),
+            )
+            for _ in range(max(1, lines // lines_per_sale))
+        ], batch_size=5000)
+        CajaSaleLine.objects.bulk_create([
+            CajaSaleLine(
+                caja_sale=sales[i % len(sales)],
+                event_product=rng.choice(products),
+                quantity=rng.randint(1, 3),
+                unit_price=Decimal(rng.choice([100, 250, 1000])),
+            )
+            for i in range(lines)
+        ], batch_size=5000)
+        return event
+
+    def _run(self, event, use_cache):
+        started = time.monotonic()
+        with CaptureQueriesContext(connection) as ctx:
+            build_event_report(event, use_cache=use_cache)
+        return len(ctx.captured_queries), time.monotonic() - started
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from caja.rollups import rebuild_event_rollups
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = (
+        'Rearma los rollups por hora del reporte de ventas de caja (CajaSalesRollup) '
+        'a partir de las ventas pagas y sus líneas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--event', help='Slug del evento (por defecto, todos los eventos activos)')
+        parser.add_argument('--all', action='store_true', help='Incluir también los eventos inactivos')
+
+    def handle(self, *args, **options):
+        if options['event']:
+            events = Event.objects.filter(slug=options['event'])
+            if not events.exists():
+                raise CommandError(f"No existe el evento {options['event']}")
+        elif options['all']:
+            events = Event.objects.all()
+        else:
+            events = Event.get_active_events()
+
+        for event in events.order_by('id'):
+            count = rebuild_event_rollups(event)
+            self.stdout.write(self.style.SUCCESS(f'{event.name}: {count} filas de rollup'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from caja.stock_ledger import take_event_snapshots
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = 'Toma un snapshot del historial de stock (EventProductStockSnapshot) de cada producto.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--event', help='Slug del evento (por defecto, todos los eventos activos)')
+        parser.add_argument('--all', action='store_true', help='Incluir también los eventos inactivos')
+
+    def handle(self, *args, **options):
+        if options['event']:
+            events = Event.objects.filter(slug=options['event'])
+            if not events.exists():
+                raise CommandError(f"No existe el evento {options['event']}")
+        elif options['all']:
+            events = Event.objects.all()
+        else:
+            events = Event.get_active_events()
+
+        for event in events.order_by('id'):
+            taken = take_event_snapshots(event)
+            self.stdout.write(self.style.SUCCESS(f'{event.name}: {taken} snapshots nuevos'))
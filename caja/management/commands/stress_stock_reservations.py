@@ -0,0 +1,145 @@
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from caja.models import EventProduct, EventProductStock, EventProductStockRecord, EventProductStockReservation
+from caja.stock import (
+    InsufficientStockError,
+    commit_reservations,
+    deduct_for_lines,
+    release_reservations,
+    reserve_lines,
+)
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de carga del stock de caja: N hilos venden en paralelo canastas con los '
+        'mismos dos productos (en orden cruzado), descontando directo o reservando y '
+        'confirmando o liberando. Falla si se vendió de más, si queda stock reservado '
+        'o el historial no cierra, o si algún hilo terminó con un error que no sea falta '
+        'de stock (por ejemplo un deadlock). Crea su propio evento y lo borra al final. '
+        'Pensado para PostgreSQL: SQLite serializa las escrituras.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--sales', type=int, default=50, help='Ventas por hilo')
+        parser.add_argument('--stock', type=int, default=100, help='Stock inicial de cada producto')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING(f'Corriendo sobre {connection.vendor}: los hilos no escriben en paralelo'))
+
+        event, products = self._fixture(options['stock'])
+        sold = Counter()
+        rejected = Counter()
+        errors = []
+        lock = threading.Lock()
+
+        def worker(seed):
+            rng = random.Random(seed)
+            try:
+                for _ in range(options['sales']):
+                    basket = [{'event_product': product, 'quantity': rng.randint(1, 2)} for product in products]
+                    rng.shuffle(basket)
+                    mode = rng.choice(['deduct', 'commit', 'release'])
+                    try:
+                        if mode == 'deduct':
+                            deduct_for_lines(basket, user=None, reason=EventProductStockRecord.Reason.SALE)
+                        else:
+                            with transaction.atomic():
+                                reservations = reserve_lines(basket)
+                            ids = [reservation.pk for reservation in reservations]
+                            pending = EventProductStockReservation.objects.filter(pk__in=ids)
+                            if mode == 'commit':
+                                commit_reservations(pending, user=None, reason=EventProductStockRecord.Reason.SALE)
+                            else:
+                                release_reservations(pending)
+                    except InsufficientStockError:
+                        with lock:
+                            rejected[mode] += 1
+                        continue
+                    if mode != 'release':
+                        with lock:
+                            for line in basket:
+                                sold[line['event_product'].pk] += line['quantity']
+            except Exception as exc:
+                with lock:
+                    errors.append(repr(exc))
+            finally:
+                connections.close_all()
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        try:
+            problems = list(errors)
+            for product in products:
+                stock = EventProductStock.objects.get(event_product=product)
+                ledger = EventProductStockRecord.objects.filter(event_product=product).aggregate(total=Sum('delta'))['total']
+                self.stdout.write(
+                    f'{product.name}: vendidas {sold[product.pk]}, quedan {stock.quantity}, '
+                    f'reservadas {stock.reserved}, historial {ledger:+d}'
+                )
+                if stock.quantity < 0 or stock.quantity != options['stock'] - sold[product.pk]:
+                    problems.append(f'{product.name}: stock {stock.quantity} no coincide con lo vendido')
+                if stock.reserved != 0:
+                    problems.append(f'{product.name}: quedaron {stock.reserved} unidades reservadas')
+                if ledger != stock.quantity:
+                    problems.append(f'{product.name}: el historial suma {ledger} y el stock es {stock.quantity}')
+        finally:
+            self._cleanup(event, products)
+
+        total = options['threads'] * options['sales']
+        self.stdout.write(f'{total} ventas en {elapsed:.2f}s, rechazadas por stock: {dict(rejected)}')
+        if problems:
+            raise CommandError('\n'.join(problems))
+        self.stdout.write(self.style.SUCCESS('Sin sobreventa ni bloqueos'))
+
+    def _fixture(self, stock):
+        now = timezone.now()
+        event = Event.objects.create(
+            name=f'Stress {uuid.uuid4().hex[:8]}',
+            slug=f'stress-{uuid.uuid4().hex[:8]}',
+            active=False,
+            start=now + timedelta(days=30),
+            end=now + timedelta(days=31),
+            transfers_enabled_until=now + timedelta(days=29),
+            header_image='events/heros/no-image.jpg',
+            title='Stress',
+            description='Stress',
+        )
+        products = []
+        for name in ('Producto A', 'Producto B'):
+            product = EventProduct.objects.create(event=event, name=name, price=100)
+            EventProductStock.objects.create(event_product=product, quantity=stock)
+            EventProductStockRecord.objects.create(
+                event_product=product,
+                delta=stock,
+                reason=EventProductStockRecord.Reason.INITIAL,
+                balance_after=stock,
+            )
+            products.append(product)
+        return event, products
+
+    def _cleanup(self, event, products):
+        EventProductStockRecord.objects.filter(event_product__in=products).delete()
+        EventProductStockReservation.objects.filter(event_product__in=products).delete()
+        EventProductStock.objects.filter(event_product__in=products).delete()
+        EventProduct.objects.filter(pk__in=[product.pk for product in products]).delete()
+        event.delete()
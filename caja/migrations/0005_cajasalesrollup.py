@@ -0,0 +1,43 @@
+# Generated by Django 4.2.15 on 2026-10-18 17:37
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0039_eventrequest_end_required'),
+        ('caja', '0004_eventproduct_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CajaSalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('payment_method', models.CharField(choices=[('EFECTIVO', 'Efectivo'), ('TRANSFERENCIA', 'Transferencia'), ('MP_QR', 'Mercado Pago QR'), ('MP_POINT', 'Mercado Pago Postnet')], max_length=20)),
+                ('hour', models.DateTimeField()),
+                ('sales', models.IntegerField(default=0)),
+                ('items', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='events.event')),
+                ('event_caja', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to='caja.eventcaja')),
+                ('event_product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='caja.eventproduct')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['event', 'hour'], name='caja_rollup_event_hour_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='cajasalesrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('event_product__isnull', False)), fields=('event_caja', 'event_product', 'payment_method', 'hour'), name='caja_rollup_product_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='cajasalesrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('event_product__isnull', True)), fields=('event_caja', 'payment_method', 'hour'), name='caja_rollup_sale_uniq'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.15 on 2026-10-18 17:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caja', '0005_cajasalesrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventproductstock',
+            name='reserved',
+            field=models.IntegerField(default=0, help_text='Unidades reservadas por ventas pendientes de pago'),
+        ),
+        migrations.CreateModel(
+            name='EventProductStockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('quantity', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('ACTIVE', 'Activa'), ('COMMITTED', 'Confirmada'), ('RELEASED', 'Liberada')], default='ACTIVE', max_length=20)),
+                ('expires_at', models.DateTimeField()),
+                ('caja_sale', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stock_reservations', to='caja.cajasale')),
+                ('event_product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_reservations', to='caja.eventproduct')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'expires_at'], name='caja_reservation_expiry_idx')],
+            },
+        ),
+    ]
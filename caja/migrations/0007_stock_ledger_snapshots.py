@@ -0,0 +1,55 @@
+# Generated by Django 4.2.15 on 2026-10-18 17:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caja', '0006_stock_reservations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventProductStockArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('day', models.DateField()),
+                ('reason', models.CharField(choices=[('INITIAL', 'Stock inicial'), ('ADMIN_ADJUST', 'Ajuste admin'), ('SALE', 'Venta'), ('SALE_CANCEL', 'Cancelación de venta'), ('MIGRATION', 'Migración'), ('ORDER_MINT', 'Emisión online')], max_length=20)),
+                ('delta', models.IntegerField(default=0)),
+                ('record_count', models.IntegerField(default=0)),
+                ('first_record_id', models.BigIntegerField()),
+                ('last_record_id', models.BigIntegerField()),
+                ('balance_after', models.IntegerField(blank=True, null=True)),
+                ('event_product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_archive', to='caja.eventproduct')),
+            ],
+            options={
+                'ordering': ['event_product', 'day', 'last_record_id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='EventProductStockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('as_of', models.DateTimeField()),
+                ('last_record_id', models.BigIntegerField(default=0)),
+                ('balance', models.IntegerField(blank=True, help_text='balance_after del último registro; null = ilimitado', null=True)),
+                ('net_delta', models.IntegerField(default=0, help_text='Suma de los deltas hasta last_record_id')),
+                ('record_count', models.IntegerField(default=0)),
+                ('event_product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='caja.eventproduct')),
+            ],
+            options={
+                'ordering': ['-as_of'],
+                'indexes': [models.Index(fields=['event_product', '-last_record_id'], name='caja_stock_snapshot_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='eventproductstockarchive',
+            constraint=models.UniqueConstraint(fields=('event_product', 'day', 'reason'), name='caja_stock_archive_uniq'),
+        ),
+    ]
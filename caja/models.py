@@ -66,6 +66,14 @@ class EventProductStock(BaseModel):
         related_name='stock',
     )
     quantity = models.IntegerField(null=True, blank=True, help_text='Null = stock ilimitado')
+    reserved = models.IntegerField(default=0, help_text='Unidades reservadas por ventas pendientes de pago')
+
+    @property
+    def free(self):
+        """Lo que se puede vender o reservar: el stock menos lo reservado."""
+        if self.quantity is None:
+            return None
+        return self.quantity - self.reserved
 
     def __str__(self):
         if self.quantity is None:
@@ -73,6 +81,41 @@ class EventProductStock(BaseModel):
         return f'{self.event_product.display_name}: {self.quantity}'
 
 
+class EventProductStockReservation(BaseModel):
+    """
+    Unidades apartadas para una venta pendiente (QR / Postnet) hasta que se pague
+    o venza (ver caja.stock). Mientras está activa suma en EventProductStock.reserved.
+    """
+    class Status(models.TextChoices):
+        ACTIVE = 'ACTIVE', 'Activa'
+        COMMITTED = 'COMMITTED', 'Confirmada'
+        RELEASED = 'RELEASED', 'Liberada'
+
+    event_product = models.ForeignKey(
+        EventProduct,
+        on_delete=models.CASCADE,
+        related_name='stock_reservations',
+    )
+    caja_sale = models.ForeignKey(
+        'CajaSale',
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name='stock_reservations',
+    )
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.ACTIVE)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='caja_reservation_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.event_product.display_name} x{self.quantity} ({self.status})'
+
+
 class EventProductStockRecord(BaseModel):
     class Reason(models.TextChoices):
         INITIAL = 'INITIAL', 'Stock inicial'
@@ -120,6 +163,61 @@ class EventProductStockRecord(BaseModel):
         return f'{self.event_product.display_name} {self.delta:+d} ({self.reason})'
 
 
+class EventProductStockSnapshot(BaseModel):
+    """
+    Saldo del historial de stock de un producto a una fecha (ver caja.stock_ledger):
+    acumula todos los registros hasta last_record_id, así el historial se puede
+    leer (y archivar) desde acá en adelante sin perder el saldo exacto.
+    """
+    event_product = models.ForeignKey(
+        EventProduct,
+        on_delete=models.CASCADE,
+        related_name='stock_snapshots',
+    )
+    as_of = models.DateTimeField()
+    last_record_id = models.BigIntegerField(default=0)
+    balance = models.IntegerField(null=True, blank=True, help_text='balance_after del último registro; null = ilimitado')
+    net_delta = models.IntegerField(default=0, help_text='Suma de los deltas hasta last_record_id')
+    record_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-as_of']
+        indexes = [
+            models.Index(fields=['event_product', '-last_record_id'], name='caja_stock_snapshot_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.event_product.display_name} al {self.as_of:%d/%m/%Y %H:%M}: {self.balance}'
+
+
+class EventProductStockArchive(BaseModel):
+    """
+    Registros de stock archivados de eventos terminados, compactados en una fila
+    por producto, día y motivo. Junto con los snapshots reconstruyen el saldo.
+    """
+    event_product = models.ForeignKey(
+        EventProduct,
+        on_delete=models.CASCADE,
+        related_name='stock_archive',
+    )
+    day = models.DateField()
+    reason = models.CharField(max_length=20, choices=EventProductStockRecord.Reason.choices)
+    delta = models.IntegerField(default=0)
+    record_count = models.IntegerField(default=0)
+    first_record_id = models.BigIntegerField()
+    last_record_id = models.BigIntegerField()
+    balance_after = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['event_product', 'day', 'last_record_id']
+        constraints = [
+            models.UniqueConstraint(fields=['event_product', 'day', 'reason'], name='caja_stock_archive_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.event_product.display_name} {self.day} {self.reason}: {self.delta:+d}'
+
+
 class EventCaja(BaseModel):
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='cajas')
     name = models.CharField(max_length=120)
@@ -248,3 +346,46 @@ class CajaSaleLine(BaseModel):
 
     def __str__(self):
         return f'{self.quantity}x {self.event_product.display_name}'
+
+
+class CajaSalesRollup(BaseModel):
+    """
+    Ventas pagas de caja sumadas por hora (de creación de la venta), caja, medio
+    de pago y producto, para el reporte de ventas (ver caja.rollups). Las filas
+    sin producto cuentan ventas y su total cobrado (incluidas las cancelaciones,
+    en negativo); las que tienen producto, unidades y recaudación de sus líneas.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='+')
+    event_caja = models.ForeignKey(EventCaja, on_delete=models.CASCADE, related_name='sales_rollups')
+    event_product = models.ForeignKey(
+        EventProduct,
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    payment_method = models.CharField(max_length=20, choices=CajaSale.PaymentMethod.choices)
+    hour = models.DateTimeField()
+    sales = models.IntegerField(default=0)
+    items = models.IntegerField(default=0)
+    revenue = models.DecimalField(decimal_places=2, max_digits=14, default=Decimal('0'))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['event_caja', 'event_product', 'payment_method', 'hour'],
+                condition=models.Q(event_product__isnull=False),
+                name='caja_rollup_product_uniq',
+            ),
+            models.UniqueConstraint(
+                fields=['event_caja', 'payment_method', 'hour'],
+                condition=models.Q(event_product__isnull=True),
+                name='caja_rollup_sale_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['event', 'hour'], name='caja_rollup_event_hour_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.event_caja_id} {self.hour:%Y-%m-%d %H}h {self.payment_method}: {self.revenue}'
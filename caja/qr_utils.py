@@ -1,11 +1,5 @@
-import base64
-import io
-
-import qrcode
+from utils.qr_cache import qr_data_url
 
 
 def qr_string_to_data_url(data):
-    buffer = io.BytesIO()
-    qrcode.make(data).save(buffer, format='PNG')
-    encoded = base64.b64encode(buffer.getvalue()).decode('ascii')
-    return f'data:image/png;base64,{encoded}'
+    return qr_data_url(data, fmt='png')
@@ -1,13 +1,20 @@
 from collections import defaultdict
 
 import json
+import os
 from decimal import Decimal
 
-from django.db.models import Count, Sum
-from django.db.models.functions import TruncHour
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import BooleanField, Case, Count, DecimalField, F, Q, Sum, Value, When
 from django.utils import timezone
 
-from caja.models import CajaSale, CajaSaleLine, EventProduct
+from caja.models import CajaSale, CajaSaleLine, CajaSalesRollup, EventProduct
+from caja.rollups import ensure_event_rollups
+
+# Reporte general del evento: se invalida por señales (Order, CajaSale) y desde
+# mint_orders; el TTL es sólo un respaldo.
+EVENT_REPORT_TTL_SECONDS = int(os.environ.get('EVENT_REPORT_CACHE_SECONDS', '60'))
 
 
 def _paid_sales(event):
@@ -30,35 +37,29 @@ def _chart_rows(queryset, label_field, value_fields):
 
 
 def build_caja_sales_report(event):
-    sales = _paid_sales(event)
-    summary = sales.aggregate(
-        total_revenue=Sum('total_amount'),
-        total_sales=Count('id'),
-        items_sold=Sum('lines__quantity'),
+    """Lee los rollups por hora (caja.rollups) en vez de recorrer las ventas y sus líneas."""
+    ensure_event_rollups(event)
+    rollups = CajaSalesRollup.objects.filter(event=event)
+    sale_rows = rollups.filter(event_product__isnull=True)
+    item_rows = rollups.filter(event_product__isnull=False)
+
+    summary = rollups.aggregate(
+        total_revenue=Sum('revenue', filter=Q(event_product__isnull=True)),
+        total_sales=Sum('sales', filter=Q(event_product__isnull=True)),
+        items_sold=Sum('items', filter=Q(event_product__isnull=False)),
     )
 
-    by_caja_qs = (
-        sales.values('event_caja__name')
-        .annotate(
-            revenue=Sum('total_amount'),
-            count=Count('id', distinct=True),
-        )
+    by_caja = list(
+        sale_rows.values('event_caja__name')
+        .annotate(revenue=Sum('revenue'), count=Sum('sales'))
         .order_by('-revenue')
     )
-    by_caja = list(by_caja_qs)
-
-    by_item_lines = CajaSaleLine.objects.filter(
-        caja_sale__event_caja__event=event,
-        caja_sale__status=CajaSale.Status.PAID,
-    ).values('event_product__name', 'quantity', 'unit_price')
 
     by_item_map = defaultdict(lambda: {'quantity': 0, 'revenue': Decimal('0')})
-    for line in by_item_lines:
-        name = line['event_product__name'] or 'Sin nombre'
-        qty = line['quantity'] or 0
-        price = line['unit_price'] or Decimal('0')
-        by_item_map[name]['quantity'] += qty
-        by_item_map[name]['revenue'] += price * qty
+    for row in item_rows.values('event_product__name').annotate(units=Sum('items'), total=Sum('revenue')).order_by():
+        name = row['event_product__name'] or 'Sin nombre'
+        by_item_map[name]['quantity'] += row['units'] or 0
+        by_item_map[name]['revenue'] += row['total'] or Decimal('0')
 
     by_item = sorted(
         [
@@ -73,27 +74,17 @@ def build_caja_sales_report(event):
         reverse=True,
     )
 
-    by_hour_qs = (
-        sales.annotate(hour=TruncHour('created_at'))
-        .values('hour')
-        .annotate(
-            revenue=Sum('total_amount'),
-            count=Count('id'),
-        )
-        .order_by('hour')
-    )
     by_hour = []
-    for row in by_hour_qs:
-        hour = row['hour']
+    for row in sale_rows.values('hour').annotate(revenue=Sum('revenue'), count=Sum('sales')).order_by('hour'):
         by_hour.append({
-            'hour': timezone.localtime(hour).strftime('%d/%m %H:%M') if hour else '—',
+            'hour': timezone.localtime(row['hour']).strftime('%d/%m %H:%M'),
             'revenue': row['revenue'] or Decimal('0'),
             'count': row['count'] or 0,
         })
 
     by_payment = list(
-        sales.values('payment_method')
-        .annotate(revenue=Sum('total_amount'), count=Count('id'))
+        sale_rows.values('payment_method')
+        .annotate(revenue=Sum('revenue'), count=Sum('sales'))
         .order_by('-revenue')
     )
     payment_labels = dict(CajaSale.PaymentMethod.choices)
@@ -192,128 +183,136 @@ ORDER_TYPE_LABELS = {
 }
 
 
-def _line_revenue(lines_qs):
-    total_qty = 0
-    total_revenue = Decimal('0')
-    by_product = defaultdict(lambda: {'quantity': 0, 'revenue': Decimal('0')})
-    for line in lines_qs.values('event_product__name', 'quantity', 'unit_price'):
-        name = line['event_product__name'] or 'Sin nombre'
-        qty = line['quantity'] or 0
-        price = line['unit_price'] or Decimal('0')
-        revenue = price * qty
-        total_qty += qty
-        total_revenue += revenue
-        by_product[name]['quantity'] += qty
-        by_product[name]['revenue'] += revenue
-    products = sorted(
-        [
-            {'name': name, 'quantity': data['quantity'], 'revenue': data['revenue']}
-            for name, data in by_product.items()
-        ],
-        key=lambda row: row['revenue'],
-        reverse=True,
+def _split_line_products(event):
+    """
+    Cantidad y recaudación por producto de las líneas pagas, en una query
+    agrupada por (nombre, es bono). Devuelve {es_bono: (cantidad, recaudación, productos)}.
+    """
+    rows = (
+        CajaSaleLine.objects.filter(
+            caja_sale__event_caja__event=event,
+            caja_sale__status=CajaSale.Status.PAID,
+        )
+        .annotate(is_ticket=Case(
+            When(event_product__ticket_type_id__isnull=False, then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        ))
+        .values('event_product__name', 'is_ticket')
+        .annotate(
+            units=Sum('quantity'),
+            revenue=Sum(F('unit_price') * F('quantity'), output_field=DecimalField(max_digits=14, decimal_places=2)),
+        )
+        .order_by()
     )
-    return total_qty, total_revenue, products
+    by_product = {True: defaultdict(lambda: {'quantity': 0, 'revenue': Decimal('0')}),
+                  False: defaultdict(lambda: {'quantity': 0, 'revenue': Decimal('0')})}
+    for row in rows:
+        # '' y NULL se agrupan por separado en SQL pero se muestran igual
+        data = by_product[row['is_ticket']][row['event_product__name'] or 'Sin nombre']
+        data['quantity'] += row['units'] or 0
+        data['revenue'] += row['revenue'] or Decimal('0')
+
+    result = {}
+    for is_ticket, products in by_product.items():
+        product_rows = sorted(
+            [{'name': name, 'quantity': data['quantity'], 'revenue': data['revenue']} for name, data in products.items()],
+            key=lambda row: row['revenue'],
+            reverse=True,
+        )
+        result[is_ticket] = (
+            sum(row['quantity'] for row in product_rows),
+            sum((row['revenue'] for row in product_rows), Decimal('0')),
+            product_rows,
+        )
+    return result
 
 
-def build_event_report(event):
-    from tickets.models import NewTicket, Order
+def _order_buckets(event):
+    """Órdenes confirmadas agrupadas por (order_type, es de caja), en una sola query."""
+    from tickets.models import Order
 
-    orders = Order.objects.filter(
-        event=event,
-        status=Order.OrderStatus.CONFIRMED,
-    )
-    order_agg = orders.aggregate(
-        total_bruto=Sum('amount'),
-        total_neto=Sum('net_received_amount'),
-        donations_art=Sum('donation_art'),
-        donations_venue=Sum('donation_venue'),
-        donations_grant=Sum('donation_grant'),
-        order_count=Count('id'),
+    return list(
+        Order.objects.filter(event=event, status=Order.OrderStatus.CONFIRMED)
+        .annotate(is_caja=Case(
+            When(generated_by_admin_user__isnull=False, then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        ))
+        .values('order_type', 'is_caja')
+        .annotate(
+            bruto=Sum('amount'),
+            neto=Sum('net_received_amount'),
+            don_art=Sum('donation_art'),
+            don_venue=Sum('donation_venue'),
+            don_grant=Sum('donation_grant'),
+            count=Count('id'),
+        )
+        .order_by()
     )
 
-    total_bruto = order_agg['total_bruto'] or Decimal('0')
-    total_neto = order_agg['total_neto'] or Decimal('0')
-    donations_art = order_agg['donations_art'] or Decimal('0')
-    donations_venue = order_agg['donations_venue'] or Decimal('0')
-    donations_grant = order_agg['donations_grant'] or Decimal('0')
+
+def _sum_buckets(rows, fields=('bruto', 'neto', 'don_art', 'don_venue', 'don_grant')):
+    totals = {field: sum((row[field] or Decimal('0') for row in rows), Decimal('0')) for field in fields}
+    totals['count'] = sum(row['count'] for row in rows)
+    return totals
+
+
+def _event_money_report(event):
+    """
+    La parte cara del reporte (plata de órdenes y de caja v2): tres queries
+    agrupadas en vez de una por cada total, y se cachea por evento.
+    """
+    from tickets.models import Order
+
+    buckets = _order_buckets(event)
+    order_agg = _sum_buckets(buckets)
+    online_agg = _sum_buckets([row for row in buckets if not row['is_caja']])
+    caja_orders_agg = _sum_buckets([row for row in buckets if row['is_caja']])
+    mp_online = _sum_buckets([
+        row for row in buckets
+        if not row['is_caja'] and row['order_type'] == Order.OrderType.ONLINE_PURCHASE
+    ])
+
+    total_bruto = order_agg['bruto']
+    total_neto = order_agg['neto']
+    donations_art = order_agg['don_art']
+    donations_venue = order_agg['don_venue']
+    donations_grant = order_agg['don_grant']
     donations_total = donations_art + donations_venue + donations_grant
     ticket_revenue_orders = total_bruto - donations_total
     commissions_total = (total_bruto - total_neto).quantize(Decimal('0.01'))
 
-    tickets_qs = NewTicket.objects.filter(
-        event=event,
-        order__status=Order.OrderStatus.CONFIRMED,
-    )
-    tickets_total = tickets_qs.count()
-    tickets_online = tickets_qs.filter(order__generated_by_admin_user__isnull=True).count()
-    tickets_caja = tickets_total - tickets_online
-    tickets_used = tickets_qs.filter(is_used=True).count()
-
-    online_orders = orders.filter(generated_by_admin_user__isnull=True)
-    caja_orders = orders.filter(generated_by_admin_user__isnull=False)
-    online_agg = online_orders.aggregate(
-        bruto=Sum('amount'),
-        neto=Sum('net_received_amount'),
-        count=Count('id'),
-    )
-    caja_orders_agg = caja_orders.aggregate(
-        bruto=Sum('amount'),
-        neto=Sum('net_received_amount'),
-        count=Count('id'),
-    )
-
-    mp_online = online_orders.filter(order_type=Order.OrderType.ONLINE_PURCHASE).aggregate(
-        bruto=Sum('amount'),
-        neto=Sum('net_received_amount'),
-    )
-    mp_bruto = mp_online['bruto'] or Decimal('0')
-    mp_neto = mp_online['neto'] or Decimal('0')
+    mp_bruto = mp_online['bruto']
+    mp_neto = mp_online['neto']
     mp_commissions = (mp_bruto - mp_neto).quantize(Decimal('0.01'))
     mp_pct = (
         ((Decimal('1') - (mp_neto / mp_bruto)) * 100).quantize(Decimal('0.01'))
         if mp_bruto > 0 else Decimal('0')
     )
 
+    by_order_type = {}
+    for row in buckets:
+        by_order_type.setdefault(row['order_type'], []).append(row)
     payment_breakdown = []
-    for row in orders.values('order_type').annotate(
-        bruto=Sum('amount'),
-        neto=Sum('net_received_amount'),
-        ordenes=Count('id'),
-        don_art=Sum('donation_art'),
-        don_venue=Sum('donation_venue'),
-        don_grant=Sum('donation_grant'),
-    ).order_by('order_type'):
+    # Mismo orden que ORDER BY order_type en Postgres (NULL al final)
+    for order_type in sorted(by_order_type, key=lambda value: (value is None, value or '')):
+        agg = _sum_buckets(by_order_type[order_type])
         payment_breakdown.append({
-            'label': ORDER_TYPE_LABELS.get(row['order_type'], row['order_type']),
-            'order_type': row['order_type'],
-            'bruto': row['bruto'] or Decimal('0'),
-            'neto': row['neto'] or Decimal('0'),
-            'ordenes': row['ordenes'] or 0,
-            'donaciones': (
-                (row['don_art'] or Decimal('0'))
-                + (row['don_venue'] or Decimal('0'))
-                + (row['don_grant'] or Decimal('0'))
-            ),
+            'label': ORDER_TYPE_LABELS.get(order_type, order_type),
+            'order_type': order_type,
+            'bruto': agg['bruto'],
+            'neto': agg['neto'],
+            'ordenes': agg['count'],
+            'donaciones': agg['don_art'] + agg['don_venue'] + agg['don_grant'],
         })
 
-    paid_caja_lines = CajaSaleLine.objects.filter(
-        caja_sale__event_caja__event=event,
-        caja_sale__status=CajaSale.Status.PAID,
-    )
-    ticket_lines = paid_caja_lines.filter(event_product__ticket_type_id__isnull=False)
-    generic_lines = paid_caja_lines.filter(event_product__ticket_type_id__isnull=True)
+    lines = _split_line_products(event)
+    _, caja_v2_ticket_revenue, caja_v2_ticket_products = lines[True]
+    generic_qty, generic_revenue, generic_products = lines[False]
 
-    _, caja_v2_ticket_revenue, caja_v2_ticket_products = _line_revenue(ticket_lines)
-    generic_qty, generic_revenue, generic_products = _line_revenue(generic_lines)
-
-    caja_v2_sales = _paid_sales(event)
-    caja_v2_agg = caja_v2_sales.aggregate(
-        revenue=Sum('total_amount'),
-        sales=Count('id'),
-    )
     caja_v2_by_payment = list(
-        caja_v2_sales.values('payment_method').annotate(
+        _paid_sales(event).values('payment_method').annotate(
             revenue=Sum('total_amount'),
             count=Count('id'),
         ).order_by('-revenue')
@@ -322,16 +321,9 @@ def build_event_report(event):
     for row in caja_v2_by_payment:
         row['label'] = caja_payment_labels.get(row['payment_method'], row['payment_method'])
 
-    grand_bruto = total_bruto + generic_revenue
-    grand_neto = total_neto + generic_revenue
-
     return {
         'summary': {
-            'tickets_total': tickets_total,
-            'tickets_online': tickets_online,
-            'tickets_caja': tickets_caja,
-            'tickets_used': tickets_used,
-            'orders_count': order_agg['order_count'] or 0,
+            'orders_count': order_agg['count'],
             'ticket_revenue': ticket_revenue_orders,
             'donations_total': donations_total,
             'donations_art': donations_art,
@@ -344,27 +336,74 @@ def build_event_report(event):
             'mp_pct': mp_pct,
             'generic_qty': generic_qty,
             'generic_revenue': generic_revenue,
-            'caja_v2_sales': caja_v2_agg['sales'] or 0,
-            'caja_v2_revenue': caja_v2_agg['revenue'] or Decimal('0'),
+            'caja_v2_sales': sum(row['count'] for row in caja_v2_by_payment),
+            'caja_v2_revenue': sum((row['revenue'] or Decimal('0') for row in caja_v2_by_payment), Decimal('0')),
             'caja_v2_ticket_revenue': caja_v2_ticket_revenue,
-            'grand_bruto': grand_bruto,
-            'grand_neto': grand_neto,
-            'venue_occupancy': event.venue_occupancy,
-            'venue_capacity': event.venue_capacity,
-            'occupancy_percentage': event.occupancy_percentage,
+            'grand_bruto': total_bruto + generic_revenue,
+            'grand_neto': total_neto + generic_revenue,
         },
         'online_orders': {
-            'bruto': online_agg['bruto'] or Decimal('0'),
-            'neto': online_agg['neto'] or Decimal('0'),
-            'count': online_agg['count'] or 0,
+            'bruto': online_agg['bruto'],
+            'neto': online_agg['neto'],
+            'count': online_agg['count'],
         },
         'caja_orders': {
-            'bruto': caja_orders_agg['bruto'] or Decimal('0'),
-            'neto': caja_orders_agg['neto'] or Decimal('0'),
-            'count': caja_orders_agg['count'] or 0,
+            'bruto': caja_orders_agg['bruto'],
+            'neto': caja_orders_agg['neto'],
+            'count': caja_orders_agg['count'],
         },
         'payment_breakdown': payment_breakdown,
         'generic_products': generic_products,
         'caja_v2_by_payment': caja_v2_by_payment,
         'caja_v2_ticket_products': caja_v2_ticket_products,
     }
+
+
+def _event_report_key(event_id):
+    return f'caja_event_report:{event_id}'
+
+
+def _ticket_summary(event):
+    """Bonos y ocupación salen de EventTicketCounters (una lectura, siempre al día)."""
+    from tickets.counters import get_event_counters
+
+    counters = get_event_counters(event)
+    venue_occupancy = max(0, counters.tickets_used - event.attendees_left)
+    return {
+        'tickets_total': counters.tickets_sold,
+        'tickets_online': counters.tickets_sold - counters.caja_tickets_sold,
+        'tickets_caja': counters.caja_tickets_sold,
+        'tickets_used': counters.tickets_used,
+        'venue_occupancy': venue_occupancy,
+        'venue_capacity': event.venue_capacity,
+        'occupancy_percentage': (
+            (venue_occupancy / event.venue_capacity) * 100
+            if event.venue_capacity and event.venue_capacity > 0 else 0
+        ),
+    }
+
+
+def build_event_report(event, use_cache=False):
+    """
+    Reporte general del evento. Con use_cache la parte de plata se lee del
+    cache (se invalida al cambiar órdenes o ventas de caja; el TTL es un
+    respaldo); los contadores de bonos se leen siempre.
+    """
+    money = None
+    if use_cache:
+        money = cache.get(_event_report_key(event.pk))
+    if money is None:
+        money = _event_money_report(event)
+        if use_cache:
+            cache.set(_event_report_key(event.pk), money, EVENT_REPORT_TTL_SECONDS)
+
+    report = dict(money)
+    report['summary'] = {**_ticket_summary(event), **money['summary']}
+    return report
+
+
+def invalidate_event_report(event_ids):
+    """Borra el reporte cacheado de esos eventos cuando commitea la transacción en curso."""
+    keys = [_event_report_key(event_id) for event_id in set(event_ids) if event_id]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,166 @@
+import logging
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def sale_hour(value):
+    """Hora (UTC) en la que se suma una venta; igual que TruncHour en zonas con offset de horas enteras."""
+    return value.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def sale_deltas(sale, lines):
+    """
+    Lo que aporta una venta paga a los rollups: {event_product_id o None: deltas}.
+    La fila None cuenta la venta y su total (negativo en las cancelaciones, que
+    no tienen líneas); las demás, unidades y recaudación de cada producto.
+    """
+    deltas = {None: {'sales': 1, 'items': 0, 'revenue': sale.total_amount or Decimal('0')}}
+    for line in lines:
+        product = deltas.setdefault(line.event_product_id, {'sales': 0, 'items': 0, 'revenue': Decimal('0')})
+        product['items'] += line.quantity
+        product['revenue'] += line.unit_price * line.quantity
+    return deltas
+
+
+def _apply(event_id, event_caja_id, event_product_id, payment_method, hour, deltas):
+    from caja.models import CajaSalesRollup
+
+    rows = CajaSalesRollup.objects.filter(
+        event_caja_id=event_caja_id,
+        event_product_id=event_product_id,
+        payment_method=payment_method,
+        hour=hour,
+    )
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if rows.update(updated_at=timezone.now(), **changes):
+        return
+    try:
+        with transaction.atomic():
+            CajaSalesRollup.objects.create(
+                event_id=event_id,
+                event_caja_id=event_caja_id,
+                event_product_id=event_product_id,
+                payment_method=payment_method,
+                hour=hour,
+                **deltas,
+            )
+    except IntegrityError:
+        # Otra venta de la misma hora la creó al mismo tiempo
+        rows.update(updated_at=timezone.now(), **changes)
+
+
+# Primer argumento de los advisory locks de rollups (pg_advisory_xact_lock(int, int)); el segundo es el evento
+ROLLUP_LOCK_NAMESPACE = 41001
+
+
+def _lock_event_rollups(event_id, exclusive=False):
+    """
+    Advisory lock (de transacción) que serializa un rebuild con las ventas: sin él,
+    una venta que se paga mientras se rearman los rollups se pierde (el DELETE
+    borra su suma) o se cuenta dos veces. Las ventas lo toman compartido y sólo
+    esperan si hay un rebuild en curso; no tocan la fila del evento.
+    Fuera de PostgreSQL no hace nada (SQLite ya serializa las escrituras).
+    """
+    if connection.vendor != 'postgresql':
+        return
+    function = 'pg_advisory_xact_lock' if exclusive else 'pg_advisory_xact_lock_shared'
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT {function}(%s, %s)', [ROLLUP_LOCK_NAMESPACE, event_id])
+
+
+def record_paid_sale(sale, lines=None):
+    """
+    Suma una venta (o cancelación) recién pagada a los rollups, en la transacción
+    del llamador. Las filas se actualizan en orden de producto para que dos
+    cajas no se bloqueen en orden cruzado.
+    """
+    if lines is None:
+        lines = list(sale.lines.all())
+    deltas = sale_deltas(sale, lines)
+    hour = sale_hour(sale.created_at)
+    event_id = sale.event_caja.event_id
+    _lock_event_rollups(event_id)
+    for event_product_id in sorted(deltas, key=lambda pk: (pk is not None, pk or 0)):
+        _apply(event_id, sale.event_caja_id, event_product_id, sale.payment_method, hour, deltas[event_product_id])
+
+
+def rebuild_event_rollups(event):
+    """
+    Recalcula desde cero los rollups del evento a partir de CajaSale y CajaSaleLine,
+    con el advisory lock del evento en modo exclusivo: las ventas que se pagan
+    mientras tanto esperan y se suman sobre las filas nuevas.
+    """
+    with transaction.atomic():
+        _lock_event_rollups(event.pk, exclusive=True)
+        return _rebuild_event_rollups(event)
+
+
+def _rebuild_event_rollups(event):
+    from caja.models import CajaSale, CajaSaleLine, CajaSalesRollup
+
+    paid_sales = CajaSale.objects.filter(event_caja__event=event, status=CajaSale.Status.PAID)
+    sale_rows = (
+        paid_sales.values('event_caja_id', 'payment_method', hour=TruncHour('created_at', tzinfo=dt_timezone.utc))
+        .annotate(sales=Count('id'), revenue=Sum('total_amount'))
+        .order_by()
+    )
+    line_rows = (
+        CajaSaleLine.objects.filter(caja_sale__in=paid_sales)
+        .values(
+            'event_product_id',
+            event_caja_id=F('caja_sale__event_caja_id'),
+            payment_method=F('caja_sale__payment_method'),
+            hour=TruncHour('caja_sale__created_at', tzinfo=dt_timezone.utc),
+        )
+        .annotate(
+            items=Sum('quantity'),
+            revenue=Sum(F('unit_price') * F('quantity'), output_field=DecimalField(max_digits=14, decimal_places=2)),
+        )
+        .order_by()
+    )
+
+    rollups = [
+        CajaSalesRollup(
+            event=event,
+            event_caja_id=row['event_caja_id'],
+            payment_method=row['payment_method'],
+            hour=row['hour'],
+            sales=row['sales'],
+            revenue=row['revenue'] or Decimal('0'),
+        )
+        for row in sale_rows
+    ]
+    rollups += [
+        CajaSalesRollup(
+            event=event,
+            event_caja_id=row['event_caja_id'],
+            event_product_id=row['event_product_id'],
+            payment_method=row['payment_method'],
+            hour=row['hour'],
+            items=row['items'] or 0,
+            revenue=row['revenue'] or Decimal('0'),
+        )
+        for row in line_rows
+    ]
+    CajaSalesRollup.objects.filter(event=event).delete()
+    CajaSalesRollup.objects.bulk_create(rollups, batch_size=1000)
+    return len(rollups)
+
+
+def ensure_event_rollups(event):
+    """Arma los rollups del evento la primera vez que se piden (ventas anteriores a la tabla)."""
+    from caja.models import CajaSale, CajaSalesRollup
+
+    if CajaSalesRollup.objects.filter(event=event).exists():
+        return
+    if not CajaSale.objects.filter(event_caja__event=event, status=CajaSale.Status.PAID).exists():
+        return
+    count = rebuild_event_rollups(event)
+    logger.info('Rollups de ventas de caja armados para el evento %s (%s filas)', event.pk, count)
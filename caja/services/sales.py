@@ -8,8 +8,14 @@ from django.db import transaction
 from django.utils import timezone
 
 from caja.models import CajaSale, CajaSaleLine, EventProductStockRecord
-from caja.stock import InsufficientStockError, deduct_for_lines, validate_lines
+from caja.rollups import record_paid_sale
+from caja.stock import InsufficientStockError, commit_reservations, deduct_for_lines, reserve_lines, validate_lines
+from tickets.counters import record_tickets_issued
+from tickets.email_outbox import enqueue_caja_bonus_email, enqueue_password_reset
+from tickets.holder_search import schedule_refresh
 from tickets.models import NewTicket, Order, OrderTicket
+from tickets.ticket_summary import invalidate_user_ticket_summaries
+from utils.audit import bulk_log_create
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -25,7 +31,8 @@ def _order_type_for_payment(payment_method):
     return mapping[payment_method]
 
 
-def _send_password_reset_email(user):
+def send_password_reset_email(user):
+    """Mail para que el cliente defina su contraseña (lo manda el outbox)."""
     from allauth.account.forms import ResetPasswordForm
 
     reset_form = ResetPasswordForm(data={'email': user.email.lower()})
@@ -49,30 +56,35 @@ def _create_or_get_customer(email):
     try:
         return User.objects.get(email=email), False
     except User.DoesNotExist:
-        user = User.objects.create_user(
-            username=str(uuid.uuid4()),
-            email=email,
-            first_name='',
-            last_name='',
-        )
-        from user_profile.models import Profile
+        with transaction.atomic():
+            user = User.objects.create_user(
+                username=str(uuid.uuid4()),
+                email=email,
+                first_name='',
+                last_name='',
+            )
+            from user_profile.models import Profile
 
-        if not hasattr(user, 'profile'):
-            Profile.objects.create(user=user)
-        user.profile.profile_completion = 'NONE'
-        user.profile.save()
-        from allauth.account.models import EmailAddress
+            if not hasattr(user, 'profile'):
+                Profile.objects.create(user=user)
+            user.profile.profile_completion = 'NONE'
+            user.profile.save()
+            from allauth.account.models import EmailAddress
 
-        EmailAddress.objects.create(user=user, email=email, verified=True, primary=True)
+            EmailAddress.objects.create(user=user, email=email, verified=True, primary=True)
         return user, True
 
 
 def _issue_caja_tickets(order, event, ticket_lines, user, sold_by, mark_as_used):
-    """Mint NewTicket rows with the same owner/holder rules as caja v1."""
+    """
+    Emite los NewTicket de la venta en un solo bulk_create, con las mismas reglas
+    de owner/holder que caja v1 (el primer bono es del cliente si no tiene uno).
+    """
     user_already_has_ticket = False
     if user:
         user_already_has_ticket = NewTicket.objects.filter(owner=user, event=event).exists()
 
+    now = timezone.now()
     tickets_created = []
     for line in ticket_lines:
         ticket_type = line.event_product.ticket_type
@@ -82,34 +94,43 @@ def _issue_caja_tickets(order, event, ticket_lines, user, sold_by, mark_as_used)
                 ticket_owner = user
                 user_already_has_ticket = True
 
-            ticket = NewTicket(
+            tickets_created.append(NewTicket(
                 event=event,
                 ticket_type=ticket_type,
                 order=order,
                 holder=user if user else None,
                 owner=ticket_owner,
                 is_used=mark_as_used,
-                used_at=timezone.now() if mark_as_used else None,
+                used_at=now if mark_as_used else None,
                 scanned_by=sold_by if mark_as_used else None,
-            )
-            ticket.save()
-            tickets_created.append(ticket)
+            ))
+    NewTicket.objects.bulk_create(tickets_created)
+
+    # bulk_create no dispara señales: lo mismo que hace mint_orders a mano
+    record_tickets_issued((ticket, order) for ticket in tickets_created)
+    bulk_log_create(tickets_created, actor=sold_by)
+    if user:
+        invalidate_user_ticket_summaries([user.pk])
+    schedule_refresh(pk__in=[ticket.pk for ticket in tickets_created])
     return tickets_created
 
 
-def _send_bonus_issued_email(user, event, order, tickets_created, total_amount):
+def send_bonus_issued_email(caja_sale, connection=None):
+    """Mail con los bonos de una venta de caja (lo manda el outbox después del commit)."""
     from utils.email import send_mail
 
+    order = caja_sale.order
     send_mail(
         template_name='bonus_issued',
-        recipient_list=[user.email],
+        recipient_list=[order.user.email],
         context={
-            'user': user,
-            'event': event,
-            'tickets': tickets_created,
+            'user': order.user,
+            'event': order.event,
+            'tickets': list(NewTicket.objects.filter(order=order).select_related('ticket_type')),
             'order': order,
-            'total_amount': total_amount,
+            'total_amount': caja_sale.total_amount,
         },
+        email_connection=connection,
     )
 
 
@@ -140,25 +161,30 @@ def finalize_caja_sale(caja_sale, net_received_amount=None):
         if caja_sale.status == CajaSale.Status.PAID:
             return caja_sale
 
-        validate_lines(stock_lines)
-        deduct_for_lines(
-            stock_lines,
-            user=caja_sale.sold_by,
-            reason=EventProductStockRecord.Reason.SALE,
-            caja_sale=caja_sale,
-            notes=f'Venta caja {caja_sale.event_caja.name}',
-        )
-
-        order = caja_sale.order
-        user_created = False
+        # El cliente se resuelve con la venta bloqueada: el webhook y el polling de
+        # estado pueden finalizar la misma venta a la vez y crearían dos cuentas.
+        # Si la venta falla (stock, etc.) el rollback se lleva la cuenta y el mail.
+        customer = None
+        if ticket_lines or caja_sale.customer_email:
+            customer, user_created = _create_or_get_customer(caja_sale.customer_email)
+            if user_created and customer and ticket_lines:
+                enqueue_password_reset(customer)
+
+        # Si la venta reservó stock al crearse se confirma eso; si la reserva venció
+        # (o la venta se cobró en el momento) se descuenta sin reserva, si alcanza
+        stock_kwargs = {
+            'user': caja_sale.sold_by,
+            'reason': EventProductStockRecord.Reason.SALE,
+            'caja_sale': caja_sale,
+            'notes': f'Venta caja {caja_sale.event_caja.name}',
+        }
+        if not commit_reservations(caja_sale.stock_reservations.all(), **stock_kwargs):
+            deduct_for_lines(stock_lines, **stock_kwargs)
 
         if ticket_lines:
-            customer, user_created = _create_or_get_customer(caja_sale.customer_email)
+            order = caja_sale.order
             event = caja_sale.event_caja.event
 
-            if user_created and customer:
-                _send_password_reset_email(customer)
-
             if not order:
                 order = Order.objects.create(
                     first_name=customer.first_name if customer else 'Caja',
@@ -202,21 +228,12 @@ def finalize_caja_sale(caja_sale, net_received_amount=None):
             )
 
             if customer and tickets_created and not caja_sale.mark_as_used:
-                try:
-                    _send_bonus_issued_email(
-                        customer,
-                        event,
-                        order,
-                        tickets_created,
-                        caja_sale.total_amount,
-                    )
-                except Exception as exc:
-                    logger.warning('Caja sale %s: bonus email failed: %s', caja_sale.id, exc)
-        elif caja_sale.customer_email:
-            _create_or_get_customer(caja_sale.customer_email)
+                # Se manda desde el outbox cuando commitea la venta
+                enqueue_caja_bonus_email(caja_sale)
 
         caja_sale.status = CajaSale.Status.PAID
         caja_sale.save(update_fields=['status', 'updated_at'])
+        record_paid_sale(caja_sale, lines)
 
     return caja_sale
 
@@ -285,6 +302,9 @@ def create_pending_sale(event_caja, sold_by, payment_method, lines_data, custome
             )
             for product, quantity, unit_price in sale_lines
         ])
+        if not immediate:
+            # QR / Postnet: el stock queda apartado mientras se espera el pago
+            reserve_lines(stock_lines, caja_sale=caja_sale)
 
     if immediate:
         caja_sale = finalize_caja_sale(caja_sale)
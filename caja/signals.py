@@ -1,11 +1,31 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-from caja.stock import ensure_stock_row, get_or_create_product_for_ticket_type
-from tickets.models import TicketType
+from caja.models import CajaSale
+from caja.reports import invalidate_event_report
+from caja.stock import ensure_stock_row, get_or_create_product_for_ticket_type, release_reservations
+from tickets.models import Order, TicketType
 
 
 @receiver(post_save, sender=TicketType)
 def ensure_event_product_for_ticket_type(sender, instance, created, **kwargs):
     product = get_or_create_product_for_ticket_type(instance, initial_quantity=instance.ticket_count)
     ensure_stock_row(product)
+
+
+@receiver([post_save, post_delete], sender=Order)
+def invalidate_event_report_for_order(sender, instance, **kwargs):
+    invalidate_event_report([instance.event_id])
+
+
+@receiver([post_save, post_delete], sender=CajaSale)
+def invalidate_event_report_for_caja_sale(sender, instance, **kwargs):
+    # Las líneas se crean con la venta PENDING; cuentan recién cuando pasa a PAID
+    invalidate_event_report([instance.event_caja.event_id])
+
+
+@receiver(post_save, sender=CajaSale)
+def release_stock_for_closed_sale(sender, instance, **kwargs):
+    # Venta pendiente cancelada o vencida (operador, webhook o poll de MP): el stock apartado vuelve
+    if instance.status in (CajaSale.Status.CANCELLED, CajaSale.Status.EXPIRED):
+        release_reservations(instance.stock_reservations.all())
@@ -1,7 +1,17 @@
-from django.db import transaction
-from django.db.models import OuterRef, Q, Subquery
+import logging
+import os
+from datetime import timedelta
 
-from caja.models import EventProduct, EventProductStock, EventProductStockRecord
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from caja.models import EventProduct, EventProductStock, EventProductStockRecord, EventProductStockReservation
+
+logger = logging.getLogger(__name__)
+
+# Cuánto aparta el stock una venta pendiente (QR / Postnet) antes de liberarse sola
+RESERVATION_TTL_SECONDS = int(os.environ.get('CAJA_STOCK_RESERVATION_SECONDS', '900'))
 
 
 class InsufficientStockError(Exception):
@@ -22,7 +32,7 @@ def ensure_stock_row(product):
 
 def available(product):
     stock = ensure_stock_row(product)
-    return stock.quantity
+    return stock.free
 
 
 def available_for_ticket_type(ticket_type):
@@ -40,7 +50,7 @@ def ticket_type_has_stock(ticket_type):
 def ticket_types_with_stock_queryset(queryset):
     stock_subq = EventProductStock.objects.filter(
         event_product__ticket_type=OuterRef('pk'),
-    ).values('quantity')[:1]
+    ).annotate(free=F('quantity') - F('reserved')).values('free')[:1]
     return queryset.annotate(stock_quantity=Subquery(stock_subq)).filter(
         Q(stock_quantity__gt=0) | Q(stock_quantity__isnull=True)
     )
@@ -72,29 +82,49 @@ def get_or_create_product_for_ticket_type(ticket_type, initial_quantity=None):
     return product
 
 
-def _apply_delta(product, delta, reason, user=None, notes='', caja_sale=None, order=None):
-    stock = EventProductStock.objects.select_for_update().get(event_product=product)
-    if stock.quantity is not None:
-        new_balance = stock.quantity + delta
-        if new_balance < 0:
-            raise InsufficientStockError(product, abs(delta), stock.quantity)
-        stock.quantity = new_balance
-        stock.save(update_fields=['quantity', 'updated_at'])
-        balance_after = new_balance
-    else:
-        balance_after = None
-
-    EventProductStockRecord.objects.create(
-        event_product=product,
-        delta=delta,
-        reason=reason,
-        balance_after=balance_after,
-        notes=notes,
-        created_by=user,
-        caja_sale=caja_sale,
-        order=order,
-    )
-    return stock
+def _update_stock(product, quantity_delta=0, reserved_delta=0):
+    """
+    Un único UPDATE condicional: suma los deltas sólo si lo libre (stock menos
+    reservado) alcanza para lo que se saca. Sin esperar locks de lectura ni
+    ventana entre validar y descontar. Devuelve (quantity, reserved) o None si
+    no alcanzó (o el producto no tiene fila de stock).
+    """
+    required = reserved_delta - quantity_delta
+    condition = ' AND (quantity IS NULL OR quantity - reserved >= %s)' if required > 0 else ''
+    params = [quantity_delta, reserved_delta, timezone.now(), product.pk]
+    if required > 0:
+        params.append(required)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {EventProductStock._meta.db_table} '
+            'SET quantity = quantity + %s, reserved = reserved + %s, updated_at = %s '
+            f'WHERE event_product_id = %s{condition} '
+            'RETURNING quantity, reserved',
+            params,
+        )
+        return cursor.fetchone()
+
+
+def _apply_delta(product, delta, reason, user=None, notes='', caja_sale=None, order=None, reserved_delta=0):
+    row = _update_stock(product, delta, reserved_delta)
+    if row is None:
+        stock = ensure_stock_row(product)
+        row = _update_stock(product, delta, reserved_delta)
+        if row is None:
+            raise InsufficientStockError(product, reserved_delta - delta, stock.free)
+
+    if delta:
+        EventProductStockRecord.objects.create(
+            event_product=product,
+            delta=delta,
+            reason=reason,
+            balance_after=row[0],
+            notes=notes,
+            created_by=user,
+            caja_sale=caja_sale,
+            order=order,
+        )
+    return row
 
 
 def adjust_stock(product, delta, user, notes=''):
@@ -136,30 +166,125 @@ def set_unlimited(product, unlimited, user=None):
         )
 
 
-def validate_lines(lines):
+def _merge_lines(lines):
+    """[(producto, cantidad)] sumando los productos repetidos, en orden de id (el orden de los locks)."""
+    merged = {}
     for line in lines:
+        if line['quantity'] <= 0:
+            continue
         product = line['event_product']
-        quantity = line['quantity']
-        qty = available(product)
+        previous = merged.get(product.pk, (product, 0))[1]
+        merged[product.pk] = (product, previous + line['quantity'])
+    return [merged[pk] for pk in sorted(merged)]
+
+
+def validate_lines(lines):
+    """Chequeo previo, en una query, sin lockear: el descuento real lo vuelve a verificar."""
+    merged = _merge_lines(lines)
+    free = {
+        product_id: (quantity - reserved if quantity is not None else None)
+        for product_id, quantity, reserved in EventProductStock.objects.filter(
+            event_product_id__in=[product.pk for product, _ in merged],
+        ).values_list('event_product_id', 'quantity', 'reserved')
+    }
+    for product, quantity in merged:
+        # Sin fila de stock es ilimitado (ensure_stock_row la crea con quantity=None)
+        qty = free.get(product.pk)
         if qty is not None and quantity > qty:
             raise InsufficientStockError(product, quantity, qty)
 
 
 def deduct_for_lines(lines, user, reason, caja_sale=None, order=None, notes=''):
     with transaction.atomic():
-        validate_lines(lines)
-        for line in lines:
-            if line['quantity'] <= 0:
-                continue
+        for product, quantity in _merge_lines(lines):
+            _apply_delta(
+                product,
+                -quantity,
+                reason,
+                user=user,
+                notes=notes,
+                caja_sale=caja_sale,
+                order=order,
+            )
+
+
+def reserve_lines(lines, caja_sale=None, ttl_seconds=None):
+    """
+    Aparta el stock de las líneas hasta que se confirme (commit_reservations),
+    se libere (release_reservations) o venza. Todo o nada: si un producto no
+    alcanza se levanta InsufficientStockError y no queda nada reservado.
+    """
+    expires_at = timezone.now() + timedelta(seconds=ttl_seconds or RESERVATION_TTL_SECONDS)
+    reservations = []
+    with transaction.atomic():
+        for product, quantity in _merge_lines(lines):
+            _apply_delta(product, 0, None, reserved_delta=quantity)
+            reservations.append(EventProductStockReservation(
+                event_product=product,
+                caja_sale=caja_sale,
+                quantity=quantity,
+                expires_at=expires_at,
+            ))
+        EventProductStockReservation.objects.bulk_create(reservations)
+    return reservations
+
+
+def _lock_active(reservations):
+    return list(
+        reservations.filter(status=EventProductStockReservation.Status.ACTIVE)
+        .select_for_update(of=('self',))
+        .select_related('event_product')
+        .order_by('event_product_id', 'id')
+    )
+
+
+def commit_reservations(reservations, user, reason, caja_sale=None, order=None, notes=''):
+    """
+    Convierte en descuento las reservas activas del queryset: pasa las unidades
+    de reservado a vendido y deja el registro en el historial. Devuelve cuántas
+    reservas se confirmaron (0 si ya habían vencido: ahí hay que descontar sin reserva).
+    """
+    with transaction.atomic():
+        active = _lock_active(reservations)
+        for reservation in active:
             _apply_delta(
-                line['event_product'],
-                -line['quantity'],
+                reservation.event_product,
+                -reservation.quantity,
                 reason,
                 user=user,
                 notes=notes,
                 caja_sale=caja_sale,
                 order=order,
+                reserved_delta=-reservation.quantity,
             )
+        EventProductStockReservation.objects.filter(pk__in=[r.pk for r in active]).update(
+            status=EventProductStockReservation.Status.COMMITTED, updated_at=timezone.now(),
+        )
+    return len(active)
+
+
+def release_reservations(reservations):
+    """Devuelve a lo libre las unidades de las reservas activas del queryset."""
+    with transaction.atomic():
+        active = _lock_active(reservations)
+        for reservation in active:
+            _update_stock(reservation.event_product, reserved_delta=-reservation.quantity)
+        EventProductStockReservation.objects.filter(pk__in=[r.pk for r in active]).update(
+            status=EventProductStockReservation.Status.RELEASED, updated_at=timezone.now(),
+        )
+    return len(active)
+
+
+def release_expired_reservations(event=None, context=None):
+    """Cron: libera las reservas vencidas (ventas pendientes que nadie pagó ni canceló)."""
+    expired = EventProductStockReservation.objects.filter(
+        status=EventProductStockReservation.Status.ACTIVE,
+        expires_at__lt=timezone.now(),
+    )
+    released = release_reservations(expired)
+    if released:
+        logger.info('Reservas de stock vencidas liberadas: %s', released)
+    return released
 
 
 def deduct_for_order_tickets(order, user=None):
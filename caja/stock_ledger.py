@@ -0,0 +1,202 @@
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from caja.models import (
+    EventProduct,
+    EventProductStockArchive,
+    EventProductStockRecord,
+    EventProductStockSnapshot,
+)
+
+logger = logging.getLogger(__name__)
+
+# Los snapshots se toman hasta hace un rato: una transacción de venta que todavía
+# no commiteó no puede quedar con un id menor al último incluido
+SNAPSHOT_LAG_SECONDS = 300
+LEDGER_PAGE_SIZE = 50
+MAX_LEDGER_PAGE_SIZE = 200
+
+
+class InvalidLedgerCursor(ValueError):
+    pass
+
+
+def latest_snapshot(product, as_of=None):
+    snapshots = EventProductStockSnapshot.objects.filter(event_product=product)
+    if as_of is not None:
+        snapshots = snapshots.filter(as_of__lte=as_of)
+    return snapshots.order_by('-last_record_id', '-as_of').first()
+
+
+def take_snapshot(product, as_of=None):
+    """
+    Snapshot del producto a `as_of` (por defecto, hace SNAPSHOT_LAG_SECONDS), a
+    partir del snapshot anterior y los registros posteriores a él. Si no hubo
+    registros nuevos devuelve el anterior sin crear otro.
+    """
+    as_of = as_of or timezone.now() - timedelta(seconds=SNAPSHOT_LAG_SECONDS)
+    previous = latest_snapshot(product, as_of)
+    last_record_id = previous.last_record_id if previous else 0
+
+    agg = EventProductStockRecord.objects.filter(
+        event_product=product, id__gt=last_record_id, created_at__lte=as_of,
+    ).aggregate(last_id=Max('id'), net_delta=Sum('delta'), count=Count('id'))
+    if not agg['count']:
+        return previous
+
+    balance = EventProductStockRecord.objects.filter(pk=agg['last_id']).values_list('balance_after', flat=True).first()
+    return EventProductStockSnapshot.objects.create(
+        event_product=product,
+        as_of=as_of,
+        last_record_id=agg['last_id'],
+        balance=balance,
+        net_delta=(previous.net_delta if previous else 0) + agg['net_delta'],
+        record_count=(previous.record_count if previous else 0) + agg['count'],
+    )
+
+
+def take_event_snapshots(event, as_of=None):
+    as_of = as_of or timezone.now() - timedelta(seconds=SNAPSHOT_LAG_SECONDS)
+    taken = 0
+    for product in EventProduct.objects.filter(event=event).order_by('id'):
+        snapshot = take_snapshot(product, as_of)
+        if snapshot is not None and snapshot.as_of == as_of:
+            taken += 1
+    return taken
+
+
+def take_stock_snapshots(event, context):
+    """Cron: snapshot diario del historial de stock de los productos de eventos activos."""
+    from events.models import Event
+
+    as_of = timezone.now() - timedelta(seconds=SNAPSHOT_LAG_SECONDS)
+    taken = sum(take_event_snapshots(active, as_of) for active in Event.get_active_events())
+    logger.info('Snapshots de stock tomados: %s', taken)
+    return taken
+
+
+def balance_as_of(product, when):
+    """
+    Stock del producto en `when` (None = ilimitado o sin movimientos). Exacto
+    sobre registros vivos y snapshots; en la parte archivada, al cierre del
+    último día completo. Gana la fuente que llega al registro más nuevo.
+    """
+    candidates = []
+    snapshot = latest_snapshot(product, when)
+    if snapshot is not None:
+        candidates.append((snapshot.last_record_id, snapshot.balance))
+    last_record = (
+        EventProductStockRecord.objects.filter(event_product=product, created_at__lte=when)
+        .order_by('-id')
+        .only('balance_after')
+        .first()
+    )
+    if last_record is not None:
+        candidates.append((last_record.pk, last_record.balance_after))
+    archived = (
+        EventProductStockArchive.objects.filter(event_product=product, day__lt=timezone.localdate(when))
+        .order_by('-last_record_id')
+        .first()
+    )
+    if archived is not None:
+        candidates.append((archived.last_record_id, archived.balance_after))
+    if not candidates:
+        return None
+    return max(candidates, key=lambda candidate: candidate[0])[1]
+
+
+def ledger_page(product, cursor=None, limit=LEDGER_PAGE_SIZE):
+    """
+    Historial desde el último snapshot en adelante, de a páginas por id. Devuelve
+    (snapshot o None, registros, cursor de la página siguiente o None).
+    """
+    limit = max(1, min(limit, MAX_LEDGER_PAGE_SIZE))
+    snapshot = latest_snapshot(product)
+    after_id = snapshot.last_record_id if snapshot else 0
+    if cursor:
+        try:
+            after_id = max(after_id, int(cursor))
+        except (TypeError, ValueError) as e:
+            raise InvalidLedgerCursor(cursor) from e
+    records = list(
+        EventProductStockRecord.objects.filter(event_product=product, id__gt=after_id)
+        .select_related('created_by')
+        .order_by('id')[:limit + 1]
+    )
+    next_cursor = str(records[limit - 1].pk) if len(records) > limit else None
+    return snapshot, records[:limit], next_cursor
+
+
+def _merge_archive_row(product, row, balances):
+    archived, created = EventProductStockArchive.objects.get_or_create(
+        event_product=product,
+        day=row['day'],
+        reason=row['reason'],
+        defaults={
+            'delta': row['delta'],
+            'record_count': row['count'],
+            'first_record_id': row['first_id'],
+            'last_record_id': row['last_id'],
+            'balance_after': balances.get(row['last_id']),
+        },
+    )
+    if created:
+        return
+    # El mismo día y motivo ya tenía registros archivados en una corrida anterior
+    archived.delta += row['delta']
+    archived.record_count += row['count']
+    archived.first_record_id = min(archived.first_record_id, row['first_id'])
+    if row['last_id'] > archived.last_record_id:
+        archived.last_record_id = row['last_id']
+        archived.balance_after = balances.get(row['last_id'])
+    archived.save()
+
+
+def archive_product_ledger(product, before):
+    """
+    Compacta en EventProductStockArchive los registros del producto anteriores
+    a `before` y los borra, dejando un snapshot en el corte. Verifica que
+    archivo + registros vivos sigan sumando lo mismo que el snapshot.
+    Devuelve la cantidad de registros archivados.
+    """
+    with transaction.atomic():
+        snapshot = take_snapshot(product, before)
+        if snapshot is None:
+            return 0
+        records = EventProductStockRecord.objects.filter(event_product=product, id__lte=snapshot.last_record_id)
+        rows = list(
+            records.annotate(day=TruncDate('created_at'))
+            .values('day', 'reason')
+            .annotate(delta=Sum('delta'), count=Count('id'), first_id=Min('id'), last_id=Max('id'))
+            .order_by()
+        )
+        if not rows:
+            return 0
+        balances = dict(
+            EventProductStockRecord.objects.filter(pk__in=[row['last_id'] for row in rows])
+            .values_list('id', 'balance_after')
+        )
+        for row in rows:
+            _merge_archive_row(product, row, balances)
+        archived, _ = records.delete()
+
+        totals = EventProductStockArchive.objects.filter(event_product=product).aggregate(
+            delta=Sum('delta'), count=Sum('record_count'),
+        )
+        if totals['delta'] != snapshot.net_delta or totals['count'] != snapshot.record_count:
+            raise RuntimeError(
+                f'El archivo de stock de {product} no coincide con el snapshot '
+                f'({totals} vs {snapshot.net_delta}/{snapshot.record_count})'
+            )
+    return archived
+
+
+def finished_events(older_than_days):
+    from events.models import Event
+
+    return Event.objects.filter(end__lt=timezone.now() - timedelta(days=older_than_days))
@@ -6,6 +6,7 @@ from caja.views import (
     api_create_sale,
     api_pay_mp_point,
     api_pay_mp_qr,
+    api_product_stock_ledger,
     api_sale_status,
     caja_edit_view,
     caja_events_v2_view,
@@ -33,6 +34,11 @@ urlpatterns = [
         product_stock_view,
         name='caja_product_stock',
     ),
+    path(
+        'mis-eventos/<slug:event_slug>/productos/<int:product_id>/stock/historial/',
+        api_product_stock_ledger,
+        name='caja_product_stock_ledger',
+    ),
     path('mis-eventos/<slug:event_slug>/cajas-v2/', cajas_list_view, name='cajas_v2'),
     path(
         'mis-eventos/<slug:event_slug>/reporte-cajas/',
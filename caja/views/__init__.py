@@ -1,4 +1,5 @@
 from caja.views.admin_views import (
+    api_product_stock_ledger,
     caja_edit_view,
     caja_events_v2_view,
     cajas_list_view,
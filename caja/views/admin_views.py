@@ -30,6 +30,7 @@ from caja.models import (
 from caja.permissions import get_event_for_admin, get_event_for_caja, user_has_caja_access
 from caja.services.mercadopago_setup import ensure_mp_qr_config, terminal_linked_cajas
 from caja.stock import adjust_stock, available, ensure_stock_row, initialize_product_stock, set_unlimited
+from caja.stock_ledger import InvalidLedgerCursor, latest_snapshot, ledger_page
 from events.models import Event
 
 logger = logging.getLogger(__name__)
@@ -142,12 +143,50 @@ def product_stock_view(request, event_slug, product_id):
         'stock': stock,
         'stock_form': stock_form,
         'records': records,
+        'snapshot': latest_snapshot(product),
         'available': available(product),
         'is_unlimited': is_unlimited,
     })
     return render(request, 'mi_fuego/caja_v2/product_stock.html', context)
 
 
+@login_required
+@require_GET
+def api_product_stock_ledger(request, event_slug, product_id):
+    event = get_event_for_admin(request.user, event_slug)
+    product = get_object_or_404(EventProduct, id=product_id, event=event)
+    try:
+        limit = int(request.GET.get('limit', 50))
+        snapshot, records, next_cursor = ledger_page(product, request.GET.get('cursor'), limit)
+    except (ValueError, InvalidLedgerCursor):
+        return JsonResponse({'error': 'Parámetros inválidos'}, status=400)
+
+    return JsonResponse({
+        'snapshot': {
+            'as_of': snapshot.as_of.isoformat(),
+            'balance': snapshot.balance,
+            'net_delta': snapshot.net_delta,
+            'record_count': snapshot.record_count,
+        } if snapshot else None,
+        'records': [
+            {
+                'id': record.id,
+                'created_at': record.created_at.isoformat(),
+                'delta': record.delta,
+                'balance_after': record.balance_after,
+                'reason': record.reason,
+                'reason_display': record.get_reason_display(),
+                'notes': record.notes,
+                'created_by': record.created_by.email if record.created_by else None,
+                'caja_sale_id': record.caja_sale_id,
+                'order_id': record.order_id,
+            }
+            for record in records
+        ],
+        'next_cursor': next_cursor,
+    })
+
+
 @login_required
 def cajas_list_view(request, event_slug):
     event = get_event_for_admin(request.user, event_slug)
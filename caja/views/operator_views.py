@@ -21,6 +21,7 @@ from caja.models import CajaSale, EventCaja, EventCajaProduct
 from caja.operator_stats import ticket_caja_operator_stats
 from caja.permissions import get_event_for_caja
 from caja.qr_utils import qr_string_to_data_url
+from caja.rollups import record_paid_sale
 from caja.services.mercadopago_setup import ensure_mp_qr_config
 from caja.services.sales import create_pending_sale, finalize_caja_sale
 from caja.stock import available, InsufficientStockError
@@ -385,6 +386,7 @@ def api_cancel_paid_sale(request, event_slug, caja_id, sale_id):
             notes=f'Cancelación de tx #{sale.id}. Motivo: {reason}',
             mark_as_used=False,
         )
+        record_paid_sale(cancellation, lines=[])
 
     return JsonResponse({
         'sale_id': sale.id,
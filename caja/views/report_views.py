@@ -29,7 +29,7 @@ def event_report_view(request, event_slug):
     if not user_is_event_admin(request.user, event):
         return HttpResponseForbidden('No tenés permiso para ver este evento')
 
-    report = build_event_report(event)
+    report = build_event_report(event, use_cache=True)
     context = mi_fuego_admin_context(request, event, f'event_report_{event.slug}')
     context.update({'report': report})
     return render(request, 'mi_fuego/caja_v2/event_report.html', context)
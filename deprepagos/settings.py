@@ -164,6 +164,19 @@ DATABASES = {
 }
 print(f'DATABASE HOST: {DATABASES["default"]["HOST"]}')
 
+# Cache compartido entre todos los Lambdas (LocMem sería uno por contenedor y las
+# invalidaciones no llegarían a los demás). La tabla la crea tickets/migrations/0075.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+        'TIMEOUT': 600,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', '50000')),
+        },
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
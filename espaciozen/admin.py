@@ -1,3 +1,31 @@
 from django.contrib import admin
 
-# No models to register - all persistence is done in Google Calendar
+from espaciozen.models import CalendarEvent
+
+
+class CalendarEventAdmin(admin.ModelAdmin):
+    """Copia local de Google Calendar, de sólo lectura: las reservas se cambian en Google o desde la app."""
+    list_display = [
+        'summary', 'start', 'end', 'all_day', 'status', 'sync_status', 'sync_attempts', 'google_updated', 'updated_at',
+    ]
+    list_filter = ['sync_status', 'all_day', 'status']
+    search_fields = ['summary', 'google_id', 'sync_error']
+    date_hierarchy = 'start'
+    actions = ['retry_push']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description='Reintentar subir a Google')
+    def retry_push(self, request, queryset):
+        from espaciozen.bookings import dispatch_push
+
+        updated = queryset.exclude(sync_status=CalendarEvent.SyncStatus.SYNCED).update(sync_attempts=0)
+        dispatch_push()
+        self.message_user(request, f'{updated} eventos vuelven a la cola para subir a Google')
+
+
+admin.site.register(CalendarEvent, CalendarEventAdmin)
@@ -0,0 +1,317 @@
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from espaciozen import google_calendar
+from espaciozen.google_calendar import CALENDAR_TIMEZONE, CalendarAPIError
+from espaciozen.interval_index import IntervalIndex
+from espaciozen.models import CalendarEvent
+from tickets.models import CronCheckpoint
+
+logger = logging.getLogger(__name__)
+
+try:
+    from zappa.asynchronous import task
+except Exception:  # pragma: no cover - zappa package may be unavailable locally
+    task = None
+
+# Horario en el que se sugieren turnos y se arma la vista por día
+OPENING_HOUR = int(os.environ.get('ESPACIO_ZEN_HORA_APERTURA', '8'))
+CLOSING_HOUR = int(os.environ.get('ESPACIO_ZEN_HORA_CIERRE', '22'))
+SLOT_STEP = timedelta(minutes=30)
+# Días hacia adelante que cubre el índice en memoria; más allá se consulta la base
+INDEX_HORIZON_DAYS = int(os.environ.get('ESPACIO_ZEN_INDEX_HORIZON_DAYS', '120'))
+MAX_SUGGESTION_DAYS = 14
+MAX_PUSH_ATTEMPTS = 6
+PUSH_BATCH_SIZE = 50
+# Fila que serializa las altas y cambios de reservas (el chequeo de superposición y el insert van juntos)
+LOCK_NAME = 'espaciozen_reservas'
+
+
+class BookingConflict(Exception):
+    pass
+
+
+def active_events():
+    """Eventos que ocupan el espacio: todo el calendario menos lo que se está borrando."""
+    return CalendarEvent.objects.exclude(sync_status=CalendarEvent.SyncStatus.PENDING_DELETE)
+
+
+# (versión, IntervalIndex) del proceso
+_index = (None, None)
+_index_lock = threading.Lock()
+
+
+def _index_window():
+    now = timezone.now()
+    return now - timedelta(days=1), now + timedelta(days=INDEX_HORIZON_DAYS)
+
+
+def booking_index():
+    """
+    IntervalIndex de los eventos de la ventana [ayer, INDEX_HORIZON_DAYS]. Se
+    reconstruye sólo si cambió la tabla (una consulta de agregados) o el día.
+    """
+    global _index
+    stats = CalendarEvent.objects.aggregate(last=Max('updated_at'), count=Count('id'))
+    version = (stats['last'], stats['count'], timezone.localdate())
+    with _index_lock:
+        if _index[0] == version:
+            return _index[1]
+    since, until = _index_window()
+    rows = active_events().filter(end__gt=since, start__lt=until).values_list('start', 'end', 'google_id')
+    index = IntervalIndex(rows)
+    with _index_lock:
+        _index = (version, index)
+    return index
+
+
+def _in_index(inicio, fin):
+    since, until = _index_window()
+    return inicio >= since and fin <= until
+
+
+def overlapping(inicio, fin, exclude_id=None):
+    """(start, end, google_id) de los eventos que se superponen con [inicio, fin)."""
+    if _in_index(inicio, fin):
+        return booking_index().overlapping(inicio, fin, exclude=exclude_id)
+    events = active_events().filter(start__lt=fin, end__gt=inicio)
+    if exclude_id:
+        events = events.exclude(google_id=exclude_id)
+    return list(events.values_list('start', 'end', 'google_id'))
+
+
+def is_free(inicio, fin, exclude_id=None):
+    return not overlapping(inicio, fin, exclude_id=exclude_id)
+
+
+def _day_windows(desde, days):
+    """(apertura, cierre) de cada día a partir de desde; el primero arranca en desde si ya abrió."""
+    first_day = timezone.localtime(desde).date()
+    tz = timezone.get_current_timezone()
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        opening = timezone.make_aware(datetime.combine(day, datetime.min.time()), tz) + timedelta(hours=OPENING_HOUR)
+        closing = timezone.make_aware(datetime.combine(day, datetime.min.time()), tz) + timedelta(hours=CLOSING_HOUR)
+        opening = max(opening, desde)
+        if opening < closing:
+            yield opening, closing
+
+
+def _index_for(desde, days):
+    if _in_index(desde, desde + timedelta(days=days)):
+        return booking_index()
+    until = desde + timedelta(days=days + 1)
+    return IntervalIndex(active_events().filter(start__lt=until, end__gt=desde).values_list('start', 'end', 'google_id'))
+
+
+def suggest_slots(duracion, desde=None, limit=3, exclude_id=None, days=MAX_SUGGESTION_DAYS):
+    """Los próximos `limit` turnos libres de `duracion` dentro del horario, a partir de desde."""
+    desde = max(desde or timezone.now(), timezone.now())
+    index = _index_for(desde, days)
+    return index.free_slots(duracion, _day_windows(desde, days), step=SLOT_STEP, limit=limit, exclude=exclude_id)
+
+
+def occupancy(desde, days):
+    """Por día: bloques ocupados y huecos libres dentro del horario."""
+    index = _index_for(desde, days)
+    return [
+        {
+            'fecha': timezone.localtime(opening).date(),
+            'ocupado': index.busy(opening, closing),
+            'libre': index.gaps(opening, closing),
+        }
+        for opening, closing in _day_windows(desde, days)
+    ]
+
+
+def upcoming_for(owner_hash, limit=50):
+    """Reservas de un usuario que todavía no terminaron, en orden."""
+    return active_events().filter(owner_hash=owner_hash, end__gt=timezone.now()).order_by('start')[:limit]
+
+
+def _lock_bookings():
+    CronCheckpoint.objects.select_for_update().get(name=LOCK_NAME)
+
+
+def _check_free(inicio, fin, exclude_id=None):
+    # Contra la base y no contra el índice del proceso: otro Lambda pudo haber reservado recién
+    conflicts = active_events().filter(start__lt=fin, end__gt=inicio)
+    if exclude_id:
+        conflicts = conflicts.exclude(google_id=exclude_id)
+    if conflicts.exists():
+        raise BookingConflict('Ya existe un evento en Google Calendar en este horario')
+
+
+def create_booking(summary, description, inicio, fin, owner_hash):
+    """
+    Guarda la reserva localmente, si el horario está libre, y la sube a Google en
+    segundo plano. El id del evento se genera acá (Google acepta ids propios), así
+    que se puede devolver antes de que llegue a Google.
+    """
+    CronCheckpoint.load(LOCK_NAME)
+    with transaction.atomic():
+        _lock_bookings()
+        _check_free(inicio, fin)
+        event = CalendarEvent.objects.create(
+            google_id=uuid.uuid4().hex,
+            summary=summary,
+            description=description,
+            start=inicio,
+            end=fin,
+            owner_hash=owner_hash,
+            sync_status=CalendarEvent.SyncStatus.PENDING_CREATE,
+            local_version=1,
+        )
+        transaction.on_commit(dispatch_push)
+    return event
+
+
+def update_booking(event, summary, description, inicio, fin):
+    CronCheckpoint.load(LOCK_NAME)
+    with transaction.atomic():
+        _lock_bookings()
+        _check_free(inicio, fin, exclude_id=event.google_id)
+        event = CalendarEvent.objects.select_for_update().get(pk=event.pk)
+        event.summary = summary
+        event.description = description
+        event.start = inicio
+        event.end = fin
+        # Si todavía no llegó a Google, el alta pendiente ya sube la versión nueva
+        if event.sync_status != CalendarEvent.SyncStatus.PENDING_CREATE:
+            event.sync_status = CalendarEvent.SyncStatus.PENDING_UPDATE
+        event.local_version += 1
+        event.sync_attempts = 0
+        event.sync_error = ''
+        event.save()
+        transaction.on_commit(dispatch_push)
+    return event
+
+
+def delete_booking(event):
+    with transaction.atomic():
+        event = CalendarEvent.objects.select_for_update().get(pk=event.pk)
+        if event.sync_status == CalendarEvent.SyncStatus.PENDING_CREATE:
+            # No se confirmó en Google: se borra acá y, por si el alta llegó a subir, también allá
+            event.delete()
+            transaction.on_commit(lambda: _delete_remote_quietly(event.google_id))
+            return
+        event.sync_status = CalendarEvent.SyncStatus.PENDING_DELETE
+        event.local_version += 1
+        event.sync_attempts = 0
+        event.sync_error = ''
+        event.save()
+        transaction.on_commit(dispatch_push)
+
+
+def _delete_remote_quietly(google_id):
+    try:
+        google_calendar.delete_event(google_id)
+    except CalendarAPIError as e:
+        if e.status_code != 404:
+            logger.warning('Espacio Zen: no se pudo borrar en Google el evento %s: %s', google_id, e.message)
+    except Exception:
+        logger.exception('Espacio Zen: no se pudo borrar en Google el evento %s', google_id)
+
+
+def _event_body(event):
+    return {
+        'summary': event.summary,
+        'description': event.description,
+        'start': {
+            'dateTime': timezone.localtime(event.start).isoformat(),
+            'timeZone': CALENDAR_TIMEZONE
+        },
+        'end': {
+            'dateTime': timezone.localtime(event.end).isoformat(),
+            'timeZone': CALENDAR_TIMEZONE
+        }
+    }
+
+
+def _push_to_google(event):
+    """Aplica en Google el cambio pendiente. Devuelve el evento como quedó allá, o None si se borró."""
+    if event.sync_status == CalendarEvent.SyncStatus.PENDING_DELETE:
+        try:
+            google_calendar.delete_event(event.google_id)
+        except CalendarAPIError as e:
+            if e.status_code != 404:
+                raise
+        return None
+    if event.sync_status == CalendarEvent.SyncStatus.PENDING_CREATE:
+        try:
+            return google_calendar.insert_event(dict(_event_body(event), id=event.google_id))
+        except CalendarAPIError as e:
+            # Ya estaba creado (un push anterior que no llegó a confirmar): se actualiza
+            if e.status_code != 409:
+                raise
+    return google_calendar.update_event(event.google_id, _event_body(event))
+
+
+def push_event(event_id):
+    """Sube un cambio local. Si mientras tanto hubo otro cambio, queda pendiente para el próximo push."""
+    event = CalendarEvent.objects.filter(pk=event_id).exclude(sync_status=CalendarEvent.SyncStatus.SYNCED).first()
+    if event is None:
+        return None
+    pending = CalendarEvent.objects.filter(pk=event.pk, local_version=event.local_version)
+    now = timezone.now()
+    try:
+        remote = _push_to_google(event)
+    except Exception as e:
+        message = e.message if isinstance(e, CalendarAPIError) else f'{type(e).__name__}: {e}'
+        pending.update(sync_attempts=F('sync_attempts') + 1, sync_error=message, updated_at=now)
+        logger.warning('Espacio Zen: no se pudo subir el evento %s (%s): %s', event.google_id, event.sync_status, message)
+        return False
+    if remote is None:
+        pending.delete()
+    else:
+        pending.update(
+            sync_status=CalendarEvent.SyncStatus.SYNCED, sync_attempts=0, sync_error='',
+            google_updated=parse_datetime(remote['updated']) if remote.get('updated') else None, updated_at=now,
+        )
+    return True
+
+
+def push_pending_events(limit=PUSH_BATCH_SIZE):
+    """Sube a Google los cambios locales pendientes, los más viejos primero."""
+    event_ids = list(
+        CalendarEvent.objects.exclude(sync_status=CalendarEvent.SyncStatus.SYNCED)
+        .filter(sync_attempts__lt=MAX_PUSH_ATTEMPTS)
+        .order_by('updated_at')
+        .values_list('id', flat=True)[:limit]
+    )
+    summary = {'pushed': 0, 'failed': 0}
+    for event_id in event_ids:
+        result = push_event(event_id)
+        if result:
+            summary['pushed'] += 1
+        elif result is False:
+            summary['failed'] += 1
+    if event_ids:
+        logger.info('Espacio Zen: %s cambios subidos a Google, %s con error', summary['pushed'], summary['failed'])
+    return summary
+
+
+if task:
+    @task
+    def push_pending_events_async():
+        """Sube los cambios en un Lambda aparte (o en línea fuera de Lambda)."""
+        return push_pending_events()
+else:
+    def push_pending_events_async():
+        """Fallback cuando zappa.asynchronous no está disponible."""
+        return push_pending_events()
+
+
+def dispatch_push():
+    try:
+        push_pending_events_async()
+    except Exception:
+        logger.exception('Espacio Zen: no se pudo disparar el push a Google; queda para el cron')
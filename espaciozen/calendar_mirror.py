@@ -0,0 +1,265 @@
+import logging
+import os
+import re
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from espaciozen import google_calendar
+from espaciozen.google_calendar import CalendarAPIError
+from espaciozen.models import CalendarEvent
+from tickets.models import CronCheckpoint
+
+logger = logging.getLogger(__name__)
+
+try:
+    from zappa.asynchronous import task
+except Exception:  # pragma: no cover - zappa package may be unavailable locally
+    task = None
+
+CHECKPOINT_NAME = 'espaciozen_calendar'
+# Si la copia local tiene más de esto, las lecturas disparan una sincronización en segundo plano
+MIRROR_MAX_AGE_SECONDS = int(os.environ.get('ESPACIO_ZEN_MIRROR_MAX_AGE_SECONDS', '60'))
+PAGE_SIZE = 250
+# Cuánto dura el reclamo de una sincronización; pasado eso, si el worker murió, otro la retoma
+SYNC_LEASE = timedelta(minutes=5)
+USER_HASH_RE = re.compile(r'[0-9a-f]{64}')
+
+MIRROR_FIELDS = ['summary', 'description', 'start', 'end', 'all_day', 'status', 'owner_hash', 'google_updated']
+
+
+def _parse_time(value):
+    """(datetime aware, todo el día) del start/end de un evento de Google."""
+    value = value or {}
+    if value.get('dateTime'):
+        parsed = parse_datetime(value['dateTime'])
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed, False
+    day = parse_date(value.get('date') or '')
+    if day is None:
+        raise ValueError(f'Evento sin fecha: {value}')
+    return timezone.make_aware(datetime.combine(day, datetime.min.time())), True
+
+
+def owner_hash_of(description):
+    """El hash del email de quien reservó va al final de la descripción, sin prefijo."""
+    tail = (description or '')[-64:]
+    return tail if USER_HASH_RE.fullmatch(tail) else ''
+
+
+def _mirror_fields(item):
+    start, all_day = _parse_time(item.get('start'))
+    end, _ = _parse_time(item.get('end'))
+    description = item.get('description', '')
+    updated = parse_datetime(item['updated']) if item.get('updated') else None
+    return {
+        'summary': item.get('summary', ''),
+        'description': description,
+        'start': start,
+        'end': end,
+        'all_day': all_day,
+        'status': item.get('status') or 'confirmed',
+        'owner_hash': owner_hash_of(description),
+        'google_updated': updated,
+    }
+
+
+def mirror_event(item):
+    """Guarda en la copia local un evento de Google que todavía no había llegado por la sincronización."""
+    if item.get('status') == 'cancelled':
+        CalendarEvent.objects.filter(google_id=item['id'], sync_status=CalendarEvent.SyncStatus.SYNCED).delete()
+        return None
+    mirrored, _ = CalendarEvent.objects.get_or_create(google_id=item['id'], defaults=_mirror_fields(item))
+    return mirrored
+
+
+def _apply_changes(items, full):
+    """
+    Guarda los cambios de una sincronización. En una completa, lo que no vino ya
+    no existe. Las filas con cambios locales todavía sin subir no se tocan: la
+    versión de Google llega en la sincronización siguiente al push.
+    """
+    changed = {}
+    cancelled = set()
+    for item in items:
+        if item.get('status') == 'cancelled':
+            cancelled.add(item['id'])
+            changed.pop(item['id'], None)
+            continue
+        try:
+            changed[item['id']] = _mirror_fields(item)
+        except (TypeError, ValueError):
+            logger.warning('Espacio Zen: evento %s sin fechas válidas, se ignora', item.get('id'))
+        cancelled.discard(item['id'])
+
+    synced = CalendarEvent.objects.filter(sync_status=CalendarEvent.SyncStatus.SYNCED)
+    if full:
+        synced.exclude(google_id__in=list(changed)).delete()
+    elif cancelled:
+        synced.filter(google_id__in=list(cancelled)).delete()
+
+    existing = {event.google_id: event for event in CalendarEvent.objects.filter(google_id__in=list(changed))}
+    to_create, to_update = [], []
+    now = timezone.now()
+    for google_id, fields in changed.items():
+        event = existing.get(google_id)
+        if event is None:
+            to_create.append(CalendarEvent(google_id=google_id, **fields))
+            continue
+        if event.sync_status != CalendarEvent.SyncStatus.SYNCED:
+            continue
+        if any(getattr(event, name) != value for name, value in fields.items()):
+            for name, value in fields.items():
+                setattr(event, name, value)
+            event.updated_at = now
+            to_update.append(event)
+    CalendarEvent.objects.bulk_create(to_create, batch_size=500)
+    CalendarEvent.objects.bulk_update(to_update, MIRROR_FIELDS + ['updated_at'], batch_size=500)
+    return {'created': len(to_create), 'updated': len(to_update), 'deleted': len(cancelled)}
+
+
+def _fetch_changes(sync_token):
+    """Todas las páginas de cambios desde sync_token (o todo el calendario). Devuelve (items, nextSyncToken)."""
+    params = {'singleEvents': True, 'maxResults': PAGE_SIZE}
+    if sync_token:
+        params['syncToken'] = sync_token
+    items = []
+    while True:
+        page = google_calendar.list_events(**params)
+        items.extend(page.get('items', []))
+        if page.get('nextPageToken'):
+            params['pageToken'] = page['nextPageToken']
+            continue
+        return items, page.get('nextSyncToken')
+
+
+def _claim_sync():
+    """
+    Reclama la sincronización con un lease en el checkpoint, en una transacción
+    corta (SKIP LOCKED): así las páginas de Google se traen sin transacción abierta
+    ni fila bloqueada. Si el worker muere, el lease vence y otro la retoma.
+    Devuelve (claim, cursor) o None si otro proceso la tiene.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        checkpoint = (
+            CronCheckpoint.objects.select_for_update(skip_locked=True).filter(name=CHECKPOINT_NAME).first()
+        )
+        if checkpoint is None:
+            return None
+        claimed_until = parse_datetime(checkpoint.cursor.get('claimed_until') or '')
+        if claimed_until and claimed_until > now:
+            return None
+        claim = uuid.uuid4().hex
+        cursor = dict(checkpoint.cursor, claim=claim, claimed_until=(now + SYNC_LEASE).isoformat())
+        # update() y no store(): updated_at marca la última sincronización, no el reclamo (ver is_stale)
+        CronCheckpoint.objects.filter(pk=checkpoint.pk).update(cursor=cursor)
+    return claim, checkpoint.cursor
+
+
+def _release_sync(claim):
+    with transaction.atomic():
+        checkpoint = CronCheckpoint.objects.select_for_update().get(name=CHECKPOINT_NAME)
+        if checkpoint.cursor.get('claim') == claim:
+            cursor = {key: value for key, value in checkpoint.cursor.items() if key not in ('claim', 'claimed_until')}
+            CronCheckpoint.objects.filter(pk=checkpoint.pk).update(cursor=cursor)
+
+
+def sync_calendar_mirror(full=False):
+    """
+    Trae de Google sólo lo que cambió desde la última sincronización (syncToken)
+    y lo aplica a CalendarEvent. Sin token, o si Google lo invalidó (410), trae
+    el calendario completo. Si otro proceso ya está sincronizando, no hace nada
+    y devuelve None.
+    """
+    CronCheckpoint.load(CHECKPOINT_NAME)
+    started = time.perf_counter()
+    claimed = _claim_sync()
+    if claimed is None:
+        return None
+    claim, cursor = claimed
+    stored_token = cursor.get('sync_token')
+    sync_token = None if full else stored_token
+    try:
+        try:
+            items, next_sync_token = _fetch_changes(sync_token)
+        except CalendarAPIError as e:
+            if e.status_code != 410 or not sync_token:
+                raise
+            logger.info('Espacio Zen: Google invalidó el syncToken, sincronización completa')
+            sync_token = None
+            items, next_sync_token = _fetch_changes(None)
+
+        with transaction.atomic():
+            checkpoint = CronCheckpoint.objects.select_for_update().get(name=CHECKPOINT_NAME)
+            # Si el lease venció y otro proceso ya guardó un token, estos cambios son viejos
+            if checkpoint.cursor.get('claim') != claim or checkpoint.cursor.get('sync_token') != stored_token:
+                logger.warning('Espacio Zen: otro proceso sincronizó mientras se traían los cambios, se descartan')
+                return None
+            summary = _apply_changes(items, full=sync_token is None)
+            checkpoint.store({'sync_token': next_sync_token, 'synced_at': timezone.now().isoformat()})
+    except Exception:
+        _release_sync(claim)
+        raise
+
+    summary['full'] = sync_token is None
+    summary['seconds'] = round(time.perf_counter() - started, 2)
+    logger.info(
+        'Espacio Zen: calendario sincronizado (%s) en %ss: %s nuevos, %s modificados, %s borrados',
+        'completo' if summary['full'] else 'incremental', summary['seconds'],
+        summary['created'], summary['updated'], summary['deleted'],
+    )
+    return summary
+
+
+def is_stale(max_age_seconds=MIRROR_MAX_AGE_SECONDS):
+    checkpoint = CronCheckpoint.objects.filter(name=CHECKPOINT_NAME).first()
+    return (
+        checkpoint is None
+        or not checkpoint.cursor.get('sync_token')
+        or checkpoint.updated_at <= timezone.now() - timedelta(seconds=max_age_seconds)
+    )
+
+
+def refresh_if_stale(max_age_seconds=MIRROR_MAX_AGE_SECONDS):
+    """Dispara una sincronización si la copia local es más vieja que max_age_seconds. No espera a Google."""
+    if is_stale(max_age_seconds):
+        dispatch_sync()
+
+
+def sync_calendar(event, context):
+    """Cron: sube las reservas pendientes y trae los cambios de Google, aunque nadie entre a Espacio Zen."""
+    from espaciozen.bookings import push_pending_events
+
+    push_pending_events()
+    return sync_calendar_mirror()
+
+
+def _sync_quietly():
+    try:
+        return sync_calendar_mirror()
+    except Exception:
+        logger.exception('Espacio Zen: no se pudo sincronizar el calendario, se usa la copia local')
+
+
+if task:
+    @task
+    def sync_calendar_async():
+        """Sincroniza en un Lambda aparte (o en línea fuera de Lambda)."""
+        return _sync_quietly()
+else:
+    def sync_calendar_async():
+        """Fallback cuando zappa.asynchronous no está disponible."""
+        return _sync_quietly()
+
+
+def dispatch_sync():
+    try:
+        sync_calendar_async()
+    except Exception:
+        logger.exception('Espacio Zen: no se pudo disparar la sincronización; queda para el cron')
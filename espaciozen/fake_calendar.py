@@ -0,0 +1,174 @@
+"""
+Calendar API en memoria, para correr Espacio Zen sin service account
+(ESPACIO_ZEN_FAKE_CALENDAR=True) y para probar la sincronización sin ir a Google.
+
+Implementa lo que usa la app: el token OAuth y events list/get/insert/update/delete,
+con paginado, filtros timeMin/timeMax, syncToken incremental (los borrados vuelven
+como cancelled) y 410 cuando el token ya no sirve (ver expire_sync_tokens).
+"""
+import json
+import threading
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+
+
+def _as_utc(value):
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=dt_timezone.utc)
+    return parsed
+
+
+def _bound(item, key):
+    value = item.get(key) or {}
+    return _as_utc(value.get('dateTime') or f"{value.get('date')}T00:00:00")
+
+
+class FakeCalendar:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.events = {}
+            # Número de cambio en el que cambió cada evento; los syncToken son ese número
+            self.changed_at = {}
+            self.sequence = 0
+            self.oldest_valid_token = 0
+            self.requests = []
+
+    def expire_sync_tokens(self):
+        """Los syncToken emitidos hasta ahora pasan a devolver 410, como cuando Google los invalida."""
+        with self._lock:
+            self.sequence += 1
+            self.oldest_valid_token = self.sequence
+
+    def _touch(self, item):
+        self.sequence += 1
+        item['updated'] = datetime.now(dt_timezone.utc).isoformat().replace('+00:00', 'Z')
+        item['etag'] = f'"{self.sequence}"'
+        self.events[item['id']] = item
+        self.changed_at[item['id']] = self.sequence
+
+    def list(self, params):
+        sync_token = params.get('syncToken')
+        if sync_token is not None:
+            since = int(sync_token)
+            if since < self.oldest_valid_token:
+                return 410, {'error': {'code': 410, 'message': 'Sync token is no longer valid, a full sync is required.'}}
+            items = [self.events[key] for key, seq in self.changed_at.items() if seq > since]
+        else:
+            items = [item for item in self.events.values() if item.get('status') != 'cancelled']
+            if params.get('timeMin'):
+                time_min = _as_utc(params['timeMin'])
+                items = [item for item in items if _bound(item, 'end') > time_min]
+            if params.get('timeMax'):
+                time_max = _as_utc(params['timeMax'])
+                items = [item for item in items if _bound(item, 'start') < time_max]
+        items.sort(key=lambda item: (_bound(item, 'start'), item['id']))
+
+        offset = int(params.get('pageToken') or 0)
+        page_size = int(params.get('maxResults') or 250)
+        body = {'kind': 'calendar#events', 'items': items[offset:offset + page_size]}
+        if offset + page_size < len(items):
+            body['nextPageToken'] = str(offset + page_size)
+        elif not params.get('timeMin') and not params.get('timeMax'):
+            body['nextSyncToken'] = str(self.sequence)
+        return 200, body
+
+    def get(self, event_id):
+        item = self.events.get(event_id)
+        if item is None:
+            return 404, {'error': {'code': 404, 'message': 'Not Found'}}
+        return 200, item
+
+    def insert(self, data):
+        # Como Google, acepta un id propio y responde 409 si ya existe
+        event_id = data.get('id') or uuid.uuid4().hex
+        if event_id in self.events:
+            return 409, {'error': {'code': 409, 'message': 'The requested identifier already exists.'}}
+        item = dict(data, id=event_id, status='confirmed')
+        self._touch(item)
+        return 200, item
+
+    def update(self, event_id, data):
+        item = self.events.get(event_id)
+        if item is None or item.get('status') == 'cancelled':
+            return 404, {'error': {'code': 404, 'message': 'Not Found'}}
+        item = dict(data, id=event_id, status=data.get('status', 'confirmed'))
+        self._touch(item)
+        return 200, item
+
+    def delete(self, event_id):
+        item = self.events.get(event_id)
+        if item is None:
+            return 404, {'error': {'code': 404, 'message': 'Not Found'}}
+        if item.get('status') == 'cancelled':
+            return 410, {'error': {'code': 410, 'message': 'Resource has been deleted'}}
+        self._touch({'id': event_id, 'status': 'cancelled', 'start': item['start'], 'end': item['end']})
+        return 204, None
+
+    def handle(self, method, path, params, body):
+        with self._lock:
+            self.requests.append((method, path))
+            if path.endswith('/token'):
+                return 200, {'access_token': f'fake-{uuid.uuid4().hex}', 'expires_in': 3600, 'token_type': 'Bearer'}
+            parts = path.split('/events')
+            if len(parts) != 2:
+                return 404, {'error': {'code': 404, 'message': 'Not Found'}}
+            event_id = unquote(parts[1].strip('/'))
+            if not event_id:
+                if method == 'GET':
+                    return self.list(params)
+                if method == 'POST':
+                    return self.insert(body)
+            elif method == 'GET':
+                return self.get(event_id)
+            elif method == 'PUT':
+                return self.update(event_id, body)
+            elif method == 'DELETE':
+                return self.delete(event_id)
+            return 405, {'error': {'code': 405, 'message': 'Method Not Allowed'}}
+
+
+fake_calendar = FakeCalendar()
+
+
+class FakeCalendarAdapter(BaseAdapter):
+    """Transport de requests que responde desde fake_calendar en vez de ir a googleapis.com."""
+
+    def __init__(self, calendar=None):
+        super().__init__()
+        self.calendar = calendar or fake_calendar
+
+    def send(self, request, **kwargs):
+        url = urlsplit(request.url)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        body = request.body
+        if isinstance(body, bytes):
+            body = body.decode('utf-8')
+        try:
+            body = json.loads(body) if body else None
+        except ValueError:
+            body = None
+        status, payload = self.calendar.handle(request.method, url.path, params, body)
+
+        response = requests.Response()
+        response.status_code = status
+        response.url = request.url
+        response.request = request
+        response.encoding = 'utf-8'
+        if payload is not None:
+            response._content = json.dumps(payload).encode('utf-8')
+            response.headers['Content-Type'] = 'application/json; charset=UTF-8'
+        else:
+            response._content = b''
+        return response
+
+    def close(self):
+        pass
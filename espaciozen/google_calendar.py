@@ -0,0 +1,178 @@
+import logging
+import os
+import threading
+import time
+from urllib.parse import quote
+
+import jwt
+import requests
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+CALENDAR_ID = "espaciozenlasedefa@gmail.com"
+CALENDAR_TIMEZONE = 'America/Argentina/Buenos_Aires'
+TOKEN_URL = 'https://www.googleapis.com/oauth2/v4/token'
+CALENDAR_API_URL = 'https://www.googleapis.com/calendar/v3'
+SCOPE = 'https://www.googleapis.com/auth/calendar'
+REQUEST_TIMEOUT_SECONDS = 10
+# El token se renueva este tiempo antes de que venza, para no usar uno que expira en medio de un request
+TOKEN_REFRESH_MARGIN_SECONDS = int(os.environ.get('ESPACIO_ZEN_TOKEN_REFRESH_MARGIN_SECONDS', '300'))
+TOKEN_CACHE_KEY = 'espaciozen:google_access_token'
+# Calendario en memoria en vez de Google (desarrollo local sin service account)
+FAKE_CALENDAR = os.environ.get('ESPACIO_ZEN_FAKE_CALENDAR', 'False') == 'True'
+
+
+class CalendarAPIError(Exception):
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+_session = None
+_session_lock = threading.Lock()
+# (access_token, vence_en) del proceso; el cache de Django lo comparte entre procesos
+_token = (None, 0)
+_token_lock = threading.Lock()
+
+
+def get_session():
+    """requests.Session compartida, con keep-alive hacia googleapis.com."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                if FAKE_CALENDAR:
+                    from espaciozen.fake_calendar import FakeCalendarAdapter
+
+                    session.mount('https://www.googleapis.com/', FakeCalendarAdapter())
+                else:
+                    session.mount('https://', HTTPAdapter(pool_connections=2, pool_maxsize=8, max_retries=0))
+                _session = session
+    return _session
+
+
+def _request_access_token():
+    """
+    Obtiene un access token usando Service Account JWT. Devuelve (token, segundos de validez).
+    Requiere las siguientes variables de entorno:
+    - ESPACIO_ZEN_CLIENT_EMAIL: El email del service account
+    - ESPACIO_ZEN_PRIVATE_KEY: La clave privada (con \n preservados)
+    """
+    client_email = os.environ.get('ESPACIO_ZEN_CLIENT_EMAIL', '')
+    private_key = os.environ.get('ESPACIO_ZEN_PRIVATE_KEY', '')
+
+    if FAKE_CALENDAR:
+        return 'fake-access-token', 3600
+    if not client_email or not private_key:
+        raise ValueError('ESPACIO_ZEN_CLIENT_EMAIL y ESPACIO_ZEN_PRIVATE_KEY deben estar configurados')
+
+    # Restaurar los saltos de línea en la clave privada
+    private_key = private_key.replace('\\n', '\n')
+
+    now = int(time.time())
+    jwt_payload = {
+        'iss': client_email,
+        'sub': client_email,
+        'aud': TOKEN_URL,
+        'iat': now,
+        'exp': now + 3600,  # Token válido por 1 hora
+        'scope': SCOPE,
+    }
+    assertion = jwt.encode(jwt_payload, private_key, algorithm='RS256')
+
+    response = get_session().post(
+        TOKEN_URL,
+        data={
+            'grant_type': 'urn:ietf:params:oauth:grant-type:jwt-bearer',
+            'assertion': assertion,
+        },
+        timeout=REQUEST_TIMEOUT_SECONDS,
+    )
+    if response.status_code != 200:
+        error_data = response.json() if response.content else {}
+        raise Exception(f'Error obteniendo access token: {error_data.get("error_description", "Error desconocido")}')
+
+    data = response.json()
+    return data['access_token'], int(data.get('expires_in', 3600))
+
+
+def get_access_token(force_refresh=False):
+    """
+    Access token del service account. Se firma el JWT y se va a Google sólo cuando
+    el token guardado (en el proceso o en el cache compartido) está por vencer.
+    """
+    global _token
+    now = time.time()
+    with _token_lock:
+        token, expires_at = _token
+        if not force_refresh and token and now < expires_at - TOKEN_REFRESH_MARGIN_SECONDS:
+            return token
+
+        cached = None if force_refresh else cache.get(TOKEN_CACHE_KEY)
+        if cached and now < cached[1] - TOKEN_REFRESH_MARGIN_SECONDS:
+            _token = tuple(cached)
+            return _token[0]
+
+        token, expires_in = _request_access_token()
+        _token = (token, now + expires_in)
+        cache.set(TOKEN_CACHE_KEY, _token, timeout=max(1, expires_in - TOKEN_REFRESH_MARGIN_SECONDS))
+        logger.info('Espacio Zen: nuevo access token de Google, vence en %ss', expires_in)
+        return token
+
+
+def invalidate_access_token():
+    global _token
+    with _token_lock:
+        _token = (None, 0)
+    cache.delete(TOKEN_CACHE_KEY)
+
+
+def _error_message(response):
+    try:
+        error = (response.json() or {}).get('error', {})
+    except ValueError:
+        return 'Error desconocido'
+    if isinstance(error, dict):
+        return error.get('message') or 'Error desconocido'
+    return str(error)
+
+
+def calendar_request(method, path, expected=(200,), **kwargs):
+    """
+    Request a la Calendar API del calendario de Espacio Zen. Si Google rechaza el
+    token (revocado o vencido antes de tiempo) se pide otro y se reintenta una vez.
+    """
+    url = f'{CALENDAR_API_URL}/calendars/{quote(CALENDAR_ID)}{path}'
+    for attempt in range(2):
+        headers = {'Authorization': f'Bearer {get_access_token(force_refresh=attempt > 0)}'}
+        response = get_session().request(method, url, headers=headers, timeout=REQUEST_TIMEOUT_SECONDS, **kwargs)
+        if response.status_code != 401:
+            break
+    if response.status_code not in expected:
+        raise CalendarAPIError(response.status_code, _error_message(response))
+    return response.json() if response.content else None
+
+
+def list_events(**params):
+    return calendar_request('GET', '/events', params=params)
+
+
+def get_event(event_id):
+    return calendar_request('GET', f'/events/{quote(event_id)}')
+
+
+def insert_event(event_data):
+    return calendar_request('POST', '/events', json=event_data)
+
+
+def update_event(event_id, event_data):
+    return calendar_request('PUT', f'/events/{quote(event_id)}', json=event_data)
+
+
+def delete_event(event_id):
+    # 410: ya estaba borrado
+    return calendar_request('DELETE', f'/events/{quote(event_id)}', expected=(200, 204, 410))
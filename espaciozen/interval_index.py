@@ -0,0 +1,81 @@
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+from itertools import accumulate
+
+
+class IntervalIndex:
+    """
+    Intervalos [start, end) ordenados por inicio, con el máximo fin acumulado.
+    Como ese máximo no decrece, con dos búsquedas binarias se acota el tramo que
+    puede superponerse con una consulta: superposiciones en O(log n + k).
+
+        index = IntervalIndex([(start, end, event_id), ...])
+        index.overlapping(inicio, fin)
+    """
+
+    def __init__(self, intervals):
+        self.intervals = sorted((start, end, key) for start, end, key in intervals if end > start)
+        self._starts = [start for start, _, _ in self.intervals]
+        self._max_ends = list(accumulate((end for _, end, _ in self.intervals), max))
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def overlapping(self, inicio, fin, exclude=None):
+        """(start, end, key) de los intervalos que se superponen con [inicio, fin)."""
+        # Los que empiezan en fin o después no se superponen; antes de `first` todos terminaron a más tardar en inicio
+        last = bisect_left(self._starts, fin)
+        first = bisect_right(self._max_ends, inicio, hi=last)
+        return [
+            interval for interval in self.intervals[first:last]
+            if interval[1] > inicio and interval[2] != exclude
+        ]
+
+    def is_free(self, inicio, fin, exclude=None):
+        return not self.overlapping(inicio, fin, exclude=exclude)
+
+    def busy(self, inicio, fin, exclude=None):
+        """Bloques ocupados dentro de [inicio, fin), con los intervalos que se tocan unidos."""
+        blocks = []
+        for start, end, _ in self.overlapping(inicio, fin, exclude=exclude):
+            start, end = max(start, inicio), min(end, fin)
+            if blocks and start <= blocks[-1][1]:
+                blocks[-1][1] = max(blocks[-1][1], end)
+            else:
+                blocks.append([start, end])
+        return [tuple(block) for block in blocks]
+
+    def gaps(self, inicio, fin, exclude=None):
+        """Huecos libres dentro de [inicio, fin)."""
+        free = []
+        cursor = inicio
+        for start, end in self.busy(inicio, fin, exclude=exclude):
+            if start > cursor:
+                free.append((cursor, start))
+            cursor = max(cursor, end)
+        if cursor < fin:
+            free.append((cursor, fin))
+        return free
+
+    def free_slots(self, duration, windows, step=timedelta(minutes=30), limit=3, exclude=None):
+        """
+        Los primeros `limit` turnos libres de `duration`, uno a continuación del otro,
+        dentro de las ventanas (inicio, fin) dadas en orden (por ejemplo, el horario
+        de cada día). Los inicios se redondean hacia arriba a múltiplos de `step`.
+        """
+        slots = []
+        for window_start, window_end in windows:
+            for gap_start, gap_end in self.gaps(window_start, window_end, exclude=exclude):
+                start = _round_up(gap_start, step)
+                while start + duration <= gap_end:
+                    slots.append((start, start + duration))
+                    if len(slots) >= limit:
+                        return slots
+                    start = _round_up(start + duration, step)
+        return slots
+
+
+def _round_up(moment, step):
+    base = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    steps = -(-(moment - base) // step)
+    return base + steps * step
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from espaciozen.calendar_mirror import sync_calendar_mirror
+
+
+class Command(BaseCommand):
+    help = 'Sincroniza la copia local del calendario de Espacio Zen con Google Calendar.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Ignora el syncToken y trae el calendario completo')
+
+    def handle(self, *args, **options):
+        summary = sync_calendar_mirror(full=options['full'])
+        if summary is None:
+            self.stdout.write(self.style.WARNING('Otro proceso está sincronizando el calendario'))
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Calendario ({'completo' if summary['full'] else 'incremental'}): {summary['created']} nuevos, "
+                f"{summary['updated']} modificados, {summary['deleted']} borrados en {summary['seconds']}s"
+            )
+        )
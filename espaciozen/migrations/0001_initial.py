@@ -0,0 +1,35 @@
+# Generated by Django 4.2.15 on 2026-10-18 17:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('google_id', models.CharField(max_length=255, unique=True)),
+                ('summary', models.TextField(blank=True, default='')),
+                ('description', models.TextField(blank=True, default='')),
+                ('start', models.DateTimeField()),
+                ('end', models.DateTimeField()),
+                ('all_day', models.BooleanField(default=False)),
+                ('status', models.CharField(default='confirmed', max_length=20)),
+                ('owner_hash', models.CharField(blank=True, db_index=True, default='', max_length=64)),
+                ('google_updated', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['start'],
+                'indexes': [models.Index(fields=['start', 'end'], name='espaciozen__start_fb7f8f_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.15 on 2026-10-18 17:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('espaciozen', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendarevent',
+            name='local_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='calendarevent',
+            name='sync_attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='calendarevent',
+            name='sync_error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='calendarevent',
+            name='sync_status',
+            field=models.CharField(choices=[('SYNCED', 'Sincronizado'), ('PENDING_CREATE', 'Crear en Google'), ('PENDING_UPDATE', 'Actualizar en Google'), ('PENDING_DELETE', 'Borrar en Google')], db_index=True, default='SYNCED', max_length=20),
+        ),
+    ]
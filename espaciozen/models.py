@@ -0,0 +1,42 @@
+from django.db import models
+
+from utils.models import BaseModel
+
+
+class CalendarEvent(BaseModel):
+    """
+    Copia local de un evento del calendario de Espacio Zen en Google. La mantiene
+    sync_calendar con los syncToken de Google. Las reservas hechas desde la app se
+    guardan primero acá (sync_status pendiente) y push_pending_events las lleva a
+    Google en segundo plano.
+    """
+    class SyncStatus(models.TextChoices):
+        SYNCED = 'SYNCED', 'Sincronizado'
+        PENDING_CREATE = 'PENDING_CREATE', 'Crear en Google'
+        PENDING_UPDATE = 'PENDING_UPDATE', 'Actualizar en Google'
+        PENDING_DELETE = 'PENDING_DELETE', 'Borrar en Google'
+
+    google_id = models.CharField(max_length=255, unique=True)
+    summary = models.TextField(blank=True, default='')
+    description = models.TextField(blank=True, default='')
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+    all_day = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, default='confirmed')
+    # Hash del email de quien reservó (el final de la descripción), vacío si no es una reserva de la app
+    owner_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)
+    google_updated = models.DateTimeField(null=True, blank=True)
+    sync_status = models.CharField(max_length=20, choices=SyncStatus.choices, default=SyncStatus.SYNCED, db_index=True)
+    # Se incrementa con cada cambio local; un push sólo marca sincronizado si no hubo otro cambio mientras tanto
+    local_version = models.PositiveIntegerField(default=0)
+    sync_attempts = models.PositiveIntegerField(default=0)
+    sync_error = models.TextField(blank=True, default='')
+
+    class Meta:
+        ordering = ['start']
+        indexes = [
+            models.Index(fields=['start', 'end']),
+        ]
+
+    def __str__(self):
+        return f"{self.summary} ({self.start:%Y-%m-%d %H:%M})"
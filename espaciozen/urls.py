@@ -8,5 +8,7 @@ urlpatterns = [
     path('api/listar-reservas/', views.listar_reservas, name='listar_reservas'),
     path('api/editar-reserva/', views.editar_reserva, name='editar_reserva'),
     path('api/borrar-reserva/', views.borrar_reserva, name='borrar_reserva'),
+    path('api/sugerir-horarios/', views.sugerir_horarios, name='sugerir_horarios'),
+    path('api/ocupacion/', views.ocupacion, name='ocupacion'),
 ]
 
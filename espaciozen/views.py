@@ -1,15 +1,20 @@
-import os
+import json
+import hashlib
 from datetime import datetime, timedelta
+
 from django.shortcuts import render
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-import json
-import requests
-import jwt
-import time
-import hashlib
+
+from espaciozen import bookings, calendar_mirror, google_calendar
+from espaciozen.bookings import BookingConflict
+from espaciozen.google_calendar import CALENDAR_ID, CalendarAPIError
+from espaciozen.models import CalendarEvent
+
+MAX_SUGERENCIAS = 10
+MAX_DIAS_OCUPACION = 31
 
 
 def get_user_hash(email):
@@ -21,197 +26,135 @@ def get_user_hash(email):
 
 
 def get_google_access_token():
-    """
-    Obtiene un access token usando Service Account JWT
-    Requiere las siguientes variables de entorno:
-    - ESPACIO_ZEN_CLIENT_EMAIL: El email del service account
-    - ESPACIO_ZEN_PRIVATE_KEY: La clave privada (con \n preservados)
-    - ESPACIO_ZEN_PRIVATE_KEY_ID: El ID de la clave privada (opcional)
-    """
-    client_email = os.environ.get('ESPACIO_ZEN_CLIENT_EMAIL', '')
-    private_key = os.environ.get('ESPACIO_ZEN_PRIVATE_KEY', '')
-    
-    if not client_email or not private_key:
-        raise ValueError('ESPACIO_ZEN_CLIENT_EMAIL y ESPACIO_ZEN_PRIVATE_KEY deben estar configurados')
-    
-    # Restaurar los saltos de línea en la clave privada
-    private_key = private_key.replace('\\n', '\n')
-    
-    # Crear el JWT
-    now = int(time.time())
-    jwt_payload = {
-        'iss': client_email,
-        'sub': client_email,
-        'aud': 'https://www.googleapis.com/oauth2/v4/token',
-        'iat': now,
-        'exp': now + 3600,  # Token válido por 1 hora
-        'scope': 'https://www.googleapis.com/auth/calendar'
+    """Access token del service account; se reutiliza hasta poco antes de que venza."""
+    return google_calendar.get_access_token()
+
+
+def _reserva(event, user_hash, nombre_usuario):
+    """Datos de una reserva del usuario para el template y la API, a partir de la copia local."""
+    # Limpiar la descripción removiendo el nombre y el hash del final (con los saltos de línea que lo preceden)
+    descripcion_limpia = event.description.replace(f'Reservado por: {nombre_usuario}', '').rstrip()
+    if descripcion_limpia.endswith(user_hash):
+        descripcion_limpia = descripcion_limpia[:-len(user_hash)].rstrip()
+    descripcion_limpia = '\n'.join([line for line in descripcion_limpia.split('\n') if line.strip()])
+    return {
+        'id': event.google_id,
+        'titulo': event.summary.replace(f' - {nombre_usuario}', '').strip(),
+        'descripcion': descripcion_limpia,
+        'fecha_inicio': timezone.localtime(event.start).isoformat(),
+        'fecha_fin': timezone.localtime(event.end).isoformat(),
+        'event_id': event.google_id,
     }
-    
-    # Firmar el JWT
-    token = jwt.encode(jwt_payload, private_key, algorithm='RS256')
-    
-    # Intercambiar JWT por access token
-    response = requests.post(
-        'https://www.googleapis.com/oauth2/v4/token',
-        data={
-            'grant_type': 'urn:ietf:params:oauth:grant-type:jwt-bearer',
-            'assertion': token
-        },
-        timeout=10
-    )
-    
-    if response.status_code != 200:
-        error_data = response.json() if response.content else {}
-        raise Exception(f'Error obteniendo access token: {error_data.get("error_description", "Error desconocido")}')
-    
-    return response.json()['access_token']
+
+
+def _reservas_del_usuario(user):
+    nombre_usuario = user.first_name or user.username
+    user_hash = get_user_hash(user.email)
+    calendar_mirror.refresh_if_stale()
+    return [
+        _reserva(event, user_hash, nombre_usuario)
+        for event in bookings.upcoming_for(user_hash)
+    ]
+
+
+def _evento_del_calendario(event_id):
+    """El evento desde la copia local; si todavía no llegó, se busca en Google y se guarda."""
+    event = CalendarEvent.objects.filter(google_id=event_id).first()
+    if event is not None and event.sync_status == CalendarEvent.SyncStatus.PENDING_DELETE:
+        return None
+    if event is None:
+        try:
+            event = calendar_mirror.mirror_event(google_calendar.get_event(event_id))
+        except CalendarAPIError as e:
+            if e.status_code in (404, 410):
+                return None
+            raise
+    return event
+
+
+def _titulo_y_descripcion(titulo, descripcion, nombre_usuario, user_hash):
+    # Incluir el nombre del usuario en el título y hash al final de la descripción para identificación única y privada
+    titulo_con_usuario = f"{titulo} - {nombre_usuario}"
+    # El hash se guarda al final de la descripción con varios saltos de línea y sin prefijo
+    descripcion_completa = f"Reservado por: {nombre_usuario}"
+    if descripcion:
+        descripcion_completa += f"\n\n{descripcion}"
+    descripcion_completa += f"\n\n\n\n{user_hash}"
+    return titulo_con_usuario, descripcion_completa
+
+
+def _parse_fecha(value):
+    fecha = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    # Convertir a timezone aware si no lo es
+    if timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha)
+    return fecha
+
+
+def _horarios(slots):
+    return [
+        {'fecha_inicio': timezone.localtime(inicio).isoformat(), 'fecha_fin': timezone.localtime(fin).isoformat()}
+        for inicio, fin in slots
+    ]
+
+
+def _mensaje_ocupado(sugerencias):
+    mensaje = 'Ya existe un evento en Google Calendar en este horario'
+    if sugerencias:
+        inicio = timezone.localtime(sugerencias[0][0])
+        mensaje += f". Próximo horario libre: {inicio:%d/%m %H:%M}"
+    return mensaje
 
 
 @login_required
 def espaciozen_home(request):
     """Vista principal que muestra el calendario de Google"""
-    calendar_id = "espaciozenlasedefa@gmail.com"
-    
     # Obtener reservas del usuario
     reservas_usuario = []
     try:
-        access_token = get_google_access_token()
-        email_usuario = request.user.email
-        nombre_usuario = request.user.first_name or request.user.username
-        user_hash = get_user_hash(email_usuario)
-        
-        # Buscar eventos del usuario usando su hash (más confiable y privado que el nombre)
-        url = f"https://www.googleapis.com/calendar/v3/calendars/{calendar_id}/events"
-        params = {
-            'timeMin': datetime.now(timezone.get_current_timezone()).isoformat(),
-            'singleEvents': True,
-            'orderBy': 'startTime',
-            'maxResults': 50
-        }
-        headers = {
-            'Authorization': f'Bearer {access_token}'
-        }
-        
-        try:
-            response = requests.get(url, params=params, headers=headers, timeout=10)
-            if response.status_code == 200:
-                events = response.json().get('items', [])
-                # Filtrar eventos que pertenecen al usuario usando su hash
-                for event in events:
-                    summary = event.get('summary', '')
-                    description = event.get('description', '')
-                    # Verificar si el evento termina con el hash del usuario (identificador único y privado)
-                    # El hash está al final de la descripción sin prefijo
-                    if description.endswith(user_hash):
-                        start = event.get('start', {}).get('dateTime', '')
-                        end = event.get('end', {}).get('dateTime', '')
-                        # Limpiar la descripción removiendo el hash del final y el nombre
-                        descripcion_limpia = description.replace(f'Reservado por: {nombre_usuario}', '').rstrip()
-                        # Remover el hash del final (puede haber varios saltos de línea antes)
-                        if descripcion_limpia.endswith(user_hash):
-                            # Remover el hash y los saltos de línea que lo preceden
-                            descripcion_limpia = descripcion_limpia[:-len(user_hash)].rstrip()
-                        # Remover líneas vacías adicionales
-                        descripcion_limpia = '\n'.join([line for line in descripcion_limpia.split('\n') if line.strip()])
-                        reservas_usuario.append({
-                            'id': event.get('id'),
-                            'titulo': summary.replace(f' - {nombre_usuario}', '').strip(),
-                            'descripcion': descripcion_limpia,
-                            'fecha_inicio': start,
-                            'fecha_fin': end,
-                            'event_id': event.get('id')
-                        })
-        except Exception as e:
-            # Si hay error, simplemente no mostramos las reservas
-            pass
-    except Exception as e:
-        # Si hay error de autenticación, continuamos sin reservas
+        reservas_usuario = _reservas_del_usuario(request.user)
+    except Exception:
+        # Si hay error, simplemente no mostramos las reservas
         pass
-    
+
     context = {
-        'calendar_id': calendar_id,
+        'calendar_id': CALENDAR_ID,
         'reservas': reservas_usuario,
     }
-    
+
     return render(request, 'espaciozen/home.html', context)
 
 
 @login_required
 @require_http_methods(["POST"])
 def verificar_disponibilidad(request):
-    """Verifica si hay disponibilidad en el rango de fechas solicitado consultando Google Calendar"""
+    """Verifica si hay disponibilidad en el rango de fechas solicitado; si no, sugiere los próximos horarios libres"""
     try:
         data = json.loads(request.body)
         fecha_inicio_str = data.get('fecha_inicio')
         fecha_fin_str = data.get('fecha_fin')
         event_id_excluir = data.get('event_id')  # Para excluir el evento actual al editar
-        
+
         if not fecha_inicio_str or not fecha_fin_str:
             return JsonResponse({'error': 'Fechas requeridas'}, status=400)
-        
-        fecha_inicio = datetime.fromisoformat(fecha_inicio_str.replace('Z', '+00:00'))
-        fecha_fin = datetime.fromisoformat(fecha_fin_str.replace('Z', '+00:00'))
-        
-        # Convertir a timezone aware si no lo es
-        if timezone.is_naive(fecha_inicio):
-            fecha_inicio = timezone.make_aware(fecha_inicio)
-        if timezone.is_naive(fecha_fin):
-            fecha_fin = timezone.make_aware(fecha_fin)
-        
-        calendar_id = "espaciozenlasedefa@gmail.com"
-        
-        # Obtener access token
-        try:
-            access_token = get_google_access_token()
-        except Exception as e:
-            return JsonResponse({
-                'error': f'Error de autenticación: {str(e)}'
-            }, status=500)
-        
-        # Consultar Google Calendar API
-        url = f"https://www.googleapis.com/calendar/v3/calendars/{calendar_id}/events"
-        params = {
-            'timeMin': fecha_inicio.isoformat(),
-            'timeMax': fecha_fin.isoformat(),
-            'singleEvents': True,
-            'orderBy': 'startTime'
-        }
-        headers = {
-            'Authorization': f'Bearer {access_token}'
-        }
-        
-        try:
-            response = requests.get(url, params=params, headers=headers, timeout=10)
-            if response.status_code == 200:
-                events = response.json().get('items', [])
-                # Filtrar el evento actual si se está editando
-                if event_id_excluir:
-                    events = [e for e in events if e.get('id') != event_id_excluir]
-                if events:
-                    return JsonResponse({
-                        'disponible': False,
-                        'mensaje': 'Ya existe un evento en Google Calendar en este horario'
-                    })
-            elif response.status_code == 403:
-                return JsonResponse({
-                    'error': 'No se tienen permisos para acceder al calendario. Asegúrate de que el calendario esté compartido con el service account.'
-                }, status=403)
-            else:
-                error_data = response.json() if response.content else {}
-                return JsonResponse({
-                    'error': f'Error al consultar el calendario: {error_data.get("error", {}).get("message", "Error desconocido")}'
-                }, status=response.status_code)
-        except requests.exceptions.RequestException as e:
+
+        fecha_inicio = _parse_fecha(fecha_inicio_str)
+        fecha_fin = _parse_fecha(fecha_fin_str)
+
+        calendar_mirror.refresh_if_stale()
+        if not bookings.is_free(fecha_inicio, fecha_fin, exclude_id=event_id_excluir):
+            sugerencias = bookings.suggest_slots(fecha_fin - fecha_inicio, desde=fecha_inicio, exclude_id=event_id_excluir)
             return JsonResponse({
-                'error': f'Error al consultar Google Calendar: {str(e)}'
-            }, status=500)
-        
+                'disponible': False,
+                'mensaje': _mensaje_ocupado(sugerencias),
+                'sugerencias': _horarios(sugerencias),
+            })
+
         return JsonResponse({
             'disponible': True,
             'mensaje': 'El horario está disponible'
         })
-        
+
     except ValueError as e:
         return JsonResponse({'error': f'Formato de fecha inválido: {str(e)}'}, status=400)
     except Exception as e:
@@ -221,126 +164,42 @@ def verificar_disponibilidad(request):
 @login_required
 @require_http_methods(["POST"])
 def crear_reserva(request):
-    """Crea una nueva reserva directamente en Google Calendar usando Service Account"""
+    """Crea una nueva reserva; se guarda localmente y se sube a Google Calendar en segundo plano"""
     try:
         data = json.loads(request.body)
         titulo = data.get('titulo')
         descripcion = data.get('descripcion', '')
         fecha_inicio_str = data.get('fecha_inicio')
         fecha_fin_str = data.get('fecha_fin')
-        
+
         if not titulo or not fecha_inicio_str or not fecha_fin_str:
             return JsonResponse({'error': 'Datos incompletos'}, status=400)
-        
-        fecha_inicio = datetime.fromisoformat(fecha_inicio_str.replace('Z', '+00:00'))
-        fecha_fin = datetime.fromisoformat(fecha_fin_str.replace('Z', '+00:00'))
-        
-        # Convertir a timezone aware si no lo es
-        if timezone.is_naive(fecha_inicio):
-            fecha_inicio = timezone.make_aware(fecha_inicio)
-        if timezone.is_naive(fecha_fin):
-            fecha_fin = timezone.make_aware(fecha_fin)
-        
-        calendar_id = "espaciozenlasedefa@gmail.com"
-        
-        # Obtener access token
-        try:
-            access_token = get_google_access_token()
-        except Exception as e:
-            return JsonResponse({
-                'error': f'Error de autenticación: {str(e)}'
-            }, status=500)
-        
-        # Verificar conflictos antes de crear
-        url_check = f"https://www.googleapis.com/calendar/v3/calendars/{calendar_id}/events"
-        params_check = {
-            'timeMin': fecha_inicio.isoformat(),
-            'timeMax': fecha_fin.isoformat(),
-            'singleEvents': True,
-            'orderBy': 'startTime'
-        }
-        headers = {
-            'Authorization': f'Bearer {access_token}'
-        }
-        
-        try:
-            response_check = requests.get(url_check, params=params_check, headers=headers, timeout=10)
-            if response_check.status_code == 200:
-                events = response_check.json().get('items', [])
-                if events:
-                    return JsonResponse({
-                        'error': 'Ya existe un evento en Google Calendar en este horario'
-                    }, status=400)
-            elif response_check.status_code != 403:
-                # Si es 403, continuamos de todos modos (puede ser que no tenga permisos de lectura pero sí de escritura)
-                pass
-        except requests.exceptions.RequestException as e:
-            # Continuamos de todos modos
-            pass
-        
+
+        fecha_inicio = _parse_fecha(fecha_inicio_str)
+        fecha_fin = _parse_fecha(fecha_fin_str)
+        if fecha_fin <= fecha_inicio:
+            return JsonResponse({'error': 'La fecha de fin debe ser posterior a la de inicio'}, status=400)
+
         # Obtener nombre del usuario (solo first_name) y generar hash del email para identificación privada
         nombre_usuario = request.user.first_name or request.user.username
-        email_usuario = request.user.email
-        user_hash = get_user_hash(email_usuario)
-        
-        # Crear el evento en Google Calendar
-        url_create = f"https://www.googleapis.com/calendar/v3/calendars/{calendar_id}/events"
-        
-        # Incluir el nombre del usuario en el título y hash al final de la descripción para identificación única y privada
-        titulo_con_usuario = f"{titulo} - {nombre_usuario}"
-        # El hash se guarda al final de la descripción con varios saltos de línea y sin prefijo
-        descripcion_completa = f"Reservado por: {nombre_usuario}"
-        if descripcion:
-            descripcion_completa += f"\n\n{descripcion}"
-        # Agregar el hash al final con varios saltos de línea
-        descripcion_completa += f"\n\n\n\n{user_hash}"
-        
-        event_data = {
-            'summary': titulo_con_usuario,
-            'description': descripcion_completa,
-            'start': {
-                'dateTime': fecha_inicio.isoformat(),
-                'timeZone': 'America/Argentina/Buenos_Aires'
-            },
-            'end': {
-                'dateTime': fecha_fin.isoformat(),
-                'timeZone': 'America/Argentina/Buenos_Aires'
-            }
-        }
-        
+        user_hash = get_user_hash(request.user.email)
+        summary, description = _titulo_y_descripcion(titulo, descripcion, nombre_usuario, user_hash)
+
         try:
-            response_create = requests.post(
-                url_create,
-                json=event_data,
-                headers={
-                    'Authorization': f'Bearer {access_token}',
-                    'Content-Type': 'application/json'
-                },
-                timeout=10
-            )
-            
-            if response_create.status_code == 200:
-                event = response_create.json()
-                return JsonResponse({
-                    'success': True,
-                    'mensaje': 'Reserva creada exitosamente en Google Calendar',
-                    'event_id': event.get('id')
-                })
-            elif response_create.status_code == 403:
-                return JsonResponse({
-                    'error': 'No se tienen permisos para crear eventos. Asegúrate de que el calendario esté compartido con el service account y tenga permisos de "Make changes to events".'
-                }, status=403)
-            else:
-                error_data = response_create.json() if response_create.content else {}
-                error_message = error_data.get('error', {}).get('message', 'Error desconocido')
-                return JsonResponse({
-                    'error': f'Error al crear el evento: {error_message}'
-                }, status=response_create.status_code)
-        except requests.exceptions.RequestException as e:
+            event = bookings.create_booking(summary, description, fecha_inicio, fecha_fin, user_hash)
+        except BookingConflict:
+            sugerencias = bookings.suggest_slots(fecha_fin - fecha_inicio, desde=fecha_inicio)
             return JsonResponse({
-                'error': f'Error al crear el evento en Google Calendar: {str(e)}'
-            }, status=500)
-        
+                'error': _mensaje_ocupado(sugerencias),
+                'sugerencias': _horarios(sugerencias),
+            }, status=400)
+
+        return JsonResponse({
+            'success': True,
+            'mensaje': 'Reserva creada exitosamente',
+            'event_id': event.google_id
+        })
+
     except ValueError as e:
         return JsonResponse({'error': f'Formato de fecha inválido: {str(e)}'}, status=400)
     except Exception as e:
@@ -352,53 +211,7 @@ def crear_reserva(request):
 def listar_reservas(request):
     """Lista las reservas del usuario actual"""
     try:
-        calendar_id = "espaciozenlasedefa@gmail.com"
-        access_token = get_google_access_token()
-        email_usuario = request.user.email
-        nombre_usuario = request.user.first_name or request.user.username
-        user_hash = get_user_hash(email_usuario)
-        
-        # Buscar eventos del usuario usando su hash
-        url = f"https://www.googleapis.com/calendar/v3/calendars/{calendar_id}/events"
-        params = {
-            'timeMin': datetime.now(timezone.get_current_timezone()).isoformat(),
-            'singleEvents': True,
-            'orderBy': 'startTime',
-            'maxResults': 50
-        }
-        headers = {
-            'Authorization': f'Bearer {access_token}'
-        }
-        
-        response = requests.get(url, params=params, headers=headers, timeout=10)
-        if response.status_code == 200:
-            events = response.json().get('items', [])
-            reservas = []
-            for event in events:
-                summary = event.get('summary', '')
-                description = event.get('description', '')
-                # Verificar usando el hash del usuario (identificador único y privado)
-                # El hash está al final de la descripción sin prefijo
-                if description.endswith(user_hash):
-                    start = event.get('start', {}).get('dateTime', '')
-                    end = event.get('end', {}).get('dateTime', '')
-                    # Limpiar la descripción
-                    descripcion_limpia = description.replace(f'Reservado por: {nombre_usuario}', '').rstrip()
-                    # Remover el hash del final
-                    if descripcion_limpia.endswith(user_hash):
-                        descripcion_limpia = descripcion_limpia[:-len(user_hash)].rstrip()
-                    descripcion_limpia = '\n'.join([line for line in descripcion_limpia.split('\n') if line.strip()])
-                    reservas.append({
-                        'id': event.get('id'),
-                        'titulo': summary.replace(f' - {nombre_usuario}', '').strip(),
-                        'descripcion': descripcion_limpia,
-                        'fecha_inicio': start,
-                        'fecha_fin': end,
-                        'event_id': event.get('id')
-                    })
-            return JsonResponse({'reservas': reservas}, status=200)
-        else:
-            return JsonResponse({'error': 'Error al obtener reservas'}, status=response.status_code)
+        return JsonResponse({'reservas': _reservas_del_usuario(request.user)}, status=200)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
@@ -406,7 +219,7 @@ def listar_reservas(request):
 @login_required
 @require_http_methods(["POST"])
 def editar_reserva(request):
-    """Edita una reserva existente en Google Calendar"""
+    """Edita una reserva existente; el cambio se sube a Google Calendar en segundo plano"""
     try:
         data = json.loads(request.body)
         event_id = data.get('event_id')
@@ -414,83 +227,40 @@ def editar_reserva(request):
         descripcion = data.get('descripcion', '')
         fecha_inicio_str = data.get('fecha_inicio')
         fecha_fin_str = data.get('fecha_fin')
-        
+
         if not event_id or not titulo or not fecha_inicio_str or not fecha_fin_str:
             return JsonResponse({'error': 'Datos incompletos'}, status=400)
-        
-        fecha_inicio = datetime.fromisoformat(fecha_inicio_str.replace('Z', '+00:00'))
-        fecha_fin = datetime.fromisoformat(fecha_fin_str.replace('Z', '+00:00'))
-        
-        if timezone.is_naive(fecha_inicio):
-            fecha_inicio = timezone.make_aware(fecha_inicio)
-        if timezone.is_naive(fecha_fin):
-            fecha_fin = timezone.make_aware(fecha_fin)
-        
-        calendar_id = "espaciozenlasedefa@gmail.com"
-        access_token = get_google_access_token()
-        email_usuario = request.user.email
+
+        fecha_inicio = _parse_fecha(fecha_inicio_str)
+        fecha_fin = _parse_fecha(fecha_fin_str)
+        if fecha_fin <= fecha_inicio:
+            return JsonResponse({'error': 'La fecha de fin debe ser posterior a la de inicio'}, status=400)
+
         nombre_usuario = request.user.first_name or request.user.username
-        user_hash = get_user_hash(email_usuario)
-        
-        # Verificar que el evento pertenece al usuario
-        url_get = f"https://www.googleapis.com/calendar/v3/calendars/{calendar_id}/events/{event_id}"
-        headers = {'Authorization': f'Bearer {access_token}'}
-        
-        response_get = requests.get(url_get, headers=headers, timeout=10)
-        if response_get.status_code != 200:
+        user_hash = get_user_hash(request.user.email)
+
+        # Verificar que el evento pertenece al usuario (el hash está al final de la descripción)
+        event = _evento_del_calendario(event_id)
+        if event is None:
             return JsonResponse({'error': 'Reserva no encontrada'}, status=404)
-        
-        event = response_get.json()
-        description = event.get('description', '')
-        
-        # Verificar usando el hash del usuario (identificador único y privado)
-        # El hash está al final de la descripción sin prefijo
-        if not description.endswith(user_hash):
+        if event.owner_hash != user_hash:
             return JsonResponse({'error': 'No tienes permisos para editar esta reserva'}, status=403)
-        
-        # Actualizar el evento
-        titulo_con_usuario = f"{titulo} - {nombre_usuario}"
-        descripcion_completa = f"Reservado por: {nombre_usuario}"
-        if descripcion:
-            descripcion_completa += f"\n\n{descripcion}"
-        # Agregar el hash al final con varios saltos de línea
-        descripcion_completa += f"\n\n\n\n{user_hash}"
-        
-        event_data = {
-            'summary': titulo_con_usuario,
-            'description': descripcion_completa,
-            'start': {
-                'dateTime': fecha_inicio.isoformat(),
-                'timeZone': 'America/Argentina/Buenos_Aires'
-            },
-            'end': {
-                'dateTime': fecha_fin.isoformat(),
-                'timeZone': 'America/Argentina/Buenos_Aires'
-            }
-        }
-        
-        url_update = f"https://www.googleapis.com/calendar/v3/calendars/{calendar_id}/events/{event_id}"
-        response_update = requests.put(
-            url_update,
-            json=event_data,
-            headers={
-                'Authorization': f'Bearer {access_token}',
-                'Content-Type': 'application/json'
-            },
-            timeout=10
-        )
-        
-        if response_update.status_code == 200:
-            return JsonResponse({
-                'success': True,
-                'mensaje': 'Reserva actualizada exitosamente'
-            })
-        else:
-            error_data = response_update.json() if response_update.content else {}
+
+        summary, description = _titulo_y_descripcion(titulo, descripcion, nombre_usuario, user_hash)
+        try:
+            bookings.update_booking(event, summary, description, fecha_inicio, fecha_fin)
+        except BookingConflict:
+            sugerencias = bookings.suggest_slots(fecha_fin - fecha_inicio, desde=fecha_inicio, exclude_id=event_id)
             return JsonResponse({
-                'error': f'Error al actualizar la reserva: {error_data.get("error", {}).get("message", "Error desconocido")}'
-            }, status=response_update.status_code)
-        
+                'error': _mensaje_ocupado(sugerencias),
+                'sugerencias': _horarios(sugerencias),
+            }, status=400)
+
+        return JsonResponse({
+            'success': True,
+            'mensaje': 'Reserva actualizada exitosamente'
+        })
+
     except ValueError as e:
         return JsonResponse({'error': f'Formato de fecha inválido: {str(e)}'}, status=400)
     except Exception as e:
@@ -500,48 +270,77 @@ def editar_reserva(request):
 @login_required
 @require_http_methods(["POST"])
 def borrar_reserva(request):
-    """Borra una reserva de Google Calendar"""
+    """Borra una reserva; se borra de Google Calendar en segundo plano"""
     try:
         data = json.loads(request.body)
         event_id = data.get('event_id')
-        
+
         if not event_id:
             return JsonResponse({'error': 'ID de reserva requerido'}, status=400)
-        
-        calendar_id = "espaciozenlasedefa@gmail.com"
-        access_token = get_google_access_token()
-        email_usuario = request.user.email
-        user_hash = get_user_hash(email_usuario)
-        
-        # Verificar que el evento pertenece al usuario
-        url_get = f"https://www.googleapis.com/calendar/v3/calendars/{calendar_id}/events/{event_id}"
-        headers = {'Authorization': f'Bearer {access_token}'}
-        
-        response_get = requests.get(url_get, headers=headers, timeout=10)
-        if response_get.status_code != 200:
+
+        user_hash = get_user_hash(request.user.email)
+
+        # Verificar que el evento pertenece al usuario (el hash está al final de la descripción)
+        event = _evento_del_calendario(event_id)
+        if event is None:
             return JsonResponse({'error': 'Reserva no encontrada'}, status=404)
-        
-        event = response_get.json()
-        description = event.get('description', '')
-        
-        # Verificar usando el hash del usuario (identificador único y privado)
-        # El hash está al final de la descripción sin prefijo
-        if not description.endswith(user_hash):
+        if event.owner_hash != user_hash:
             return JsonResponse({'error': 'No tienes permisos para borrar esta reserva'}, status=403)
-        
-        # Eliminar el evento
-        url_delete = f"https://www.googleapis.com/calendar/v3/calendars/{calendar_id}/events/{event_id}"
-        response_delete = requests.delete(url_delete, headers=headers, timeout=10)
-        
-        if response_delete.status_code == 204:
-            return JsonResponse({
-                'success': True,
-                'mensaje': 'Reserva eliminada exitosamente'
-            })
-        else:
-            return JsonResponse({
-                'error': 'Error al eliminar la reserva'
-            }, status=response_delete.status_code)
-        
+
+        bookings.delete_booking(event)
+        return JsonResponse({
+            'success': True,
+            'mensaje': 'Reserva eliminada exitosamente'
+        })
+
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@login_required
+@require_http_methods(["GET"])
+def sugerir_horarios(request):
+    """Próximos horarios libres de la duración pedida (?duracion_minutos=120&desde=...)"""
+    try:
+        duracion_minutos = int(request.GET.get('duracion_minutos', '60'))
+        if duracion_minutos <= 0 or duracion_minutos > 24 * 60:
+            return JsonResponse({'error': 'Duración inválida'}, status=400)
+        desde = _parse_fecha(request.GET['desde']) if request.GET.get('desde') else None
+        cantidad = min(int(request.GET.get('cantidad', '3')), MAX_SUGERENCIAS)
+
+        calendar_mirror.refresh_if_stale()
+        sugerencias = bookings.suggest_slots(timedelta(minutes=duracion_minutos), desde=desde, limit=cantidad)
+        return JsonResponse({'sugerencias': _horarios(sugerencias)})
+
+    except ValueError as e:
+        return JsonResponse({'error': f'Parámetros inválidos: {str(e)}'}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@login_required
+@require_http_methods(["GET"])
+def ocupacion(request):
+    """Horarios ocupados y libres por día (?desde=2025-01-01&dias=7)"""
+    try:
+        dias = min(int(request.GET.get('dias', '7')), MAX_DIAS_OCUPACION)
+        if dias <= 0:
+            return JsonResponse({'error': 'Cantidad de días inválida'}, status=400)
+        desde = _parse_fecha(request.GET['desde']) if request.GET.get('desde') else timezone.now()
+
+        calendar_mirror.refresh_if_stale()
+        return JsonResponse({
+            'dias': [
+                {
+                    'fecha': dia['fecha'].isoformat(),
+                    'ocupado': _horarios(dia['ocupado']),
+                    'libre': _horarios(dia['libre']),
+                }
+                for dia in bookings.occupancy(desde, dias)
+            ]
+        })
+
+    except ValueError as e:
+        return JsonResponse({'error': f'Parámetros inválidos: {str(e)}'}, status=400)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
@@ -155,14 +155,10 @@ class Event(BaseModel):
 
     @classmethod
     def get_main_event(cls):
-        """Get the main event (displayed at /)"""
-        from events.services.main_event import reconcile_main_event
+        """Get the main event (displayed at /), cached per process (see events.services.main_event)"""
+        from events.services.main_event import cached_main_event
 
-        reconcile_main_event()
-        try:
-            return cls.objects.get(is_main=True, active=True)
-        except cls.DoesNotExist:
-            return None
+        return cached_main_event()
 
     @classmethod
     def get_active_events(cls):
@@ -180,11 +176,8 @@ class Event(BaseModel):
     @property
     def venue_occupancy(self):
         """Calculate current venue occupancy as used tickets minus attendees who left"""
-        from tickets.models import NewTicket
-        used_tickets = NewTicket.objects.filter(
-            event=self, 
-            is_used=True
-        ).count()
+        from tickets.counters import get_event_counters
+        used_tickets = get_event_counters(self).tickets_used
         return max(0, used_tickets - self.attendees_left)
 
     @property
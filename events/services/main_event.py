@@ -1,4 +1,8 @@
+import copy
 import logging
+import os
+import threading
+import time
 
 from django.db import transaction
 from django.utils import timezone
@@ -7,6 +11,13 @@ from events.models import Event
 
 logger = logging.getLogger(__name__)
 
+# Cuánto confía cada proceso en el evento principal que leyó. En el proceso que
+# guarda un Event se invalida al instante; en los demás el cambio tarda a lo sumo esto.
+MAIN_EVENT_CACHE_SECONDS = int(os.environ.get('MAIN_EVENT_CACHE_SECONDS', '60'))
+
+_cache = {'event': None, 'expires_at': 0.0}
+_cache_lock = threading.Lock()
+
 
 def _best_active_event(*, exclude_pk=None):
     """Evento activo vigente más apto para ser principal."""
@@ -34,6 +45,7 @@ def _transfer_main(*, new_main, previous_main=None):
         if not new_main.is_main:
             new_main.is_main = True
             new_main.save(update_fields=['is_main', 'updated_at'])
+        invalidate_main_event_cache()
     if previous_main and previous_main.pk != new_main.pk:
         logger.info(
             'Evento principal: #%s (%s) → #%s (%s)',
@@ -83,3 +95,34 @@ def promote_if_no_valid_main(event):
         return
 
     _transfer_main(new_main=event, previous_main=current_main)
+
+
+def cached_main_event():
+    """
+    Evento principal activo (o None) desde el cache del proceso. Sólo lee: la
+    rotación la hacen sync_main_event (cron) y el post_save de Event. Devuelve
+    una copia, así quien la modifique no cambia la de los demás requests.
+    """
+    now = time.monotonic()
+    with _cache_lock:
+        if _cache['expires_at'] > now:
+            event = _cache['event']
+            return copy.copy(event) if event else None
+
+    event = Event.objects.filter(is_main=True, active=True).first()
+    with _cache_lock:
+        _cache['event'] = event
+        _cache['expires_at'] = now + MAIN_EVENT_CACHE_SECONDS
+    return copy.copy(event) if event else None
+
+
+def _clear_cache():
+    with _cache_lock:
+        _cache['event'] = None
+        _cache['expires_at'] = 0.0
+
+
+def invalidate_main_event_cache():
+    """Al commitear (o ya, fuera de una transacción) la próxima lectura vuelve a la base."""
+    _clear_cache()
+    transaction.on_commit(_clear_cache)
@@ -1,8 +1,12 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from events.models import Event
-from events.services.main_event import promote_if_no_valid_main, reconcile_main_event
+from events.services.main_event import (
+    invalidate_main_event_cache,
+    promote_if_no_valid_main,
+    reconcile_main_event,
+)
 
 
 @receiver(post_save, sender=Event)
@@ -11,3 +15,10 @@ def handle_event_main_status(sender, instance, created, **kwargs):
         promote_if_no_valid_main(instance)
     else:
         reconcile_main_event()
+    # Cualquier cambio (nombre, fechas, active) tiene que verse en la copia cacheada
+    invalidate_main_event_cache()
+
+
+@receiver(post_delete, sender=Event)
+def handle_event_deleted(sender, instance, **kwargs):
+    invalidate_main_event_cache()
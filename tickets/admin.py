@@ -21,7 +21,7 @@ from events.models import Event
 from utils.direct_sales import direct_sales_existing_user, direct_sales_new_user
 from .forms import TicketPurchaseForm
 from .models import TicketType, Order, OrderTicket, NewTicket, NewTicketTransfer, DirectTicketTemplate, \
-    DirectTicketTemplateStatus, TicketPhoto
+    DirectTicketTemplateStatus, TicketPhoto, EmailOutbox, WebhookInbox, BroadcastJob, BroadcastJobRecipient
 from .processing import mint_tickets
 from .views import webhooks
 
@@ -486,7 +486,91 @@ class TicketPhotoAdmin(admin.ModelAdmin):
         return False  # Prevent adding photos through admin
 
 
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'dedupe_key', 'status', 'attempts', 'available_at', 'sent_at', 'created_at']
+    list_filter = ['kind', 'status']
+    search_fields = ['dedupe_key', 'last_error']
+    readonly_fields = ['kind', 'dedupe_key', 'payload', 'attempts', 'sent_at', 'last_error', 'created_at']
+    actions = ['retry_now']
+
+    @admin.action(description='Reintentar ahora')
+    def retry_now(self, request, queryset):
+        from django.utils import timezone
+        updated = queryset.exclude(status=EmailOutbox.Status.SENT).update(
+            status=EmailOutbox.Status.PENDING,
+            available_at=timezone.now(),
+        )
+        self.message_user(request, f'{updated} emails vuelven a la cola')
+
+
+class WebhookInboxAdmin(admin.ModelAdmin):
+    list_display = [
+        'id', 'topic', 'resource_id', 'status', 'outcome', 'received_count', 'attempts',
+        'fetch_ms', 'latency_ms', 'processed_at', 'created_at',
+    ]
+    list_filter = ['topic', 'status', 'outcome']
+    search_fields = ['resource_id', 'last_error']
+    readonly_fields = [
+        'topic', 'resource_id', 'payload', 'received_count', 'received_at', 'attempts', 'outcome',
+        'processed_at', 'fetch_ms', 'latency_ms', 'last_error', 'created_at',
+    ]
+    actions = ['retry_now']
+
+    @admin.action(description='Reprocesar ahora')
+    def retry_now(self, request, queryset):
+        from django.utils import timezone
+        now = timezone.now()
+        updated = queryset.update(
+            status=WebhookInbox.Status.PENDING, available_at=now, received_at=now, attempts=0,
+        )
+        self.message_user(request, f'{updated} webhooks vuelven a la cola')
+
+
+class BroadcastJobRecipientInline(admin.TabularInline):
+    model = BroadcastJobRecipient
+    extra = 0
+    fields = ['holder', 'status', 'attempts', 'sent_to', 'ticket_count', 'error', 'sent_at']
+    readonly_fields = fields
+    raw_id_fields = ['holder']
+    can_delete = False
+
+    def get_queryset(self, request):
+        # Los fallidos primero; un evento grande tiene miles de destinatarios
+        return super().get_queryset(request).select_related('holder').order_by('-status', 'holder_id')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+class BroadcastJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'event', 'status', 'total', 'sent', 'failed', 'concurrency', 'heartbeat_at', 'finished_at']
+    list_filter = ['status', 'event']
+    readonly_fields = [
+        'event', 'total', 'sent', 'failed', 'cursor', 'started_at', 'heartbeat_at', 'finished_at', 'created_at',
+    ]
+    inlines = [BroadcastJobRecipientInline]
+    actions = ['cancel', 'resume']
+
+    @admin.action(description='Cancelar')
+    def cancel(self, request, queryset):
+        from tickets.broadcast_jobs import ACTIVE_STATUSES
+        updated = queryset.filter(status__in=ACTIVE_STATUSES).update(status=BroadcastJob.Status.CANCELLED)
+        self.message_user(request, f'{updated} envíos cancelados')
+
+    @admin.action(description='Retomar')
+    def resume(self, request, queryset):
+        from tickets.broadcast_jobs import dispatch_broadcast_job
+        job_ids = list(queryset.exclude(status=BroadcastJob.Status.RUNNING).values_list('id', flat=True))
+        BroadcastJob.objects.filter(pk__in=job_ids).update(status=BroadcastJob.Status.PENDING, finished_at=None)
+        for job_id in job_ids:
+            dispatch_broadcast_job(job_id)
+        self.message_user(request, f'{len(job_ids)} envíos retomados')
+
+
 admin.site.register(Order, OrderAdmin)
 admin.site.register(NewTicket, NewTicketAdmin)
 admin.site.register(NewTicketTransfer)
 admin.site.register(TicketPhoto, TicketPhotoAdmin)
+admin.site.register(EmailOutbox, EmailOutboxAdmin)
+admin.site.register(WebhookInbox, WebhookInboxAdmin)
+admin.site.register(BroadcastJob, BroadcastJobAdmin)
@@ -0,0 +1,254 @@
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import close_old_connections, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from tickets.models import BroadcastJob, BroadcastJobRecipient, NewTicket
+
+logger = logging.getLogger(__name__)
+
+try:
+    from zappa.asynchronous import task
+except Exception:  # pragma: no cover - zappa package may be unavailable locally
+    task = None
+
+# Holders a los que se les arma y manda el mail en paralelo
+BROADCAST_CONCURRENCY = int(os.environ.get('BROADCAST_CONCURRENCY', '4'))
+# Holders por tanda: al terminar cada una se guarda el cursor y el progreso
+BROADCAST_CHUNK_SIZE = int(os.environ.get('BROADCAST_CHUNK_SIZE', '20'))
+# Margen para cortar antes del timeout del Lambda; el resto sigue en otra invocación
+TIME_BUDGET_SECONDS = int(os.environ.get('BROADCAST_TIME_BUDGET_SECONDS', '240'))
+# Un job en curso sin tandas terminadas en este tiempo quedó huérfano (se cayó el worker)
+STALE_AFTER = timedelta(minutes=10)
+MAX_ATTEMPTS = 3
+MAX_FAILURES_IN_PROGRESS = 50
+
+ACTIVE_STATUSES = (BroadcastJob.Status.PENDING, BroadcastJob.Status.RUNNING)
+
+
+def start_broadcast(event, concurrency=None):
+    """
+    Crea el job con un destinatario por holder del evento y dispara el worker al
+    commitear. Si el evento ya tiene uno sin terminar devuelve ese. Devuelve (job, creado).
+    """
+    with transaction.atomic():
+        job = BroadcastJob.objects.filter(event=event, status__in=ACTIVE_STATUSES).order_by('id').first()
+        if job is not None:
+            return job, False
+        holder_ids = list(
+            NewTicket.objects.filter(event=event, holder__isnull=False)
+            .values_list('holder_id', flat=True)
+            .distinct()
+            .order_by('holder_id')
+        )
+        job = BroadcastJob.objects.create(
+            event=event,
+            concurrency=max(1, concurrency or BROADCAST_CONCURRENCY),
+            total=len(holder_ids),
+        )
+        BroadcastJobRecipient.objects.bulk_create(
+            [BroadcastJobRecipient(job=job, holder_id=holder_id) for holder_id in holder_ids],
+            batch_size=1000,
+        )
+        transaction.on_commit(lambda: dispatch_broadcast_job(job.pk))
+    logger.info('Broadcast %s creado para el evento %s: %s holders', job.pk, event.pk, len(holder_ids))
+    return job, True
+
+
+def _send_one_holder(event, holder_id):
+    """Corre en un thread del pool, con su propia conexión a la base."""
+    from tickets.views.send_holder_tickets_email import run_send_holder_tickets_email
+
+    close_old_connections()
+    try:
+        return run_send_holder_tickets_email(event, holder_user_id=holder_id)
+    except Exception as e:
+        logger.exception('Broadcast: error enviando al holder %s', holder_id)
+        return {'ok': False, 'error': str(e), 'status': 500}
+    finally:
+        close_old_connections()
+
+
+def _claim(job_id):
+    """Toma el job si está pendiente o si el worker que lo tenía dejó de dar señales."""
+    now = timezone.now()
+    with transaction.atomic():
+        job = BroadcastJob.objects.select_for_update().select_related('event').filter(pk=job_id).first()
+        if job is None:
+            return None
+        stale = job.heartbeat_at is None or job.heartbeat_at < now - STALE_AFTER
+        if job.status == BroadcastJob.Status.PENDING or (job.status == BroadcastJob.Status.RUNNING and stale):
+            job.status = BroadcastJob.Status.RUNNING
+            job.started_at = job.started_at or now
+            job.heartbeat_at = now
+            job.save(update_fields=['status', 'started_at', 'heartbeat_at', 'updated_at'])
+            return job
+    return None
+
+
+def _refresh_counts(job):
+    counts = job.recipients.aggregate(
+        sent=Count('id', filter=Q(status=BroadcastJobRecipient.Status.SENT)),
+        failed=Count('id', filter=Q(status=BroadcastJobRecipient.Status.FAILED)),
+    )
+    job.sent = counts['sent']
+    job.failed = counts['failed']
+
+
+def _record_chunk(recipients, results):
+    now = timezone.now()
+    for recipient, result in zip(recipients, results):
+        recipient.attempts += 1
+        if result['ok']:
+            recipient.status = BroadcastJobRecipient.Status.SENT
+            recipient.sent_to = result['sent_to']
+            recipient.ticket_count = result['ticket_count']
+            recipient.error = ''
+            recipient.sent_at = now
+        else:
+            recipient.status = BroadcastJobRecipient.Status.FAILED
+            recipient.error = result['error']
+            # Sin bonos o sin email no se arregla reintentando; un PDF o un SMTP caído sí
+            recipient.retryable = result.get('status', 500) >= 500
+        recipient.updated_at = now
+    BroadcastJobRecipient.objects.bulk_update(
+        recipients, ['status', 'attempts', 'sent_to', 'ticket_count', 'error', 'retryable', 'sent_at', 'updated_at'],
+    )
+
+
+def _retry_failed(job):
+    """Vuelve a pendientes los fallidos reintentables y arranca otra pasada desde el principio."""
+    retried = job.recipients.filter(
+        status=BroadcastJobRecipient.Status.FAILED, retryable=True, attempts__lt=MAX_ATTEMPTS,
+    ).update(status=BroadcastJobRecipient.Status.PENDING, updated_at=timezone.now())
+    if retried:
+        job.cursor = 0
+        logger.info('Broadcast %s: reintentando %s holders', job.pk, retried)
+    return retried
+
+
+def _deadline(context):
+    budget = TIME_BUDGET_SECONDS
+    remaining_ms = getattr(context, 'get_remaining_time_in_millis', None)
+    if callable(remaining_ms):
+        budget = min(budget, max(0, remaining_ms() / 1000 - 30))
+    return time.monotonic() + budget
+
+
+def run_broadcast_job(job_id, context=None):
+    """
+    Procesa el job por tandas de holders ordenadas por holder_id, guardando el
+    cursor y el progreso al terminar cada una. Si se acaba el tiempo deja el job
+    pendiente y dispara otra invocación que sigue desde el cursor; si el worker
+    se cae, lo retoma el cron.
+    """
+    job = _claim(job_id)
+    if job is None:
+        return None
+    deadline = _deadline(context)
+    started = time.perf_counter()
+    processed = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, job.concurrency)) as executor:
+        while True:
+            if time.monotonic() >= deadline:
+                job.status = BroadcastJob.Status.PENDING
+                job.save(update_fields=['status', 'updated_at'])
+                logger.info('Broadcast %s: corte por tiempo en el holder %s, sigue en otra invocación', job.pk, job.cursor)
+                break
+
+            recipients = list(
+                job.recipients.filter(status=BroadcastJobRecipient.Status.PENDING, holder_id__gt=job.cursor)
+                .order_by('holder_id')[:BROADCAST_CHUNK_SIZE]
+            )
+            if not recipients:
+                # Pendientes detrás del cursor (una pasada de reintentos que se cortó): otra pasada
+                if job.cursor and job.recipients.filter(status=BroadcastJobRecipient.Status.PENDING).exists():
+                    job.cursor = 0
+                    continue
+                if _retry_failed(job):
+                    continue
+                _refresh_counts(job)
+                job.status = BroadcastJob.Status.DONE
+                job.finished_at = timezone.now()
+                job.save(update_fields=['status', 'cursor', 'sent', 'failed', 'finished_at', 'updated_at'])
+                break
+
+            results = list(executor.map(lambda r: _send_one_holder(job.event, r.holder_id), recipients))
+            _record_chunk(recipients, results)
+            processed += len(recipients)
+
+            job.cursor = recipients[-1].holder_id
+            job.heartbeat_at = timezone.now()
+            _refresh_counts(job)
+            job.save(update_fields=['cursor', 'heartbeat_at', 'sent', 'failed', 'updated_at'])
+
+            # Cancelado desde el admin mientras corría
+            if BroadcastJob.objects.filter(pk=job.pk, status=BroadcastJob.Status.CANCELLED).exists():
+                job.status = BroadcastJob.Status.CANCELLED
+                break
+
+    elapsed = time.perf_counter() - started
+    logger.info(
+        'Broadcast %s: %s holders en %.1fs (%.1f/s), %s/%s enviados, %s fallidos, estado %s',
+        job.pk, processed, elapsed, processed / elapsed if elapsed else 0, job.sent, job.total, job.failed, job.status,
+    )
+    if job.status == BroadcastJob.Status.PENDING:
+        dispatch_broadcast_job(job.pk)
+    return job
+
+
+def resume_broadcast_jobs(event, context):
+    """Cron: retoma los jobs pendientes o huérfanos (el worker se cayó o no se pudo disparar)."""
+    job_ids = list(
+        BroadcastJob.objects.filter(status__in=ACTIVE_STATUSES).order_by('id').values_list('id', flat=True)
+    )
+    for job_id in job_ids:
+        run_broadcast_job(job_id, context)
+
+
+def broadcast_progress(job):
+    pending = job.total - job.sent - job.failed
+    return {
+        'job_id': job.pk,
+        'event_id': job.event_id,
+        'status': job.status,
+        'total': job.total,
+        'sent': job.sent,
+        'failed': job.failed,
+        'pending': max(pending, 0),
+        'percent': round((job.sent + job.failed) * 100 / job.total, 1) if job.total else 100.0,
+        'concurrency': job.concurrency,
+        'cursor': job.cursor,
+        'started_at': job.started_at,
+        'heartbeat_at': job.heartbeat_at,
+        'finished_at': job.finished_at,
+        'failures': list(
+            job.recipients.filter(status=BroadcastJobRecipient.Status.FAILED)
+            .order_by('holder_id')
+            .values('holder_id', 'attempts', 'retryable', 'error')[:MAX_FAILURES_IN_PROGRESS]
+        ),
+    }
+
+
+if task:
+    @task
+    def run_broadcast_job_async(job_id):
+        """Procesa el job en un Lambda aparte (o en línea fuera de Lambda)."""
+        return run_broadcast_job(job_id)
+else:
+    def run_broadcast_job_async(job_id):
+        """Fallback cuando zappa.asynchronous no está disponible."""
+        return run_broadcast_job(job_id)
+
+
+def dispatch_broadcast_job(job_id):
+    try:
+        run_broadcast_job_async(job_id)
+    except Exception:
+        logger.exception('No se pudo disparar el broadcast %s; queda para el cron', job_id)
@@ -0,0 +1,99 @@
+import logging
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = ('tickets_sold', 'tickets_used', 'caja_tickets_sold', 'tickets_left')
+
+
+def ticket_deltas(ticket, order, sign=1):
+    """Lo que aporta un bono a los contadores de su evento (si su orden está confirmada)."""
+    return {
+        'tickets_sold': sign,
+        'tickets_used': sign if ticket.is_used else 0,
+        'caja_tickets_sold': sign if order.generated_by_admin_user_id else 0,
+        'tickets_left': sign if ticket.holder_left else 0,
+    }
+
+
+def _aggregate(event_id):
+    from tickets.models import NewTicket, Order
+
+    return NewTicket.objects.filter(
+        order__event_id=event_id, order__status=Order.OrderStatus.CONFIRMED,
+    ).aggregate(
+        tickets_sold=Count('id'),
+        tickets_used=Count('id', filter=Q(is_used=True)),
+        caja_tickets_sold=Count('id', filter=Q(order__generated_by_admin_user__isnull=False)),
+        tickets_left=Count('id', filter=Q(holder_left=True)),
+    )
+
+
+def reconcile_event_counters(event_id):
+    """Recalcula los contadores del evento desde cero. Devuelve (counters, diferencias)."""
+    from tickets.models import EventTicketCounters
+
+    with transaction.atomic():
+        values = _aggregate(event_id)
+        counters = EventTicketCounters.objects.select_for_update().filter(event_id=event_id).first()
+        if counters is None:
+            try:
+                with transaction.atomic():
+                    counters = EventTicketCounters.objects.create(
+                        event_id=event_id, reconciled_at=timezone.now(), **values
+                    )
+                return counters, {}
+            except IntegrityError:
+                # Otro request la creó al mismo tiempo
+                counters = EventTicketCounters.objects.select_for_update().get(event_id=event_id)
+        drift = {
+            field: values[field] - getattr(counters, field)
+            for field in COUNTER_FIELDS
+            if values[field] != getattr(counters, field)
+        }
+        for field in COUNTER_FIELDS:
+            setattr(counters, field, values[field])
+        counters.reconciled_at = timezone.now()
+        counters.save()
+    return counters, drift
+
+
+def apply_deltas(event_id, deltas):
+    """
+    Suma los deltas con un UPDATE ... SET campo = campo + n, en la transacción
+    del llamador. Si el evento todavía no tiene fila se crea recalculando, lo que
+    ya incluye el cambio en curso.
+    """
+    from tickets.models import EventTicketCounters
+
+    changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if not changes or not event_id:
+        return
+    updated = EventTicketCounters.objects.filter(event_id=event_id).update(
+        updated_at=timezone.now(), **changes
+    )
+    if not updated:
+        reconcile_event_counters(event_id)
+
+
+def record_tickets_issued(tickets_with_orders):
+    """Para bulk_create (mint_orders), que no dispara señales: un UPDATE por evento."""
+    by_event = {}
+    for ticket, order in tickets_with_orders:
+        by_event.setdefault(order.event_id, Counter()).update(ticket_deltas(ticket, order))
+    for event_id, deltas in by_event.items():
+        apply_deltas(event_id, deltas)
+
+
+def get_event_counters(event):
+    """Lectura O(1) para el scanner; si el evento no tiene fila todavía, la crea."""
+    from tickets.models import EventTicketCounters
+
+    counters = EventTicketCounters.objects.filter(event_id=event.pk).first()
+    if counters is None:
+        counters, _ = reconcile_event_counters(event.pk)
+    return counters
@@ -0,0 +1,184 @@
+from functools import cached_property
+
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
+
+
+class TicketDTOAssembler:
+    """
+    Arma los DTOs de una lista de bonos con una cantidad fija de queries, sin
+    importar cuántos bonos sean: relaciones, fotos y transferencias del usuario
+    agrupadas por bono al construirse; términos por evento y grupos de
+    holders/owners recién cuando se piden.
+
+    Uso:
+        assembler = TicketDTOAssembler(tickets, request.user)
+        for ticket in assembler.tickets:
+            dto = assembler.build(ticket)
+    """
+
+    def __init__(self, tickets, user):
+        from tickets.models import NewTicketTransfer
+
+        self.tickets = list(tickets)
+        self.user = user
+        self._pending = {}
+        self._completed = {}
+        if not self.tickets:
+            return
+
+        prefetch_related_objects(
+            self.tickets, 'order', 'ticket_type', 'event', 'owner', 'scanned_by',
+            'ticket_photos__uploaded_by',
+        )
+
+        # .first() del get_dto original: la transferencia de menor id por bono
+        transfers = (
+            NewTicketTransfer.objects.filter(
+                ticket_id__in=[ticket.pk for ticket in self.tickets],
+                tx_from=user,
+                status__in=['PENDING', 'COMPLETED'],
+            )
+            .order_by('id')
+        )
+        for transfer in transfers:
+            target = self._pending if transfer.status == 'PENDING' else self._completed
+            target.setdefault(transfer.ticket_id, transfer)
+
+    @cached_property
+    def _terms(self):
+        from events.models import EventTermsAndConditions
+
+        terms = {}
+        for event_id, term_id in EventTermsAndConditions.objects.filter(
+            event_id__in={ticket.event_id for ticket in self.tickets}
+        ).values_list('event_id', 'id'):
+            terms.setdefault(event_id, []).append(term_id)
+        return terms
+
+    @cached_property
+    def _accepted_term_ids(self):
+        from events.models import EventTermsAndConditionsAcceptance
+
+        if self.user is None or not self.tickets:
+            return set()
+        return set(
+            EventTermsAndConditionsAcceptance.objects.filter(
+                user=self.user, term__event_id__in={ticket.event_id for ticket in self.tickets}
+            ).values_list('term_id', flat=True)
+        )
+
+    @cached_property
+    def _grupos(self):
+        """Primer GrupoMiembro por (evento, usuario), según el ordering del modelo."""
+        from events.models import GrupoMiembro
+
+        member_ids = {ticket.holder_id for ticket in self.tickets} | {ticket.owner_id for ticket in self.tickets}
+        member_ids.discard(None)
+        grupos = {}
+        if member_ids:
+            for miembro in GrupoMiembro.objects.filter(
+                grupo__event_id__in={ticket.event_id for ticket in self.tickets}, user_id__in=member_ids
+            ).select_related('grupo'):
+                grupos.setdefault((miembro.grupo.event_id, miembro.user_id), miembro)
+        return grupos
+
+    def pending_transfer(self, ticket):
+        return self._pending.get(ticket.pk)
+
+    def completed_transfer(self, ticket):
+        return self._completed.get(ticket.pk)
+
+    def has_all_terms_accepted(self, event_id):
+        return all(term_id in self._accepted_term_ids for term_id in self._terms.get(event_id, []))
+
+    def grupo_miembro(self, ticket):
+        """Grupo del holder y, si no tiene, el del owner."""
+        miembro = None
+        if ticket.holder_id:
+            miembro = self._grupos.get((ticket.event_id, ticket.holder_id))
+        if miembro is None and ticket.owner_id:
+            miembro = self._grupos.get((ticket.event_id, ticket.owner_id))
+        return miembro
+
+    def build(self, ticket):
+        """Mismo dict que NewTicket.get_dto."""
+        transfer_pending = self.pending_transfer(ticket)
+        return {
+            'key': ticket.key,
+            'order': ticket.order.key,
+            'ticket_type': ticket.ticket_type.name,
+            'ticket_color': ticket.ticket_type.color,
+            'emoji': ticket.ticket_type.emoji,
+            'price': ticket.ticket_type.price,
+            'is_transfer_pending': transfer_pending is not None,
+            'transferring_to': transfer_pending.tx_to_email if transfer_pending else None,
+            'is_owners': ticket.holder_id == ticket.owner_id,
+            'owner': ticket.owner_id,  # Add owner field for AJAX
+            'volunteer_ranger': ticket.volunteer_ranger,
+            'volunteer_transmutator': ticket.volunteer_transmutator,
+            'volunteer_umpalumpa': ticket.volunteer_umpalumpa,
+            'volunteer_mad': ticket.volunteer_mad,
+            'qr_code_url': ticket.qr_image_url(),
+            'is_used': ticket.is_used,
+            'used_at': ticket.used_at,
+            'scanned_by': {
+                'id': ticket.scanned_by.id,
+                'username': ticket.scanned_by.username,
+                'full_name': ticket.scanned_by.get_full_name() or ticket.scanned_by.username,
+                'email': ticket.scanned_by.email
+            } if ticket.scanned_by else None,
+            'notes': ticket.notes,
+            'photos': [
+                {
+                    'id': photo.id,
+                    'url': photo.photo.url,
+                    'name': photo.photo.name.split('/')[-1],  # Get filename
+                    'uploaded_at': photo.created_at.isoformat() if photo.created_at else None,
+                    'uploaded_by': photo.uploaded_by.get_full_name() or photo.uploaded_by.username
+                }
+                for photo in ticket.ticket_photos.all()
+            ],
+        }
+
+    def build_all(self):
+        return [self.build(ticket) for ticket in self.tickets]
+
+    def grupo_fields(self, ticket):
+        """Ingreso anticipado, late checkout y restricción alimentaria del grupo del bono."""
+        grupo_miembro = self.grupo_miembro(ticket)
+        if grupo_miembro is None:
+            return {
+                'has_ingreso_anticipado': False,
+                'ingreso_anticipado_fecha': None,
+                'ingreso_anticipado_desde': None,
+                'has_late_checkout': False,
+                'late_checkout_hasta': None,
+                'restriccion': None,
+                'restriccion_display': None,
+                'grupo_id': None,
+                'grupo_miembro_id': None,
+            }
+        grupo = grupo_miembro.grupo
+        return {
+            'has_ingreso_anticipado': grupo_miembro.ingreso_anticipado or bool(grupo_miembro.ingreso_anticipado_fecha),
+            'ingreso_anticipado_fecha': (
+                grupo_miembro.ingreso_anticipado_fecha.strftime("%d/%m/%Y")
+                if grupo_miembro.ingreso_anticipado_fecha else None
+            ),
+            'ingreso_anticipado_desde': (
+                timezone.localtime(grupo.ingreso_anticipado_desde).strftime("%d/%m/%Y %H:%M")
+                if grupo.ingreso_anticipado_desde else None
+            ),
+            'has_late_checkout': grupo_miembro.late_checkout,
+            'late_checkout_hasta': (
+                timezone.localtime(grupo.late_checkout_hasta).strftime("%d/%m/%Y %H:%M")
+                if grupo.late_checkout_hasta else None
+            ),
+            'restriccion': grupo_miembro.restriccion,
+            'restriccion_display': dict(grupo_miembro.RESTRICCION_CHOICES).get(
+                grupo_miembro.restriccion, grupo_miembro.restriccion
+            ),
+            'grupo_id': grupo.id,
+            'grupo_miembro_id': grupo_miembro.id,
+        }
@@ -2,7 +2,6 @@ import hashlib
 import json
 import logging
 import time
-from concurrent.futures import ThreadPoolExecutor, ALL_COMPLETED, wait
 from urllib.parse import urlencode
 
 from django.db import connection
@@ -11,9 +10,11 @@ from django.utils import timezone
 
 from events.models import Event
 from tickets.models import MessageIdempotency
-from utils.email import send_mail
+from utils.email import email_pool, send_mass_templated
 
 DASHES_LINE = '-' * 120
+# Recordatorios por tanda de send_mass_templated (la idempotencia se registra por mail, apenas sale)
+REMINDER_CHUNK_SIZE = 200
 
 
 def send_pending_actions_emails(event, context):
@@ -65,65 +66,109 @@ def send_pending_actions_emails_for_event(current_event):
     logging.info(DASHES_LINE)
 
     start_time = time.perf_counter()
-    with (ThreadPoolExecutor() as executor):
-        futures = [
-                      executor.submit(send_sender_pending_transfers_reminder, transfer, current_event)
-                      for transfer
-                      in pending_transfers_sender
-                  ] + [
-                      executor.submit(send_recipient_pending_transfers_reminder, transfer, current_event)
-                      for transfer
-                      in pending_transfers_recipient
-                  ] + [
-                      executor.submit(send_unsent_tickets_reminder_email, unsent_ticket, current_event)
-                      for unsent_ticket
-                      in unsent_tickets
-                  ] + [
-                      executor.submit(send_profile_reminder_email, user_without_profile, current_event)
-                      for user_without_profile
-                      in users_without_profile
-                  ]
-
-        wait(futures, return_when=ALL_COMPLETED)
-
-    total_emails_sent = sum([future.result()[0] for future in futures])
-    total_sms_sent = sum([future.result()[1] for future in futures])
-
+    due = [
+        reminder for reminder in (
+            [build_reminder(sender_pending_transfers_reminder, transfer, current_event) for transfer in pending_transfers_sender]
+            + [build_reminder(recipient_pending_transfers_reminder, transfer, current_event) for transfer in pending_transfers_recipient]
+            + [build_reminder(unsent_tickets_reminder, unsent_ticket, current_event) for unsent_ticket in unsent_tickets]
+            + [build_reminder(profile_reminder, user_without_profile, current_event) for user_without_profile in users_without_profile]
+        )
+        if reminder is not None
+    ]
+    # Los hashes ya enviados en una sola query (IN) en vez de un exists() por destinatario
+    already_sent = already_sent_hashes([reminder.hash for reminder in due])
+    pending = list({reminder.hash: reminder for reminder in due if reminder.hash not in already_sent}.values())
+
+    stats = send_reminders(pending)
+
+    elapsed = time.perf_counter() - start_time
     logging.info(DASHES_LINE)
     logging.info(
-        f"Process time: {time.perf_counter() - start_time:.4f} seconds. Emails sent: {total_emails_sent}. SMS sent: {total_sms_sent}")
+        f"Process time: {elapsed:.4f} seconds. Reminders due: {len(due)}. Already sent: {len(due) - len(pending)}. "
+        f"Emails sent: {stats['sent']}. Failed: {stats['failed']}. "
+        f"Throughput: {stats['sent'] / stats['send_seconds'] if stats['send_seconds'] else 0:.1f} emails/s "
+        f"({email_pool.size} SMTP connections)")
     logging.info(DASHES_LINE)
+    return stats
+
 
+class Reminder:
+    """Un email de recordatorio a enviar; `action` es el texto cuyo hash evita repetirlo."""
 
-def send_recipient_pending_transfers_reminder(transfer, current_event):
-    if transfer.max_days_ago % 30 in fibonacci_impares(5):
-        action = f"sending a notification to the recipient {transfer.tx_to_email} to remember to create an account, you have a pending ticket transfer since {transfer.max_days_ago} days ago. You have time until {current_event.transfers_enabled_until.strftime('%d/%m')}"
-        try:
-            if not MessageIdempotency.objects.filter(email=transfer.tx_to_email, hash=hash_string(action)).exists():
-                send_mail(
-                    template_name='recipient_pending_transfers_reminder',
-                    recipient_list=[transfer.tx_to_email],
-                    context={
-                        'transfer': transfer,
-                        'current_event': current_event,
-                        'sign_up_link': f"{reverse('account_signup')}?{urlencode({'email': transfer.tx_to_email})}"
-
-                    }
-                )
-                logging.info(action)
-                MessageIdempotency(
-                    email=transfer.tx_to_email,
-                    hash=hash_string(action),
-                    payload=json.dumps(
-                        {
-                            'action': 'send_recipient_pending_transfers_reminder',
-                            'transfer': transfer.to_dict(),
-                            'event_id': current_event.id
-                        })).save()
-                return 1, 0
-        except Exception as e:
-            logging.error(f"Error sending email to {transfer.tx_to_email}: {e}")
-    return 0, 0
+    def __init__(self, email, action, template_name, context, payload):
+        self.email = email
+        self.action = action
+        self.hash = hash_string(action)
+        self.template_name = template_name
+        self.context = context
+        self.payload = payload
+
+    def idempotency(self):
+        return MessageIdempotency(email=self.email, hash=self.hash, payload=json.dumps(self.payload))
+
+
+def build_reminder(builder, item, current_event):
+    try:
+        return builder(item, current_event)
+    except Exception as e:
+        logging.error(f"Error preparing reminder for {item.to_dict()}: {e}")
+        return None
+
+
+def already_sent_hashes(hashes, chunk_size=1000):
+    sent = set()
+    for start in range(0, len(hashes), chunk_size):
+        sent.update(
+            MessageIdempotency.objects.filter(hash__in=hashes[start:start + chunk_size]).values_list('hash', flat=True)
+        )
+    return sent
+
+
+def send_reminders(reminders, chunk_size=REMINDER_CHUNK_SIZE):
+    """
+    Envía los recordatorios con send_mass_templated (conexiones SMTP del pool,
+    lotes en paralelo) y registra cada uno en MessageIdempotency apenas sale: si
+    el Lambda corta a mitad de un lote, la próxima corrida no los repite.
+    """
+    stats = {'sent': 0, 'failed': 0, 'send_seconds': 0.0}
+    started = time.perf_counter()
+    for start in range(0, len(reminders), chunk_size):
+        chunk = reminders[start:start + chunk_size]
+
+        def record_sent(index, chunk=chunk):
+            logging.info(chunk[index].action)
+            MessageIdempotency.objects.bulk_create([chunk[index].idempotency()], ignore_conflicts=True)
+
+        errors, _ = send_mass_templated([
+            {'template_name': reminder.template_name, 'recipient_list': [reminder.email], 'context': reminder.context}
+            for reminder in chunk
+        ], on_sent=record_sent)
+        sent = [reminder for reminder, error in zip(chunk, errors) if error is None]
+        stats['sent'] += len(sent)
+        stats['failed'] += len(chunk) - len(sent)
+    stats['send_seconds'] = time.perf_counter() - started
+    return stats
+
+
+def recipient_pending_transfers_reminder(transfer, current_event):
+    if transfer.max_days_ago % 30 not in fibonacci_impares(5):
+        return None
+    action = f"sending a notification to the recipient {transfer.tx_to_email} to remember to create an account, you have a pending ticket transfer since {transfer.max_days_ago} days ago. You have time until {current_event.transfers_enabled_until.strftime('%d/%m')}"
+    return Reminder(
+        email=transfer.tx_to_email,
+        action=action,
+        template_name='recipient_pending_transfers_reminder',
+        context={
+            'transfer': transfer,
+            'current_event': current_event,
+            'sign_up_link': f"{reverse('account_signup')}?{urlencode({'email': transfer.tx_to_email})}"
+        },
+        payload={
+            'action': 'send_recipient_pending_transfers_reminder',
+            'transfer': transfer.to_dict(),
+            'event_id': current_event.id
+        },
+    )
 
 
 listita_emojis = [
@@ -152,36 +197,25 @@ listita_emojis = [
 ]
 
 
-def send_sender_pending_transfers_reminder(transfer, current_event):
-    emails_sent = 0
-    messages_sent = 0
-    if transfer.max_days_ago % 30 in fibonacci_impares(5):
-        try:
-            action = f"sending a notification to the sender {transfer.tx_from_email} to remember that tickets shared with {transfer.tx_to_emails}, were not accepted yet since {transfer.max_days_ago} days ago. Are you sure they are going to use them? Are the emails correct?. You have time until {current_event.transfers_enabled_until.strftime('%d/%m')}"
-            if not MessageIdempotency.objects.filter(email=transfer.tx_from_email, hash=hash_string(action)).exists():
-                send_mail(
-                    template_name='sender_pending_transfers_reminder',
-                    recipient_list=[transfer.tx_from_email],
-                    context={
-                        'transfer': transfer,
-                        'current_event': current_event,
-                        'listita_emojis': listita_emojis
-
-                    }
-                )
-                logging.info(action)
-                MessageIdempotency(
-                    email=transfer.tx_from_email,
-                    hash=hash_string(action),
-                    payload=json.dumps(
-                        {
-                            'action': 'send_sender_pending_transfers_reminder:email',
-                            'transfer': transfer.to_dict(),
-                            'event_id': current_event.id
-                        })).save()
-                emails_sent = 1
-        except Exception as e:
-            logging.error(f"Error sending email to {transfer.tx_from_email}: {e}")
+def sender_pending_transfers_reminder(transfer, current_event):
+    if transfer.max_days_ago % 30 not in fibonacci_impares(5):
+        return None
+    action = f"sending a notification to the sender {transfer.tx_from_email} to remember that tickets shared with {transfer.tx_to_emails}, were not accepted yet since {transfer.max_days_ago} days ago. Are you sure they are going to use them? Are the emails correct?. You have time until {current_event.transfers_enabled_until.strftime('%d/%m')}"
+    return Reminder(
+        email=transfer.tx_from_email,
+        action=action,
+        template_name='sender_pending_transfers_reminder',
+        context={
+            'transfer': transfer,
+            'current_event': current_event,
+            'listita_emojis': listita_emojis
+        },
+        payload={
+            'action': 'send_sender_pending_transfers_reminder:email',
+            'transfer': transfer.to_dict(),
+            'event_id': current_event.id
+        },
+    )
 
     ## TODO Find a way to do this for free. Twillio charges periodically to first OWN a number.
     ## We only send SMS notifications for transfers that are 2 days old to be assertive but not overwhelming
@@ -205,37 +239,25 @@ def send_sender_pending_transfers_reminder(transfer, current_event):
     #     except Exception as e:
     #         logging.error(f"Error sending SMS to {transfer.tx_from_email}: {e}")
 
-    return emails_sent, messages_sent
-
-
-def send_unsent_tickets_reminder_email(unsent_ticket, current_event):
-    if unsent_ticket.max_days_ago % 30 in fibonacci_impares(5):
-        try:
-            action = f"sending a notification to the holder {unsent_ticket.email} to remember to share the tickets, you have {unsent_ticket.pending_to_share_tickets} pending tickets since {unsent_ticket.max_days_ago} days ago. You have time until {current_event.transfers_enabled_until.strftime('%d/%m')}"
-            if not MessageIdempotency.objects.filter(email=unsent_ticket.email, hash=hash_string(action)).exists():
-                send_mail(
-                    template_name='unsent_tickets_reminder',
-                    recipient_list=[unsent_ticket.email],
-                    context={
-                        'unsent_ticket': unsent_ticket,
-                        'current_event': current_event,
-
-                    }
-                )
-                logging.info(action)
-                MessageIdempotency(
-                    email=unsent_ticket.email,
-                    hash=hash_string(action),
-                    payload=json.dumps(
-                        {
-                            'action': 'send_unsent_tickets_reminder_email',
-                            'unsent_ticket': unsent_ticket.to_dict(),
-                            'event_id': current_event.id
-                        })).save()
-                return 1, 0
-        except Exception as e:
-            logging.error(f"Error sending email to {unsent_ticket.email}: {e}")
-    return 0, 0
+
+def unsent_tickets_reminder(unsent_ticket, current_event):
+    if unsent_ticket.max_days_ago % 30 not in fibonacci_impares(5):
+        return None
+    action = f"sending a notification to the holder {unsent_ticket.email} to remember to share the tickets, you have {unsent_ticket.pending_to_share_tickets} pending tickets since {unsent_ticket.max_days_ago} days ago. You have time until {current_event.transfers_enabled_until.strftime('%d/%m')}"
+    return Reminder(
+        email=unsent_ticket.email,
+        action=action,
+        template_name='unsent_tickets_reminder',
+        context={
+            'unsent_ticket': unsent_ticket,
+            'current_event': current_event,
+        },
+        payload={
+            'action': 'send_unsent_tickets_reminder_email',
+            'unsent_ticket': unsent_ticket.to_dict(),
+            'event_id': current_event.id
+        },
+    )
 
 
 class PendingTransferReceiver:
@@ -410,36 +432,26 @@ def get_users_without_profile(current_event):
         return users_without_profile
 
 
-def send_profile_reminder_email(user_without_profile, current_event):
-    if user_without_profile.max_days_ago % 30 in fibonacci_impares(5):
-        try:
-            action = f"sending a notification to {user_without_profile.email} to remember to create an account and complete their profile, you have {user_without_profile.tickets_count} ticket{'s' if user_without_profile.tickets_count > 1 else ''} assigned since {user_without_profile.max_days_ago} days ago. You have time until {current_event.transfers_enabled_until.strftime('%d/%m')} or your bonus will expire"
-            if not MessageIdempotency.objects.filter(email=user_without_profile.email, hash=hash_string(action)).exists():
-                complete_profile_url = reverse('complete_profile')
-                send_mail(
-                    template_name='profile_reminder',
-                    recipient_list=[user_without_profile.email],
-                    context={
-                        'user_without_profile': user_without_profile,
-                        'current_event': current_event,
-                        'sign_up_link': f"{reverse('account_signup')}?{urlencode({'email': user_without_profile.email})}",
-                        'complete_profile_link': complete_profile_url
-                    }
-                )
-                logging.info(action)
-                MessageIdempotency(
-                    email=user_without_profile.email,
-                    hash=hash_string(action),
-                    payload=json.dumps(
-                        {
-                            'action': 'send_profile_reminder_email',
-                            'user_without_profile': user_without_profile.to_dict(),
-                            'event_id': current_event.id
-                        })).save()
-                return 1, 0
-        except Exception as e:
-            logging.error(f"Error sending email to {user_without_profile.email}: {e}")
-    return 0, 0
+def profile_reminder(user_without_profile, current_event):
+    if user_without_profile.max_days_ago % 30 not in fibonacci_impares(5):
+        return None
+    action = f"sending a notification to {user_without_profile.email} to remember to create an account and complete their profile, you have {user_without_profile.tickets_count} ticket{'s' if user_without_profile.tickets_count > 1 else ''} assigned since {user_without_profile.max_days_ago} days ago. You have time until {current_event.transfers_enabled_until.strftime('%d/%m')} or your bonus will expire"
+    return Reminder(
+        email=user_without_profile.email,
+        action=action,
+        template_name='profile_reminder',
+        context={
+            'user_without_profile': user_without_profile,
+            'current_event': current_event,
+            'sign_up_link': f"{reverse('account_signup')}?{urlencode({'email': user_without_profile.email})}",
+            'complete_profile_link': reverse('complete_profile')
+        },
+        payload={
+            'action': 'send_profile_reminder_email',
+            'user_without_profile': user_without_profile.to_dict(),
+            'event_id': current_event.id
+        },
+    )
 
 
 def fibonacci_impares(n, a=0, b=1, sequence=None):
@@ -0,0 +1,231 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from tickets.models import EmailOutbox, Order
+from utils.email import email_pool
+from utils.work_queue import claim_batch, dispatch, drain, retry_delay
+
+logger = logging.getLogger(__name__)
+
+try:
+    from zappa.asynchronous import task
+except Exception:  # pragma: no cover - zappa package may be unavailable locally
+    task = None
+
+BATCH_SIZE = 25
+MAX_ATTEMPTS = 5
+# Una fila reclamada por un worker que murió vuelve a estar disponible pasado este tiempo
+CLAIM_LEASE = timedelta(minutes=10)
+
+
+def enqueue_email(kind, payload, dedupe_key):
+    """
+    Encola un email en la misma transacción que el cambio que lo origina.
+    Al commitear se dispara un worker; si falla, lo levanta el cron.
+    """
+    row, created = EmailOutbox.objects.get_or_create(
+        dedupe_key=dedupe_key,
+        defaults={'kind': kind, 'payload': payload},
+    )
+    if created:
+        transaction.on_commit(dispatch_email_outbox)
+    else:
+        logger.info('Email %s ya estaba en cola (%s)', dedupe_key, row.status)
+    return row
+
+
+def enqueue_order_confirmation(order):
+    return enqueue_email(
+        EmailOutbox.Kind.ORDER_CONFIRMATION,
+        {'order_id': order.pk},
+        f'order_confirmation:{order.pk}',
+    )
+
+
+def enqueue_order_confirmations(orders):
+    """
+    enqueue_order_confirmation para varias órdenes con un SELECT y un bulk_create;
+    mint_orders lo llama dentro de su transacción.
+    """
+    keys = {f'order_confirmation:{order.pk}': order for order in orders}
+    existing = set(EmailOutbox.objects.filter(dedupe_key__in=keys).values_list('dedupe_key', flat=True))
+    rows = EmailOutbox.objects.bulk_create([
+        EmailOutbox(kind=EmailOutbox.Kind.ORDER_CONFIRMATION, payload={'order_id': order.pk}, dedupe_key=key)
+        for key, order in keys.items()
+        if key not in existing
+    ], ignore_conflicts=True)
+    if rows:
+        transaction.on_commit(dispatch_email_outbox)
+    return rows
+
+
+def enqueue_caja_bonus_email(caja_sale):
+    return enqueue_email(
+        EmailOutbox.Kind.CAJA_BONUS_ISSUED,
+        {'caja_sale_id': caja_sale.pk},
+        f'caja_bonus_issued:{caja_sale.pk}',
+    )
+
+
+def enqueue_password_reset(user):
+    return enqueue_email(
+        EmailOutbox.Kind.PASSWORD_RESET,
+        {'user_id': user.pk},
+        f'password_reset:{user.pk}',
+    )
+
+
+def _send_order_confirmations(rows, connection):
+    orders = Order.objects.select_related('event', 'user').in_bulk(
+        [row.payload.get('order_id') for row in rows]
+    )
+    for row in rows:
+        order = orders.get(row.payload.get('order_id'))
+        if order is None:
+            yield row, f"Order {row.payload.get('order_id')} not found"
+            continue
+        try:
+            order.send_confirmation_email(connection=connection)
+        except Exception as e:
+            logger.exception('Outbox %s: error enviando confirmación de orden %s', row.pk, order.pk)
+            yield row, str(e)
+        else:
+            yield row, None
+
+
+def _send_caja_bonus_emails(rows, connection):
+    from caja.models import CajaSale
+    from caja.services.sales import send_bonus_issued_email
+
+    sales = CajaSale.objects.select_related('order__event', 'order__user').in_bulk(
+        [row.payload.get('caja_sale_id') for row in rows]
+    )
+    for row in rows:
+        sale = sales.get(row.payload.get('caja_sale_id'))
+        if sale is None or sale.order is None or sale.order.user is None:
+            yield row, f"Venta de caja {row.payload.get('caja_sale_id')} sin orden o sin cliente"
+            continue
+        try:
+            send_bonus_issued_email(sale, connection=connection)
+        except Exception as e:
+            logger.exception('Outbox %s: error enviando bonos de la venta de caja %s', row.pk, sale.pk)
+            yield row, str(e)
+        else:
+            yield row, None
+
+
+def _send_password_resets(rows, connection):
+    from django.contrib.auth.models import User
+
+    from caja.services.sales import send_password_reset_email
+
+    users = User.objects.in_bulk([row.payload.get('user_id') for row in rows])
+    for row in rows:
+        user = users.get(row.payload.get('user_id'))
+        if user is None:
+            yield row, f"User {row.payload.get('user_id')} not found"
+            continue
+        try:
+            # allauth arma y envía el mail por su cuenta (no usa la conexión del lote)
+            send_password_reset_email(user)
+        except Exception as e:
+            logger.exception('Outbox %s: error enviando reset de contraseña a %s', row.pk, user.pk)
+            yield row, str(e)
+        else:
+            yield row, None
+
+
+HANDLERS = {
+    EmailOutbox.Kind.ORDER_CONFIRMATION: _send_order_confirmations,
+    EmailOutbox.Kind.CAJA_BONUS_ISSUED: _send_caja_bonus_emails,
+    EmailOutbox.Kind.PASSWORD_RESET: _send_password_resets,
+}
+
+
+def _record_result(row, error):
+    now = timezone.now()
+    if error is None:
+        row.status = EmailOutbox.Status.SENT
+        row.sent_at = now
+        row.last_error = ''
+    elif row.attempts >= MAX_ATTEMPTS:
+        row.status = EmailOutbox.Status.FAILED
+        row.last_error = error
+        logger.error('Outbox %s (%s) falló %s veces: %s', row.pk, row.dedupe_key, row.attempts, error)
+    else:
+        row.available_at = now + retry_delay(row.attempts)
+        row.last_error = error
+    row.save(update_fields=['status', 'sent_at', 'available_at', 'last_error', 'updated_at'])
+
+
+def process_email_outbox_batch(batch_size=BATCH_SIZE):
+    """
+    Reclama un lote de emails pendientes (SKIP LOCKED, así varios workers no se pisan),
+    los envía por una única conexión SMTP y agenda reintentos con backoff exponencial.
+    """
+    rows = claim_batch(EmailOutbox, batch_size, CLAIM_LEASE)
+    summary = {'claimed': len(rows), 'sent': 0, 'retrying': 0, 'failed': 0}
+    if not rows:
+        return summary
+
+    by_kind = {}
+    for row in rows:
+        by_kind.setdefault(row.kind, []).append(row)
+
+    started = time.perf_counter()
+    # Conexión del pool compartido: entre lotes seguidos no se vuelve a autenticar
+    with email_pool.connection() as connection:
+        for kind, kind_rows in by_kind.items():
+            handler = HANDLERS.get(kind)
+            if handler is None:
+                results = [(row, f'Sin handler para {kind}') for row in kind_rows]
+            else:
+                results = handler(kind_rows, connection)
+            for row, error in results:
+                _record_result(row, error)
+                if error is None:
+                    summary['sent'] += 1
+                elif row.status == EmailOutbox.Status.FAILED:
+                    summary['failed'] += 1
+                else:
+                    summary['retrying'] += 1
+
+    logger.info(
+        'Email outbox: %s reclamados, %s enviados, %s a reintentar, %s fallidos en %.2fs',
+        summary['claimed'], summary['sent'], summary['retrying'], summary['failed'],
+        time.perf_counter() - started,
+    )
+    return summary
+
+
+def drain_email_outbox(batch_size=BATCH_SIZE, max_batches=None):
+    """Procesa lotes hasta vaciar la cola (o hasta max_batches)."""
+    return drain(process_email_outbox_batch, batch_size, max_batches)
+
+
+def process_email_outbox(event, context):
+    """Cron: envía los emails en cola y reintenta los que fallaron."""
+    return drain_email_outbox(max_batches=20)
+
+
+if task:
+    @task
+    def process_email_outbox_async():
+        """Procesa la cola en un Lambda aparte (o en línea fuera de Lambda)."""
+        return drain_email_outbox(max_batches=5)
+else:
+    def process_email_outbox_async():
+        """Fallback cuando zappa.asynchronous no está disponible."""
+        return drain_email_outbox(max_batches=5)
+
+
+def dispatch_email_outbox():
+    """
+    Dispara el worker al commitear. En Zappa se encola una invocación asíncrona;
+    localmente (y en tests) corre en línea, que hace las veces de runner local.
+    """
+    dispatch(process_email_outbox_async, 'emails')
@@ -0,0 +1,195 @@
+import difflib
+import logging
+import os
+import re
+import unicodedata
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+# Resultados que devuelve una búsqueda por nombre
+MAX_RESULTS = int(os.environ.get('HOLDER_SEARCH_MAX_RESULTS', '50'))
+# Similitud mínima (word_similarity de pg_trgm, 0 a 1) para la búsqueda difusa
+FUZZY_THRESHOLD = float(os.environ.get('HOLDER_SEARCH_FUZZY_THRESHOLD', '0.5'))
+# Equivalente para difflib cuando no hay pg_trgm (su ratio da valores más altos)
+DIFFLIB_CUTOFF = 0.75
+# Un texto con al menos esta cantidad de dígitos se busca como documento
+DOCUMENT_MIN_DIGITS = 5
+
+_trigram_available = None
+
+_UPDATE_FIELDS = ['event', 'holder', 'grupo_miembro', 'search_name', 'first_name', 'document', 'updated_at']
+
+
+def normalize_name(value):
+    """Sin acentos, en minúsculas y con un solo espacio entre palabras."""
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return ' '.join(re.sub(r'[^\w\s]', ' ', value.lower()).split())
+
+
+def normalize_document(value):
+    return re.sub(r'[^0-9A-Za-z]', '', value or '').upper()
+
+
+def _build_entries(tickets):
+    from events.models import GrupoMiembro
+    from tickets.models import TicketSearchEntry
+
+    # Mismo criterio que _group_info_for_ticket: primer GrupoMiembro del holder (o del owner) en el evento
+    members = {}
+    member_ids = {ticket.holder_id or ticket.owner_id for ticket in tickets} - {None}
+    if member_ids:
+        for miembro in GrupoMiembro.objects.filter(
+            grupo__event_id__in={ticket.event_id for ticket in tickets}, user_id__in=member_ids
+        ).select_related('grupo'):
+            members.setdefault((miembro.grupo.event_id, miembro.user_id), miembro.pk)
+
+    entries = []
+    for ticket in tickets:
+        holder = ticket.holder
+        profile = getattr(holder, 'profile', None) if holder else None
+        last_name = normalize_name(holder.last_name) if holder else ''
+        first_name = normalize_name(holder.first_name) if holder else ''
+        entries.append(TicketSearchEntry(
+            ticket_id=ticket.pk,
+            event_id=ticket.event_id,
+            holder_id=ticket.holder_id,
+            grupo_miembro_id=members.get((ticket.event_id, ticket.holder_id or ticket.owner_id)),
+            search_name=f'{last_name} {first_name}'.strip()[:320],
+            first_name=first_name[:160],
+            document=normalize_document(profile.document_number if profile else '')[:50],
+        ))
+    return entries
+
+
+def refresh_search_entries(tickets_qs, batch_size=1000):
+    """Recalcula (upsert) las filas de TicketSearchEntry de los bonos del queryset."""
+    tickets_qs = tickets_qs.select_related('holder__profile').only(
+        'id', 'event_id', 'holder_id', 'owner_id',
+        'holder__first_name', 'holder__last_name', 'holder__profile__document_number',
+    ).order_by('id')
+    total = 0
+    batch = []
+    for ticket in tickets_qs.iterator(chunk_size=batch_size):
+        batch.append(ticket)
+        if len(batch) >= batch_size:
+            total += _upsert(_build_entries(batch))
+            batch = []
+    if batch:
+        total += _upsert(_build_entries(batch))
+    return total
+
+
+def _upsert(entries):
+    from tickets.models import TicketSearchEntry
+
+    TicketSearchEntry.objects.bulk_create(
+        entries, update_conflicts=True, unique_fields=['ticket'], update_fields=_UPDATE_FIELDS,
+    )
+    return len(entries)
+
+
+def schedule_refresh(*args, **filters):
+    """Recalcula las filas de los bonos que cumplen el filtro cuando commitea la transacción en curso."""
+    from tickets.models import NewTicket
+
+    transaction.on_commit(lambda: refresh_search_entries(NewTicket.objects.filter(*args, **filters)))
+
+
+def ensure_event_index(event):
+    """Arma el índice del evento la primera vez que se busca en él (eventos viejos o recién migrados)."""
+    from tickets.models import NewTicket, TicketSearchEntry
+
+    if TicketSearchEntry.objects.filter(event=event).exists():
+        return
+    if NewTicket.objects.filter(event=event).exists():
+        count = refresh_search_entries(NewTicket.objects.filter(event=event))
+        logger.info('Índice de búsqueda de bonos armado para el evento %s (%s bonos)', event.pk, count)
+
+
+def trigram_available():
+    """pg_trgm instalado (lo intenta crear la migración 0078; en SQLite nunca)."""
+    global _trigram_available
+    if _trigram_available is None:
+        _trigram_available = False
+        if connection.vendor == 'postgresql':
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                    _trigram_available = cursor.fetchone() is not None
+            except DatabaseError:
+                logger.warning('No se pudo consultar pg_extension', exc_info=True)
+    return _trigram_available
+
+
+def _base_queryset(event):
+    from tickets.models import TicketSearchEntry
+
+    return TicketSearchEntry.objects.filter(event=event).select_related(
+        'ticket', 'ticket__ticket_type', 'holder__profile', 'grupo_miembro__grupo__tipo',
+    )
+
+
+def _fuzzy(event, query):
+    """Coincidencias aproximadas (typos, palabras en otro orden), de la más parecida a la menos."""
+    entries = _base_queryset(event)
+    if trigram_available():
+        # <% usa el índice GIN de trigramas sobre search_name y compara contra cada palabra
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute('SET LOCAL pg_trgm.word_similarity_threshold = %s', [FUZZY_THRESHOLD])
+            return list(
+                entries.annotate(similarity=RawSQL(
+                    'word_similarity(%s, tickets_ticketsearchentry.search_name)', (query,), output_field=FloatField(),
+                ))
+                .filter(RawSQL('%s <%% tickets_ticketsearchentry.search_name', (query,), output_field=BooleanField()))
+                .order_by('-similarity', 'search_name')[:MAX_RESULTS]
+            )
+
+    # Sin pg_trgm (SQLite en desarrollo): comparar en Python contra los nombres del evento
+    names = {}
+    for pk, search_name in entries.values_list('pk', 'search_name'):
+        names.setdefault(search_name, []).append(pk)
+    words = {}
+    for search_name in names:
+        for word in search_name.split():
+            words.setdefault(word, set()).add(search_name)
+    matched = []
+    for term in query.split():
+        for word in difflib.get_close_matches(term, list(words), n=MAX_RESULTS, cutoff=DIFFLIB_CUTOFF):
+            matched.extend(words[word])
+    ids = [pk for search_name in dict.fromkeys(matched) for pk in names[search_name]][:MAX_RESULTS]
+    return list(entries.filter(pk__in=ids).order_by('search_name'))
+
+
+def search_holders(event, query):
+    """
+    Busca bonos del evento por documento o por nombre del holder, en el índice
+    TicketSearchEntry. Devuelve (modo, entradas) con modo 'document', 'prefix',
+    'fuzzy' o None si no hubo resultados. Cada entrada trae ticket, holder y
+    grupo_miembro ya cargados.
+    """
+    ensure_event_index(event)
+    entries = _base_queryset(event)
+
+    document = normalize_document(query)
+    if sum(char.isdigit() for char in document) >= DOCUMENT_MIN_DIGITS:
+        found = list(entries.filter(document=document).order_by('ticket_id'))
+        if not found:
+            found = list(entries.filter(document__startswith=document).order_by('document', 'ticket_id')[:MAX_RESULTS])
+        return ('document', found) if found else (None, [])
+
+    name = normalize_name(query)
+    if not name:
+        return None, []
+    found = list(
+        entries.filter(Q(search_name__startswith=name) | Q(first_name__startswith=name))
+        .order_by('search_name', 'ticket_id')[:MAX_RESULTS]
+    )
+    if found:
+        return 'prefix', found
+    found = _fuzzy(event, name)
+    return ('fuzzy', found) if found else (None, [])
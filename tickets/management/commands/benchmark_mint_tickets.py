@@ -0,0 +1,102 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from events.models import Event
+from tickets.models import NewTicket, Order, OrderTicket, TicketType
+from tickets.processing import mint_orders
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide la emisión en lote de bonos (mint_orders): emite 1 bono y luego N bonos, '
+        'y falla si la cantidad de queries no es la misma. Todo corre en una transacción '
+        'que se revierte al final. Pensado para PostgreSQL: SQLite parte los bulk_create '
+        'en lotes por su límite de parámetros.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickets', type=int, default=10000, help='Bonos a emitir en la corrida grande')
+        parser.add_argument('--per-order', type=int, default=5, help='Bonos por orden en la corrida grande')
+
+    def handle(self, *args, **options):
+        total = options['tickets']
+        per_order = max(1, options['per_order'])
+        if total < per_order:
+            raise CommandError('--tickets debe ser mayor o igual a --per-order')
+
+        results = {}
+        try:
+            with transaction.atomic():
+                ticket_type = self._fixture_ticket_type()
+                # Deja el cache de content types caliente para que no cuente en la primera corrida
+                ContentType.objects.get_for_models(NewTicket, Order)
+                results['small'] = self._run(ticket_type, orders=1, per_order=1)
+                results['large'] = self._run(ticket_type, orders=total // per_order, per_order=per_order)
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        for label, (tickets, queries, elapsed) in results.items():
+            self.stdout.write(f'{label}: {tickets} bonos, {queries} queries, {elapsed:.2f}s')
+
+        if results['small'][1] != results['large'][1]:
+            raise CommandError(
+                f"La cantidad de queries depende del volumen: "
+                f"{results['small'][1]} vs {results['large'][1]}"
+            )
+        self.stdout.write(self.style.SUCCESS('Cantidad de queries constante'))
+
+    def _fixture_ticket_type(self):
+        now = timezone.now()
+        event = Event.objects.create(
+            name=f'Benchmark {uuid.uuid4().hex[:8]}',
+            slug=f'benchmark-{uuid.uuid4().hex[:8]}',
+            active=False,
+            start=now + timedelta(days=30),
+            end=now + timedelta(days=31),
+            transfers_enabled_until=now + timedelta(days=29),
+            header_image='events/heros/no-image.jpg',
+            title='Benchmark',
+            description='Benchmark',
+        )
+        return TicketType.objects.create(event=event, name='Benchmark', price=0, ticket_count=0)
+
+    def _run(self, ticket_type, orders, per_order):
+        order_objs = []
+        for _ in range(orders):
+            email = f'{uuid.uuid4().hex}@benchmark.invalid'
+            user = User.objects.create_user(username=email, email=email)
+            order_objs.append(Order(
+                first_name='Bench',
+                last_name='Mark',
+                email=email,
+                phone='',
+                dni='',
+                amount=0,
+                event=ticket_type.event,
+                user=user,
+            ))
+        Order.objects.bulk_create(order_objs)
+        OrderTicket.objects.bulk_create([
+            OrderTicket(order=order, ticket_type=ticket_type, quantity=per_order)
+            for order in order_objs
+        ])
+
+        started = time.monotonic()
+        with CaptureQueriesContext(connection) as ctx:
+            minted = mint_orders(order_objs)
+        elapsed = time.monotonic() - started
+        tickets = sum(len(t) for t in minted.values())
+        return tickets, len(ctx.captured_queries), elapsed
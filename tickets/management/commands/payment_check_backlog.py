@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from events.models import Event
+from tickets.models import Order
+from tickets.payment_check_cron import (
+    MAX_CHECKS_PER_RUN,
+    MAX_ORDER_AGE_HOURS,
+    _due_filter,
+    pending_orders_in_scope,
+)
+
+AGE_BUCKETS = [
+    ('< 1h', timedelta(hours=1)),
+    ('1h - 6h', timedelta(hours=6)),
+    ('6h - 24h', timedelta(days=1)),
+    ('1d - 3d', timedelta(days=3)),
+    ('3d - 7d', timedelta(days=7)),
+]
+
+
+class Command(BaseCommand):
+    help = 'Muestra cómo se distribuye el backlog de órdenes pendientes que consulta el cron de pagos.'
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        event_ids = list(Event.get_active_events().values_list('id', flat=True))
+        pending = Order.objects.filter(status=Order.OrderStatus.PENDING, event_id__in=event_ids)
+        in_scope = pending_orders_in_scope(event_ids, now)
+
+        labels = [label for label, _ in AGE_BUCKETS] + [f'> {AGE_BUCKETS[-1][0].split()[-1]}']
+        age_aggregates = {}
+        lower = None
+        for index, (_, upper) in enumerate(AGE_BUCKETS):
+            bucket = Q(created_at__gt=now - upper)
+            if lower is not None:
+                bucket &= Q(created_at__lte=now - lower)
+            age_aggregates[f'age_{index}'] = Count('id', filter=bucket)
+            lower = upper
+        age_aggregates[f'age_{len(AGE_BUCKETS)}'] = Count('id', filter=Q(created_at__lte=now - lower))
+        by_age = pending.aggregate(**age_aggregates)
+
+        totals = in_scope.aggregate(
+            total=Count('id'),
+            never_checked=Count('id', filter=Q(last_payment_check_at__isnull=True)),
+            due=Count('id', filter=_due_filter(now)),
+        )
+        by_attempts = (
+            in_scope.values('check_attempts')
+            .annotate(total=Count('id'))
+            .order_by('check_attempts')
+        )
+
+        self.stdout.write(f'Pendientes en eventos activos: {pending.count()}')
+        self.stdout.write('Por antigüedad:')
+        for index, label in enumerate(labels):
+            self.stdout.write(f'  {label:>10}: {by_age[f"age_{index}"]}')
+
+        self.stdout.write(f'En alcance del cron (< {MAX_ORDER_AGE_HOURS}h): {totals["total"]}')
+        self.stdout.write(f'  nunca consultadas: {totals["never_checked"]}')
+        self.stdout.write(f'  vencidas ahora: {totals["due"]} (tope por corrida: {MAX_CHECKS_PER_RUN})')
+        self.stdout.write('Por intentos:')
+        for row in by_attempts:
+            self.stdout.write(f'  {row["check_attempts"]:>3}: {row["total"]}')
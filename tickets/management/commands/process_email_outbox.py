@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from tickets.email_outbox import BATCH_SIZE, drain_email_outbox
+
+
+class Command(BaseCommand):
+    help = 'Envía los emails en cola (confirmaciones de orden con PDFs, etc.) y reintenta los fallidos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, default=None)
+
+    def handle(self, *args, **options):
+        totals = drain_email_outbox(
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Outbox: {totals['claimed']} reclamados, {totals['sent']} enviados, "
+                f"{totals['retrying']} a reintentar, {totals['failed']} fallidos"
+            )
+        )
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from events.models import Event
+from tickets.holder_search import refresh_search_entries
+from tickets.models import NewTicket, TicketSearchEntry
+
+
+class Command(BaseCommand):
+    help = 'Rearma el índice de búsqueda de la puerta (TicketSearchEntry) a partir de los bonos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--event', help='Slug del evento (por defecto, todos los eventos activos)')
+        parser.add_argument('--all', action='store_true', help='Incluir también los eventos inactivos')
+
+    def handle(self, *args, **options):
+        if options['event']:
+            events = Event.objects.filter(slug=options['event'])
+            if not events.exists():
+                raise CommandError(f"No existe el evento {options['event']}")
+        elif options['all']:
+            events = Event.objects.all()
+        else:
+            events = Event.get_active_events()
+
+        for event in events.order_by('id'):
+            count = refresh_search_entries(NewTicket.objects.filter(event=event))
+            # Filas de bonos que ya no son del evento (no debería pasar, pero el índice no lo sabe)
+            stale, _ = TicketSearchEntry.objects.filter(event=event).exclude(ticket__event=event).delete()
+            message = f'{event.name}: {count} bonos indexados'
+            if stale:
+                self.stdout.write(self.style.WARNING(f'{message} ({stale} filas viejas borradas)'))
+            else:
+                self.stdout.write(self.style.SUCCESS(message))
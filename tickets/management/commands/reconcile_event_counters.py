@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from events.models import Event
+from tickets.counters import reconcile_event_counters
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero los contadores de bonos por evento (EventTicketCounters) y muestra las diferencias.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--event', help='Slug del evento (por defecto, todos los eventos activos)')
+        parser.add_argument('--all', action='store_true', help='Incluir también los eventos inactivos')
+
+    def handle(self, *args, **options):
+        if options['event']:
+            events = Event.objects.filter(slug=options['event'])
+            if not events.exists():
+                raise CommandError(f"No existe el evento {options['event']}")
+        elif options['all']:
+            events = Event.objects.all()
+        else:
+            events = Event.get_active_events()
+
+        for event in events.order_by('id'):
+            counters, drift = reconcile_event_counters(event.pk)
+            summary = (
+                f'{event.name}: {counters.tickets_sold} vendidos, {counters.tickets_used} usados, '
+                f'{counters.caja_tickets_sold} por caja, {counters.tickets_left} salieron'
+            )
+            if drift:
+                diffs = ', '.join(f'{field} {delta:+d}' for field, delta in drift.items())
+                self.stdout.write(self.style.WARNING(f'{summary} (corregido: {diffs})'))
+            else:
+                self.stdout.write(self.style.SUCCESS(summary))
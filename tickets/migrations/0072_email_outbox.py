@@ -0,0 +1,35 @@
+# Generated by Django 4.2.15 on 2026-10-18 17:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0071_alter_order_order_type_alter_tickettype_ticket_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('kind', models.CharField(choices=[('ORDER_CONFIRMATION', 'Confirmación de orden')], max_length=40)),
+                ('dedupe_key', models.CharField(help_text='Evita encolar dos veces el mismo envío', max_length=128, unique=True)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('PENDING', 'Pendiente'), ('SENT', 'Enviado'), ('FAILED', 'Fallido')], default='PENDING', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, help_text='No se procesa antes de este momento')),
+                ('last_error', models.TextField(blank=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Email en cola',
+                'verbose_name_plural': 'Emails en cola',
+                'indexes': [models.Index(fields=['status', 'available_at'], name='tickets_outbox_status_avail')],
+            },
+        ),
+    ]
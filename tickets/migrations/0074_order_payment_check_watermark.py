@@ -0,0 +1,27 @@
+# Generated by Django 4.2.15 on 2026-10-18 17:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0073_cron_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='check_attempts',
+            field=models.PositiveIntegerField(default=0, help_text='Consultas a MercadoPago hechas por el cron sin pago aprobado'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='last_payment_check_at',
+            field=models.DateTimeField(blank=True, help_text='Última consulta del pago a MercadoPago desde el cron', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'last_payment_check_at'], name='tickets_order_pay_check_idx'),
+        ),
+    ]
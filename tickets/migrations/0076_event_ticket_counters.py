@@ -0,0 +1,32 @@
+# Generated by Django 4.2.15 on 2026-10-18 17:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0039_eventrequest_end_required'),
+        ('tickets', '0075_create_cache_table'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventTicketCounters',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ticket_counters', serialize=False, to='events.event')),
+                ('tickets_sold', models.IntegerField(default=0)),
+                ('tickets_used', models.IntegerField(default=0)),
+                ('caja_tickets_sold', models.IntegerField(default=0)),
+                ('tickets_left', models.IntegerField(default=0, help_text='Bonos usados cuyo holder está marcado como que salió')),
+                ('reconciled_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Contadores de bonos del evento',
+                'verbose_name_plural': 'Contadores de bonos por evento',
+            },
+        ),
+    ]
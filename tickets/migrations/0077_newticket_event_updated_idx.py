@@ -0,0 +1,17 @@
+# Generated by Django 4.2.15 on 2026-10-18 17:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0076_event_ticket_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='newticket',
+            index=models.Index(fields=['event', 'updated_at'], name='tickets_newticket_evt_upd_idx'),
+        ),
+    ]
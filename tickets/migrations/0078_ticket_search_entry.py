@@ -0,0 +1,63 @@
+# Generated by Django 4.2.15 on 2026-10-18 17:28
+
+from django.conf import settings
+import logging
+
+from django.db import DatabaseError, migrations, models, transaction
+import django.db.models.deletion
+
+logger = logging.getLogger(__name__)
+
+
+def create_trigram_index(apps, schema_editor):
+    # Búsqueda aproximada de tickets.holder_search: sólo en Postgres y si se puede
+    # crear pg_trgm (si no, la búsqueda aproximada se hace con difflib)
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    try:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS tickets_search_name_trgm_idx '
+                'ON tickets_ticketsearchentry USING gin (search_name gin_trgm_ops)'
+            )
+    except DatabaseError:
+        logger.warning('No se pudo crear pg_trgm; la búsqueda aproximada de bonos no va a usar índice', exc_info=True)
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS tickets_search_name_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0039_eventrequest_end_required'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tickets', '0077_newticket_event_updated_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketSearchEntry',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('ticket', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_entry', serialize=False, to='tickets.newticket')),
+                ('search_name', models.CharField(blank=True, help_text='Apellido y nombre, sin acentos y en minúsculas', max_length=320)),
+                ('first_name', models.CharField(blank=True, help_text='Nombre normalizado', max_length=160)),
+                ('document', models.CharField(blank=True, help_text='Documento sin puntos ni espacios', max_length=50)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='events.event')),
+                ('grupo_miembro', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='events.grupomiembro')),
+                ('holder', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Índice de búsqueda de bonos',
+                'verbose_name_plural': 'Índice de búsqueda de bonos',
+                'indexes': [models.Index(fields=['event', 'search_name'], name='tickets_search_evt_name_idx', opclasses=['int8_ops', 'varchar_pattern_ops']), models.Index(fields=['event', 'first_name'], name='tickets_search_evt_first_idx', opclasses=['int8_ops', 'varchar_pattern_ops']), models.Index(fields=['event', 'document'], name='tickets_search_evt_doc_idx', opclasses=['int8_ops', 'varchar_pattern_ops'])],
+            },
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
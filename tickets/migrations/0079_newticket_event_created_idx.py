@@ -0,0 +1,17 @@
+# Generated by Django 4.2.15 on 2026-10-18 17:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0078_ticket_search_entry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='newticket',
+            index=models.Index(fields=['event', '-created_at', '-id'], name='tickets_newticket_evt_crt_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.15 on 2026-10-18 17:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0079_newticket_event_created_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='emailoutbox',
+            name='kind',
+            field=models.CharField(choices=[('ORDER_CONFIRMATION', 'Confirmación de orden'), ('CAJA_BONUS_ISSUED', 'Bonos emitidos por caja'), ('PASSWORD_RESET', 'Definir contraseña (cuenta creada por caja)')], max_length=40),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.15 on 2026-10-18 17:46
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0080_emailoutbox_caja_kinds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookInbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('topic', models.CharField(choices=[('payment', 'Pago'), ('order', 'Orden (caja)')], max_length=20)),
+                ('resource_id', models.CharField(max_length=64)),
+                ('payload', models.JSONField(blank=True, default=dict, help_text='Última notificación recibida')),
+                ('status', models.CharField(choices=[('PENDING', 'Pendiente'), ('PROCESSED', 'Procesado'), ('FAILED', 'Fallido')], default='PENDING', max_length=10)),
+                ('received_count', models.PositiveIntegerField(default=1, help_text='Notificaciones recibidas para este recurso')),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Desde cuándo está pendiente')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, help_text='No se procesa antes de este momento')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('outcome', models.CharField(blank=True, max_length=40)),
+                ('last_error', models.TextField(blank=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('fetch_ms', models.PositiveIntegerField(blank=True, help_text='Consulta a MercadoPago', null=True)),
+                ('latency_ms', models.PositiveIntegerField(blank=True, help_text='De recibido a procesado', null=True)),
+            ],
+            options={
+                'verbose_name': 'Webhook recibido',
+                'verbose_name_plural': 'Webhooks recibidos',
+                'indexes': [models.Index(fields=['status', 'available_at'], name='tickets_webhook_status_avail')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='webhookinbox',
+            constraint=models.UniqueConstraint(fields=('topic', 'resource_id'), name='tickets_webhookinbox_unique_resource'),
+        ),
+    ]
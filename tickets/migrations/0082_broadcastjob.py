@@ -0,0 +1,67 @@
+# Generated by Django 4.2.15 on 2026-10-18 17:51
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0039_eventrequest_end_required'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tickets', '0081_webhookinbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BroadcastJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('status', models.CharField(choices=[('PENDING', 'Pendiente'), ('RUNNING', 'En curso'), ('DONE', 'Terminado'), ('CANCELLED', 'Cancelado')], default='PENDING', max_length=10)),
+                ('concurrency', models.PositiveSmallIntegerField(default=4, help_text='Holders en paralelo')),
+                ('cursor', models.PositiveIntegerField(default=0, help_text='Último holder_id procesado en esta pasada')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('sent', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, help_text='Última tanda terminada por un worker', null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='broadcast_jobs', to='events.event')),
+            ],
+            options={
+                'verbose_name': 'Envío masivo de bonos',
+                'verbose_name_plural': 'Envíos masivos de bonos',
+            },
+        ),
+        migrations.CreateModel(
+            name='BroadcastJobRecipient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('status', models.CharField(choices=[('PENDING', 'Pendiente'), ('SENT', 'Enviado'), ('FAILED', 'Fallido')], default='PENDING', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('sent_to', models.EmailField(blank=True, max_length=254)),
+                ('ticket_count', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('retryable', models.BooleanField(default=False, help_text='El error fue del envío (no del holder) y se puede reintentar')),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('holder', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipients', to='tickets.broadcastjob')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['job', 'status', 'holder'], name='tickets_broadcast_job_status')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='broadcastjobrecipient',
+            constraint=models.UniqueConstraint(fields=('job', 'holder'), name='tickets_broadcast_unique_holder'),
+        ),
+        migrations.AddIndex(
+            model_name='broadcastjob',
+            index=models.Index(fields=['status', 'heartbeat_at'], name='tickets_broadcast_status_hb'),
+        ),
+    ]
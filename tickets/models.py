@@ -3,10 +3,8 @@ import logging
 import uuid
 from datetime import datetime
 from decimal import Decimal
-from io import BytesIO
 
 import jsonfield
-import qrcode
 from auditlog.registry import auditlog
 from django.utils import timezone
 from django.conf import settings
@@ -20,6 +18,7 @@ from django.utils import timezone
 from events.models import Event
 from utils.email import send_mail
 from utils.models import BaseModel
+from utils.qr_cache import QR_IMAGE_FORMAT, qr_data_url, qr_image_bytes
 from .processing import mint_tickets
 
 
@@ -218,10 +217,16 @@ class Order(BaseModel):
     processor_callback = models.JSONField(null=True, blank=True, help_text="Payment processor callback data")
     net_received_amount = models.DecimalField(decimal_places=2, max_digits=10, null=True, blank=True, help_text="Net amount received after fees")
 
+    last_payment_check_at = models.DateTimeField(null=True, blank=True, help_text="Última consulta del pago a MercadoPago desde el cron")
+    check_attempts = models.PositiveIntegerField(default=0, help_text="Consultas a MercadoPago hechas por el cron sin pago aprobado")
+
     class Meta:
         permissions = [
             ("can_sell_tickets", "Can sell tickets in Caja"),
         ]
+        indexes = [
+            models.Index(fields=['status', 'last_payment_check_at'], name='tickets_order_pay_check_idx'),
+        ]
 
     def total_ticket_types(self):
         return self.order_tickets.count()
@@ -235,6 +240,8 @@ class Order(BaseModel):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._old_status = self.status
+        # Si los bonos de la orden ya están sumados en EventTicketCounters (ver tickets.signals)
+        self._counted_confirmed = self.__dict__.get('status') == Order.OrderStatus.CONFIRMED
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
@@ -242,7 +249,11 @@ class Order(BaseModel):
             self._old_status = self.status
             mint_tickets(self)
 
-    def send_confirmation_email(self):
+    def enqueue_confirmation_email(self):
+        from tickets.email_outbox import enqueue_order_confirmation
+        return enqueue_order_confirmation(self)
+
+    def send_confirmation_email(self, connection=None):
         kwargs = {
             'template_name': 'order_success',
             'recipient_list': [self.email],
@@ -284,7 +295,7 @@ class Order(BaseModel):
                             e,
                         )
 
-        send_mail(**kwargs)
+        send_mail(email_connection=connection, **kwargs)
         logging.info(f'Order {self.id} confirmation email sent')
 
     def get_payment_preference(self):
@@ -376,59 +387,34 @@ class NewTicket(BaseModel):
     volunteer_mad = models.BooleanField('MAD - Para brindar apoyo en el movimiento de obras de arte y sus partes durante FA.', null=True, blank=True, )
 
     def generate_qr_code(self):
-        # Generate the QR code
-        img = qrcode.make(f'{self.key}')
-        img_io = BytesIO()
-        img.save(img_io, format='PNG')
-        img_io.seek(0)
+        # PNG en base64; sale del cache de QRs (la key del bono nunca cambia)
+        return base64.b64encode(qr_image_bytes(self.key)).decode('utf-8')
+
+    def qr_image_url(self, fmt=None):
+        # Vista autenticada (holder, owner o staff): el QR es la credencial de entrada
+        return reverse('ticket_qr', kwargs={'ticket_key': self.key, 'fmt': fmt or QR_IMAGE_FORMAT})
 
-        # Encode the image to base64
-        img_data_base64 = base64.b64encode(img_io.getvalue()).decode('utf-8')
+    def qr_data_url(self):
+        # Inline, para la página pública del bono (quien la ve ya tiene la key en la URL)
+        return qr_data_url(self.key)
 
-        return img_data_base64
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Para invalidar también el resumen del holder/owner anterior (ver tickets.signals)
+        self._old_holder_id = self.__dict__.get('holder_id')
+        self._old_owner_id = self.__dict__.get('owner_id')
+        # Para ajustar EventTicketCounters sólo con lo que cambió
+        self._old_is_used = self.__dict__.get('is_used')
+        self._old_holder_left = self.__dict__.get('holder_left')
 
     def save(self, *args, **kwargs):
         super(NewTicket, self).save(*args, **kwargs)
 
     def get_dto(self, user):
-        transfer_pending = NewTicketTransfer.objects.filter(ticket=self, tx_from=user,
-                                                            status='PENDING').first()
-        return {
-            'key': self.key,
-            'order': self.order.key,
-            'ticket_type': self.ticket_type.name,
-            'ticket_color': self.ticket_type.color,
-            'emoji': self.ticket_type.emoji,
-            'price': self.ticket_type.price,
-            'is_transfer_pending': transfer_pending is not None,
-            'transferring_to': transfer_pending.tx_to_email if transfer_pending else None,
-            'is_owners': self.holder == self.owner,
-            'owner': self.owner.id if self.owner else None,  # Add owner field for AJAX
-            'volunteer_ranger': self.volunteer_ranger,
-            'volunteer_transmutator': self.volunteer_transmutator,
-            'volunteer_umpalumpa': self.volunteer_umpalumpa,
-            'volunteer_mad': self.volunteer_mad,
-            'qr_code': self.generate_qr_code(),
-            'is_used': self.is_used,
-            'used_at': self.used_at,
-            'scanned_by': {
-                'id': self.scanned_by.id,
-                'username': self.scanned_by.username,
-                'full_name': self.scanned_by.get_full_name() or self.scanned_by.username,
-                'email': self.scanned_by.email
-            } if self.scanned_by else None,
-            'notes': self.notes,
-            'photos': [
-                {
-                    'id': photo.id,
-                    'url': photo.photo.url,
-                    'name': photo.photo.name.split('/')[-1],  # Get filename
-                    'uploaded_at': photo.created_at.isoformat() if photo.created_at else None,
-                    'uploaded_by': photo.uploaded_by.get_full_name() or photo.uploaded_by.username
-                }
-                for photo in self.ticket_photos.all()
-            ],
-        }
+        # Para listas de bonos usar TicketDTOAssembler directamente
+        from tickets.dto import TicketDTOAssembler
+
+        return TicketDTOAssembler([self], user).build(self)
 
     def is_volunteer(self):
         return self.volunteer_ranger or self.volunteer_transmutator or self.volunteer_umpalumpa or self.volunteer_mad
@@ -438,6 +424,12 @@ class NewTicket(BaseModel):
 
     class Meta:
         verbose_name = 'Ticket'
+        indexes = [
+            # Deltas del manifiesto del scanner (tickets.scanner_sync)
+            models.Index(fields=['event', 'updated_at'], name='tickets_newticket_evt_upd_idx'),
+            # Keyset del reporte de bonos (tickets.reports)
+            models.Index(fields=['event', '-created_at', '-id'], name='tickets_newticket_evt_crt_idx'),
+        ]
 
 
 class NewTicketTransfer(BaseModel):
@@ -556,6 +548,219 @@ class MessageIdempotency(BaseModel):
         return f"{self.email} - {self.hash}"
 
 
+class EmailOutbox(BaseModel):
+    """Emails pendientes de envío; los procesa tickets.email_outbox fuera del request."""
+
+    class Kind(models.TextChoices):
+        ORDER_CONFIRMATION = 'ORDER_CONFIRMATION', 'Confirmación de orden'
+        CAJA_BONUS_ISSUED = 'CAJA_BONUS_ISSUED', 'Bonos emitidos por caja'
+        PASSWORD_RESET = 'PASSWORD_RESET', 'Definir contraseña (cuenta creada por caja)'
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pendiente'
+        SENT = 'SENT', 'Enviado'
+        FAILED = 'FAILED', 'Fallido'
+
+    kind = models.CharField(max_length=40, choices=Kind.choices)
+    dedupe_key = models.CharField(max_length=128, unique=True, help_text="Evita encolar dos veces el mismo envío")
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now, help_text="No se procesa antes de este momento")
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Email en cola'
+        verbose_name_plural = 'Emails en cola'
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='tickets_outbox_status_avail'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.dedupe_key} ({self.status})'
+
+
+class WebhookInbox(BaseModel):
+    """
+    Notificaciones de MercadoPago recibidas y todavía no aplicadas (o ya aplicadas).
+    Una fila por recurso: las notificaciones repetidas se suman a la misma fila y
+    las procesa tickets.webhook_inbox en lote, fuera del request.
+    """
+
+    class Topic(models.TextChoices):
+        PAYMENT = 'payment', 'Pago'
+        ORDER = 'order', 'Orden (caja)'
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pendiente'
+        PROCESSED = 'PROCESSED', 'Procesado'
+        FAILED = 'FAILED', 'Fallido'
+
+    topic = models.CharField(max_length=20, choices=Topic.choices)
+    resource_id = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict, blank=True, help_text="Última notificación recibida")
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    received_count = models.PositiveIntegerField(default=1, help_text="Notificaciones recibidas para este recurso")
+    received_at = models.DateTimeField(default=timezone.now, help_text="Desde cuándo está pendiente")
+    available_at = models.DateTimeField(default=timezone.now, help_text="No se procesa antes de este momento")
+    attempts = models.PositiveIntegerField(default=0)
+    outcome = models.CharField(max_length=40, blank=True)
+    last_error = models.TextField(blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    fetch_ms = models.PositiveIntegerField(null=True, blank=True, help_text="Consulta a MercadoPago")
+    latency_ms = models.PositiveIntegerField(null=True, blank=True, help_text="De recibido a procesado")
+
+    class Meta:
+        verbose_name = 'Webhook recibido'
+        verbose_name_plural = 'Webhooks recibidos'
+        constraints = [
+            models.UniqueConstraint(fields=['topic', 'resource_id'], name='tickets_webhookinbox_unique_resource'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='tickets_webhook_status_avail'),
+        ]
+
+    def __str__(self):
+        return f'{self.topic} {self.resource_id} ({self.status})'
+
+
+class BroadcastJob(BaseModel):
+    """Envío de los PDFs a todos los holders de un evento, de a tandas y retomable (tickets.broadcast_jobs)."""
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pendiente'
+        RUNNING = 'RUNNING', 'En curso'
+        DONE = 'DONE', 'Terminado'
+        CANCELLED = 'CANCELLED', 'Cancelado'
+
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='broadcast_jobs')
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    concurrency = models.PositiveSmallIntegerField(default=4, help_text="Holders en paralelo")
+    cursor = models.PositiveIntegerField(default=0, help_text="Último holder_id procesado en esta pasada")
+    total = models.PositiveIntegerField(default=0)
+    sent = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="Última tanda terminada por un worker")
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Envío masivo de bonos'
+        verbose_name_plural = 'Envíos masivos de bonos'
+        indexes = [
+            models.Index(fields=['status', 'heartbeat_at'], name='tickets_broadcast_status_hb'),
+        ]
+
+    def __str__(self):
+        return f'Broadcast {self.event} ({self.status}, {self.sent}/{self.total})'
+
+
+class BroadcastJobRecipient(BaseModel):
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pendiente'
+        SENT = 'SENT', 'Enviado'
+        FAILED = 'FAILED', 'Fallido'
+
+    job = models.ForeignKey(BroadcastJob, on_delete=models.CASCADE, related_name='recipients')
+    holder = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    sent_to = models.EmailField(blank=True)
+    ticket_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    retryable = models.BooleanField(default=False, help_text="El error fue del envío (no del holder) y se puede reintentar")
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'holder'], name='tickets_broadcast_unique_holder'),
+        ]
+        indexes = [
+            models.Index(fields=['job', 'status', 'holder'], name='tickets_broadcast_job_status'),
+        ]
+
+    def __str__(self):
+        return f'{self.job_id} → {self.holder_id} ({self.status})'
+
+
+class CronCheckpoint(BaseModel):
+    """Progreso persistido de un cron, para que la corrida siguiente retome donde quedó la anterior."""
+    name = models.CharField(max_length=100, unique=True)
+    cursor = models.JSONField(default=dict, blank=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.updated_at})"
+
+    @classmethod
+    def load(cls, name):
+        checkpoint, _ = cls.objects.get_or_create(name=name)
+        return checkpoint
+
+    def store(self, cursor):
+        self.cursor = cursor
+        self.save(update_fields=['cursor', 'updated_at'])
+
+
+class EventTicketCounters(BaseModel):
+    """
+    Contadores por evento para el scanner, mantenidos en la misma transacción que
+    el cambio (ver tickets.counters). Cuentan los bonos de órdenes CONFIRMED del evento.
+    """
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, primary_key=True, related_name='ticket_counters')
+    tickets_sold = models.IntegerField(default=0)
+    tickets_used = models.IntegerField(default=0)
+    caja_tickets_sold = models.IntegerField(default=0)
+    tickets_left = models.IntegerField(default=0, help_text="Bonos usados cuyo holder está marcado como que salió")
+    reconciled_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Contadores de bonos del evento"
+        verbose_name_plural = "Contadores de bonos por evento"
+
+    def __str__(self):
+        return f"{self.event_id}: {self.tickets_used}/{self.tickets_sold}"
+
+
+class TicketSearchEntry(BaseModel):
+    """
+    Índice de búsqueda de la puerta (check_ticket_by_dni): nombre y documento del
+    holder normalizados y su GrupoMiembro, una fila por bono. Se mantiene desde
+    tickets.signals y mint_orders (ver tickets.holder_search).
+    """
+    ticket = models.OneToOneField(NewTicket, on_delete=models.CASCADE, primary_key=True, related_name='search_entry')
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='+')
+    holder = models.ForeignKey(User, null=True, blank=True, on_delete=models.CASCADE, related_name='+')
+    grupo_miembro = models.ForeignKey(
+        'events.GrupoMiembro', null=True, blank=True, on_delete=models.SET_NULL, related_name='+'
+    )
+    search_name = models.CharField(max_length=320, blank=True, help_text="Apellido y nombre, sin acentos y en minúsculas")
+    first_name = models.CharField(max_length=160, blank=True, help_text="Nombre normalizado")
+    document = models.CharField(max_length=50, blank=True, help_text="Documento sin puntos ni espacios")
+
+    class Meta:
+        verbose_name = "Índice de búsqueda de bonos"
+        verbose_name_plural = "Índice de búsqueda de bonos"
+        indexes = [
+            # Prefijo (LIKE 'q%') con cualquier collation de Postgres
+            models.Index(
+                fields=['event', 'search_name'], opclasses=['int8_ops', 'varchar_pattern_ops'],
+                name='tickets_search_evt_name_idx',
+            ),
+            models.Index(
+                fields=['event', 'first_name'], opclasses=['int8_ops', 'varchar_pattern_ops'],
+                name='tickets_search_evt_first_idx',
+            ),
+            models.Index(
+                fields=['event', 'document'], opclasses=['int8_ops', 'varchar_pattern_ops'],
+                name='tickets_search_evt_doc_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.ticket_id}: {self.search_name} ({self.document})"
+
+
 class DirectTicketTemplateOriginChoices(models.TextChoices):
     CAMP = 'CAMP', 'Camp'
     VOLUNTEER = 'VOLUNTARIOS', 'Voluntarios'
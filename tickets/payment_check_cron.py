@@ -1,172 +1,293 @@
 import logging
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
 import requests
 from django.conf import settings
+from django.db.models import BooleanField, Case, F, Q, Value, When
+from django.utils import timezone
+
 from events.models import Event
 from tickets.models import Order
+from tickets.processing import mint_orders
+from utils.mercadopago_api import MP_API_BASE_URL, api_get
 
 logger = logging.getLogger(__name__)
 
+MERCHANT_ORDERS_SEARCH_URL = f'{MP_API_BASE_URL}/merchant_orders/search'
+# Threads que consultan MP en paralelo (todas comparten la sesión HTTP y el rate limit por host)
+CHECK_WORKERS = int(os.environ.get('PAYMENT_CHECK_WORKERS', '8'))
+# Órdenes pendientes más viejas que esto ya no se consultan
+MAX_ORDER_AGE_HOURS = int(os.environ.get('PAYMENT_CHECK_MAX_ORDER_AGE_HOURS', '168'))
+# Órdenes creadas hace menos de esto se consultan en todas las corridas
+FRESH_ORDER_MINUTES = int(os.environ.get('PAYMENT_CHECK_FRESH_ORDER_MINUTES', '60'))
+# Después, el intervalo entre consultas se duplica con cada intento (base, 2*base, 4*base...) hasta el máximo
+RECHECK_BASE_MINUTES = int(os.environ.get('PAYMENT_CHECK_RECHECK_BASE_MINUTES', '10'))
+RECHECK_MAX_MINUTES = int(os.environ.get('PAYMENT_CHECK_RECHECK_MAX_MINUTES', '720'))
+# Tope de consultas a MP por corrida, sin importar cuántos carritos abandonados haya
+MAX_CHECKS_PER_RUN = int(os.environ.get('PAYMENT_CHECK_MAX_PER_RUN', '300'))
+# Margen para cortar antes del timeout del Lambda
+TIME_BUDGET_SECONDS = int(os.environ.get('PAYMENT_CHECK_TIME_BUDGET_SECONDS', '240'))
+REQUEST_TIMEOUT_SECONDS = 10
+
+
+def _fetch_merchant_order(order_key, access_token):
+    """Corre en un thread del pool: solo HTTP, nada de DB."""
+    try:
+        response = api_get(
+            MERCHANT_ORDERS_SEARCH_URL,
+            params={'external_reference': order_key},
+            access_token=access_token,
+            timeout=REQUEST_TIMEOUT_SECONDS,
+        )
+        return response, None
+    except requests.exceptions.RequestException as e:
+        return None, e
+
+
+def _approved_payment(data):
+    elements = data.get('elements') or []
+    if not elements:
+        return None, 'No elements found in MercadoPago response'
+    # Get the first merchant order
+    payments = elements[0].get('payments') or []
+    if not payments:
+        return None, 'No payments found in merchant order'
+    for payment in payments:
+        if payment.get('status') == 'approved':
+            return payment, None
+    return None, 'Payment not approved yet'
+
+
+def _approve_order(order_id, order_key, data, approved_payment):
+    """Guarda el pago en la orden; el mint se hace después, en lote, para todas las aprobadas."""
+    order = Order.objects.get(id=order_id, key=order_key)
+
+    if order.status != Order.OrderStatus.PENDING:
+        logger.info(f"Order {order_key} is no longer PENDING (current status: {order.status}). Skipping update.")
+        return None
+
+    # Store the merchant order data (includes payment info)
+    order.processor_callback = data
+    transaction_details = approved_payment.get('transaction_details', {})
+    net_received = transaction_details.get('net_received_amount')
+    if net_received:
+        order.net_received_amount = net_received
+        logger.info(f"Set net_received_amount to {net_received} for order {order_key}")
+    order.save(update_fields=['processor_callback', 'net_received_amount', 'updated_at'])
+    logger.info(f"Order {order_key} approved, queued for minting")
+    return order
+
+
+def _deadline(context):
+    budget = TIME_BUDGET_SECONDS
+    remaining_ms = getattr(context, 'get_remaining_time_in_millis', None)
+    if callable(remaining_ms):
+        # Dejar 30s para registrar los chequeos y emitir
+        budget = min(budget, max(0, remaining_ms() / 1000 - 30))
+    return time.monotonic() + budget
+
+
+def recheck_interval(check_attempts):
+    return timedelta(minutes=min(RECHECK_BASE_MINUTES * 2 ** check_attempts, RECHECK_MAX_MINUTES))
+
+
+def _due_filter(now):
+    """Fresca, nunca consultada, o ya pasó su intervalo según la cantidad de intentos."""
+    due = Q(created_at__gte=now - timedelta(minutes=FRESH_ORDER_MINUTES)) | Q(last_payment_check_at__isnull=True)
+    attempts = 0
+    while RECHECK_BASE_MINUTES * 2 ** attempts < RECHECK_MAX_MINUTES:
+        due |= Q(check_attempts=attempts, last_payment_check_at__lte=now - recheck_interval(attempts))
+        attempts += 1
+    due |= Q(
+        check_attempts__gte=attempts,
+        last_payment_check_at__lte=now - timedelta(minutes=RECHECK_MAX_MINUTES),
+    )
+    return due
+
+
+def pending_orders_in_scope(event_ids, now):
+    """Órdenes pendientes que el cron todavía consulta (eventos activos, no demasiado viejas)."""
+    return Order.objects.filter(
+        status=Order.OrderStatus.PENDING,
+        event_id__in=event_ids,
+        created_at__gte=now - timedelta(hours=MAX_ORDER_AGE_HOURS),
+    )
+
+
+def due_pending_orders(event_ids, now, limit=MAX_CHECKS_PER_RUN):
+    """
+    Lote priorizado para esta corrida: primero las frescas, después las nunca
+    consultadas y luego las que hace más tiempo no se consultan.
+    """
+    return (
+        pending_orders_in_scope(event_ids, now)
+        .filter(_due_filter(now))
+        .annotate(is_fresh=Case(
+            When(created_at__gte=now - timedelta(minutes=FRESH_ORDER_MINUTES), then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        ))
+        .order_by('-is_fresh', F('last_payment_check_at').asc(nulls_first=True), '-created_at')
+        .values('id', 'key', 'event_id')[:limit]
+    )
+
+
+def _record_checks(order_ids, checked_at):
+    Order.objects.filter(pk__in=order_ids, status=Order.OrderStatus.PENDING).update(
+        last_payment_check_at=checked_at,
+        check_attempts=F('check_attempts') + 1,
+    )
+
+
+def _mint_approved_orders(orders):
+    """
+    Emite las órdenes aprobadas en un solo mint_orders; si el lote falla, se
+    reintenta orden por orden para que una orden con problemas no deje
+    pendientes a las demás. Devuelve (minted, órdenes que fallaron).
+
+    A las que fallan no se les cuenta este chequeo para el backoff: ya están
+    pagas y tienen que reintentarse pronto, no en horas.
+    """
+    try:
+        return mint_orders(orders), []
+    except Exception as e:
+        logger.error(f"Error minting {len(orders)} approved orders in one batch, retrying one by one: {str(e)}", exc_info=True)
+
+    minted = {}
+    failed = []
+    for order in orders:
+        try:
+            minted.update(mint_orders([order]))
+        except Exception as e:
+            logger.error(f"Error minting approved order {order.key}: {str(e)}", exc_info=True)
+            failed.append(order)
+    if failed:
+        Order.objects.filter(
+            pk__in=[order.pk for order in failed], status=Order.OrderStatus.PENDING, check_attempts__gt=0,
+        ).update(check_attempts=F('check_attempts') - 1)
+    return minted, failed
+
 
 def check_pending_payments(event, context):
     """
     Scheduled task to check pending orders and verify payment status with MercadoPago.
     Runs every 5 minutes via Zappa scheduled events.
-    
+
+    Cada corrida toma un lote acotado (MAX_CHECKS_PER_RUN) de órdenes pendientes:
+    las frescas siempre, las más viejas con intervalos que se duplican según
+    Order.check_attempts desde Order.last_payment_check_at. Las consultas a MP van
+    en paralelo (pool acotado, una sesión HTTP, rate limit y backoff compartidos
+    con el sync de La Sede).
+
     Args:
         event: AWS Lambda event (unused but required by Zappa)
-        context: AWS Lambda context (unused but required by Zappa)
+        context: AWS Lambda context (used only to respect the remaining time)
     """
     logger.info("=" * 80)
     logger.info("Payment Check Cron Job Started")
     logger.info("=" * 80)
-    
+
     try:
-        # Get all active events
-        active_events = Event.get_active_events()
-        
-        if not active_events.exists():
+        event_names = dict(Event.get_active_events().values_list('id', 'name'))
+
+        if not event_names:
             logger.warning("No active events found. Skipping payment check.")
             return
-        
-        logger.info(f"Found {active_events.count()} active event(s)")
-        
-        # Get pending orders for all active events
-        pending_orders = Order.objects.filter(
-            status=Order.OrderStatus.PENDING,
-            event__in=active_events
-        ).values('id', 'key', 'event_id')
-        
-        logger.info(f"Found {pending_orders.count()} pending orders to check across all active events")
-        
-        if pending_orders.count() == 0:
-            logger.info("No pending orders found. Exiting.")
-            return
-        
+
+        logger.info(f"Found {len(event_names)} active event(s)")
+
         # Get MercadoPago access token from environment
         access_token = os.environ.get('MERCADOPAGO_ACCESS_TOKEN') or settings.MERCADOPAGO.get('ACCESS_TOKEN')
-        
+
         if not access_token:
             logger.error("MERCADOPAGO_ACCESS_TOKEN not found in environment variables")
             return
-        
+
+        now = timezone.now()
+        due = list(due_pending_orders(list(event_names), now))
+
+        logger.info(f"{len(due)} pending orders due for a check across all active events")
+
+        if not due:
+            logger.info("No pending orders due for a check. Exiting.")
+            return
+
         approved_count = 0
         error_count = 0
-        
-        # Check each pending order
-        for order_data in pending_orders:
-            order_id = order_data['id']
-            order_key = str(order_data['key'])
-            event_id = order_data['event_id']
-            
-            # Get event name for logging
-            try:
-                event = Event.objects.get(id=event_id)
-                event_name = event.name
-            except Event.DoesNotExist:
-                event_name = f"Event ID {event_id}"
-            
-            logger.info(f"Checking order ID: {order_id}, Key: {order_key}, Event: {event_name} (ID: {event_id})")
-            
-            try:
-                # Call MercadoPago API to check payment status
-                url = f"https://api.mercadopago.com/merchant_orders/search?external_reference={order_key}"
-                headers = {
-                    'Content-Type': 'application/json',
-                    'Authorization': f'Bearer {access_token}'
-                }
-                
-                logger.info(f"Making request to MercadoPago API: {url}")
-                response = requests.get(url, headers=headers, timeout=30)
-                
-                logger.info(f"MercadoPago API response status: {response.status_code}")
-                logger.info(f"MercadoPago API response body: {response.text}")
-                
-                if response.status_code != 200:
-                    logger.error(f"Error calling MercadoPago API for order {order_key}: Status {response.status_code}")
-                    error_count += 1
-                    continue
-                
-                data = response.json()
-                logger.info(f"Full MercadoPago response: {data}")
-                
-                # Check if payment is approved
-                elements = data.get('elements', [])
-                
-                if not elements:
-                    logger.info(f"No elements found in MercadoPago response for order {order_key}")
-                    continue
-                
-                # Get the first merchant order
-                merchant_order = elements[0]
-                payments = merchant_order.get('payments', [])
-                
-                if not payments:
-                    logger.info(f"No payments found in merchant order for order {order_key}")
-                    continue
-                
-                # Check if any payment is approved
-                payment_approved = False
-                approved_payment = None
-                for payment in payments:
-                    payment_status = payment.get('status')
-                    logger.info(f"Payment status for order {order_key}: {payment_status}")
-                    
-                    if payment_status == 'approved':
-                        payment_approved = True
-                        approved_payment = payment
-                        logger.info(f"Payment APPROVED for order {order_key}")
-                        break
-                
-                if payment_approved:
-                    # Update order status to PROCESSING (this will trigger ticket emission)
+        checked_count = 0
+        approved_orders = []
+        deadline = _deadline(context)
+        chunk_size = max(1, CHECK_WORKERS * 4)
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=CHECK_WORKERS) as executor:
+            for start in range(0, len(due), chunk_size):
+                if time.monotonic() >= deadline:
+                    logger.warning(f"Time budget exhausted after {checked_count} orders; the rest stay due for next run")
+                    break
+                chunk = due[start:start + chunk_size]
+                results = executor.map(
+                    lambda o: _fetch_merchant_order(str(o['key']), access_token),
+                    chunk,
+                )
+                for order_data, (response, network_error) in zip(chunk, results):
+                    order_id = order_data['id']
+                    order_key = str(order_data['key'])
+                    event_name = event_names.get(order_data['event_id'], f"Event ID {order_data['event_id']}")
+                    checked_count += 1
+
+                    if network_error is not None:
+                        logger.error(f"Network error checking order {order_key} ({event_name}): {network_error}")
+                        error_count += 1
+                        continue
+
+                    if response.get('status') != 200:
+                        logger.error(
+                            f"Error calling MercadoPago API for order {order_key} ({event_name}): "
+                            f"Status {response.get('status')}"
+                        )
+                        error_count += 1
+                        continue
+
+                    data = response.get('response') or {}
+                    approved_payment, reason = _approved_payment(data)
+                    if approved_payment is None:
+                        logger.debug(f"Order {order_key} ({event_name}): {reason}")
+                        continue
+
+                    logger.info(f"Payment APPROVED for order {order_key} ({event_name})")
                     try:
-                        order = Order.objects.get(id=order_id, key=order_key)
-                        
-                        if order.status != Order.OrderStatus.PENDING:
-                            logger.info(f"Order {order_key} is no longer PENDING (current status: {order.status}). Skipping update.")
-                            continue
-                        
-                        logger.info(f"Updating order {order_key} status from PENDING to PROCESSING")
-                        order.status = Order.OrderStatus.PROCESSING
-                        # Store the merchant order data (includes payment info)
-                        order.processor_callback = data
-                        # Try to get net_received_amount from the approved payment
-                        if approved_payment:
-                            transaction_details = approved_payment.get('transaction_details', {})
-                            net_received = transaction_details.get('net_received_amount')
-                            if net_received:
-                                order.net_received_amount = net_received
-                                logger.info(f"Set net_received_amount to {net_received} for order {order_key}")
-                        order.save()
-                        
-                        logger.info(f"Successfully updated order {order_key} to PROCESSING status")
-                        approved_count += 1
-                        
+                        order = _approve_order(order_id, order_key, data, approved_payment)
                     except Order.DoesNotExist:
                         logger.error(f"Order {order_key} not found in database")
                         error_count += 1
+                        continue
                     except Exception as e:
                         logger.error(f"Error updating order {order_key}: {str(e)}", exc_info=True)
                         error_count += 1
-                else:
-                    logger.info(f"Payment not approved yet for order {order_key}")
-                    
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Network error checking order {order_key}: {str(e)}", exc_info=True)
-                error_count += 1
-            except Exception as e:
-                logger.error(f"Unexpected error checking order {order_key}: {str(e)}", exc_info=True)
-                error_count += 1
-        
+                        continue
+                    if order is not None:
+                        approved_orders.append(order)
+
+                _record_checks([o['id'] for o in chunk], timezone.now())
+
+        if approved_orders:
+            logger.info(f"Minting tickets for {len(approved_orders)} approved orders")
+            minted, failed = _mint_approved_orders(approved_orders)
+            error_count += len(failed)
+            # mint_orders ya encoló la confirmación de cada orden emitida
+            approved_count += sum(1 for order in approved_orders if order.pk in minted)
+
         logger.info("=" * 80)
         logger.info(f"Payment Check Cron Job Completed")
         logger.info(f"Orders approved and updated: {approved_count}")
         logger.info(f"Errors encountered: {error_count}")
-        logger.info(f"Total orders checked: {pending_orders.count()}")
+        logger.info(f"Total orders checked: {checked_count} of {len(due)} due in {time.perf_counter() - started:.2f}s")
         logger.info("=" * 80)
-        
+
     except Exception as e:
         logger.error(f"Fatal error in payment check cron job: {str(e)}", exc_info=True)
         raise
-
@@ -1,45 +1,140 @@
 import logging
+from collections import defaultdict
 
 from django.db import transaction
+from django.utils import timezone
 
 
-def mint_tickets(order):
+def mint_orders(orders, actor=None):
+    """
+    Emite los NewTicket de varias órdenes en una cantidad fija de queries,
+    sin importar cuántas órdenes o bonos sean: un bulk_create para todos los
+    bonos, un UPDATE para las órdenes y un bulk de entradas de auditlog.
 
-    try:
-        from tickets.models import NewTicket, OrderTicket, Order
-        user_already_has_ticket = NewTicket.objects.filter(owner=order.user, event=order.event).exists()
-        logging.info(f"user_already_has_ticket {user_already_has_ticket}")
-        order_has_more_than_one_ticket_type = order.total_ticket_types() > 1
-        logging.info(f"order_has_more_than_one_ticket_type {order_has_more_than_one_ticket_type}")
-
-        order_tickets = OrderTicket.objects.filter(order=order, ticket_type__event=order.event)
-
-        new_minted_tickets = []
-        with transaction.atomic():
-            for ticket in order_tickets:
-                for _ in range(ticket.quantity):
+    El owner se resuelve en memoria con las mismas reglas que antes: el primer
+    bono de la orden queda a nombre del comprador si todavía no es owner de un
+    bono del evento y la orden tiene un único tipo de bono.
+
+    Las órdenes que ya tienen bonos emitidos se saltean, así un webhook y el cron
+    de pagos que confirman la misma orden a la vez no emiten dos veces.
+
+    El mail de confirmación de cada orden emitida se encola en el outbox en la
+    misma transacción: si el proceso muere después del commit el mail igual sale.
+
+    Devuelve {order.pk: [NewTicket, ...]} con las órdenes efectivamente emitidas.
+    """
+    from tickets.models import NewTicket, OrderTicket, Order
+    from caja.reports import invalidate_event_report
+    from tickets.counters import record_tickets_issued
+    from tickets.email_outbox import enqueue_order_confirmations
+    from tickets.ticket_summary import invalidate_user_ticket_summaries
+    from tickets.holder_search import schedule_refresh
+    from utils.audit import bulk_log_create, bulk_log_update
+
+    orders = [order for order in orders if order.pk]
+    if not orders:
+        return {}
+
+    minted = {}
+    with transaction.atomic():
+        locked = {
+            o.pk: o
+            for o in Order.objects.select_for_update(of=('self',))
+            .select_related('user')
+            .filter(pk__in=[order.pk for order in orders])
+        }
+        already_minted = set(
+            NewTicket.objects.filter(order_id__in=locked.keys())
+            .values_list('order_id', flat=True)
+            .distinct()
+        )
+        for order_pk in already_minted:
+            logging.info(f"Order {order_pk} already has tickets, skipping mint")
+        orders = [order for order in orders if order.pk in locked and order.pk not in already_minted]
+        if not orders:
+            return {}
+
+        order_tickets_by_order = defaultdict(list)
+        for order_ticket in (
+            OrderTicket.objects.filter(order_id__in=[order.pk for order in orders])
+            .select_related('ticket_type__event')
+            .order_by('id')
+        ):
+            order_tickets_by_order[order_ticket.order_id].append(order_ticket)
+
+        user_ids = {order.user_id for order in orders if order.user_id}
+        event_ids = {order.event_id for order in orders if order.event_id}
+        owners_with_ticket = set(
+            NewTicket.objects.filter(owner_id__in=user_ids, event_id__in=event_ids)
+            .values_list('owner_id', 'event_id')
+            .distinct()
+        ) if user_ids else set()
+
+        new_tickets = []
+        for order in orders:
+            user = locked[order.pk].user
+            order_tickets = order_tickets_by_order[order.pk]
+            order_has_more_than_one_ticket_type = len(order_tickets) > 1
+            owner_key = (order.user_id, order.event_id)
+            minted[order.pk] = []
+            for order_ticket in order_tickets:
+                if order_ticket.ticket_type.event_id != order.event_id:
+                    continue
+                for _ in range(order_ticket.quantity):
                     new_ticket = NewTicket(
-                        holder=order.user,
-                        ticket_type=ticket.ticket_type,
+                        holder=user,
+                        ticket_type=order_ticket.ticket_type,
                         order=order,
-                        event=order.event,
+                        event=order_ticket.ticket_type.event,
                     )
+                    if user and owner_key not in owners_with_ticket and not order_has_more_than_one_ticket_type:
+                        new_ticket.owner = user
+                        owners_with_ticket.add(owner_key)
+                    new_tickets.append(new_ticket)
+                    minted[order.pk].append(new_ticket)
 
-                    if not user_already_has_ticket and not order_has_more_than_one_ticket_type:
-                        new_ticket.owner = order.user
-                        user_already_has_ticket = True
-
-                    new_ticket.save()
-                    new_minted_tickets.append(new_ticket)
+        NewTicket.objects.bulk_create(new_tickets)
 
+        now = timezone.now()
+        Order.objects.filter(pk__in=[order.pk for order in orders]).update(
+            status=Order.OrderStatus.CONFIRMED,
+            updated_at=now,
+        )
+        # Después del UPDATE: si el evento no tiene contadores todavía se recalculan y ya incluyen estas órdenes
+        record_tickets_issued(
+            (ticket, order) for order in orders for ticket in minted[order.pk]
+        )
+        status_changes = []
+        for order in orders:
+            previous_status = locked[order.pk].status
             order.status = Order.OrderStatus.CONFIRMED
-            order.save()
+            order.updated_at = now
+            order._old_status = order.status
+            order._counted_confirmed = True
+            if previous_status != order.status:
+                status_changes.append((order, {'status': (previous_status, order.status)}))
+
+        bulk_log_create(new_tickets, actor=actor)
+        bulk_log_update(status_changes, actor=actor)
+        # bulk_create y update() no disparan las señales que invalidan el resumen, el reporte del evento ni las del índice de búsqueda
+        invalidate_user_ticket_summaries(order.user_id for order in orders)
+        invalidate_event_report(order.event_id for order in orders)
+        schedule_refresh(pk__in=[ticket.pk for ticket in new_tickets])
+        enqueue_order_confirmations(orders)
 
-            for ticket in new_minted_tickets:
-                logging.info(f"Minted {ticket}")
+    logging.info(f"Minted {len(new_tickets)} tickets for {len(minted)} orders")
+    return minted
 
 
-        order.send_confirmation_email()
+def mint_tickets(order):
+
+    try:
+        minted = mint_orders([order])
+        if order.pk not in minted:
+            return
+
+        for ticket in minted[order.pk]:
+            logging.info(f"Minted {ticket}")
 
     except AttributeError as e:
         logging.error(f"Attribute error in minting tickets: {str(e)}")
@@ -0,0 +1,215 @@
+import base64
+import csv
+import json
+from datetime import datetime
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from tickets.models import NewTicket
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+STATUS_USED = 'used'
+STATUS_UNUSED = 'unused'
+STATUS_UNASSIGNED = 'unassigned'
+ORIGIN_CAJA = 'caja'
+ORIGIN_ONLINE = 'online'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _unassigned_q(event):
+    # Con attendee_must_be_registered=False los bonos sin owner cuentan como sin usar
+    if not event.attendee_must_be_registered:
+        return Q(pk__in=[])
+    return Q(is_used=False, holder__isnull=False, owner__isnull=True)
+
+
+def _caja_q():
+    return Q(order__generated_by_admin_user__isnull=False)
+
+
+def bonus_report_stats(event):
+    """Totales del reporte de bonos en una sola query."""
+    aggregates = {
+        'total_tickets': Count('id'),
+        'used_tickets': Count('id', filter=Q(is_used=True)),
+        'caja_issued_tickets': Count('id', filter=_caja_q()),
+    }
+    if event.attendee_must_be_registered:
+        aggregates['unassigned_tickets'] = Count('id', filter=_unassigned_q(event))
+    stats = NewTicket.objects.filter(event=event).aggregate(**aggregates)
+    stats.setdefault('unassigned_tickets', 0)
+    total = stats['total_tickets']
+    stats['unused_tickets'] = total - stats['used_tickets'] - stats['unassigned_tickets']
+    stats['usage_percentage'] = (stats['used_tickets'] / total * 100) if total > 0 else 0
+    return stats
+
+
+def bonus_report_queryset(event, status=None, origin=None, ticket_type=None, search=None):
+    """Bonos del evento con los filtros del reporte, del más nuevo al más viejo."""
+    tickets = NewTicket.objects.filter(event=event)
+    if status == STATUS_USED:
+        tickets = tickets.filter(is_used=True)
+    elif status == STATUS_UNASSIGNED:
+        tickets = tickets.filter(_unassigned_q(event))
+    elif status == STATUS_UNUSED:
+        tickets = tickets.filter(is_used=False).exclude(_unassigned_q(event))
+    if origin == ORIGIN_CAJA:
+        tickets = tickets.filter(_caja_q())
+    elif origin == ORIGIN_ONLINE:
+        tickets = tickets.exclude(_caja_q())
+    if ticket_type:
+        tickets = tickets.filter(ticket_type_id=ticket_type)
+    # Cada palabra tiene que aparecer en algún campo ("juan perez" encuentra a Juan Pérez)
+    for term in (search or '').split():
+        tickets = tickets.filter(
+            Q(holder__first_name__icontains=term) | Q(holder__last_name__icontains=term)
+            | Q(holder__email__icontains=term) | Q(owner__first_name__icontains=term)
+            | Q(owner__last_name__icontains=term) | Q(owner__email__icontains=term)
+            | Q(ticket_type__name__icontains=term)
+        )
+    return tickets.select_related(
+        'holder', 'owner', 'scanned_by', 'ticket_type', 'order__generated_by_admin_user',
+    ).order_by('-created_at', '-id')
+
+
+def encode_cursor(ticket):
+    raw = json.dumps({'c': ticket.created_at.isoformat(), 'i': ticket.pk}).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.fromisoformat(data['c']), int(data['i'])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+def bonus_report_page(tickets, cursor=None, limit=PAGE_SIZE):
+    """
+    Una página por keyset (created_at, id): cuesta lo mismo la primera que la
+    última, y un bono nuevo no corre las páginas siguientes. Devuelve
+    (bonos, cursor de la próxima página o None).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if cursor:
+        created_at, ticket_id = decode_cursor(cursor)
+        tickets = tickets.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=ticket_id))
+    page = list(tickets.prefetch_related('ticket_photos__uploaded_by')[:limit + 1])
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    return page[:limit], next_cursor
+
+
+def _full_name(user):
+    return f"{user.first_name} {user.last_name}".strip() if user else None
+
+
+def _caja_admin_name(order):
+    admin_user = order.generated_by_admin_user
+    if admin_user is None:
+        return None
+    return _full_name(admin_user) or admin_user.username
+
+
+def ticket_status(ticket, event):
+    if ticket.is_used:
+        return STATUS_USED
+    if ticket.holder_id and not ticket.owner_id and event.attendee_must_be_registered:
+        return STATUS_UNASSIGNED
+    return STATUS_UNUSED
+
+
+def serialize_ticket(ticket, event):
+    """Fila del reporte (template, JSON y CSV comparten los mismos datos)."""
+    status = ticket_status(ticket, event)
+    return {
+        'key': ticket.key,
+        'ticket_type': ticket.ticket_type.name,
+        'ticket_type_emoji': ticket.ticket_type.emoji,
+        'ticket_type_color': ticket.ticket_type.color,
+        'holder_name': _full_name(ticket.holder) or "Sin asignar",
+        'holder_email': ticket.holder.email if ticket.holder else None,
+        'owner_name': _full_name(ticket.owner) or "Sin asignar",
+        'owner_email': ticket.owner.email if ticket.owner else None,
+        'status': status,
+        'is_used': ticket.is_used,
+        'used_at': ticket.used_at,
+        'scanned_by_name': _full_name(ticket.scanned_by),
+        'scanned_by_email': ticket.scanned_by.email if ticket.scanned_by else None,
+        'notes': ticket.notes,
+        'is_unassigned': status == STATUS_UNASSIGNED,
+        'is_caja_issued': ticket.order.generated_by_admin_user_id is not None,
+        'caja_admin_name': _caja_admin_name(ticket.order),
+        'order_type': ticket.order.get_order_type_display() if ticket.order.order_type else None,
+        'created_at': ticket.created_at,
+        'order_key': ticket.order.key,
+    }
+
+
+def serialize_ticket_with_photos(ticket, event):
+    row = serialize_ticket(ticket, event)
+    row['photos'] = [
+        {
+            'id': photo.id,
+            'url': photo.photo.url,
+            'name': photo.photo.name.split('/')[-1],
+            'uploaded_at': photo.created_at,
+            'uploaded_by': _full_name(photo.uploaded_by),
+        }
+        for photo in ticket.ticket_photos.all()
+    ]
+    return row
+
+
+CSV_COLUMNS = [
+    ('key', 'Bono'),
+    ('ticket_type', 'Tipo'),
+    ('status', 'Estado'),
+    ('owner_name', 'Titular'),
+    ('owner_email', 'Email titular'),
+    ('holder_name', 'Custodiado por'),
+    ('holder_email', 'Email custodio'),
+    ('scanned_by_name', 'Escaneado por'),
+    ('used_at', 'Hora de entrada'),
+    ('is_caja_issued', 'Emitido por caja'),
+    ('caja_admin_name', 'Cajero'),
+    ('order_type', 'Tipo de orden'),
+    ('notes', 'Notas'),
+    ('photo_count', 'Archivos'),
+    ('created_at', 'Creado'),
+    ('order_key', 'Orden'),
+]
+STATUS_LABELS = {STATUS_USED: 'Usado', STATUS_UNUSED: 'Sin usar', STATUS_UNASSIGNED: 'Sin asignar'}
+
+
+class _Echo:
+    """csv.writer escribe acá y cada fila se devuelve tal cual (StreamingHttpResponse)."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(key, value):
+    if key == 'status':
+        return STATUS_LABELS.get(value, value)
+    if isinstance(value, bool):
+        return 'Sí' if value else 'No'
+    if isinstance(value, datetime):
+        return timezone.localtime(value).strftime('%d/%m/%Y %H:%M')
+    return '' if value is None else value
+
+
+def iter_bonus_report_csv(event, tickets, chunk_size=2000):
+    """Filas del CSV de a una, leyendo los bonos de a chunks (sin fotos, sólo cuántas hay)."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow([label for _, label in CSV_COLUMNS])
+    for ticket in tickets.annotate(photo_count=Count('ticket_photos')).iterator(chunk_size=chunk_size):
+        row = serialize_ticket(ticket, event)
+        row['photo_count'] = ticket.photo_count
+        yield writer.writerow([_csv_value(key, row[key]) for key, _ in CSV_COLUMNS])
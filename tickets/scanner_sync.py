@@ -0,0 +1,279 @@
+import base64
+import hashlib
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+from django.core import signing
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+
+logger = logging.getLogger(__name__)
+
+# Solapamiento entre deltas: un bono que se guardó en una transacción que
+# commiteó después de armar el cursor igual entra en el próximo delta.
+DELTA_OVERLAP_SECONDS = int(os.environ.get('SCANNER_SYNC_DELTA_OVERLAP_SECONDS', '30'))
+# Cursores más viejos que esto reciben el manifiesto completo (así el scanner
+# también se entera de bonos borrados o grupos que cambiaron de miembros)
+MAX_DELTA_AGE_HOURS = int(os.environ.get('SCANNER_SYNC_MAX_DELTA_AGE_HOURS', '12'))
+# Escaneos aceptados por request de sync
+MAX_SCANS_PER_BATCH = int(os.environ.get('SCANNER_SYNC_MAX_SCANS_PER_BATCH', '500'))
+# Un escaneo con used_at a menos de esto de lo que ya está guardado (mismo
+# scanner) es un reintento del mismo lote, no un conflicto
+DUPLICATE_TOLERANCE_SECONDS = 2
+
+CURSOR_SALT = 'tickets.scanner_sync.cursor'
+SIGNING_KEY_SALT = 'tickets.scanner_sync.manifest'
+MANIFEST_VERSION = 1
+
+
+def key_hash(ticket_key):
+    """Lo que el scanner calcula del QR leído para buscarlo en el manifiesto."""
+    return hashlib.sha256(str(ticket_key).encode('utf-8')).hexdigest()[:32]
+
+
+def _signing_key(event_id):
+    # Derivada de SECRET_KEY: no hace falta guardar claves, y cada evento tiene la suya
+    seed = salted_hmac(SIGNING_KEY_SALT, f'event:{event_id}', algorithm='sha256').digest()
+    return Ed25519PrivateKey.from_private_bytes(seed[:32])
+
+
+def public_key(event_id):
+    """
+    Clave pública (base64) con la que el scanner verifica los manifiestos del evento.
+    Se entrega aparte (scanner_manifest_key), nunca dentro del manifiesto que firma.
+    """
+    raw = _signing_key(event_id).public_key().public_bytes(Encoding.Raw, PublicFormat.Raw)
+    return base64.b64encode(raw).decode('ascii')
+
+
+def encode_cursor(event_id, since):
+    return signing.dumps({'e': event_id, 't': since.isoformat()}, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(event_id, cursor):
+    """Fecha desde la que pedir cambios, o None si hay que mandar el manifiesto completo."""
+    if not cursor:
+        return None
+    try:
+        data = signing.loads(cursor, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        logger.warning('Cursor de scanner inválido para el evento %s', event_id)
+        return None
+    if data.get('e') != event_id:
+        return None
+    since = datetime.fromisoformat(data['t'])
+    if timezone.now() - since > timedelta(hours=MAX_DELTA_AGE_HOURS):
+        return None
+    return since - timedelta(seconds=DELTA_OVERLAP_SECONDS)
+
+
+def _epoch(value):
+    return int(value.timestamp()) if value else None
+
+
+def _early_access_windows(event, user_ids=None):
+    """
+    Ventana de ingreso anticipado (desde, hasta) por usuario, con el mismo criterio
+    que _group_info_for_ticket: el primer GrupoMiembro del usuario en el evento.
+    """
+    from events.models import GrupoMiembro
+
+    miembros = GrupoMiembro.objects.filter(grupo__event=event).select_related('grupo')
+    if user_ids is not None:
+        miembros = miembros.filter(user_id__in=user_ids)
+    windows = {}
+    for miembro in miembros:
+        if miembro.user_id in windows:
+            continue
+        if not (miembro.ingreso_anticipado or miembro.ingreso_anticipado_fecha):
+            windows[miembro.user_id] = None
+            continue
+        if miembro.ingreso_anticipado_fecha:
+            desde = timezone.make_aware(datetime.combine(miembro.ingreso_anticipado_fecha, time.min))
+        else:
+            desde = miembro.grupo.ingreso_anticipado_desde
+        windows[miembro.user_id] = [_epoch(desde), _epoch(event.start)]
+    return windows
+
+
+def _changed_tickets(event, since):
+    """Bonos a mandar: todos, o los que cambiaron (ellos o el grupo de su holder/owner) desde `since`."""
+    from events.models import GrupoMiembro
+    from tickets.models import NewTicket
+
+    tickets = NewTicket.objects.filter(event=event)
+    if since is None:
+        return tickets
+    member_ids = list(
+        GrupoMiembro.objects.filter(grupo__event=event)
+        .filter(Q(updated_at__gte=since) | Q(grupo__updated_at__gte=since))
+        .values_list('user_id', flat=True)
+    )
+    changed = tickets.filter(updated_at__gte=since)
+    if member_ids:
+        changed = changed | tickets.filter(holder_id__in=member_ids) | tickets.filter(
+            holder__isnull=True, owner_id__in=member_ids
+        )
+    return changed
+
+
+def iter_manifest(event, cursor=None, chunk_size=2000):
+    """
+    Manifiesto del evento en NDJSON, línea por línea (para StreamingHttpResponse):
+
+        {"v": 1, "event": ..., "full": true|false, "types": {...}}
+        {"h": <hash de la key>, "t": <ticket_type_id>, "u": 0|1, "l": 0|1, "ea": [desde, hasta]|null}
+        ...
+        {"count": n, "cursor": ..., "sha256": ..., "signature": ...}
+
+    La última línea firma (Ed25519) el sha256 de todas las anteriores, así el
+    scanner puede guardarlo y verificarlo sin red con la clave pública que bajó
+    antes por separado (public_key). Con un cursor válido sólo van
+    los bonos que cambiaron desde entonces; el scanner los pisa por hash.
+    """
+    from tickets.models import TicketType
+
+    generated_at = timezone.now()
+    since = decode_cursor(event.pk, cursor)
+    digest = hashlib.sha256()
+
+    def emit(payload):
+        line = (json.dumps(payload, separators=(',', ':')) + '\n').encode('utf-8')
+        digest.update(line)
+        return line
+
+    yield emit({
+        'v': MANIFEST_VERSION,
+        'event': event.slug,
+        'full': since is None,
+        'generated_at': _epoch(generated_at),
+        'types': {
+            str(pk): name for pk, name in TicketType.objects.filter(event=event).values_list('pk', 'name')
+        },
+    })
+
+    tickets = (
+        _changed_tickets(event, since)
+        .values_list('key', 'ticket_type_id', 'is_used', 'holder_left', 'holder_id', 'owner_id')
+        .order_by('id')
+    )
+    if since is None:
+        # Completo: los grupos del evento entran en memoria, los bonos se leen de a chunks
+        windows = _early_access_windows(event)
+        rows = tickets.iterator(chunk_size=chunk_size)
+    else:
+        rows = list(tickets)
+        windows = _early_access_windows(event, {row[4] or row[5] for row in rows} - {None})
+
+    count = 0
+    for key, ticket_type_id, is_used, holder_left, holder_id, owner_id in rows:
+        count += 1
+        yield emit({
+            'h': key_hash(key),
+            't': ticket_type_id,
+            'u': int(is_used),
+            'l': int(holder_left),
+            'ea': windows.get(holder_id or owner_id),
+        })
+
+    body_digest = digest.hexdigest()
+    yield (json.dumps({
+        'count': count,
+        'cursor': encode_cursor(event.pk, generated_at),
+        'sha256': body_digest,
+        'signature': base64.b64encode(_signing_key(event.pk).sign(body_digest.encode('ascii'))).decode('ascii'),
+    }, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+def _parse_scanned_at(value, now):
+    """used_at informado por el scanner; si falta, es inválido o está en el futuro, ahora."""
+    if not value:
+        return now
+    try:
+        if isinstance(value, (int, float)):
+            scanned_at = datetime.fromtimestamp(value, tz=dt_timezone.utc)
+        else:
+            scanned_at = datetime.fromisoformat(str(value))
+            if timezone.is_naive(scanned_at):
+                scanned_at = timezone.make_aware(scanned_at)
+    except (ValueError, OverflowError, OSError):
+        return now
+    return min(scanned_at, now)
+
+
+def apply_scans(event, user, scans):
+    """
+    Aplica un lote de ingresos registrados offline. Cada bono se marca en su
+    propia transacción con lock de fila (como mark_ticket_used), así las
+    señales de contadores se disparan igual y un bono malo no frena el resto.
+
+    Resolución de conflictos: gana el primer ingreso que llegó al servidor. Si
+    el bono ya estaba usado por otro escaneo el resultado es 'conflict' y trae
+    el ingreso guardado, para que la puerta lo revise; si es el mismo escaneo
+    reenviado (mismo usuario, misma hora) es 'duplicate'.
+    """
+    from tickets.models import NewTicket
+
+    now = timezone.now()
+    keys = {}
+    results = []
+    for scan in scans:
+        keys.setdefault(_canonical_key(scan.get('key')), []).append(scan)
+
+    known = dict(
+        NewTicket.objects.filter(event=event, key__in=[key for key in keys if key is not None])
+        .values_list('key', 'id')
+    )
+    known = {str(key): pk for key, pk in known.items()}
+
+    for key, key_scans in keys.items():
+        # Si el mismo bono vino varias veces en el lote, se procesa primero el más viejo
+        key_scans.sort(key=lambda s: _parse_scanned_at(s.get('used_at'), now))
+        for scan in key_scans:
+            scan_id = scan.get('id')
+            # Se devuelve la key tal como la mandó el scanner, para que matchee su lote
+            scan_key = str(scan.get('key') or '').strip()
+            ticket_id = known.get(key)
+            if ticket_id is None:
+                results.append({'id': scan_id, 'key': scan_key, 'status': 'not_found'})
+                continue
+            scanned_at = _parse_scanned_at(scan.get('used_at'), now)
+            with transaction.atomic():
+                ticket = NewTicket.objects.select_for_update(of=('self',)).get(pk=ticket_id)
+                if not ticket.is_used:
+                    ticket.is_used = True
+                    ticket.used_at = scanned_at
+                    ticket.scanned_by = user
+                    ticket.save()
+                    status = 'accepted'
+                elif (
+                    ticket.scanned_by_id == user.pk and ticket.used_at
+                    and abs((ticket.used_at - scanned_at).total_seconds()) <= DUPLICATE_TOLERANCE_SECONDS
+                ):
+                    status = 'duplicate'
+                else:
+                    status = 'conflict'
+            result = {'id': scan_id, 'key': scan_key, 'status': status, 'used_at': _epoch(ticket.used_at)}
+            if status == 'conflict':
+                result['scanned_by'] = ticket.scanned_by_id
+                logger.warning(
+                    'Ingreso offline en conflicto: bono %s ya usado a las %s (scanner %s), reintento de %s a las %s',
+                    key, ticket.used_at, ticket.scanned_by_id, user.pk, scanned_at,
+                )
+            results.append(result)
+    return results
+
+
+def _canonical_key(value):
+    """Key del bono en la forma en que está guardada (mayúsculas, sin guiones, etc. valen), o None."""
+    try:
+        return str(uuid.UUID(str(value or '').strip()))
+    except ValueError:
+        return None
@@ -0,0 +1,113 @@
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from events.models import Event, GrupoMiembro
+from tickets.counters import apply_deltas, ticket_deltas
+from tickets.holder_search import schedule_refresh
+from tickets.models import NewTicket, NewTicketTransfer, Order, TicketType
+from tickets.ticket_summary import invalidate_event_ticket_flags, invalidate_user_ticket_summaries
+from user_profile.models import Profile
+
+
+@receiver(post_save, sender=NewTicket)
+@receiver(post_delete, sender=NewTicket)
+def invalidate_summary_for_ticket(sender, instance, **kwargs):
+    # El holder anterior también pierde (o gana) el bono
+    invalidate_user_ticket_summaries([
+        instance.holder_id, instance.owner_id, instance._old_holder_id, instance._old_owner_id,
+    ])
+
+
+@receiver(post_save, sender=NewTicketTransfer)
+@receiver(post_delete, sender=NewTicketTransfer)
+def invalidate_summary_for_transfer(sender, instance, **kwargs):
+    invalidate_user_ticket_summaries([instance.tx_from_id, instance.tx_to_id])
+
+
+@receiver(post_save, sender=Order)
+def invalidate_summary_for_order(sender, instance, **kwargs):
+    invalidate_user_ticket_summaries([instance.user_id])
+
+
+@receiver(post_save, sender=Event)
+def invalidate_flags_for_events(sender, instance, **kwargs):
+    # Cambiar un evento activo cambia has_multiple_events de todos los eventos
+    invalidate_event_ticket_flags(Event.objects.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=TicketType)
+def invalidate_flags_for_ticket_type(sender, instance, **kwargs):
+    invalidate_event_ticket_flags([instance.event_id])
+
+
+@receiver(post_save, sender=NewTicket)
+def update_counters_for_ticket(sender, instance, created, **kwargs):
+    order = instance.order
+    if order.status == Order.OrderStatus.CONFIRMED:
+        if created:
+            deltas = ticket_deltas(instance, order)
+        else:
+            deltas = {
+                'tickets_used': int(bool(instance.is_used)) - int(bool(instance._old_is_used)),
+                'tickets_left': int(bool(instance.holder_left)) - int(bool(instance._old_holder_left)),
+            }
+        apply_deltas(order.event_id, deltas)
+    instance._old_is_used = instance.is_used
+    instance._old_holder_left = instance.holder_left
+
+
+@receiver(post_delete, sender=NewTicket)
+def update_counters_for_deleted_ticket(sender, instance, **kwargs):
+    order = Order.objects.filter(pk=instance.order_id).first()
+    if order is not None and order.status == Order.OrderStatus.CONFIRMED:
+        apply_deltas(order.event_id, ticket_deltas(instance, order, sign=-1))
+
+
+@receiver(post_save, sender=Order)
+def update_counters_for_order(sender, instance, **kwargs):
+    confirmed = instance.status == Order.OrderStatus.CONFIRMED
+    if confirmed == instance._counted_confirmed:
+        return
+    # La orden entra o sale de CONFIRMED con los bonos que ya tenga emitidos
+    sign = 1 if confirmed else -1
+    deltas = {field: 0 for field in ('tickets_sold', 'tickets_used', 'caja_tickets_sold', 'tickets_left')}
+    for ticket in NewTicket.objects.filter(order=instance).only('is_used', 'holder_left'):
+        for field, delta in ticket_deltas(ticket, instance, sign).items():
+            deltas[field] += delta
+    apply_deltas(instance.event_id, deltas)
+    instance._counted_confirmed = confirmed
+
+
+@receiver(post_save, sender=NewTicket)
+def refresh_search_entry_for_ticket(sender, instance, created, **kwargs):
+    if created or (instance.holder_id, instance.owner_id) != (instance._old_holder_id, instance._old_owner_id):
+        schedule_refresh(pk=instance.pk)
+
+
+@receiver(post_save, sender=User)
+def refresh_search_entries_for_user(sender, instance, created, update_fields=None, **kwargs):
+    # El login sólo guarda last_login
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    schedule_refresh(holder_id=instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+def refresh_search_entries_for_profile(sender, instance, **kwargs):
+    schedule_refresh(holder_id=instance.user_id)
+
+
+@receiver(post_save, sender=GrupoMiembro)
+@receiver(post_delete, sender=GrupoMiembro)
+def refresh_search_entries_for_grupo_miembro(sender, instance, **kwargs):
+    schedule_refresh(Q(holder_id=instance.user_id) | Q(holder__isnull=True, owner_id=instance.user_id))
+
+
+# Registrada última: los receivers de arriba comparan contra el holder/owner anterior
+@receiver(post_save, sender=NewTicket)
+@receiver(post_delete, sender=NewTicket)
+def remember_saved_holder(sender, instance, **kwargs):
+    instance._old_holder_id = instance.holder_id
+    instance._old_owner_id = instance.owner_id
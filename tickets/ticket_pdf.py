@@ -3,7 +3,6 @@ from __future__ import annotations
 
 from io import BytesIO
 
-import qrcode
 from django.utils import timezone
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
@@ -13,6 +12,7 @@ from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Tabl
 
 from events.models import GrupoMiembro
 from tickets.models import NewTicket
+from utils.qr_cache import qr_image_bytes
 
 
 def build_new_ticket_pdf_bytes(ticket: NewTicket) -> bytes:
@@ -217,14 +217,7 @@ def build_new_ticket_pdf_bytes(ticket: NewTicket) -> bytes:
 
     body_elements.append(Spacer(1, 0.2 * inch))
 
-    qr = qrcode.QRCode(version=1, box_size=10, border=4)
-    qr.add_data(str(ticket.key))
-    qr.make(fit=True)
-    qr_img = qr.make_image(fill_color="black", back_color="white")
-
-    qr_buffer = BytesIO()
-    qr_img.save(qr_buffer, format='PNG')
-    qr_buffer.seek(0)
+    qr_buffer = BytesIO(qr_image_bytes(ticket.key))
 
     qr_image = Image(qr_buffer, width=2.5 * inch, height=2.5 * inch)
     qr_image.hAlign = 'CENTER'
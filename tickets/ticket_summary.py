@@ -0,0 +1,125 @@
+import os
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+# Resumen de bonos por usuario: se invalida explícitamente (señales de NewTicket,
+# NewTicketTransfer y Order, y mint_orders); el TTL es sólo un respaldo.
+USER_SUMMARY_TTL_SECONDS = int(os.environ.get('TICKET_SUMMARY_CACHE_SECONDS', '600'))
+# Flags por evento (hay bonos a la venta, hay varios eventos activos): dependen del
+# stock y de las fechas de venta, que cambian sin pasar por estas señales.
+EVENT_FLAGS_TTL_SECONDS = int(os.environ.get('TICKET_SUMMARY_EVENT_CACHE_SECONDS', '60'))
+
+
+def _user_key(user_id):
+    return f'ticket_summary:user:{user_id}'
+
+
+def _event_key(event_id):
+    return f'ticket_summary:event:{event_id}'
+
+
+def _build_user_summary(user_id):
+    """Todos los eventos del usuario en tres queries, sin armar DTOs ni QRs."""
+    from tickets.models import NewTicket, NewTicketTransfer
+
+    events = {}
+    rows = (
+        NewTicket.objects.filter(holder_id=user_id)
+        .values('event_id')
+        .annotate(
+            held=Count('id'),
+            owned=Count('id', filter=Q(owner_id=user_id)),
+            ownerless=Count('id', filter=Q(owner__isnull=True)),
+        )
+    )
+    for row in rows:
+        events[row['event_id']] = {
+            'held': row['held'],
+            'ownerless': row['ownerless'],
+            'owns_ticket': row['owned'] > 0,
+            'has_unassigned_tickets': row['held'] > row['owned'],
+            'has_transfer_pending': False,
+        }
+
+    pending_event_ids = (
+        NewTicketTransfer.objects.filter(tx_from_id=user_id, ticket__holder_id=user_id, status='PENDING')
+        .values_list('ticket__event_id', flat=True)
+        .distinct()
+    )
+    for event_id in pending_event_ids:
+        if event_id in events:
+            events[event_id]['has_transfer_pending'] = True
+
+    return {
+        'events': events,
+        'shared_tickets': NewTicketTransfer.objects.filter(tx_from_id=user_id, status="COMPLETED").count(),
+    }
+
+
+def _build_event_flags(event):
+    from events.models import Event
+    from tickets.models import TicketType
+
+    active_event_ids = list(Event.get_active_events().values_list('id', flat=True))
+    return {
+        'active_event_ids': active_event_ids,
+        'has_multiple_events': len(active_event_ids) > 1,
+        'has_available_tickets': event is not None and TicketType.objects
+        .get_available_ticket_types_for_current_events().filter(event=event).exists(),
+    }
+
+
+def get_ticket_context(event, user=None):
+    """
+    Variables de current_event para el evento y el usuario. Con el cache caliente
+    es un único get_many; los faltantes se calculan y se guardan.
+    """
+    event_id = event.pk if event is not None else None
+    keys = [_event_key(event_id)]
+    if user is not None and event is not None:
+        keys.append(_user_key(user.pk))
+    cached = cache.get_many(keys)
+
+    flags = cached.get(_event_key(event_id))
+    if flags is None:
+        flags = _build_event_flags(event)
+        cache.set(_event_key(event_id), flags, EVENT_FLAGS_TTL_SECONDS)
+
+    context = {'has_multiple_events': flags['has_multiple_events']}
+    if user is None or event is None:
+        return context
+
+    summary = cached.get(_user_key(user.pk))
+    if summary is None:
+        summary = _build_user_summary(user.pk)
+        cache.set(_user_key(user.pk), summary, USER_SUMMARY_TTL_SECONDS)
+
+    event_summary = summary['events'].get(event_id, {})
+    held = event_summary.get('held', 0)
+    context.update({
+        'has_unassigned_tickets': event_summary.get('has_unassigned_tickets', False),
+        'has_transfer_pending': event_summary.get('has_transfer_pending', False),
+        'has_available_tickets': flags['has_available_tickets'],
+        'holding_tickets': event_summary.get('ownerless', 0) if event.attendee_must_be_registered else held,
+        'shared_tickets': summary['shared_tickets'],
+        'owns_ticket': event_summary.get('owns_ticket', False),
+        'total_tickets': sum(
+            summary['events'].get(active_id, {}).get('held', 0) for active_id in flags['active_event_ids']
+        ),
+    })
+    return context
+
+
+def invalidate_user_ticket_summaries(user_ids):
+    """Borra el resumen de esos usuarios cuando commitea la transacción en curso."""
+    keys = [_user_key(user_id) for user_id in set(user_ids) if user_id]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_event_ticket_flags(event_ids):
+    keys = [_event_key(event_id) for event_id in set(event_ids) if event_id]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
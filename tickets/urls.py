@@ -3,7 +3,10 @@ from django.views.decorators.csrf import csrf_exempt
 
 from .views import home, order, ticket, checkout, webhooks, new_ticket
 from tickets.views import admin
-from tickets.views.broadcast_holder_tickets_email import broadcast_holder_tickets_email
+from tickets.views.broadcast_holder_tickets_email import (
+    broadcast_holder_tickets_email,
+    broadcast_holder_tickets_email_progress,
+)
 from tickets.views.send_holder_tickets_email import send_holder_tickets_email
 
 urlpatterns = [
@@ -20,6 +23,11 @@ urlpatterns = [
         csrf_exempt(broadcast_holder_tickets_email),
         name='broadcast_holder_tickets_email',
     ),
+    path(
+        'broadcast-holder-ticket-emails/<int:job_id>/',
+        broadcast_holder_tickets_email_progress,
+        name='broadcast_holder_tickets_email_progress',
+    ),
 
     # Event-specific URLs (subpaths before the bare event slug catch-all)
     path(
@@ -43,6 +51,7 @@ urlpatterns = [
 
     # Ticket related paths
     path('ticket/<str:ticket_key>/transfer/', new_ticket.transfer_ticket, name='transfer_ticket'),
+    path('ticket/<str:ticket_key>/qr.<str:fmt>', new_ticket.ticket_qr, name='ticket_qr'),
     path('ticket/<str:ticket_key>/unassign/', new_ticket.unassign_ticket, name='unassign_ticket'),
     path('ticket/<str:ticket_key>/unassign-check/', new_ticket.unassign_ticket_check, name='unassign_ticket_check'),
     path('ticket/transfer-ticket/cancel-ticket-transfer', new_ticket.cancel_ticket_transfer,
@@ -82,6 +91,9 @@ urlpatterns = [
     path('api/tickets/<str:ticket_key>/update-notes/', admin.update_ticket_notes, name='update_ticket_notes'),
     path('api/tickets/<str:ticket_key>/delete-photo/', admin.delete_ticket_photo, name='delete_ticket_photo'),
     path('api/events/<slug:event_slug>/stats/', admin.event_stats_api, name='event_stats_api'),
+    path('api/events/<slug:event_slug>/scanner/manifest/', admin.scanner_manifest, name='scanner_manifest'),
+    path('api/events/<slug:event_slug>/scanner/manifest-key/', admin.scanner_manifest_key, name='scanner_manifest_key'),
+    path('api/events/<slug:event_slug>/scanner/sync/', admin.scanner_sync, name='scanner_sync'),
     path('api/events/<slug:event_slug>/increment-attendees-left/', admin.increment_attendees_left, name='increment_attendees_left'),
     path('api/events/<slug:event_slug>/decrement-attendees-left/', admin.decrement_attendees_left, name='decrement_attendees_left'),
 ]
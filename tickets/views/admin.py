@@ -1,11 +1,17 @@
+import json
+
 from django.contrib.auth.decorators import user_passes_test, login_required
 from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse, HttpResponseForbidden
+from django.http import JsonResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
+from tickets.counters import get_event_counters
+from tickets.holder_search import search_holders
+from tickets.scanner_sync import MAX_SCANS_PER_BATCH, apply_scans, iter_manifest, public_key
 from tickets.models import NewTicket
 from events.models import Event, GrupoMiembro
 from django.core.exceptions import ObjectDoesNotExist
-from user_profile.models import Profile
 
 def is_admin_or_puerta(user):
     return user.is_superuser or user.groups.filter(name='Puerta').exists()
@@ -34,6 +40,11 @@ def _group_info_for_ticket(ticket):
         grupo__event=ticket.event,
         user=user,
     ).select_related('grupo', 'grupo__tipo').first()
+    return _group_info(gm)
+
+
+def _group_info(gm):
+    """Early access and group info for a GrupoMiembro (with grupo and grupo__tipo loaded)."""
     if not gm:
         return None
     has_early = gm.ingreso_anticipado or bool(gm.ingreso_anticipado_fecha)
@@ -179,9 +190,6 @@ def scanner_dashboard(request, event_slug):
 @login_required
 def scan_tickets_event(request, event_slug):
     """Scanner for a specific event with new access control"""
-    from django.db import connection
-    from decimal import Decimal
-    
     event = get_object_or_404(Event, slug=event_slug)
     
     # Check if user has scanner access for this event
@@ -189,36 +197,19 @@ def scan_tickets_event(request, event_slug):
         return HttpResponseForbidden("No tienes permisos para acceder al scanner de este evento")
     
     # Get statistics for the scanner
-    with connection.cursor() as cursor:
-        query = """
-            SELECT 
-                -- Total tickets sold (from newticket table, including ALL tickets for scanner display)
-                COUNT(DISTINCT nt.id) as tickets_sold,
-                COALESCE(SUM(CASE WHEN nt.is_used = true THEN 1 ELSE 0 END), 0) as tickets_used,
-                -- Caja orders (generated_by_admin_user_id is not null)
-                COUNT(DISTINCT CASE WHEN too.generated_by_admin_user_id IS NOT NULL THEN nt.id END) as caja_tickets_sold,
-                -- Regular orders (generated_by_admin_user_id is null) - only from newticket table
-                COUNT(DISTINCT CASE WHEN too.generated_by_admin_user_id IS NULL THEN nt.id END) as regular_tickets_sold
-            FROM tickets_order too
-            LEFT JOIN tickets_orderticket tot ON too.id = tot.order_id
-            LEFT JOIN tickets_newticket nt ON too.id = nt.order_id
-            LEFT JOIN tickets_tickettype tt ON nt.ticket_type_id = tt.id
-            WHERE too.event_id = %s AND too.status = 'CONFIRMED'
-        """
-        cursor.execute(query, [event.id])
-        result = cursor.fetchone()
+    counters = get_event_counters(event)
     
     # Calculate percentage used
     percentage_used = 0
-    total_tickets = result[0] or 0  # tickets_sold (already includes both regular and caja)
-    tickets_used = result[1] or 0
+    total_tickets = counters.tickets_sold  # already includes both regular and caja
+    tickets_used = counters.tickets_used
     if total_tickets > 0:
         percentage_used = (tickets_used / total_tickets) * 100
     
     context = {
         'event': event,
         'stats': {
-            'tickets_sold': result[0] or 0,
+            'tickets_sold': counters.tickets_sold,
             'tickets_used': tickets_used,
             'total_tickets': total_tickets,
             'percentage_used': percentage_used,
@@ -229,53 +220,98 @@ def scan_tickets_event(request, event_slug):
 @login_required
 def event_stats_api(request, event_slug):
     """API endpoint to get real-time event statistics for the scanner"""
-    from django.db import connection
-    from django.http import JsonResponse
-    
     event = get_object_or_404(Event, slug=event_slug)
     
     # Check if user has scanner access for this event
     if not has_scanner_access(request.user, event):
         return JsonResponse({"error": "No tienes permisos para acceder a este evento"}, status=403)
     
-    # Get statistics for the event
-    with connection.cursor() as cursor:
-        query = """
-            SELECT 
-                -- Total tickets sold (from newticket table, including ALL tickets for scanner display)
-                COUNT(DISTINCT nt.id) as tickets_sold,
-                COALESCE(SUM(CASE WHEN nt.is_used = true THEN 1 ELSE 0 END), 0) as tickets_used,
-                -- Caja orders (generated_by_admin_user_id is not null)
-                COUNT(DISTINCT CASE WHEN too.generated_by_admin_user_id IS NOT NULL THEN nt.id END) as caja_tickets_sold,
-                -- Regular orders (generated_by_admin_user_id is null) - only from newticket table
-                COUNT(DISTINCT CASE WHEN too.generated_by_admin_user_id IS NULL THEN nt.id END) as regular_tickets_sold
-            FROM tickets_order too
-            LEFT JOIN tickets_orderticket tot ON too.id = tot.order_id
-            LEFT JOIN tickets_newticket nt ON too.id = nt.order_id
-            LEFT JOIN tickets_tickettype tt ON nt.ticket_type_id = tt.id
-            WHERE too.event_id = %s AND too.status = 'CONFIRMED'
-        """
-        cursor.execute(query, [event.id])
-        result = cursor.fetchone()
+    # Contadores pre-agregados (una fila por evento), en vez de contar bonos en cada poll
+    counters = get_event_counters(event)
     
     # Calculate percentage used
     percentage_used = 0
-    total_tickets = result[0] or 0  # tickets_sold (already includes both regular and caja)
-    tickets_used = result[1] or 0
+    total_tickets = counters.tickets_sold  # already includes both regular and caja
+    tickets_used = counters.tickets_used
     if total_tickets > 0:
         percentage_used = (tickets_used / total_tickets) * 100
     
+    venue_occupancy = max(0, tickets_used - event.attendees_left)
+    occupancy_percentage = 0
+    if event.venue_capacity and event.venue_capacity > 0:
+        occupancy_percentage = (venue_occupancy / event.venue_capacity) * 100
+    
     return JsonResponse({
-        'tickets_sold': result[0] or 0,
+        'tickets_sold': counters.tickets_sold,
         'tickets_used': tickets_used,
         'total_tickets': total_tickets,
         'percentage_used': percentage_used,
         'venue_capacity': event.venue_capacity,
-        'venue_occupancy': event.venue_occupancy,
+        'venue_occupancy': venue_occupancy,
         'attendees_left': event.attendees_left,
-        'occupancy_percentage': event.occupancy_percentage,
+        'occupancy_percentage': occupancy_percentage,
     })
 
+@login_required
+def scanner_manifest(request, event_slug):
+    """
+    Manifiesto firmado de los bonos del evento para validar ingresos sin red
+    (ver tickets.scanner_sync.iter_manifest). Con ?cursor= (el de la última
+    línea del manifiesto anterior) devuelve sólo los cambios.
+    """
+    event = get_object_or_404(Event, slug=event_slug)
+    if not has_scanner_access(request.user, event):
+        return JsonResponse({"error": "No tienes permisos para acceder a este evento"}, status=403)
+
+    response = StreamingHttpResponse(
+        iter_manifest(event, request.GET.get('cursor')),
+        content_type='application/x-ndjson',
+    )
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@login_required
+def scanner_manifest_key(request, event_slug):
+    """
+    Clave pública para verificar los manifiestos del evento. El scanner la baja una
+    vez (autenticado) y la guarda; el manifiesto no la trae, así quien pueda
+    modificarlo en el camino no puede firmarlo con una clave propia.
+    """
+    event = get_object_or_404(Event, slug=event_slug)
+    if not has_scanner_access(request.user, event):
+        return JsonResponse({"error": "No tienes permisos para acceder a este evento"}, status=403)
+
+    response = JsonResponse({'event': event.slug, 'algorithm': 'ed25519', 'public_key': public_key(event.pk)})
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@login_required
+def scanner_sync(request, event_slug):
+    """
+    Recibe los ingresos que el scanner registró offline:
+    {"scans": [{"id": ..., "key": ..., "used_at": <epoch o ISO>}, ...]}
+    y devuelve el resultado de cada uno (accepted, duplicate, conflict o not_found).
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+    event = get_object_or_404(Event, slug=event_slug)
+    if not has_scanner_access(request.user, event):
+        return JsonResponse({'error': 'No tienes permisos para marcar tickets de este evento'}, status=403)
+
+    try:
+        scans = json.loads(request.body or b'{}').get('scans')
+    except (ValueError, AttributeError):
+        return JsonResponse({'error': 'JSON inválido'}, status=400)
+    if not isinstance(scans, list) or not all(isinstance(scan, dict) for scan in scans):
+        return JsonResponse({'error': 'Falta la lista de escaneos (scans)'}, status=400)
+    if len(scans) > MAX_SCANS_PER_BATCH:
+        return JsonResponse({'error': f'Máximo {MAX_SCANS_PER_BATCH} escaneos por envío'}, status=400)
+
+    return JsonResponse({'results': apply_scans(event, request.user, scans)})
+
+
 def check_ticket_public(request, ticket_key):
     """
     Public endpoint to check only if a ticket is used (for polling on public ticket page)
@@ -328,45 +364,36 @@ def check_ticket_by_dni(request):
         if not has_scanner_access(request.user, event):
             return JsonResponse({'error': 'No tienes permisos para verificar tickets de este evento'}, status=403)
 
-        # 1) Try exact DNI match first
-        profile = Profile.objects.filter(document_number__iexact=q).first()
-        if profile:
-            ticket = NewTicket.objects.filter(event=event, holder=profile.user).order_by('id').first()
-            if ticket:
-                return JsonResponse(_ticket_check_response(ticket))
-            return JsonResponse({'error': 'No se encontró ningún bono con ese DNI en este evento'}, status=404)
-
-        # 2) Search by last name (holder)
-        tickets = (
-            NewTicket.objects.filter(event=event, holder__last_name__icontains=q)
-            .select_related('holder', 'ticket_type')
-            .order_by('holder__last_name', 'holder__first_name')
-        )
-        if not tickets.exists():
+        # Índice por evento (tickets.holder_search): documento exacto o por prefijo,
+        # apellido/nombre por prefijo y, si no hay nada, búsqueda aproximada
+        mode, entries = search_holders(event, q)
+        if not entries:
             return JsonResponse({'error': 'No se encontró ningún bono con ese DNI o apellido en este evento'}, status=404)
-        if tickets.count() == 1:
-            return JsonResponse(_ticket_check_response(tickets[0]))
+        # Mismo documento exacto: el primer bono de esa persona, como antes
+        if len(entries) == 1 or (mode == 'document' and len({entry.holder_id for entry in entries}) == 1):
+            return JsonResponse(_ticket_check_response(entries[0].ticket))
 
-        # 3) Multiple matches: return list for user to choose
-        def _holder_doc(t):
-            if not t.holder:
+        # Multiple matches: return list for user to choose
+        def _holder_doc(entry):
+            if not entry.holder:
                 return ''
-            p = getattr(t.holder, 'profile', None)
+            p = getattr(entry.holder, 'profile', None)
             return p.document_number if p else ''
         results = []
-        for t in tickets:
-            gi = _group_info_for_ticket(t)
+        for entry in entries:
+            t = entry.ticket
+            gi = _group_info(entry.grupo_miembro)
             results.append({
                 'key': str(t.key),
                 'ticket_type': str(t.ticket_type),
-                'holder_name': f'{t.holder.first_name or ""} {t.holder.last_name or ""}'.strip() if t.holder else '',
-                'document_number': _holder_doc(t),
+                'holder_name': f'{entry.holder.first_name or ""} {entry.holder.last_name or ""}'.strip() if entry.holder else '',
+                'document_number': _holder_doc(entry),
                 'is_used': t.is_used,
                 'has_early_access': gi['has_early_access'] if gi else False,
                 'grupo_nombre': gi['grupo_nombre'] if gi else None,
                 'ingreso_anticipado_desde': gi.get('ingreso_anticipado_desde') if gi else None,
             })
-        return JsonResponse({'results': results})
+        return JsonResponse({'results': results, 'match': mode})
     except Event.DoesNotExist:
         return JsonResponse({'error': 'Evento no encontrado'}, status=404)
     except Exception as e:
@@ -379,19 +406,21 @@ def mark_ticket_used(request, ticket_key):
         return JsonResponse({'error': 'Método no permitido'}, status=405)
     
     try:
-        ticket = NewTicket.objects.get(key=ticket_key)
-        
-        # Check if user has scanner access for this ticket's event
-        if not has_scanner_access(request.user, ticket.event):
-            return JsonResponse({'error': 'No tienes permisos para marcar tickets de este evento'}, status=403)
-        
-        if ticket.is_used:
-            return JsonResponse({'error': 'El bono ya fue usado'}, status=400)
-        
-        ticket.is_used = True
-        ticket.used_at = timezone.now()
-        ticket.scanned_by = request.user
-        ticket.save()
+        # Lock del bono: dos scanners a la vez no lo marcan (ni suman al contador) dos veces
+        with transaction.atomic():
+            ticket = NewTicket.objects.select_for_update(of=('self',)).select_related('event').get(key=ticket_key)
+            
+            # Check if user has scanner access for this ticket's event
+            if not has_scanner_access(request.user, ticket.event):
+                return JsonResponse({'error': 'No tienes permisos para marcar tickets de este evento'}, status=403)
+            
+            if ticket.is_used:
+                return JsonResponse({'error': 'El bono ya fue usado'}, status=400)
+            
+            ticket.is_used = True
+            ticket.used_at = timezone.now()
+            ticket.scanned_by = request.user
+            ticket.save()
         
         return JsonResponse(_ticket_check_response(ticket))
     except NewTicket.DoesNotExist:
@@ -406,20 +435,21 @@ def mark_ticket_left(request, ticket_key):
     if request.method != 'POST':
         return JsonResponse({'error': 'Método no permitido'}, status=405)
     try:
-        ticket = NewTicket.objects.get(key=ticket_key)
-        if not has_scanner_access(request.user, ticket.event):
-            return JsonResponse({'error': 'No tienes permisos'}, status=403)
-        if not ticket.is_used:
-            return JsonResponse({'error': 'El bono no está marcado como usado'}, status=400)
-        if getattr(ticket, 'holder_left', False):
-            return JsonResponse({'error': 'Ya está registrado como que salió'}, status=400)
-        ticket.holder_left = True
-        ticket.left_at = timezone.now()
-        ticket.save()
-        event = ticket.event
-        if event.venue_capacity is not None:
-            event.attendees_left += 1
-            event.save(update_fields=['attendees_left'])
+        with transaction.atomic():
+            ticket = NewTicket.objects.select_for_update(of=('self',)).select_related('event').get(key=ticket_key)
+            if not has_scanner_access(request.user, ticket.event):
+                return JsonResponse({'error': 'No tienes permisos'}, status=403)
+            if not ticket.is_used:
+                return JsonResponse({'error': 'El bono no está marcado como usado'}, status=400)
+            if getattr(ticket, 'holder_left', False):
+                return JsonResponse({'error': 'Ya está registrado como que salió'}, status=400)
+            ticket.holder_left = True
+            ticket.left_at = timezone.now()
+            ticket.save()
+            event = ticket.event
+            if event.venue_capacity is not None:
+                Event.objects.filter(pk=event.pk).update(attendees_left=F('attendees_left') + 1)
+                event.refresh_from_db(fields=['attendees_left'])
         return JsonResponse(_ticket_check_response(ticket))
     except NewTicket.DoesNotExist:
         return JsonResponse({'error': 'Bono no encontrado'}, status=404)
@@ -433,18 +463,19 @@ def mark_ticket_returned(request, ticket_key):
     if request.method != 'POST':
         return JsonResponse({'error': 'Método no permitido'}, status=405)
     try:
-        ticket = NewTicket.objects.get(key=ticket_key)
-        if not has_scanner_access(request.user, ticket.event):
-            return JsonResponse({'error': 'No tienes permisos'}, status=403)
-        if not getattr(ticket, 'holder_left', False):
-            return JsonResponse({'error': 'Este bono no estaba registrado como que salió'}, status=400)
-        ticket.holder_left = False
-        ticket.left_at = None
-        ticket.save()
-        event = ticket.event
-        if event.venue_capacity is not None and event.attendees_left > 0:
-            event.attendees_left -= 1
-            event.save(update_fields=['attendees_left'])
+        with transaction.atomic():
+            ticket = NewTicket.objects.select_for_update(of=('self',)).select_related('event').get(key=ticket_key)
+            if not has_scanner_access(request.user, ticket.event):
+                return JsonResponse({'error': 'No tienes permisos'}, status=403)
+            if not getattr(ticket, 'holder_left', False):
+                return JsonResponse({'error': 'Este bono no estaba registrado como que salió'}, status=400)
+            ticket.holder_left = False
+            ticket.left_at = None
+            ticket.save()
+            event = ticket.event
+            if event.venue_capacity is not None:
+                Event.objects.filter(pk=event.pk, attendees_left__gt=0).update(attendees_left=F('attendees_left') - 1)
+                event.refresh_from_db(fields=['attendees_left'])
         return JsonResponse(_ticket_check_response(ticket))
     except NewTicket.DoesNotExist:
         return JsonResponse({'error': 'Bono no encontrado'}, status=404)
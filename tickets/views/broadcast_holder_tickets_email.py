@@ -1,21 +1,13 @@
 import json
-import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from django.contrib.auth import get_user_model
-from django.db import close_old_connections
 from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.urls import reverse
+from django.views.decorators.http import require_GET, require_POST
 
 from events.models import Event
-from tickets.models import NewTicket
-from tickets.views.send_holder_tickets_email import (
-    _authorization_matches_secret,
-    run_send_holder_tickets_email,
-)
-
-
-BATCH_SIZE = 10
+from tickets.broadcast_jobs import broadcast_progress, start_broadcast
+from tickets.models import BroadcastJob
+from tickets.views.send_holder_tickets_email import _authorization_matches_secret
 
 
 def _resolve_event_from_payload(payload):
@@ -62,12 +54,13 @@ def _resolve_event_from_payload(payload):
     return matches[0], None
 
 
-def _send_one_holder(event, holder_id):
-    close_old_connections()
-    try:
-        return run_send_holder_tickets_email(event, holder_user_id=holder_id)
-    finally:
-        close_old_connections()
+MAX_CONCURRENCY = 16
+
+
+def _job_response(job, status=200):
+    progress = broadcast_progress(job)
+    progress['progress_url'] = reverse('broadcast_holder_tickets_email_progress', args=[job.pk])
+    return JsonResponse(progress, status=status)
 
 
 @require_POST
@@ -76,9 +69,13 @@ def broadcast_holder_tickets_email(request):
     POST /broadcast-holder-ticket-emails/
     Header Authorization == settings.SECRET.
     JSON (uno): {"event_id": 123} | {"event_slug": "..."} | {"event_name": "..."}.
+    Opcional: {"concurrency": 4} (holders en paralelo, 1 a 16).
 
-    Lista holders únicos con al menos un bono en el evento y, por lotes de 10
-    en paralelo, ejecuta la misma lógica que send-holder-tickets-email (user_id).
+    Crea un BroadcastJob con un destinatario por holder único del evento y
+    responde enseguida (202); el envío (misma lógica que send-holder-tickets-email
+    por user_id) lo hace tickets.broadcast_jobs por tandas, retomable. Si el
+    evento ya tiene un envío sin terminar devuelve ese (200). El progreso está en
+    progress_url.
     """
     if not _authorization_matches_secret(request):
         return JsonResponse({'error': 'Unauthorized'}, status=401)
@@ -93,62 +90,28 @@ def broadcast_holder_tickets_email(request):
         status = err.pop('status', 400)
         return JsonResponse(err, status=status)
 
-    holder_ids = list(
-        NewTicket.objects.filter(event=event, holder__isnull=False)
-        .exclude(holder_id__isnull=True)
-        .values_list('holder_id', flat=True)
-        .distinct()
-        .order_by('holder_id')
-    )
-
-    User = get_user_model()
-    users_by_id = {u.pk: u for u in User.objects.filter(pk__in=holder_ids)} if holder_ids else {}
-    holders_unique = [
-        {
-            'holder_id': hid,
-            'email': ((users_by_id[hid].email or '') if hid in users_by_id else '').strip() or None,
-        }
-        for hid in holder_ids
-    ]
-
-    results = []
-    for i in range(0, len(holder_ids), BATCH_SIZE):
-        batch = holder_ids[i : i + BATCH_SIZE]
-        with ThreadPoolExecutor(max_workers=BATCH_SIZE) as pool:
-            future_map = {
-                pool.submit(_send_one_holder, event, hid): hid for hid in batch
-            }
-            for fut in as_completed(future_map):
-                hid = future_map[fut]
-                try:
-                    out = fut.result()
-                except Exception as e:
-                    logging.exception('broadcast_holder_tickets_email: worker failed holder_id=%s', hid)
-                    results.append({'holder_id': hid, 'ok': False, 'error': str(e)})
-                    continue
-                row = {'holder_id': hid, 'ok': out['ok']}
-                if out['ok']:
-                    row['sent_to'] = out['sent_to']
-                    row['ticket_count'] = out['ticket_count']
-                else:
-                    row['error'] = out['error']
-                results.append(row)
-
-    ok_n = sum(1 for r in results if r.get('ok'))
-    fail_n = len(results) - ok_n
-
-    return JsonResponse(
-        {
-            'ok': fail_n == 0,
-            'event_id': event.id,
-            'event_name': event.name,
-            'event_slug': event.slug,
-            'unique_holders': len(holder_ids),
-            'holders': holders_unique,
-            'processed': len(results),
-            'succeeded': ok_n,
-            'failed': fail_n,
-            'batch_size': BATCH_SIZE,
-            'results': sorted(results, key=lambda r: r['holder_id']),
-        }
-    )
+    concurrency = payload.get('concurrency')
+    if concurrency is not None:
+        try:
+            concurrency = min(max(int(concurrency), 1), MAX_CONCURRENCY)
+        except (TypeError, ValueError):
+            return JsonResponse({'error': 'Invalid concurrency'}, status=400)
+
+    job, created = start_broadcast(event, concurrency=concurrency)
+    job.refresh_from_db()
+    return _job_response(job, status=202 if created else 200)
+
+
+@require_GET
+def broadcast_holder_tickets_email_progress(request, job_id):
+    """
+    GET /broadcast-holder-ticket-emails/<job_id>/
+    Header Authorization == settings.SECRET. Progreso del envío masivo.
+    """
+    if not _authorization_matches_secret(request):
+        return JsonResponse({'error': 'Unauthorized'}, status=401)
+
+    job = BroadcastJob.objects.filter(pk=job_id).first()
+    if job is None:
+        return JsonResponse({'error': 'Broadcast job not found'}, status=404)
+    return _job_response(job)
@@ -8,7 +8,7 @@ from django.core.exceptions import ValidationError
 from django.core.validators import EmailValidator
 from django.db import transaction
 from django.http import HttpResponseNotAllowed, HttpResponseForbidden, HttpResponse, HttpResponseBadRequest, \
-    JsonResponse
+    JsonResponse, Http404
 from django.shortcuts import redirect, get_object_or_404
 from django.urls import reverse
 from django.utils import timezone
@@ -18,6 +18,7 @@ from allauth.account.models import EmailAddress
 from events.models import GrupoMiembro
 from tickets.models import NewTicket, NewTicketTransfer
 from utils.email import send_mail
+from utils.qr_cache import CONTENT_TYPES, QR_BROWSER_CACHE_SECONDS, qr_etag, qr_image_bytes
 
 logger = logging.getLogger(__name__)
 
@@ -152,6 +153,32 @@ def transfer_ticket(request, ticket_key):
     return JsonResponse({'status': 'OK', 'destination_user_exists': destination_user_exists})
 
 
+@login_required()
+def ticket_qr(request, ticket_key, fmt):
+    """
+    Imagen del QR de un bono, sólo para su holder, su owner o staff: el QR es la
+    credencial de entrada. Sale del cache en memoria y el navegador la guarda
+    (privada, con ETag), así las listas de bonos no cargan la imagen en base64.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    if fmt not in CONTENT_TYPES:
+        raise Http404('Formato no soportado')
+    ticket = get_object_or_404(NewTicket.objects.only('key', 'holder_id', 'owner_id'), key=ticket_key)
+    user = request.user
+    if user.pk not in (ticket.holder_id, ticket.owner_id) and not (user.is_staff or user.is_superuser):
+        return HttpResponseForbidden('No autorizado')
+
+    etag = qr_etag(ticket.key, fmt)
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponse(status=304)
+    else:
+        response = HttpResponse(qr_image_bytes(ticket.key, fmt), content_type=CONTENT_TYPES[fmt])
+    response['ETag'] = etag
+    response['Cache-Control'] = f'private, max-age={QR_BROWSER_CACHE_SECONDS}'
+    return response
+
+
 @login_required()
 def cancel_ticket_transfer(request):
     if request.method != 'POST':
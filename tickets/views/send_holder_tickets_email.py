@@ -10,6 +10,7 @@ from django.views.decorators.http import require_POST
 from events.models import Event
 from tickets.models import NewTicket
 from tickets.ticket_pdf import build_new_ticket_pdf_bytes, new_ticket_pdf_filename
+from utils.email import send_message
 
 
 def _authorization_matches_secret(request):
@@ -134,7 +135,7 @@ def run_send_holder_tickets_email(event, payload=None, *, holder_user_id=None):
         return {'ok': False, 'error': f'PDF generation failed: {e}', 'status': 500}
 
     try:
-        msg.send(fail_silently=False)
+        send_message(msg)
     except Exception as e:
         logging.exception('run_send_holder_tickets_email: send failed')
         return {'ok': False, 'error': f'Could not send email: {e}', 'status': 500}
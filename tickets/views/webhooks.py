@@ -4,12 +4,11 @@ import json
 import logging
 import urllib
 
-import mercadopago
 from django.conf import settings
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 
-from tickets.models import Order, OrderTicket
+from tickets.webhook_inbox import enqueue_webhook, topic_for
 
 
 @csrf_exempt
@@ -24,8 +23,11 @@ def mercadopago_webhook(request):
             logging.info("Webhook payload:")
             logging.info(payload)
 
-            if payload['action'] == 'payment.created':
-                handle_payment_created(payload)
+            # Se guarda y se responde enseguida; la consulta a MP y la orden las procesa tickets.webhook_inbox
+            topic, resource_id = topic_for(payload)
+            if topic is None:
+                return JsonResponse({"status": "ignored"}, status=200)
+            enqueue_webhook(topic, resource_id, payload)
 
             return JsonResponse({"status": "success"}, status=200)
 
@@ -88,45 +90,3 @@ def verify_hmac(data_id, x_request_id, ts, hash_value):
     sha = hmac_obj.hexdigest()
     return sha == hash_value
 
-
-def handle_payment_created(payload):
-    try:
-        sdk = mercadopago.SDK(settings.MERCADOPAGO['ACCESS_TOKEN'])
-        payment = sdk.payment().get(payload['data']['id'])['response']
-        logging.info(payment)
-
-        if payment['status'] == 'approved':
-            order_approved(payment)
-
-    except KeyError as e:
-        logging.error(f"Missing key in payload: {str(e)}")
-        raise e
-
-    except Exception as e:
-        logging.error(f"Error handling payment creation: {str(e)}")
-        raise e
-
-
-def order_approved(payment):
-    try:
-        order = Order.objects.get(key=payment['external_reference'])
-        if order.status != Order.OrderStatus.PENDING:
-            logging.info(f"Order {order.key} already confirmed")
-            return
-
-        order.status = Order.OrderStatus.PROCESSING
-        order.processor_callback = payment
-        order.net_received_amount = payment.get('transaction_details', {}).get('net_received_amount')
-        order.save()
-
-    except Order.DoesNotExist as e:
-        logging.error(f"Order not found: {str(e)}")
-        raise e
-
-    except AttributeError as e:
-        logging.error(f"Attribute error in processing order: {str(e)}")
-        raise e
-
-    except Exception as e:
-        logging.error(f"Error processing order: {str(e)}")
-        raise e
@@ -0,0 +1,254 @@
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from tickets.models import Order, WebhookInbox
+from utils.mercadopago_api import MP_API_BASE_URL, api_get
+from utils.work_queue import claim_batch, dispatch, drain, retry_delay
+
+logger = logging.getLogger(__name__)
+
+try:
+    from zappa.asynchronous import task
+except Exception:  # pragma: no cover - zappa package may be unavailable locally
+    task = None
+
+# Notificaciones por lote
+BATCH_SIZE = int(os.environ.get('WEBHOOK_INBOX_BATCH_SIZE', '50'))
+# Consultas a MP en paralelo dentro de un lote (comparten sesión HTTP y rate limit por host)
+FETCH_WORKERS = int(os.environ.get('WEBHOOK_INBOX_FETCH_WORKERS', '8'))
+MAX_ATTEMPTS = 6
+# Una fila reclamada por un worker que murió vuelve a estar disponible pasado este tiempo
+CLAIM_LEASE = timedelta(minutes=5)
+REQUEST_TIMEOUT_SECONDS = 10
+
+PAYMENTS_URL = f'{MP_API_BASE_URL}/v1/payments'
+
+# Resultados después de los cuales una notificación repetida ya no cambia nada
+FINAL_OUTCOMES = frozenset({
+    'approved', 'rejected', 'cancelled', 'refunded', 'charged_back',
+    'paid', 'expired', 'ignored', 'not_caja',
+})
+
+
+def topic_for(payload):
+    """(topic, id del recurso) de una notificación de MP, o (None, None) si no nos interesa."""
+    action = str(payload.get('action') or '')
+    kind = str(payload.get('type') or payload.get('topic') or payload.get('entity') or '')
+    resource_id = (payload.get('data') or {}).get('id') or payload.get('id')
+    if not resource_id:
+        return None, None
+    if action.startswith('payment.') or kind == 'payment':
+        return WebhookInbox.Topic.PAYMENT, str(resource_id)
+    if action.startswith('order.') or kind == 'order':
+        return WebhookInbox.Topic.ORDER, str(resource_id)
+    return None, None
+
+
+def enqueue_webhook(topic, resource_id, payload):
+    """
+    Guarda la notificación y dispara el worker al commitear. Las repetidas de un
+    recurso que todavía está pendiente se suman a su fila sin otra consulta a MP;
+    las que llegan después de procesado sólo lo reencolan si el resultado todavía
+    podía cambiar (por ejemplo un pago que seguía pendiente).
+    """
+    now = timezone.now()
+    rows = WebhookInbox.objects.filter(topic=topic, resource_id=resource_id)
+    if rows.filter(status=WebhookInbox.Status.PENDING).update(
+        received_count=F('received_count') + 1, payload=payload, updated_at=now,
+    ):
+        logger.info('Webhook %s %s repetido, ya estaba en cola', topic, resource_id)
+        return
+
+    row, created = WebhookInbox.objects.get_or_create(
+        topic=topic, resource_id=resource_id, defaults={'payload': payload, 'received_at': now},
+    )
+    if created:
+        transaction.on_commit(dispatch_webhook_inbox)
+        return
+
+    requeued = rows.exclude(status=WebhookInbox.Status.PENDING).exclude(
+        status=WebhookInbox.Status.PROCESSED, outcome__in=FINAL_OUTCOMES,
+    ).update(
+        status=WebhookInbox.Status.PENDING, received_count=F('received_count') + 1, payload=payload,
+        received_at=now, available_at=now, attempts=0, last_error='', updated_at=now,
+    )
+    if requeued:
+        transaction.on_commit(dispatch_webhook_inbox)
+        return
+    rows.update(received_count=F('received_count') + 1, updated_at=now)
+    logger.info('Webhook %s %s repetido, ya procesado (%s)', topic, resource_id, row.outcome or row.status)
+
+
+def _fetch_payment(payment_id, access_token):
+    response = api_get(f'{PAYMENTS_URL}/{payment_id}', access_token=access_token, timeout=REQUEST_TIMEOUT_SECONDS)
+    if response.get('status') != 200:
+        raise ValueError(f"MercadoPago respondió {response.get('status')} para el pago {payment_id}")
+    return response.get('response') or {}
+
+
+def _fetch_order(mp_order_id):
+    from caja.mercadopago_instore import get_order
+
+    return get_order(mp_order_id)
+
+
+def _fetch(row, access_token):
+    """Corre en un thread del pool: solo HTTP, nada de DB. Devuelve (datos, error, ms)."""
+    started = time.perf_counter()
+    try:
+        if row.topic == WebhookInbox.Topic.PAYMENT:
+            data = _fetch_payment(row.resource_id, access_token)
+        else:
+            data = _fetch_order(row.resource_id)
+        error = None
+    except Exception as e:
+        data, error = None, f'{type(e).__name__}: {e}'
+    return data, error, int((time.perf_counter() - started) * 1000)
+
+
+def order_approved(payment):
+    order = Order.objects.get(key=payment['external_reference'])
+    if order.status != Order.OrderStatus.PENDING:
+        logger.info(f"Order {order.key} already confirmed")
+        return
+
+    order.status = Order.OrderStatus.PROCESSING
+    order.processor_callback = payment
+    order.net_received_amount = payment.get('transaction_details', {}).get('net_received_amount')
+    order.save()
+
+
+def _apply_payment(payment):
+    from caja.webhook_handlers import handle_caja_payment_approved
+
+    status = payment.get('status') or 'unknown'
+    if status == 'approved':
+        if not handle_caja_payment_approved(payment):
+            order_approved(payment)
+    return status
+
+
+def _apply_order(mp_order):
+    from caja.webhook_handlers import process_caja_mp_order
+
+    return process_caja_mp_order(mp_order, payment_callback=mp_order) or 'not_caja'
+
+
+APPLIERS = {
+    WebhookInbox.Topic.PAYMENT: _apply_payment,
+    WebhookInbox.Topic.ORDER: _apply_order,
+}
+
+
+def _record_result(row, outcome, error, fetch_ms):
+    now = timezone.now()
+    row.fetch_ms = fetch_ms
+    if error is None:
+        row.status = WebhookInbox.Status.PROCESSED
+        row.outcome = str(outcome)[:40]
+        row.processed_at = now
+        row.latency_ms = int((now - row.received_at).total_seconds() * 1000)
+        row.last_error = ''
+    elif row.attempts >= MAX_ATTEMPTS:
+        row.status = WebhookInbox.Status.FAILED
+        row.last_error = error
+        logger.error('Webhook %s %s falló %s veces: %s', row.topic, row.resource_id, row.attempts, error)
+    else:
+        row.available_at = now + retry_delay(row.attempts)
+        row.last_error = error
+    # Sólo si no llegó otra notificación mientras tanto; si llegó, queda pendiente para el próximo lote
+    updated = WebhookInbox.objects.filter(pk=row.pk, received_count=row.received_count).update(
+        status=row.status, outcome=row.outcome, processed_at=row.processed_at, latency_ms=row.latency_ms,
+        fetch_ms=row.fetch_ms, available_at=row.available_at, last_error=row.last_error, updated_at=now,
+    )
+    if not updated:
+        WebhookInbox.objects.filter(pk=row.pk).update(available_at=now, fetch_ms=fetch_ms, updated_at=now)
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def process_webhook_inbox_batch(batch_size=BATCH_SIZE):
+    """
+    Reclama un lote de notificaciones pendientes (SKIP LOCKED), consulta a MP los
+    pagos y órdenes en paralelo y aplica los resultados de a uno, cada uno en su
+    transacción. Los errores se reintentan con backoff exponencial.
+    """
+    rows = claim_batch(WebhookInbox, batch_size, CLAIM_LEASE)
+    summary = {'claimed': len(rows), 'processed': 0, 'retrying': 0, 'failed': 0}
+    if not rows:
+        return summary
+
+    started = time.perf_counter()
+    access_token = settings.MERCADOPAGO.get('ACCESS_TOKEN')
+    with ThreadPoolExecutor(max_workers=max(1, min(FETCH_WORKERS, len(rows)))) as executor:
+        fetched = list(executor.map(lambda row: _fetch(row, access_token), rows))
+
+    latencies = []
+    for row, (data, error, fetch_ms) in zip(rows, fetched):
+        outcome = None
+        if error is None:
+            try:
+                with transaction.atomic():
+                    outcome = APPLIERS[row.topic](data)
+            except Exception as e:
+                logger.exception('Webhook %s %s: error aplicando la notificación', row.topic, row.resource_id)
+                error = f'{type(e).__name__}: {e}'
+        _record_result(row, outcome, error, fetch_ms)
+        if error is None:
+            summary['processed'] += 1
+            latencies.append(row.latency_ms)
+        elif row.status == WebhookInbox.Status.FAILED:
+            summary['failed'] += 1
+        else:
+            summary['retrying'] += 1
+
+    logger.info(
+        'Webhook inbox: %s reclamados, %s procesados, %s a reintentar, %s fallidos en %.2fs '
+        '(latencia p50 %sms, p95 %sms, máx %sms)',
+        summary['claimed'], summary['processed'], summary['retrying'], summary['failed'],
+        time.perf_counter() - started,
+        _percentile(latencies, 0.5), _percentile(latencies, 0.95), max(latencies, default=0),
+    )
+    return summary
+
+
+def drain_webhook_inbox(batch_size=BATCH_SIZE, max_batches=None):
+    """Procesa lotes hasta vaciar la cola (o hasta max_batches)."""
+    return drain(process_webhook_inbox_batch, batch_size, max_batches)
+
+
+def process_webhook_inbox(event, context):
+    """Cron: procesa las notificaciones que el worker no llegó a procesar y reintenta las que fallaron."""
+    return drain_webhook_inbox(max_batches=20)
+
+
+if task:
+    @task
+    def process_webhook_inbox_async():
+        """Procesa la cola en un Lambda aparte (o en línea fuera de Lambda)."""
+        return drain_webhook_inbox(max_batches=5)
+else:
+    def process_webhook_inbox_async():
+        """Fallback cuando zappa.asynchronous no está disponible."""
+        return drain_webhook_inbox(max_batches=5)
+
+
+def dispatch_webhook_inbox():
+    """
+    Dispara el worker al commitear. En Zappa se encola una invocación asíncrona;
+    localmente corre en línea, antes de responder el request.
+    """
+    dispatch(process_webhook_inbox_async, 'webhooks')
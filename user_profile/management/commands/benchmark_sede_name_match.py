@@ -0,0 +1,120 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from user_profile.services.sede_mercadopago import (
+    _find_user_by_name,
+    _find_user_by_name_scan,
+    _name_candidates,
+    build_name_blocks,
+    build_user_match_index,
+    normalize_name,
+)
+
+FIRST_NAMES = [
+    'Juan', 'María', 'Lucía', 'Martín', 'Sofía', 'Mateo', 'Valentina', 'Tomás', 'Camila', 'Joaquín',
+    'Florencia', 'Agustín', 'Micaela', 'Nicolás', 'Julieta', 'Facundo', 'Carolina', 'Santiago', 'Paula', 'Bruno',
+]
+LAST_NAMES = [
+    'González', 'Rodríguez', 'Fernández', 'López', 'Martínez', 'García', 'Pérez', 'Sánchez', 'Romero', 'Díaz',
+    'Álvarez', 'Torres', 'Ruiz', 'Ramírez', 'Flores', 'Acosta', 'Benítez', 'Medina', 'Herrera', 'Suárez',
+    'Aguirre', 'Giménez', 'Gutiérrez', 'Pereyra', 'Rojas', 'Molina', 'Castro', 'Ortiz', 'Silva', 'Núñez',
+    'Luna', 'Juárez', 'Cabrera', 'Ríos', 'Ferreyra', 'Godoy', 'Morales', 'Domínguez', 'Moreno', 'Peralta',
+    'Vega', 'Carrizo', 'Quiroga', 'Castillo', 'Ledesma', 'Muñoz', 'Ojeda', 'Ponce', 'Vera', 'Vázquez',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare _find_user_by_name (last-name trigram candidates) with the full scan of '
+        'user_index["by_name"]: time, candidates scored and whether both return the same '
+        'match. Uses a synthetic index of --members people, or the persisted one with '
+        '--from-db. Fails if any result differs.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=20000, help='People in the synthetic index')
+        parser.add_argument('--queries', type=int, default=100, help='Payer names to look up')
+        parser.add_argument('--from-db', action='store_true', help='Use the persisted match index instead')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        if options['from_db']:
+            user_index = build_user_match_index()
+        else:
+            user_index = self._synthetic_index(options['members'], rng)
+        by_name = [entry for entry in user_index['by_name'] if entry['last_name']]
+        if not by_name:
+            raise CommandError('The match index has no last names')
+
+        started = time.perf_counter()
+        user_index['name_blocks'] = build_name_blocks(user_index['by_name'])
+        build_seconds = time.perf_counter() - started
+
+        queries = [self._payer_name(rng.choice(by_name), rng) for _ in range(options['queries'])]
+
+        started = time.perf_counter()
+        scanned = [_find_user_by_name_scan(first, last, user_index) for first, last in queries]
+        scan_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        blocked = [_find_user_by_name(first, last, user_index) for first, last in queries]
+        blocked_seconds = time.perf_counter() - started
+
+        candidates = [len(_name_candidates(normalize_name(last), user_index['name_blocks'])) for _, last in queries]
+        mismatches = [
+            (query, scan, block) for query, scan, block in zip(queries, scanned, blocked)
+            if scan[0] != block[0] or scan[1] != block[1]
+        ]
+        total = len(queries)
+
+        self.stdout.write(f"Index: {len(user_index['by_name'])} people, trigrams built in {build_seconds:.3f}s")
+        self.stdout.write(
+            f'Full scan: {scan_seconds:.3f}s ({scan_seconds / total * 1000:.2f} ms/lookup, '
+            f"{len(user_index['by_name'])} scored), "
+            f'{sum(1 for user, _ in scanned if user is not None)}/{total} matched'
+        )
+        self.stdout.write(
+            f'Trigram candidates: {blocked_seconds:.3f}s ({blocked_seconds / total * 1000:.2f} ms/lookup, '
+            f'{sum(candidates) / total:.1f} distinct last names scored on average, max {max(candidates)}), '
+            f'{sum(1 for user, _ in blocked if user is not None)}/{total} matched'
+        )
+        if blocked_seconds:
+            self.stdout.write(f'Speedup: x{scan_seconds / blocked_seconds:.1f}')
+
+        if mismatches:
+            for (first, last), scan, block in mismatches[:10]:
+                self.stderr.write(f'  {first} {last}: scan={scan} trigrams={block}')
+            raise CommandError(f'{len(mismatches)}/{total} result(s) differ from the full scan')
+        self.stdout.write(self.style.SUCCESS(f'Same user and score as the full scan for {total}/{total} lookups'))
+
+    def _synthetic_index(self, members, rng):
+        by_name = []
+        for user_id in range(members):
+            last_name = rng.choice(LAST_NAMES)
+            if rng.random() < 0.6:
+                last_name = f'{last_name} {rng.choice(LAST_NAMES)}'
+            by_name.append({
+                'user': user_id,
+                'first_name': normalize_name(rng.choice(FIRST_NAMES)),
+                'last_name': normalize_name(last_name),
+            })
+        return {'by_email': {}, 'by_document': {}, 'by_name': by_name}
+
+    def _payer_name(self, entry, rng):
+        """(first name, last name) the way a MP payment could carry them for this person, or someone else."""
+        first, last = entry['first_name'], entry['last_name']
+        kind = rng.random()
+        if kind < 0.3:
+            return first.upper(), last.upper()
+        if kind < 0.55:
+            position = rng.randrange(len(last))
+            return first, last[:position] + rng.choice('aeiourszn') + last[position + 1:]
+        if kind < 0.7:
+            position = rng.randrange(len(last))
+            return first, last[:position] + last[position + 1:]
+        if kind < 0.8:
+            return first, last.split(' ')[0]
+        return rng.choice(FIRST_NAMES), f'{rng.choice(LAST_NAMES)}{rng.choice(["", "s", "ez", "o"])}'
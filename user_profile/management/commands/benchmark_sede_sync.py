@@ -0,0 +1,140 @@
+import logging
+import random
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from user_profile.models import Profile, SedeSubscriptionPlan
+from user_profile.services import sede_mercadopago
+from user_profile.services.fake_mercadopago import fake_mercadopago
+from utils.mercadopago_api import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+FIRST_NAMES = ['Juan', 'María', 'Lucía', 'Martín', 'Sofía', 'Mateo', 'Valentina', 'Tomás', 'Camila', 'Joaquín']
+LAST_NAMES = [
+    'González', 'Rodríguez', 'Fernández', 'López', 'Martínez', 'García', 'Pérez', 'Sánchez', 'Romero', 'Díaz',
+    'Álvarez', 'Torres', 'Ruiz', 'Ramírez', 'Flores', 'Acosta', 'Benítez', 'Medina', 'Herrera', 'Suárez',
+]
+PLAN_ID = 'benchmark-sede-plan'
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the La Sede sync offline against the in-memory MercadoPago '
+        '(user_profile.services.fake_mercadopago): a full sync, then an incremental '
+        'one after --changed subscriptions change. Prints per-phase timings and MP '
+        'requests per endpoint. Runs in a transaction that is rolled back at the end.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=5000, help='Users with a profile to match against')
+        parser.add_argument('--subscriptions', type=int, default=200, help='Subscriptions on the fake account')
+        parser.add_argument('--changed', type=int, default=10, help='Subscriptions modified before the incremental run')
+        parser.add_argument('--latency', type=float, default=0.05, help='Seconds added to every fake MP request')
+        parser.add_argument(
+            '--rate', type=float, default=100,
+            help='Requests/second for the shared MP rate limiter during the run (0 keeps the configured rate)',
+        )
+
+    def handle(self, *args, **options):
+        previous = (sede_mercadopago.FAKE_MERCADOPAGO, fake_mercadopago.latency, rate_limiter.rate, rate_limiter.burst)
+        sede_mercadopago.FAKE_MERCADOPAGO = True
+        fake_mercadopago.reset()
+        fake_mercadopago.latency = options['latency']
+        if options['rate']:
+            rate_limiter.rate = options['rate']
+            rate_limiter.burst = max(1, int(options['rate']))
+
+        results = []
+        try:
+            with transaction.atomic():
+                rng = random.Random(42)
+                users = self._members(options['members'], rng)
+                sub_ids = self._subscriptions(users, options['subscriptions'], rng)
+
+                results.append(self._run('full', sede_mercadopago.run_full_sync))
+
+                since = timezone.now()
+                time.sleep(0.01)
+                for sub_id in rng.sample(sub_ids, min(options['changed'], len(sub_ids))):
+                    fake_mercadopago.update_subscription(sub_id, status=rng.choice(['authorized', 'paused']))
+                results.append(self._run(
+                    'incremental',
+                    lambda log: sede_mercadopago.run_incremental_sync(log=log, modified_since=since),
+                ))
+                raise _Rollback()
+        except _Rollback:
+            pass
+        finally:
+            sede_mercadopago.FAKE_MERCADOPAGO, fake_mercadopago.latency, rate_limiter.rate, rate_limiter.burst = previous
+            fake_mercadopago.reset()
+
+        for label, elapsed, summary, requests in results:
+            phases = ' '.join(f'{name}={seconds}s' for name, seconds in summary.get('phase_timings', {}).items())
+            self.stdout.write(
+                f"{label}: {elapsed:.2f}s, {summary.get('total', 0)} subscriptions, "
+                f"{summary.get('matched', 0)} matched, {summary.get('unmatched', 0)} unmatched, "
+                f"{summary.get('errors', 0)} errors"
+            )
+            self.stdout.write(f'  phases: {phases}')
+            self.stdout.write(f'  MP requests: {sum(requests.values())}')
+            for route, count in sorted(requests.items()):
+                self.stdout.write(f'    {route}: {count}')
+
+    def _run(self, label, sync):
+        fake_mercadopago.requests.clear()
+        started = time.perf_counter()
+        summary = sync(log=logger)
+        return label, time.perf_counter() - started, summary, dict(fake_mercadopago.requests)
+
+    def _members(self, count, rng):
+        tag = uuid.uuid4().hex[:8]
+        users = User.objects.bulk_create([
+            User(
+                username=f'sede-bench-{tag}-{i}',
+                email=f'sede-bench-{tag}-{i}@example.com',
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=f'{rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}',
+            )
+            for i in range(count)
+        ], batch_size=1000)
+        users = list(User.objects.filter(username__startswith=f'sede-bench-{tag}-').order_by('id'))
+        Profile.objects.bulk_create([
+            Profile(user=user, document_number=str(20000000 + i), phone='1123456789')
+            for i, user in enumerate(users)
+        ], batch_size=1000)
+        # bulk_create skips the signals: the full sync rebuilds the match index with these members
+        return users
+
+    def _subscriptions(self, users, count, rng):
+        SedeSubscriptionPlan.objects.update_or_create(
+            plan_id=PLAN_ID, defaults={'plan_name': 'La Sede (benchmark)', 'is_enabled': True},
+        )
+        sub_ids = []
+        for user in rng.sample(users, min(count, len(users))):
+            kind = rng.random()
+            if kind < 0.7:
+                # DNI on the card and the customer
+                document = user.profile.document_number
+                first_name, last_name = user.first_name, user.last_name
+            elif kind < 0.9:
+                # No DNI, slightly misspelled name: fuzzy name match
+                document = ''
+                first_name, last_name = user.first_name, user.last_name[:-1] + 'x'
+            else:
+                # Nobody on the platform
+                document = str(90000000 + len(sub_ids))
+                first_name, last_name = 'Desconocido', f'Persona {len(sub_ids)}'
+            sub_ids.append(fake_mercadopago.add_subscription(
+                PLAN_ID, first_name, last_name, document_number=document, payer_email=f'payer{len(sub_ids)}@example.com',
+            ))
+        return sub_ids
@@ -0,0 +1,20 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from user_profile.services.sede_mercadopago import rebuild_sede_match_index
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Recompute the persisted La Sede user match index from profiles, users and email addresses'
+
+    def handle(self, *args, **options):
+        summary = rebuild_sede_match_index(log=logger)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Match index rebuilt: {summary['created']} created, "
+                f"{summary['updated']} updated, {summary['deleted']} deleted"
+            )
+        )
@@ -2,7 +2,7 @@ import logging
 
 from django.core.management.base import BaseCommand
 
-from user_profile.services.sede_mercadopago import run_full_sync
+from user_profile.services.sede_mercadopago import run_full_sync, run_incremental_sync
 
 logger = logging.getLogger(__name__)
 
@@ -10,8 +10,18 @@ logger = logging.getLogger(__name__)
 class Command(BaseCommand):
     help = 'Sync La Sede members from MercadoPago subscriptions (match by DNI or similar names)'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Only sync subscriptions modified in MercadoPago since the last successful sync',
+        )
+
     def handle(self, *args, **options):
-        summary = run_full_sync(log=logger)
+        if options['incremental']:
+            summary = run_incremental_sync(log=logger)
+        else:
+            summary = run_full_sync(log=logger)
 
         if summary.get('error'):
             self.stderr.write(self.style.ERROR(summary['error']))
@@ -35,3 +45,8 @@ class Command(BaseCommand):
                 f"took {summary.get('duration_seconds', 0)}s"
             )
         )
+        phases = summary.get('phase_timings', {})
+        self.stdout.write(
+            f"Mode: {summary.get('mode')}, phases: "
+            + ', '.join(f'{name}={seconds}s' for name, seconds in phases.items())
+        )
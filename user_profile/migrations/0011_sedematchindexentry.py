@@ -0,0 +1,32 @@
+# Generated by Django 4.2.15 on 2026-10-18 18:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('user_profile', '0010_sedesubscription_soft_remove'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SedeMatchIndexEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('first_name', models.CharField(blank=True, default='', max_length=150)),
+                ('last_name', models.CharField(blank=True, default='', max_length=150)),
+                ('document_number', models.CharField(blank=True, db_index=True, default='', max_length=50)),
+                ('emails', models.JSONField(blank=True, default=list)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='sede_match_entry', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -97,6 +97,8 @@ class Profile(BaseModel):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._old_profile_completion = self.profile_completion
+        # Sin disparar la carga de un campo diferido (el cascade de un delete trae solo algunos campos)
+        self._old_document_number = self.__dict__.get('document_number')
 
     def __str__(self):
         return self.user.username
@@ -195,4 +197,17 @@ class SedeSubscriptionPlan(BaseModel):
         ordering = ('-is_enabled', 'plan_name', 'plan_id')
 
     def __str__(self):
-        return f'{self.plan_name or self.plan_id} ({self.plan_id})'
\ No newline at end of file
+        return f'{self.plan_name or self.plan_id} ({self.plan_id})'
+
+
+class SedeMatchIndexEntry(BaseModel):
+    """Datos normalizados de cada usuario para matchear pagadores de MercadoPago; lo mantienen las señales."""
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='sede_match_entry')
+    first_name = models.CharField(max_length=150, blank=True, default='')
+    last_name = models.CharField(max_length=150, blank=True, default='')
+    document_number = models.CharField(max_length=50, blank=True, default='', db_index=True)
+    emails = models.JSONField(default=list, blank=True)
+
+    def __str__(self):
+        return f'{self.last_name}, {self.first_name} ({self.document_number or "—"})'
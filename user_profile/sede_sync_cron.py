@@ -1,6 +1,6 @@
 import logging
 
-from user_profile.services.sede_mercadopago import run_full_sync
+from user_profile.services.sede_mercadopago import run_full_sync, run_incremental_sync
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +27,21 @@ def sync_sede_members(event, context):
         raise
 
 
+def sync_sede_members_incremental(event, context):
+    """
+    Scheduled task that syncs only the subscriptions MercadoPago modified since
+    the last successful sync. The daily full sync stays as the guardrail.
+    """
+    try:
+        summary = run_incremental_sync(log=logger)
+        if summary.get('error'):
+            logger.error('La Sede incremental sync failed: %s', summary['error'])
+        return summary
+    except Exception:
+        logger.exception('Fatal error in La Sede incremental membership sync')
+        raise
+
+
 if task:
     @task
     def sync_sede_members_async():
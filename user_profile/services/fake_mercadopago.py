@@ -0,0 +1,215 @@
+"""
+In-memory MercadoPago API for the La Sede sync: local runs without an access token
+(SEDE_SYNC_FAKE_MERCADOPAGO=True) and offline benchmarks (benchmark_sede_sync).
+It plugs into the real SDK as its http_client, so the sync runs the same code
+path as in production, paging and rate limiting included.
+
+Implements what the sync reads: /preapproval/search (paging and the
+last_modified range filter), /preapproval/{id}, /authorized_payments/search,
+/v1/payments/{id}, /v1/payments/search by payer.id and /v1/customers/{id}.
+`latency` adds a fixed delay to every request to approximate the real API.
+"""
+import itertools
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+from urllib.parse import urlsplit
+
+from mercadopago.http.http_client import HttpClient
+
+
+def _now():
+    return datetime.now(dt_timezone.utc)
+
+
+def _iso(value):
+    return value.isoformat(timespec='milliseconds')
+
+
+def _parse(value):
+    if not value or value == 'NOW':
+        return _now()
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=dt_timezone.utc)
+    return parsed
+
+
+def _page(results, params, default_limit=50):
+    offset = int(params.get('offset') or 0)
+    limit = int(params.get('limit') or default_limit)
+    return {
+        'paging': {'total': len(results), 'offset': offset, 'limit': limit},
+        'results': results[offset:offset + limit],
+    }
+
+
+class FakeMercadoPago:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = 0.0
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.subscriptions = {}
+            self.invoices = {}
+            self.payments = {}
+            self.customers = {}
+            self.requests = Counter()
+            self._ids = itertools.count(1)
+
+    def add_subscription(self, plan_id, payer_first_name, payer_last_name, document_number='',
+                         payer_email='', status='authorized', amount=5000, charges=3, last_modified=None):
+        """Create a subscription with its customer and `charges` monthly approved payments."""
+        with self._lock:
+            number = next(self._ids)
+            sub_id = f'fake{number:028x}'
+            payer_id = 100000 + number
+            now = _now()
+            created = now - timedelta(days=30 * max(charges, 1))
+            self.customers[str(payer_id)] = {
+                'id': str(payer_id),
+                'first_name': payer_first_name,
+                'last_name': payer_last_name,
+                'email': payer_email,
+                'identification': {'type': 'DNI', 'number': document_number},
+            }
+            invoices = []
+            for charge in range(charges):
+                charged_at = created + timedelta(days=30 * (charge + 1))
+                payment_id = 900000000 + number * 100 + charge
+                self.payments[str(payment_id)] = {
+                    'id': payment_id,
+                    'status': 'approved',
+                    'date_created': _iso(charged_at),
+                    'date_approved': _iso(charged_at),
+                    'transaction_amount': amount,
+                    'payment_method_id': 'visa',
+                    'payer': {
+                        'id': str(payer_id),
+                        'identification': {'type': 'DNI', 'number': document_number},
+                    },
+                    'card': {'cardholder': {
+                        'name': f'{payer_first_name} {payer_last_name}'.upper(),
+                        'identification': {'type': 'DNI', 'number': document_number},
+                    }},
+                }
+                invoices.append({
+                    'id': payment_id + 1,
+                    'preapproval_id': sub_id,
+                    'debit_date': _iso(charged_at),
+                    'date_created': _iso(charged_at),
+                    'transaction_amount': amount,
+                    'payment': {'id': payment_id, 'status': 'approved'},
+                })
+            self.invoices[sub_id] = invoices
+            last_charged = invoices[-1]['debit_date'] if invoices else None
+            self.subscriptions[sub_id] = {
+                'id': sub_id,
+                'preapproval_plan_id': plan_id,
+                'reason': 'La Sede',
+                'status': status,
+                'payer_id': payer_id,
+                'payer_email': payer_email,
+                'payer_first_name': payer_first_name,
+                'payer_last_name': payer_last_name,
+                'payment_method_id': 'visa',
+                'date_created': _iso(created),
+                'last_modified': _iso(last_modified or now),
+                'next_payment_date': _iso(now + timedelta(days=30)),
+                'auto_recurring': {
+                    'frequency': 1,
+                    'frequency_type': 'months',
+                    'transaction_amount': amount,
+                    'currency_id': 'ARS',
+                },
+                'summarized': {
+                    'charged_quantity': charges,
+                    'last_charged_date': last_charged,
+                    'last_charged_amount': amount if charges else None,
+                },
+            }
+            return sub_id
+
+    def update_subscription(self, sub_id, **changes):
+        """Change a subscription the way MP does: last_modified moves to now."""
+        with self._lock:
+            self.subscriptions[sub_id].update(changes, last_modified=_iso(_now()))
+
+    def handle(self, method, url, params=None):
+        path = urlsplit(url).path.rstrip('/')
+        params = params or {}
+        with self._lock:
+            self.requests[f'{method} {self._route_name(path)}'] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if method != 'GET':
+            return 405, {'message': 'method not supported by the fake'}
+        with self._lock:
+            return self._get(path, params)
+
+    @staticmethod
+    def _route_name(path):
+        parts = path.strip('/').split('/')
+        if parts[-1] == 'search':
+            return path
+        return '/'.join(parts[:-1]) + '/{id}'
+
+    def _get(self, path, params):
+        if path == '/preapproval/search':
+            results = list(self.subscriptions.values())
+            if params.get('range') == 'last_modified':
+                begin, end = _parse(params.get('begin_date')), _parse(params.get('end_date'))
+                results = [sub for sub in results if begin <= _parse(sub['last_modified']) <= end]
+            if params.get('preapproval_plan_id'):
+                results = [sub for sub in results if sub['preapproval_plan_id'] == params['preapproval_plan_id']]
+            return 200, _page(results, params)
+        if path.startswith('/preapproval/'):
+            sub = self.subscriptions.get(path.rsplit('/', 1)[-1])
+            return (200, dict(sub)) if sub else (404, {'message': 'preapproval not found'})
+        if path == '/authorized_payments/search':
+            return 200, _page(self.invoices.get(params.get('preapproval_id'), []), params, default_limit=10)
+        if path == '/v1/payments/search':
+            payer_id = str(params.get('payer.id') or '')
+            results = [payment for payment in self.payments.values() if payment['payer']['id'] == payer_id]
+            results.sort(key=lambda payment: payment['date_created'], reverse=params.get('criteria') == 'desc')
+            return 200, _page(results, params)
+        if path.startswith('/v1/payments/'):
+            payment = self.payments.get(path.rsplit('/', 1)[-1])
+            return (200, payment) if payment else (404, {'message': 'payment not found'})
+        if path.startswith('/v1/customers/'):
+            customer = self.customers.get(path.rsplit('/', 1)[-1])
+            return (200, customer) if customer else (404, {'message': 'customer not found'})
+        return 404, {'message': f'{path} not implemented by the fake'}
+
+    @property
+    def http_client(self):
+        return FakeHttpClient(self)
+
+
+class FakeHttpClient(HttpClient):
+    """The SDK's HttpClient answered by a FakeMercadoPago instead of the network."""
+
+    def __init__(self, fake):
+        self.fake = fake
+
+    def request(self, method, url, params=None, **kwargs):
+        status, body = self.fake.handle(method, url, params)
+        return {'status': status, 'response': body}
+
+    def get(self, url, headers, params=None, timeout=None, maxretries=None):
+        return self.request('GET', url, params=params)
+
+    def post(self, url, headers, data=None, params=None, timeout=None, maxretries=None):
+        return self.request('POST', url, params=params)
+
+    def put(self, url, headers, data=None, params=None, timeout=None, maxretries=None):
+        return self.request('PUT', url, params=params)
+
+    def delete(self, url, headers, params=None, timeout=None, maxretries=None):
+        return self.request('DELETE', url, params=params)
+
+
+fake_mercadopago = FakeMercadoPago()
@@ -1,10 +1,11 @@
 import logging
 import os
-import random
 import re
 import time
 import unicodedata
+from collections import Counter, defaultdict
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from difflib import SequenceMatcher
 from datetime import datetime, timedelta
 from decimal import Decimal, InvalidOperation
@@ -17,10 +18,12 @@ from django.utils.dateparse import parse_datetime
 
 from user_profile.models import (
     Profile,
+    SedeMatchIndexEntry,
     SedeSubscription,
     SedeSubscriptionPlan,
     SedeUnmatchedSubscription,
 )
+from utils.mercadopago_api import call_with_backoff
 
 logger = logging.getLogger(__name__)
 
@@ -29,11 +32,16 @@ LAST_NAME_SIMILARITY_THRESHOLD = 0.85
 FIRST_NAME_SIMILARITY_THRESHOLD = 0.90
 SUBSCRIPTION_PAYMENTS_LOOKBACK_DAYS = 375
 ALL_HINT_SOURCES = {'subscription', 'customer', 'payment', 'invoice'}
-API_RETRY_ATTEMPTS = 4
-API_RETRY_BASE_SECONDS = 0.75
 PAYMENT_FETCH_WORKERS = int(os.environ.get('SEDE_SYNC_PAYMENT_FETCH_WORKERS', '4'))
 SUBSCRIPTION_SYNC_WORKERS = int(os.environ.get('SEDE_SYNC_SUBSCRIPTION_WORKERS', '8'))
 PREAPPROVAL_FETCH_WORKERS = int(os.environ.get('SEDE_SYNC_PREAPPROVAL_FETCH_WORKERS', '6'))
+# Upper bound for any worker pool above; throughput is bounded by MERCADOPAGO_API_RATE_PER_SECOND anyway.
+MAX_SYNC_WORKERS = int(os.environ.get('SEDE_SYNC_MAX_WORKERS', '12'))
+# Incremental runs re-read this much before the last sync start to cover clock skew and in-flight writes.
+INCREMENTAL_OVERLAP_MINUTES = int(os.environ.get('SEDE_SYNC_INCREMENTAL_OVERLAP_MINUTES', '15'))
+SYNC_CHECKPOINT_NAME = 'sede_sync'
+# In-memory MercadoPago (user_profile.services.fake_mercadopago) for local runs and benchmarks.
+FAKE_MERCADOPAGO = os.environ.get('SEDE_SYNC_FAKE_MERCADOPAGO', 'False') == 'True'
 FORCED_ACTIVE_SUBSCRIPTION_IDS = {'0fe8d0c8034d4802aab2057e4a46907f'}
 
 PAYMENT_METHOD_LABELS = {
@@ -247,43 +255,16 @@ def parse_mp_datetime(value):
 
 
 def get_mp_sdk():
-    return mercadopago.SDK(settings.MERCADOPAGO['ACCESS_TOKEN'])
-
+    if FAKE_MERCADOPAGO:
+        from user_profile.services.fake_mercadopago import fake_mercadopago
 
-def _retry_delay_seconds(attempt, response=None):
-    # Honor Retry-After if SDK exposes headers, otherwise exponential backoff + jitter.
-    headers = (response or {}).get('headers') or {}
-    retry_after = headers.get('Retry-After') or headers.get('retry-after')
-    if retry_after:
-        try:
-            return float(retry_after)
-        except (TypeError, ValueError):
-            pass
-    return API_RETRY_BASE_SECONDS * (2 ** attempt) + random.uniform(0, 0.25)
+        return mercadopago.SDK('fake-access-token', http_client=fake_mercadopago.http_client)
+    return mercadopago.SDK(settings.MERCADOPAGO['ACCESS_TOKEN'])
 
 
 def _call_with_backoff(search_fn, params):
-    last_response = None
-    for attempt in range(API_RETRY_ATTEMPTS):
-        response = search_fn(params)
-        status = response.get('status')
-        last_response = response
-        if status == 200:
-            return response
-        if status in (429, 500, 502, 503, 504):
-            delay = _retry_delay_seconds(attempt, response=response)
-            logger.warning(
-                'MP transient error %s for %s. Retry %d/%d in %.2fs',
-                status,
-                params,
-                attempt + 1,
-                API_RETRY_ATTEMPTS,
-                delay,
-            )
-            time.sleep(delay)
-            continue
-        return response
-    return last_response or {'status': 500, 'response': {'message': 'No response'}}
+    # Rate limit por host y backoff compartidos con el cron de pagos (utils.mercadopago_api).
+    return call_with_backoff(search_fn, params)
 
 
 def _paginated_search(search_fn, filters, limit=50):
@@ -307,21 +288,49 @@ def _paginated_search(search_fn, filters, limit=50):
     return results
 
 
-def fetch_all_subscriptions(sdk=None, plan_ids=None):
-    """Fetch every subscription on the MercadoPago account."""
+def _modified_since_filters(modified_since):
+    # Same range/begin_date/end_date filters the MP search endpoints take for date columns.
+    return {
+        'range': 'last_modified',
+        'begin_date': timezone.localtime(modified_since).isoformat(timespec='seconds'),
+        'end_date': 'NOW',
+    }
+
+
+def _is_modified_since(subscription, modified_since):
+    last_modified = parse_mp_datetime(subscription.get('last_modified'))
+    return last_modified is None or last_modified >= modified_since
+
+
+def fetch_all_subscriptions(sdk=None, plan_ids=None, modified_since=None):
+    """
+    Fetch every subscription on the MercadoPago account, or only the ones modified
+    since `modified_since` when given.
+    """
     sdk = sdk or get_mp_sdk()
     seen_ids = set()
     subscriptions = []
     allowed_plan_ids = set(plan_ids or [])
     page_limit = 50
+    filters = _modified_since_filters(modified_since) if modified_since else {}
 
     # Fetch first page to learn total and then request remaining pages concurrently.
     first_response = _call_with_backoff(
         sdk.preapproval().search,
-        {'limit': page_limit, 'offset': 0},
+        {**filters, 'limit': page_limit, 'offset': 0},
     )
+    if first_response.get('status') != 200 and filters:
+        # Date filters rejected: page through everything and filter by last_modified below.
+        logger.warning('MP preapproval search rejected date filters (%s), fetching all', first_response.get('status'))
+        filters = {}
+        first_response = _call_with_backoff(
+            sdk.preapproval().search,
+            {'limit': page_limit, 'offset': 0},
+        )
     if first_response.get('status') != 200:
         logger.warning('MP preapproval search first page failed: %s', first_response)
+        if modified_since:
+            raise RuntimeError(f'MP preapproval search failed: {first_response.get("status")}')
         return subscriptions
 
     first_data = first_response.get('response', {}) or {}
@@ -330,9 +339,10 @@ def fetch_all_subscriptions(sdk=None, plan_ids=None):
     total = int(paging.get('total') or len(first_batch))
 
     all_items = list(first_batch)
+    failed_offsets = []
     remaining_offsets = list(range(page_limit, total, page_limit))
     if remaining_offsets:
-        workers = max(1, min(PREAPPROVAL_FETCH_WORKERS, len(remaining_offsets), 10))
+        workers = max(1, min(PREAPPROVAL_FETCH_WORKERS, len(remaining_offsets), MAX_SYNC_WORKERS))
         logger.info(
             'Fetching %d remaining preapproval page(s) with %d worker(s)',
             len(remaining_offsets),
@@ -342,7 +352,7 @@ def fetch_all_subscriptions(sdk=None, plan_ids=None):
         def fetch_offset(offset):
             response = _call_with_backoff(
                 sdk.preapproval().search,
-                {'limit': page_limit, 'offset': offset},
+                {**filters, 'limit': page_limit, 'offset': offset},
             )
             return offset, response
 
@@ -354,19 +364,27 @@ def fetch_all_subscriptions(sdk=None, plan_ids=None):
                     _, response = future.result()
                 except Exception:
                     logger.exception('Failed to fetch preapproval page offset=%s', offset)
+                    failed_offsets.append(offset)
                     continue
 
                 if response.get('status') != 200:
                     logger.warning('MP preapproval search failed at offset=%s: %s', offset, response.get('status'))
+                    failed_offsets.append(offset)
                     continue
                 batch = (response.get('response', {}) or {}).get('results', []) or []
                 all_items.extend(batch)
 
+    if modified_since and failed_offsets:
+        # A skipped page would be lost for good once the incremental watermark moves past it.
+        raise RuntimeError(f'MP preapproval search failed at offsets {sorted(failed_offsets)}')
+
     for item in all_items:
         sub_id = item.get('id')
         plan_id = item.get('preapproval_plan_id') or ''
         if allowed_plan_ids and plan_id not in allowed_plan_ids:
             continue
+        if modified_since and not _is_modified_since(item, modified_since):
+            continue
         if sub_id and sub_id not in seen_ids:
             seen_ids.add(sub_id)
             subscriptions.append(item)
@@ -374,41 +392,113 @@ def fetch_all_subscriptions(sdk=None, plan_ids=None):
     return subscriptions
 
 
+def _user_emails(user, email_addresses):
+    emails = {user.email.strip().lower()} if user.email else set()
+    emails.update(
+        email_obj.email.strip().lower()
+        for email_obj in email_addresses
+        if getattr(email_obj, 'email', None)
+    )
+    return sorted(emails)
+
+
+def _match_index_values(profile, email_addresses):
+    user = profile.user
+    return {
+        'first_name': normalize_name(user.first_name),
+        'last_name': normalize_name(user.last_name),
+        'document_number': normalize_document_number(profile.document_number),
+        'emails': _user_emails(user, email_addresses),
+    }
+
+
+MATCH_INDEX_FIELDS = ['first_name', 'last_name', 'document_number', 'emails']
+
+
+def index_user_for_sede_match(user):
+    """
+    Refresh the persisted match index row for one user (called from the Profile,
+    User and EmailAddress signals). Writes only when a normalized value changed.
+    """
+    profile = Profile.objects.filter(user=user).select_related('user').first()
+    if profile is None:
+        SedeMatchIndexEntry.objects.filter(user=user).delete()
+        return None
+
+    values = _match_index_values(profile, user.emailaddress_set.all())
+    entry = SedeMatchIndexEntry.objects.filter(user=user).first()
+    if entry is None:
+        return SedeMatchIndexEntry.objects.create(user=user, **values)
+    if any(getattr(entry, field) != value for field, value in values.items()):
+        for field, value in values.items():
+            setattr(entry, field, value)
+        entry.save(update_fields=[*MATCH_INDEX_FIELDS, 'updated_at'])
+    return entry
+
+
+def rebuild_sede_match_index(log=None):
+    """
+    Recompute every match index row from Profile/User/EmailAddress. The full sync
+    runs this as a guardrail for writes that bypass signals (queryset updates, raw SQL).
+    """
+    log = log or logger
+    existing = SedeMatchIndexEntry.objects.in_bulk(field_name='user_id')
+    seen_user_ids = set()
+    to_create = []
+    to_update = []
+    now = timezone.now()
+    try:
+        profiles_qs = Profile.objects.select_related('user').prefetch_related('user__emailaddress_set')
+        for profile in profiles_qs.iterator(chunk_size=500):
+            # Use prefetched related objects to avoid one query per user (N+1).
+            values = _match_index_values(profile, profile.user.emailaddress_set.all())
+            seen_user_ids.add(profile.user_id)
+            entry = existing.get(profile.user_id)
+            if entry is None:
+                to_create.append(SedeMatchIndexEntry(user_id=profile.user_id, **values))
+            elif any(getattr(entry, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(entry, field, value)
+                entry.updated_at = now
+                to_update.append(entry)
+    except DatabaseError:
+        log.exception('Database error while rebuilding user match index')
+        raise
+
+    stale_user_ids = set(existing) - seen_user_ids
+    if stale_user_ids:
+        SedeMatchIndexEntry.objects.filter(user_id__in=stale_user_ids).delete()
+    SedeMatchIndexEntry.objects.bulk_create(to_create, batch_size=500)
+    SedeMatchIndexEntry.objects.bulk_update(to_update, [*MATCH_INDEX_FIELDS, 'updated_at'], batch_size=500)
+    summary = {'created': len(to_create), 'updated': len(to_update), 'deleted': len(stale_user_ids)}
+    log.info('User match index rebuilt: %s', summary)
+    return summary
+
+
 def build_user_match_index():
+    """Load the persisted match index (kept current by signals) into lookup dicts."""
     by_email = {}
     by_document = {}
     by_name = []
 
     log = logger
-    log.info('Loading profiles for match index...')
+    if not SedeMatchIndexEntry.objects.exists():
+        rebuild_sede_match_index(log=log)
+
+    log.info('Loading user match index...')
     try:
-        profiles_qs = Profile.objects.select_related('user').prefetch_related('user__emailaddress_set')
-        processed = 0
-        for profile in profiles_qs.iterator(chunk_size=500):
-            user = profile.user
-            emails = {user.email.strip().lower()} if user.email else set()
-            # Use prefetched related objects to avoid one query per user (N+1).
-            emails.update(
-                email_obj.email.strip().lower()
-                for email_obj in user.emailaddress_set.all()
-                if getattr(email_obj, 'email', None)
-            )
-            for email in emails:
+        entries = SedeMatchIndexEntry.objects.select_related('user').order_by('user_id')
+        for entry in entries.iterator(chunk_size=2000):
+            user = entry.user
+            for email in entry.emails:
                 by_email[email] = user
-
-            normalized_document = normalize_document_number(profile.document_number)
-            if normalized_document:
-                by_document[normalized_document] = user
-
+            if entry.document_number:
+                by_document[entry.document_number] = user
             by_name.append({
                 'user': user,
-                'first_name': normalize_name(user.first_name),
-                'last_name': normalize_name(user.last_name),
+                'first_name': entry.first_name,
+                'last_name': entry.last_name,
             })
-
-            processed += 1
-            if processed % 200 == 0:
-                log.info('  Indexed %d profiles...', processed)
     except DatabaseError:
         log.exception('Database error while building user match index')
         raise
@@ -417,6 +507,7 @@ def build_user_match_index():
         'by_email': by_email,
         'by_document': by_document,
         'by_name': by_name,
+        'name_blocks': build_name_blocks(by_name),
     }
 
 
@@ -526,7 +617,7 @@ def fetch_subscription_recent_payments(sdk, subscription_id, log=None, lookback_
 
     payments = []
     if payment_ids:
-        worker_count = max(1, min(PAYMENT_FETCH_WORKERS, len(payment_ids), 6))
+        worker_count = max(1, min(PAYMENT_FETCH_WORKERS, len(payment_ids), MAX_SYNC_WORKERS))
         log.info('  Fetching %d payment detail(s) with %d worker(s)', len(payment_ids), worker_count)
 
         def fetch_payment(payment_id):
@@ -593,7 +684,7 @@ def fetch_recent_payer_payments(sdk, payer_id, log=None, limit=40):
 def _resolve_subscription_prefetch_worker_count(total_subscriptions):
     if total_subscriptions <= 0:
         return 1
-    return max(1, min(SUBSCRIPTION_SYNC_WORKERS, total_subscriptions, 12))
+    return max(1, min(SUBSCRIPTION_SYNC_WORKERS, total_subscriptions, MAX_SYNC_WORKERS))
 
 
 def _prefetch_subscription_remote_data(subscription_summary, log=None, include_payments=True):
@@ -772,22 +863,129 @@ def _find_user_by_document(document_number, user_index):
     return user_index['by_document'].get(normalized)
 
 
+def _name_trigrams(name):
+    # Padded so that short names and word edges produce trigrams too ('$' never survives normalize_name).
+    padded = f'$${name}$$'
+    return Counter(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _max_similar_length(length, threshold):
+    # ratio = 2M / (len_a + len_b) <= 2 * len_a / (len_a + len_b), so len_b <= len_a * (2 - t) / t.
+    return int(length * (2 - threshold) / threshold + 1e-9)
+
+
+def _min_shared_trigrams(length, threshold):
+    """
+    Lower bound on the padded trigrams a name of this length shares with any name
+    whose SequenceMatcher ratio against it reaches `threshold`. The ratio bounds
+    the insertions + deletions between both (and so the edit distance) to
+    (1 - t) * (len_a + len_b); each edit breaks at most 3 trigrams (q-gram lemma).
+    """
+    max_edits = int((1 - threshold) * (length + _max_similar_length(length, threshold)) + 1e-9)
+    return length + 2 - 3 * max_edits
+
+
+def build_name_blocks(by_name):
+    """
+    Inverted index of last-name trigrams for user_index['by_name']. Works on the
+    distinct last names (many people share one), each with its by_name positions.
+    """
+    name_ids = {}
+    last_names = []
+    positions = []
+    postings = defaultdict(list)
+    for position, candidate in enumerate(by_name):
+        last_name = candidate['last_name']
+        if not last_name:
+            continue
+        name_id = name_ids.get(last_name)
+        if name_id is None:
+            name_id = name_ids[last_name] = len(last_names)
+            last_names.append(last_name)
+            positions.append([])
+            for trigram, count in _name_trigrams(last_name).items():
+                postings[trigram].append((name_id, count))
+        positions[name_id].append(position)
+    return {'last_names': last_names, 'positions': positions, 'postings': dict(postings)}
+
+
+def _name_candidates(target_last, name_blocks):
+    """
+    Ids of the distinct last names in name_blocks that can reach the similarity
+    threshold against target_last. Exact pre-filter: whatever it drops would have
+    failed the threshold in a full scan too.
+    """
+    last_names = name_blocks['last_names']
+    length = len(target_last)
+    min_length = length * LAST_NAME_SIMILARITY_THRESHOLD / (2 - LAST_NAME_SIMILARITY_THRESHOLD) - 1e-9
+    max_length = _max_similar_length(length, LAST_NAME_SIMILARITY_THRESHOLD)
+    min_shared = _min_shared_trigrams(length, LAST_NAME_SIMILARITY_THRESHOLD)
+    if min_shared <= 0:
+        return [
+            name_id for name_id, last_name in enumerate(last_names)
+            if min_length <= len(last_name) <= max_length
+        ]
+
+    shared = Counter()
+    for trigram, count in _name_trigrams(target_last).items():
+        for name_id, candidate_count in name_blocks['postings'].get(trigram, ()):
+            shared[name_id] += min(count, candidate_count)
+    return [
+        name_id for name_id, total in shared.items()
+        if total >= min_shared and min_length <= len(last_names[name_id]) <= max_length
+    ]
+
+
 def _find_user_by_name(first_name, last_name, user_index):
     target_last = normalize_name(last_name)
     target_first = normalize_name(first_name)
     if not target_last:
         return None, 0.0
 
+    name_blocks = user_index.get('name_blocks')
+    if name_blocks is None:
+        return _best_name_match(target_first, target_last, user_index['by_name'])
+
+    last_sims = {}
+    positions = []
+    for name_id in _name_candidates(target_last, name_blocks):
+        candidate_last = name_blocks['last_names'][name_id]
+        last_sim = name_similarity(target_last, candidate_last)
+        if last_sim >= LAST_NAME_SIMILARITY_THRESHOLD:
+            last_sims[candidate_last] = last_sim
+            positions.extend(name_blocks['positions'][name_id])
+    # by_name order, so ties resolve to the same user as a full scan
+    by_name = user_index['by_name']
+    candidates = (by_name[position] for position in sorted(positions))
+    return _best_name_match(target_first, target_last, candidates, last_sims=last_sims)
+
+
+def _find_user_by_name_scan(first_name, last_name, user_index):
+    """Score every entry, without the trigram pre-filter (reference for benchmark_sede_name_match)."""
+    target_last = normalize_name(last_name)
+    target_first = normalize_name(first_name)
+    if not target_last:
+        return None, 0.0
+    return _best_name_match(target_first, target_last, user_index['by_name'])
+
+
+def _best_name_match(target_first, target_last, candidates, last_sims=None):
     best_user = None
     best_score = 0.0
+    first_sims = {}
 
-    for candidate in user_index['by_name']:
-        last_sim = name_similarity(target_last, candidate['last_name'])
+    for candidate in candidates:
+        if last_sims is not None:
+            last_sim = last_sims[candidate['last_name']]
+        else:
+            last_sim = name_similarity(target_last, candidate['last_name'])
         if last_sim < LAST_NAME_SIMILARITY_THRESHOLD:
             continue
 
         if target_first and candidate['first_name']:
-            first_sim = name_similarity(target_first, candidate['first_name'])
+            first_sim = first_sims.get(candidate['first_name'])
+            if first_sim is None:
+                first_sim = first_sims[candidate['first_name']] = name_similarity(target_first, candidate['first_name'])
         elif not target_first or not candidate['first_name']:
             first_sim = 1.0
         else:
@@ -1358,6 +1556,15 @@ def _process_subscription(
     return result, sub_id if active else None, details or {}
 
 
+def _apply_new_candidate_match(profile, result, details):
+    match_method = result['match_method']
+    if match_method == 'subscription_id':
+        # Matched because the subscription row already exists: keep how it was linked originally.
+        existing = SedeSubscription.objects.filter(subscription_id=result['subscription_id']).only('matched_via').first()
+        match_method = (existing and existing.matched_via) or 'subscription_id'
+    apply_subscription_to_profile(profile, details, match_method=match_method)
+
+
 def _update_existing_non_authorized_subscription(sdk, subscription_summary, log):
     sub_id = subscription_summary.get('id') or ''
     if not sub_id:
@@ -1481,15 +1688,72 @@ def run_match_audit(log=None):
     }
 
 
+class _PhaseTimer:
+    """Wall time per sync phase; a phase can be entered several times and accumulates."""
+
+    PHASES = ('plan_refresh', 'fetch', 'match', 'apply')
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(self.PHASES, 0.0)
+
+    @contextmanager
+    def __call__(self, phase):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[phase] += time.perf_counter() - started
+
+    def as_dict(self):
+        return {f'{phase}_seconds': round(seconds, 2) for phase, seconds in self.seconds.items()}
+
+
+def _load_sync_checkpoint():
+    from tickets.models import CronCheckpoint
+
+    return CronCheckpoint.load(SYNC_CHECKPOINT_NAME)
+
+
 def run_full_sync(log=None):
     """Sync all MercadoPago subscriptions with platform users. Returns summary dict."""
+    return _run_sync(log=log)
+
+
+def run_incremental_sync(log=None, modified_since=None):
+    """
+    Sync only the subscriptions MercadoPago modified since `modified_since`, by
+    default the start of the last successful sync (full or incremental). Falls
+    back to a full sync when there is none yet.
+    """
+    log = log or logger
+    if modified_since is None:
+        last_synced_at = parse_datetime(_load_sync_checkpoint().cursor.get('synced_at') or '')
+        if last_synced_at is None:
+            log.info('No previous La Sede sync recorded, running a full sync')
+            return _run_sync(log=log)
+        modified_since = last_synced_at - timedelta(minutes=INCREMENTAL_OVERLAP_MINUTES)
+    return _run_sync(log=log, modified_since=modified_since)
+
+
+def _run_sync(log=None, modified_since=None):
+    """
+    Full sync when modified_since is None. Otherwise only subscriptions modified
+    since then are fetched and applied; plan counts, the detail-truth pass and
+    stale deactivation need the whole account, so they are left to the full sync.
+    """
     log = log or logger
+    incremental = modified_since is not None
     sync_started = time.perf_counter()
+    sync_started_at = timezone.now()
+    timer = _PhaseTimer()
     log.info('=' * 80)
-    log.info('La Sede membership sync started')
+    if incremental:
+        log.info('La Sede membership sync started (incremental, modified since %s)', modified_since.isoformat())
+    else:
+        log.info('La Sede membership sync started')
 
     access_token = settings.MERCADOPAGO.get('ACCESS_TOKEN')
-    if not access_token:
+    if not access_token and not FAKE_MERCADOPAGO:
         log.error('MERCADOPAGO_ACCESS_TOKEN not configured')
         return {'error': 'MERCADOPAGO_ACCESS_TOKEN not configured'}
 
@@ -1500,7 +1764,8 @@ def run_full_sync(log=None):
 
     log.info('Fetching subscriptions from MercadoPago...')
     fetch_started = time.perf_counter()
-    subscriptions = fetch_all_subscriptions(sdk, plan_ids=plan_ids)
+    with timer('fetch'):
+        subscriptions = fetch_all_subscriptions(sdk, plan_ids=plan_ids, modified_since=modified_since)
     soft_removed_skipped = 0
     soft_removed_reactivated = 0
     soft_removed_records = SedeSubscription.objects.filter(is_soft_removed=True).in_bulk(field_name='subscription_id')
@@ -1515,11 +1780,12 @@ def run_full_sync(log=None):
                 'Checking %d soft-removed subscription(s) for new payments...',
                 len(soft_removed_candidates),
             )
-            soft_removed_payloads = _prefetch_subscription_remote_map(
-                soft_removed_candidates,
-                log=log,
-                include_payments=False,
-            )
+            with timer('fetch'):
+                soft_removed_payloads = _prefetch_subscription_remote_map(
+                    soft_removed_candidates,
+                    log=log,
+                    include_payments=False,
+                )
             for subscription_summary in soft_removed_candidates:
                 sub_id = str(subscription_summary.get('id') or '')
                 existing_subscription = soft_removed_records.get(sub_id)
@@ -1533,11 +1799,12 @@ def run_full_sync(log=None):
                 previous_last_payment = existing_subscription.last_payment_date
                 latest_last_payment = details.get('last_payment_date')
                 if latest_last_payment and latest_last_payment != previous_last_payment:
-                    apply_subscription_to_profile(
-                        existing_subscription.profile,
-                        details,
-                        match_method=existing_subscription.matched_via or 'subscription_id',
-                    )
+                    with timer('apply'):
+                        apply_subscription_to_profile(
+                            existing_subscription.profile,
+                            details,
+                            match_method=existing_subscription.matched_via or 'subscription_id',
+                        )
                     soft_removed_reactivated_ids.add(sub_id)
                     soft_removed_reactivated += 1
         soft_removed_skipped = sum(
@@ -1555,7 +1822,10 @@ def run_full_sync(log=None):
         subscriptions = [
             sub for sub in subscriptions if str(sub.get('id') or '') not in (soft_removed_ids - soft_removed_reactivated_ids)
         ]
-    refreshed_plans = _upsert_subscription_plans(_build_plan_catalog(subscriptions), log=log)
+    refreshed_plans = 0
+    if not incremental:
+        with timer('plan_refresh'):
+            refreshed_plans = _upsert_subscription_plans(_build_plan_catalog(subscriptions), log=log)
     authorized_subscriptions = [
         sub for sub in subscriptions if (sub.get('status') or '').lower() == 'authorized'
     ]
@@ -1606,114 +1876,122 @@ def run_full_sync(log=None):
     )
 
     if known_matched_subscriptions:
-        known_payloads = _prefetch_subscription_remote_map(
-            known_matched_subscriptions,
-            log=log,
-            include_payments=False,
-        )
-        now = timezone.now()
-        matched_updates = []
-        for subscription_summary in known_matched_subscriptions:
-            sub_id = subscription_summary.get('id', '')
-            existing_subscription = existing_subscriptions.get(sub_id)
-            payload = known_payloads.get(sub_id, {})
-            if payload.get('error'):
-                error_count += 1
-                log.warning('  Known matched preload failed for %s: %s', sub_id, payload.get('error'))
-                continue
-
-            details = _extract_subscription_details(
-                subscription_summary,
-                payload.get('detail') or subscription_summary,
-            )
-            defaults = _build_subscription_defaults(
-                details,
-                match_method=existing_subscription.matched_via or 'subscription_id',
-            )
-            for field, value in defaults.items():
-                setattr(existing_subscription, field, value)
-            existing_subscription.synced_at = now
-            existing_subscription.updated_at = now
-            matched_updates.append(existing_subscription)
-            _sync_duplicate_alias_rows(sub_id, defaults, match_method=defaults['matched_via'])
-            matched_count += 1
-            _clear_unmatched_subscription(sub_id)
-            if existing_subscription.is_active:
-                active_subscription_ids.append(sub_id)
-
-        if matched_updates:
-            SedeSubscription.objects.bulk_update(
-                matched_updates,
-                fields=[
-                    'plan_id',
-                    'tier_name',
-                    'status',
-                    'payment_method',
-                    'last_payment_date',
-                    'last_payment_amount',
-                    'next_payment_date',
-                    'member_since',
-                    'is_active',
-                    'matched_via',
-                    'synced_at',
-                    'updated_at',
-                ],
+        with timer('fetch'):
+            known_payloads = _prefetch_subscription_remote_map(
+                known_matched_subscriptions,
+                log=log,
+                include_payments=False,
             )
+        with timer('apply'):
+            now = timezone.now()
+            matched_updates = []
+            for subscription_summary in known_matched_subscriptions:
+                sub_id = subscription_summary.get('id', '')
+                existing_subscription = existing_subscriptions.get(sub_id)
+                payload = known_payloads.get(sub_id, {})
+                if payload.get('error'):
+                    error_count += 1
+                    log.warning('  Known matched preload failed for %s: %s', sub_id, payload.get('error'))
+                    continue
+
+                details = _extract_subscription_details(
+                    subscription_summary,
+                    payload.get('detail') or subscription_summary,
+                )
+                defaults = _build_subscription_defaults(
+                    details,
+                    match_method=existing_subscription.matched_via or 'subscription_id',
+                )
+                for field, value in defaults.items():
+                    setattr(existing_subscription, field, value)
+                existing_subscription.synced_at = now
+                existing_subscription.updated_at = now
+                matched_updates.append(existing_subscription)
+                _sync_duplicate_alias_rows(sub_id, defaults, match_method=defaults['matched_via'])
+                matched_count += 1
+                _clear_unmatched_subscription(sub_id)
+                if existing_subscription.is_active:
+                    active_subscription_ids.append(sub_id)
+
+            if matched_updates:
+                SedeSubscription.objects.bulk_update(
+                    matched_updates,
+                    fields=[
+                        'plan_id',
+                        'tier_name',
+                        'status',
+                        'payment_method',
+                        'last_payment_date',
+                        'last_payment_amount',
+                        'next_payment_date',
+                        'member_since',
+                        'is_active',
+                        'matched_via',
+                        'synced_at',
+                        'updated_at',
+                    ],
+                )
         log.info('Updated %d known matched subscription(s) via bulk update', len(matched_updates))
 
     if known_unmatched_subscriptions:
-        now = timezone.now()
-        unmatched_updates = []
-        for subscription_summary in known_unmatched_subscriptions:
-            sub_id = subscription_summary.get('id', '')
-            unmatched = existing_unmatched.get(sub_id)
-            if not unmatched:
-                continue
-            unmatched.plan_id = subscription_summary.get('preapproval_plan_id') or unmatched.plan_id or ''
-            unmatched.tier_name = subscription_summary.get('reason') or unmatched.tier_name or ''
-            unmatched.status = subscription_summary.get('status') or unmatched.status or ''
-            unmatched.payer_id = str(subscription_summary.get('payer_id') or unmatched.payer_id or '')
-            unmatched.payer_email = subscription_summary.get('payer_email') or unmatched.payer_email or ''
-            unmatched.payer_first_name = subscription_summary.get('payer_first_name') or unmatched.payer_first_name or ''
-            unmatched.payer_last_name = subscription_summary.get('payer_last_name') or unmatched.payer_last_name or ''
-            unmatched.last_seen_at = now
-            unmatched.updated_at = now
-            unmatched_updates.append(unmatched)
-
-        if unmatched_updates:
-            SedeUnmatchedSubscription.objects.bulk_update(
-                unmatched_updates,
-                fields=[
-                    'plan_id',
-                    'tier_name',
-                    'status',
-                    'payer_id',
-                    'payer_email',
-                    'payer_first_name',
-                    'payer_last_name',
-                    'last_seen_at',
-                    'updated_at',
-                ],
-            )
+        with timer('apply'):
+            now = timezone.now()
+            unmatched_updates = []
+            for subscription_summary in known_unmatched_subscriptions:
+                sub_id = subscription_summary.get('id', '')
+                unmatched = existing_unmatched.get(sub_id)
+                if not unmatched:
+                    continue
+                unmatched.plan_id = subscription_summary.get('preapproval_plan_id') or unmatched.plan_id or ''
+                unmatched.tier_name = subscription_summary.get('reason') or unmatched.tier_name or ''
+                unmatched.status = subscription_summary.get('status') or unmatched.status or ''
+                unmatched.payer_id = str(subscription_summary.get('payer_id') or unmatched.payer_id or '')
+                unmatched.payer_email = subscription_summary.get('payer_email') or unmatched.payer_email or ''
+                unmatched.payer_first_name = subscription_summary.get('payer_first_name') or unmatched.payer_first_name or ''
+                unmatched.payer_last_name = subscription_summary.get('payer_last_name') or unmatched.payer_last_name or ''
+                unmatched.last_seen_at = now
+                unmatched.updated_at = now
+                unmatched_updates.append(unmatched)
+
+            if unmatched_updates:
+                SedeUnmatchedSubscription.objects.bulk_update(
+                    unmatched_updates,
+                    fields=[
+                        'plan_id',
+                        'tier_name',
+                        'status',
+                        'payer_id',
+                        'payer_email',
+                        'payer_first_name',
+                        'payer_last_name',
+                        'last_seen_at',
+                        'updated_at',
+                    ],
+                )
         unmatched_count += len(known_unmatched_subscriptions)
         log.info('Refreshed %d known unmatched subscription(s) without rematching', len(unmatched_updates))
 
     if new_candidate_subscriptions:
-        log.info('Building user match index for new authorized candidates...')
-        user_index = build_user_match_index()
-        log.info(
-            'User index ready: %d emails, %d documents, %d name entries',
-            len(user_index['by_email']),
-            len(user_index['by_document']),
-            len(user_index['by_name']),
-        )
+        with timer('match'):
+            log.info('Loading user match index for new authorized candidates...')
+            if not incremental:
+                rebuild_sede_match_index(log=log)
+            user_index = build_user_match_index()
+            log.info(
+                'User index ready: %d emails, %d documents, %d name entries',
+                len(user_index['by_email']),
+                len(user_index['by_document']),
+                len(user_index['by_name']),
+            )
         assigned_users = {}
-        preloaded_new_candidates = _prefetch_subscription_remote_map(
-            new_candidate_subscriptions,
-            log=log,
-            include_payments=True,
-        )
+        with timer('fetch'):
+            preloaded_new_candidates = _prefetch_subscription_remote_map(
+                new_candidate_subscriptions,
+                log=log,
+                include_payments=True,
+            )
 
+        processed_candidates = []
         for index, subscription_summary in enumerate(new_candidate_subscriptions, start=1):
             sub_id = subscription_summary.get('id', '—')
             payer_name = ' '.join(filter(None, [
@@ -1732,28 +2010,44 @@ def run_full_sync(log=None):
             )
 
             try:
-                result, active_sub_id, details = _process_subscription(
-                    sdk,
-                    subscription_summary,
-                    user_index,
-                    assigned_users,
-                    log,
-                    preloaded_remote=preloaded_new_candidates.get(sub_id),
-                )
-                if result.get('matched'):
-                    matched_count += 1
-                    _clear_unmatched_subscription(sub_id)
-                    if active_sub_id:
-                        active_subscription_ids.append(active_sub_id)
-                elif result.get('message', '').startswith('Conflicto'):
-                    conflict_count += 1
-                    _store_unmatched_subscription(subscription_summary, details, result.get('message'))
-                else:
-                    unmatched_count += 1
-                    _store_unmatched_subscription(subscription_summary, details, result.get('message'))
+                with timer('match'):
+                    result, active_sub_id, details = _process_subscription(
+                        sdk,
+                        subscription_summary,
+                        user_index,
+                        assigned_users,
+                        log,
+                        apply_changes=False,
+                        preloaded_remote=preloaded_new_candidates.get(sub_id),
+                    )
+                processed_candidates.append((subscription_summary, result, active_sub_id, details))
             except Exception as exc:
                 error_count += 1
                 log.exception('  Error processing new subscription %s: %s', sub_id, exc)
+
+        with timer('apply'):
+            matched_profiles = Profile.objects.in_bulk(
+                [result['user_id'] for _, result, _, _ in processed_candidates if result.get('matched')],
+                field_name='user_id',
+            )
+            for subscription_summary, result, active_sub_id, details in processed_candidates:
+                sub_id = subscription_summary.get('id', '—')
+                try:
+                    if result.get('matched'):
+                        _apply_new_candidate_match(matched_profiles[result['user_id']], result, details)
+                        matched_count += 1
+                        _clear_unmatched_subscription(sub_id)
+                        if active_sub_id:
+                            active_subscription_ids.append(active_sub_id)
+                    elif result.get('message', '').startswith('Conflicto'):
+                        conflict_count += 1
+                        _store_unmatched_subscription(subscription_summary, details, result.get('message'))
+                    else:
+                        unmatched_count += 1
+                        _store_unmatched_subscription(subscription_summary, details, result.get('message'))
+                except Exception as exc:
+                    error_count += 1
+                    log.exception('  Error applying new subscription %s: %s', sub_id, exc)
     authorized_duration = time.perf_counter() - authorized_started
 
     update_only_updated = 0
@@ -1787,113 +2081,134 @@ def run_full_sync(log=None):
     )
 
     if update_known_matched:
-        known_non_auth_payloads = _prefetch_subscription_remote_map(
-            update_known_matched,
-            log=log,
-            include_payments=False,
-        )
-        now = timezone.now()
-        matched_non_auth_updates = []
-        for subscription_summary in update_known_matched:
-            sub_id = subscription_summary.get('id', '')
-            existing_subscription = update_existing_subscriptions.get(sub_id)
-            payload = known_non_auth_payloads.get(sub_id, {})
-            if payload.get('error'):
-                error_count += 1
-                log.warning('  Non-auth matched preload failed for %s: %s', sub_id, payload.get('error'))
-                continue
-
-            details = _extract_subscription_details(
-                subscription_summary,
-                payload.get('detail') or subscription_summary,
-            )
-            defaults = _build_subscription_defaults(
-                details,
-                match_method=existing_subscription.matched_via or 'subscription_id',
-            )
-            for field, value in defaults.items():
-                setattr(existing_subscription, field, value)
-            existing_subscription.synced_at = now
-            existing_subscription.updated_at = now
-            matched_non_auth_updates.append(existing_subscription)
-            _sync_duplicate_alias_rows(sub_id, defaults, match_method=defaults['matched_via'])
-            update_only_updated += 1
-            if existing_subscription.is_active:
-                active_subscription_ids.append(sub_id)
-
-        if matched_non_auth_updates:
-            SedeSubscription.objects.bulk_update(
-                matched_non_auth_updates,
-                fields=[
-                    'plan_id',
-                    'tier_name',
-                    'status',
-                    'payment_method',
-                    'last_payment_date',
-                    'last_payment_amount',
-                    'next_payment_date',
-                    'member_since',
-                    'is_active',
-                    'synced_at',
-                    'updated_at',
-                ],
+        with timer('fetch'):
+            known_non_auth_payloads = _prefetch_subscription_remote_map(
+                update_known_matched,
+                log=log,
+                include_payments=False,
             )
+        with timer('apply'):
+            now = timezone.now()
+            matched_non_auth_updates = []
+            for subscription_summary in update_known_matched:
+                sub_id = subscription_summary.get('id', '')
+                existing_subscription = update_existing_subscriptions.get(sub_id)
+                payload = known_non_auth_payloads.get(sub_id, {})
+                if payload.get('error'):
+                    error_count += 1
+                    log.warning('  Non-auth matched preload failed for %s: %s', sub_id, payload.get('error'))
+                    continue
+
+                details = _extract_subscription_details(
+                    subscription_summary,
+                    payload.get('detail') or subscription_summary,
+                )
+                defaults = _build_subscription_defaults(
+                    details,
+                    match_method=existing_subscription.matched_via or 'subscription_id',
+                )
+                for field, value in defaults.items():
+                    setattr(existing_subscription, field, value)
+                existing_subscription.synced_at = now
+                existing_subscription.updated_at = now
+                matched_non_auth_updates.append(existing_subscription)
+                _sync_duplicate_alias_rows(sub_id, defaults, match_method=defaults['matched_via'])
+                update_only_updated += 1
+                if existing_subscription.is_active:
+                    active_subscription_ids.append(sub_id)
+
+            if matched_non_auth_updates:
+                SedeSubscription.objects.bulk_update(
+                    matched_non_auth_updates,
+                    fields=[
+                        'plan_id',
+                        'tier_name',
+                        'status',
+                        'payment_method',
+                        'last_payment_date',
+                        'last_payment_amount',
+                        'next_payment_date',
+                        'member_since',
+                        'is_active',
+                        'synced_at',
+                        'updated_at',
+                    ],
+                )
         log.info('Updated %d known non-auth matched subscription(s)', len(matched_non_auth_updates))
 
     if update_known_unmatched:
-        now = timezone.now()
-        unmatched_non_auth_updates = []
-        for subscription_summary in update_known_unmatched:
-            sub_id = subscription_summary.get('id', '')
-            unmatched = update_existing_unmatched.get(sub_id)
-            if not unmatched:
-                continue
-            unmatched.plan_id = subscription_summary.get('preapproval_plan_id') or unmatched.plan_id or ''
-            unmatched.tier_name = subscription_summary.get('reason') or unmatched.tier_name or ''
-            unmatched.status = subscription_summary.get('status') or unmatched.status or ''
-            unmatched.payer_id = str(subscription_summary.get('payer_id') or unmatched.payer_id or '')
-            unmatched.payer_email = subscription_summary.get('payer_email') or unmatched.payer_email or ''
-            unmatched.payer_first_name = subscription_summary.get('payer_first_name') or unmatched.payer_first_name or ''
-            unmatched.payer_last_name = subscription_summary.get('payer_last_name') or unmatched.payer_last_name or ''
-            unmatched.last_seen_at = now
-            unmatched.updated_at = now
-            unmatched_non_auth_updates.append(unmatched)
-            update_only_updated += 1
-
-        if unmatched_non_auth_updates:
-            SedeUnmatchedSubscription.objects.bulk_update(
-                unmatched_non_auth_updates,
-                fields=[
-                    'plan_id',
-                    'tier_name',
-                    'status',
-                    'payer_id',
-                    'payer_email',
-                    'payer_first_name',
-                    'payer_last_name',
-                    'last_seen_at',
-                    'updated_at',
-                ],
-            )
+        with timer('apply'):
+            now = timezone.now()
+            unmatched_non_auth_updates = []
+            for subscription_summary in update_known_unmatched:
+                sub_id = subscription_summary.get('id', '')
+                unmatched = update_existing_unmatched.get(sub_id)
+                if not unmatched:
+                    continue
+                unmatched.plan_id = subscription_summary.get('preapproval_plan_id') or unmatched.plan_id or ''
+                unmatched.tier_name = subscription_summary.get('reason') or unmatched.tier_name or ''
+                unmatched.status = subscription_summary.get('status') or unmatched.status or ''
+                unmatched.payer_id = str(subscription_summary.get('payer_id') or unmatched.payer_id or '')
+                unmatched.payer_email = subscription_summary.get('payer_email') or unmatched.payer_email or ''
+                unmatched.payer_first_name = subscription_summary.get('payer_first_name') or unmatched.payer_first_name or ''
+                unmatched.payer_last_name = subscription_summary.get('payer_last_name') or unmatched.payer_last_name or ''
+                unmatched.last_seen_at = now
+                unmatched.updated_at = now
+                unmatched_non_auth_updates.append(unmatched)
+                update_only_updated += 1
+
+            if unmatched_non_auth_updates:
+                SedeUnmatchedSubscription.objects.bulk_update(
+                    unmatched_non_auth_updates,
+                    fields=[
+                        'plan_id',
+                        'tier_name',
+                        'status',
+                        'payer_id',
+                        'payer_email',
+                        'payer_first_name',
+                        'payer_last_name',
+                        'last_seen_at',
+                        'updated_at',
+                    ],
+                )
         log.info('Updated %d known non-auth unmatched subscription(s)', len(unmatched_non_auth_updates))
 
     update_only_ignored += len(update_new_unknown)
     non_auth_duration = time.perf_counter() - non_auth_started
 
     truth_started = time.perf_counter()
-    detail_truth_summary = _reconcile_local_subscriptions_with_remote_detail_truth(sdk, log=log)
-    active_subscription_ids = detail_truth_summary.get('active_ids', active_subscription_ids)
-    error_count += detail_truth_summary.get('errors', 0)
+    detail_truth_summary = {}
+    if not incremental:
+        detail_truth_summary = _reconcile_local_subscriptions_with_remote_detail_truth(sdk, log=log)
+        active_subscription_ids = detail_truth_summary.get('active_ids', active_subscription_ids)
+        error_count += detail_truth_summary.get('errors', 0)
     truth_duration = time.perf_counter() - truth_started
 
     deactivate_started = time.perf_counter()
-    log.info('Deactivating stale members...')
-    active_subscription_ids_for_deactivation = list(_with_duplicate_alias_ids(active_subscription_ids))
-    deactivated = _deactivate_stale_members(active_subscription_ids_for_deactivation, log)
+    deactivated = 0
+    if incremental:
+        # Unchanged subscriptions were not fetched, so "not seen" does not mean inactive.
+        active_members = SedeSubscription.objects.filter(is_active=True).count()
+    else:
+        log.info('Deactivating stale members...')
+        active_subscription_ids_for_deactivation = list(_with_duplicate_alias_ids(active_subscription_ids))
+        with timer('apply'):
+            deactivated = _deactivate_stale_members(active_subscription_ids_for_deactivation, log)
+        active_members = len(active_subscription_ids)
     deactivate_duration = time.perf_counter() - deactivate_started
     total_duration = time.perf_counter() - sync_started
 
+    if error_count:
+        log.warning('Sync finished with %d error(s); keeping the previous incremental watermark', error_count)
+    else:
+        _load_sync_checkpoint().store({
+            'synced_at': sync_started_at.isoformat(),
+            'mode': 'incremental' if incremental else 'full',
+        })
+
     summary = {
+        'mode': 'incremental' if incremental else 'full',
         'total': total,
         'refreshed_plans': refreshed_plans,
         'authorized_total': len(authorized_subscriptions),
@@ -1902,7 +2217,7 @@ def run_full_sync(log=None):
         'unmatched': unmatched_count,
         'conflicts': conflict_count,
         'errors': error_count,
-        'active_members': len(active_subscription_ids),
+        'active_members': active_members,
         'deactivated': deactivated,
         'update_only_updated': update_only_updated,
         'update_only_ignored': update_only_ignored,
@@ -1917,10 +2232,11 @@ def run_full_sync(log=None):
             'detail_truth_seconds': round(truth_duration, 2),
             'deactivate_seconds': round(deactivate_duration, 2),
         },
+        'phase_timings': timer.as_dict(),
     }
 
     log.info('=' * 80)
-    log.info('La Sede membership sync completed')
+    log.info('La Sede membership sync completed (%s)', summary['mode'])
     log.info('Total subscriptions: %d', summary['total'])
     log.info('Matched: %d', summary['matched'])
     log.info('Unmatched: %d', summary['unmatched'])
@@ -1937,6 +2253,13 @@ def run_full_sync(log=None):
         summary['timings']['detail_truth_seconds'],
         summary['timings']['deactivate_seconds'],
     )
+    log.info(
+        'Phases: plan_refresh=%ss fetch=%ss match=%ss apply=%ss',
+        summary['phase_timings']['plan_refresh_seconds'],
+        summary['phase_timings']['fetch_seconds'],
+        summary['phase_timings']['match_seconds'],
+        summary['phase_timings']['apply_seconds'],
+    )
     log.info('=' * 80)
 
     return summary
@@ -2,7 +2,9 @@ import uuid
 
 from django.contrib.auth.models import Group, Permission
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save, pre_save, post_migrate
+from allauth.account.models import EmailAddress
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save, post_migrate
 from django.dispatch import receiver
 
 from .models import Profile
@@ -26,6 +28,57 @@ def save_user_profile(sender, instance, **kwargs):
     if not instance.is_staff:
         instance.profile.save()
 
+
+# Campos que entran al índice de matching de La Sede (SedeMatchIndexEntry)
+SEDE_MATCH_USER_FIELDS = {'first_name', 'last_name', 'email'}
+
+
+def _refresh_sede_match_index(user):
+    from user_profile.services.sede_mercadopago import index_user_for_sede_match
+
+    index_user_for_sede_match(user)
+
+
+def _refresh_sede_match_index_on_commit(user_id):
+    # Se difiere al commit: si el usuario se está borrando (cascade de User) ya no existe y no se recrea la fila
+    def refresh():
+        user = User.objects.filter(pk=user_id).first()
+        if user is not None:
+            _refresh_sede_match_index(user)
+
+    transaction.on_commit(refresh)
+
+
+@receiver(post_save, sender=User)
+def update_sede_match_index_for_user(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+    # Al crear el usuario, create_user_profile crea el Profile y su señal ya lo indexa.
+    # save(update_fields=['last_login']) en cada login no toca el índice
+    if raw or created or (update_fields is not None and not SEDE_MATCH_USER_FIELDS.intersection(update_fields)):
+        return
+    _refresh_sede_match_index(instance)
+
+
+@receiver(post_save, sender=Profile)
+def update_sede_match_index_for_profile(sender, instance, created=False, raw=False, **kwargs):
+    # save_user_profile guarda el Profile en cada save de User: solo se reindexa si cambió el documento
+    if raw or (not created and instance.document_number == instance._old_document_number):
+        return
+    instance._old_document_number = instance.document_number
+    _refresh_sede_match_index(instance.user)
+
+
+@receiver(post_save, sender=EmailAddress)
+def update_sede_match_index_for_email(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _refresh_sede_match_index(instance.user)
+
+
+@receiver(post_delete, sender=EmailAddress)
+def update_sede_match_index_for_deleted_email(sender, instance, **kwargs):
+    _refresh_sede_match_index_on_commit(instance.user_id)
+
+
 @receiver(post_migrate)
 def create_user_groups(sender, **kwargs):
     """
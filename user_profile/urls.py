@@ -23,6 +23,8 @@ from .views import (
     scanner_events_view,
     caja_events_view,
     bonus_report_view,
+    bonus_report_api,
+    bonus_report_csv,
     caja_view,
     profile_view,
     send_phone_code_ajax,
@@ -66,6 +68,8 @@ urlpatterns = [
     path("mis-eventos/<slug:event_slug>/roles/", roles_management_view, name="roles_management"),
     path("mis-eventos/<slug:event_slug>/puerta/", puerta_admin_view, name="puerta_admin"),
     path("mis-eventos/<slug:event_slug>/reporte-bonos/", bonus_report_view, name="bonus_report"),
+    path("mis-eventos/<slug:event_slug>/reporte-bonos/api/", bonus_report_api, name="bonus_report_api"),
+    path("mis-eventos/<slug:event_slug>/reporte-bonos/csv/", bonus_report_csv, name="bonus_report_csv"),
     path("mis-eventos/<slug:event_slug>/caja/", caja_view, name="caja"),
     path("mis-eventos/<slug:event_slug>/configuracion-caja/", caja_config_view, name="caja_config"),
     path("mis-eventos/<slug:event_slug>/configuracion-caja/ajax/", caja_config_ajax, name="caja_config_ajax"),
@@ -2,8 +2,9 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.exceptions import ValidationError
 from django.db import transaction
-from django.http import Http404, HttpResponseNotAllowed, HttpResponseForbidden, JsonResponse
+from django.http import Http404, HttpResponseNotAllowed, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth import login, update_session_auth_hash
@@ -15,7 +16,17 @@ import json
 
 from events.models import Event, EventTermsAndConditions, EventTermsAndConditionsAcceptance, Grupo, GrupoTipo, GrupoMiembro
 from events.utils import get_event_from_request, get_admin_events_for_user
+from tickets.dto import TicketDTOAssembler
 from tickets.models import NewTicket, NewTicketTransfer, Order, TicketType
+from tickets.reports import (
+    PAGE_SIZE as BONUS_REPORT_PAGE_SIZE,
+    InvalidCursor,
+    bonus_report_page,
+    bonus_report_queryset,
+    bonus_report_stats,
+    iter_bonus_report_csv,
+    serialize_ticket_with_photos,
+)
 from .forms import ProfileStep1Form, ProfileStep2Form, VolunteeringForm, ProfileUpdateForm, CustomPasswordChangeForm, AddEmailForm, PhoneUpdateForm, CajaEmitirBonoForm
 from .impersonation import IMPERSONATION_ADMIN_USER_ID_SESSION_KEY
 
@@ -107,6 +118,7 @@ def show_past_events(request):
         holder=request.user, 
         event__in=past_events
     ).order_by("-event__end", "event__name", "owner").all()
+    assembler = TicketDTOAssembler(past_tickets, request.user)
     
     # Get the first ticket for the main event (for backward compatibility)
     my_ticket = NewTicket.objects.filter(
@@ -115,7 +127,7 @@ def show_past_events(request):
 
     # Organize past tickets by event
     past_tickets_by_event = {}
-    for ticket in past_tickets:
+    for ticket in assembler.tickets:
         event_key = ticket.event.slug or ticket.event.id
         if event_key not in past_tickets_by_event:
             past_tickets_by_event[event_key] = {
@@ -131,9 +143,9 @@ def show_past_events(request):
                 'tickets': []
             }
         
-        ticket_dto = ticket.get_dto(user=request.user)
+        ticket_dto = assembler.build(ticket)
         # Add tag to distinguish between Mine and Guest tickets
-        ticket_dto['tag'] = 'Mine' if ticket.owner == request.user else 'Guest'
+        ticket_dto['tag'] = 'Mine' if ticket.owner_id == request.user.id else 'Guest'
         # Add event information for this specific ticket
         ticket_dto['event'] = {
             'name': ticket.event.name,
@@ -144,19 +156,9 @@ def show_past_events(request):
             'location_url': ticket.event.location_url,
         }
         # Verificar si el usuario ha aceptado todos los términos y condiciones del evento
-        event_terms = EventTermsAndConditions.objects.filter(event=ticket.event)
-        accepted_term_ids = set(
-            EventTermsAndConditionsAcceptance.objects.filter(
-                user=request.user,
-                term__event=ticket.event
-            ).values_list('term_id', flat=True)
-        )
-        ticket_dto['has_all_terms_accepted'] = (
-            event_terms.count() == 0 or 
-            all(term.id in accepted_term_ids for term in event_terms)
-        )
+        ticket_dto['has_all_terms_accepted'] = assembler.has_all_terms_accepted(ticket.event_id)
         # Add user information for Mine tickets
-        if ticket.owner == request.user:
+        if ticket.owner_id == request.user.id:
             ticket_dto['user_info'] = {
                 'first_name': request.user.first_name,
                 'last_name': request.user.last_name,
@@ -218,23 +220,19 @@ def my_ticket_view(request, event_slug=None):
                 return redirect('my_ticket')
                 
             # Get tickets for this specific event
-            all_tickets = NewTicket.objects.filter(
+            all_tickets = list(NewTicket.objects.filter(
                 holder=request.user, 
                 event=current_event
-            ).order_by("owner").all()
+            ).order_by("owner"))
             
             # Also get tickets that were transferred from this user (completed transfers)
-            from tickets.models import NewTicketTransfer
-            transferred_tickets = NewTicketTransfer.objects.filter(
-                tx_from=request.user,
-                status='COMPLETED',
-                ticket__event=current_event
-            ).select_related('ticket').all()
-            
-            # Add transferred tickets to the list
-            for transfer in transferred_tickets:
-                if transfer.ticket not in all_tickets:
-                    all_tickets = list(all_tickets) + [transfer.ticket]
+            transferred_tickets = NewTicket.objects.filter(
+                newtickettransfer__tx_from=request.user,
+                newtickettransfer__status='COMPLETED',
+                event=current_event,
+            ).exclude(pk__in=[ticket.pk for ticket in all_tickets]).distinct()
+            all_tickets.extend(transferred_tickets)
+            assembler = TicketDTOAssembler(all_tickets, request.user)
             
             # Get the first ticket for this event (for backward compatibility)
             my_ticket = NewTicket.objects.filter(
@@ -245,9 +243,9 @@ def my_ticket_view(request, event_slug=None):
             tickets_dto = []
             all_unassigned = True
             for ticket in all_tickets:
-                ticket_dto = ticket.get_dto(user=request.user)
+                ticket_dto = assembler.build(ticket)
                 # Add tag to distinguish between Mine and Guest tickets
-                ticket_dto['tag'] = 'Mine' if ticket.owner == request.user else 'Guest'
+                ticket_dto['tag'] = 'Mine' if ticket.owner_id == request.user.id else 'Guest'
                 # Add event information for this specific ticket
                 ticket_dto['event'] = {
                     'name': ticket.event.name,
@@ -258,19 +256,9 @@ def my_ticket_view(request, event_slug=None):
                     'location_url': ticket.event.location_url,
                 }
                 # Verificar si el usuario ha aceptado todos los términos y condiciones del evento
-                event_terms = EventTermsAndConditions.objects.filter(event=ticket.event)
-                accepted_term_ids = set(
-                    EventTermsAndConditionsAcceptance.objects.filter(
-                        user=request.user,
-                        term__event=ticket.event
-                    ).values_list('term_id', flat=True)
-                )
-                ticket_dto['has_all_terms_accepted'] = (
-                    event_terms.count() == 0 or 
-                    all(term.id in accepted_term_ids for term in event_terms)
-                )
+                ticket_dto['has_all_terms_accepted'] = assembler.has_all_terms_accepted(ticket.event_id)
                 # Add user information for Mine tickets
-                if ticket.owner == request.user:
+                if ticket.owner_id == request.user.id:
                     ticket_dto['user_info'] = {
                         'first_name': request.user.first_name,
                         'last_name': request.user.last_name,
@@ -279,24 +267,15 @@ def my_ticket_view(request, event_slug=None):
                     all_unassigned = False
                 else:
                     # For Guest tickets, add transfer information similar to transferable_tickets
-                    from tickets.models import NewTicketTransfer
-                    transfer_pending = NewTicketTransfer.objects.filter(
-                        ticket=ticket, 
-                        tx_from=request.user, 
-                        status='PENDING'
-                    ).first()
-                    transfer_completed = NewTicketTransfer.objects.filter(
-                        ticket=ticket, 
-                        tx_from=request.user, 
-                        status='COMPLETED'
-                    ).first()
+                    transfer_pending = assembler.pending_transfer(ticket)
+                    transfer_completed = assembler.completed_transfer(ticket)
                     
                     if transfer_pending:
                         ticket_dto['is_transfer_pending'] = True
                         ticket_dto['transferring_to'] = transfer_pending.tx_to_email
                         ticket_dto['is_transfer_completed'] = False
                         ticket_dto['transferred_to'] = None
-                    elif transfer_completed and ticket.holder != request.user:
+                    elif transfer_completed and ticket.holder_id != request.user.id:
                         # Solo mostrar "transferido" cuando el bono no está de vuelta con este usuario
                         ticket_dto['is_transfer_pending'] = False
                         ticket_dto['transferring_to'] = None
@@ -309,54 +288,8 @@ def my_ticket_view(request, event_slug=None):
                         ticket_dto['is_transfer_completed'] = False
                         ticket_dto['transferred_to'] = None
                 
-                # Verificar si el usuario del ticket tiene ingreso anticipado o late checkout
-                # Prioridad: primero verificamos el holder (quien tiene el bono), luego el owner
-                from events.models import GrupoMiembro
-                grupo_miembro = None
-                
-                # Primero intentamos con el holder
-                if ticket.holder:
-                    grupo_miembro = GrupoMiembro.objects.filter(
-                        grupo__event=ticket.event,
-                        user=ticket.holder
-                    ).select_related('grupo').first()
-                
-                # Si no encontramos grupo con el holder, intentamos con el owner
-                if not grupo_miembro and ticket.owner:
-                    grupo_miembro = GrupoMiembro.objects.filter(
-                        grupo__event=ticket.event,
-                        user=ticket.owner
-                    ).select_related('grupo').first()
-                
-                if grupo_miembro:
-                    ticket_dto['has_ingreso_anticipado'] = grupo_miembro.ingreso_anticipado or bool(grupo_miembro.ingreso_anticipado_fecha)
-                    if grupo_miembro.ingreso_anticipado_fecha:
-                        ticket_dto['ingreso_anticipado_fecha'] = grupo_miembro.ingreso_anticipado_fecha.strftime("%d/%m/%Y")
-                    else:
-                        ticket_dto['ingreso_anticipado_fecha'] = None
-                    if grupo_miembro.grupo.ingreso_anticipado_desde:
-                        ticket_dto['ingreso_anticipado_desde'] = timezone.localtime(grupo_miembro.grupo.ingreso_anticipado_desde).strftime("%d/%m/%Y %H:%M")
-                    else:
-                        ticket_dto['ingreso_anticipado_desde'] = None
-                    ticket_dto['has_late_checkout'] = grupo_miembro.late_checkout
-                    if grupo_miembro.grupo.late_checkout_hasta:
-                        ticket_dto['late_checkout_hasta'] = timezone.localtime(grupo_miembro.grupo.late_checkout_hasta).strftime("%d/%m/%Y %H:%M")
-                    else:
-                        ticket_dto['late_checkout_hasta'] = None
-                    ticket_dto['restriccion'] = grupo_miembro.restriccion
-                    ticket_dto['restriccion_display'] = dict(grupo_miembro.RESTRICCION_CHOICES).get(grupo_miembro.restriccion, grupo_miembro.restriccion)
-                    ticket_dto['grupo_id'] = grupo_miembro.grupo.id
-                    ticket_dto['grupo_miembro_id'] = grupo_miembro.id
-                else:
-                    ticket_dto['has_ingreso_anticipado'] = False
-                    ticket_dto['ingreso_anticipado_fecha'] = None
-                    ticket_dto['ingreso_anticipado_desde'] = None
-                    ticket_dto['has_late_checkout'] = False
-                    ticket_dto['late_checkout_hasta'] = None
-                    ticket_dto['restriccion'] = None
-                    ticket_dto['restriccion_display'] = None
-                    ticket_dto['grupo_id'] = None
-                    ticket_dto['grupo_miembro_id'] = None
+                # Ingreso anticipado / late checkout: primero el grupo del holder, luego el del owner
+                ticket_dto.update(assembler.grupo_fields(ticket))
                 
                 tickets_dto.append(ticket_dto)
             
@@ -512,8 +445,9 @@ def transferable_tickets_view(request, event_slug=None):
 
     tickets_dto = []
 
-    for ticket in tickets:
-        ticket_dto = ticket.get_dto(user=request.user)
+    assembler = TicketDTOAssembler(tickets, request.user)
+    for ticket in assembler.tickets:
+        ticket_dto = assembler.build(ticket)
         # Add event information for this specific ticket
         ticket_dto['event'] = {
             'name': ticket.event.name,
@@ -525,7 +459,7 @@ def transferable_tickets_view(request, event_slug=None):
 
     transferred_tickets = NewTicketTransfer.objects.filter(
         tx_from=request.user, status="COMPLETED", ticket__event=current_event
-    ).all()
+    ).select_related('ticket__ticket_type', 'ticket__event')
     transferred_dto = []
     for transfer in transferred_tickets:
         transferred_dto.append(
@@ -2531,10 +2465,8 @@ def caja_events_view(request):
     return render(request, "mi_fuego/caja_events.html", context)
 
 
-@login_required
-def bonus_report_view(request, event_slug):
-    """Show report of all sold bonuses for a specific event"""
-    # Get the event and check if user is admin
+def _bonus_report_event(request, event_slug):
+    """Evento del reporte de bonos, si el usuario es admin; si no, (None, respuesta de error)."""
     try:
         event = Event.objects.get(slug=event_slug)
     except Event.DoesNotExist:
@@ -2542,14 +2474,28 @@ def bonus_report_view(request, event_slug):
     
     # Check if user is admin of this event
     if not event.admins.filter(id=request.user.id).exists():
-        return HttpResponseForbidden("You don't have permission to view this event")
+        return None, HttpResponseForbidden("You don't have permission to view this event")
+    return event, None
+
+
+def _bonus_report_filters(request):
+    return {
+        'status': request.GET.get('status') or None,
+        'origin': request.GET.get('origin') or None,
+        'ticket_type': int(request.GET['ticket_type']) if request.GET.get('ticket_type', '').isdigit() else None,
+        'search': (request.GET.get('q') or '').strip() or None,
+    }
+
+
+@login_required
+def bonus_report_view(request, event_slug):
+    """Show report of all sold bonuses for a specific event"""
+    event, error = _bonus_report_event(request, event_slug)
+    if error:
+        return error
     
-    # Get all tickets sold for this event
-    tickets = NewTicket.objects.filter(
-        event=event
-    ).select_related(
-        'holder', 'owner', 'scanned_by', 'ticket_type', 'order'
-    ).prefetch_related('ticket_photos').order_by('-created_at')
+    # Sólo la primera página; el resto (y los filtros) van por bonus_report_api
+    tickets, next_cursor = bonus_report_page(bonus_report_queryset(event))
     
     # Get the main event for context
     main_event = Event.get_main_event()
@@ -2567,64 +2513,6 @@ def bonus_report_view(request, event_slug):
         holder=request.user, event=main_event, owner=request.user
     ).first() if main_event else None
     
-    # Prepare ticket data for the template
-    tickets_data = []
-    for ticket in tickets:
-        # Determine if ticket is unassigned (has holder but no owner)
-        # If attendee_must_be_registered is False, treat unassigned tickets as unused
-        is_unassigned = ticket.holder and not ticket.owner and event.attendee_must_be_registered
-        
-        # Check if ticket was issued by caja (admin-generated order)
-        is_caja_issued = ticket.order.generated_by_admin_user is not None
-        
-        # Get caja admin name (who issued the ticket)
-        caja_admin_name = None
-        if is_caja_issued:
-            admin_user = ticket.order.generated_by_admin_user
-            caja_admin_name = f"{admin_user.first_name} {admin_user.last_name}".strip()
-            if not caja_admin_name or caja_admin_name == " ":
-                caja_admin_name = admin_user.username
-        
-        ticket_data = {
-            'key': ticket.key,
-            'ticket_type': ticket.ticket_type.name,
-            'ticket_type_emoji': ticket.ticket_type.emoji,
-            'ticket_type_color': ticket.ticket_type.color,
-            'holder_name': f"{ticket.holder.first_name} {ticket.holder.last_name}".strip() if ticket.holder else "Sin asignar",
-            'holder_email': ticket.holder.email if ticket.holder else None,
-            'owner_name': f"{ticket.owner.first_name} {ticket.owner.last_name}".strip() if ticket.owner else "Sin asignar",
-            'owner_email': ticket.owner.email if ticket.owner else None,
-            'is_used': ticket.is_used,
-            'used_at': ticket.used_at,
-            'scanned_by_name': f"{ticket.scanned_by.first_name} {ticket.scanned_by.last_name}".strip() if ticket.scanned_by else None,
-            'scanned_by_email': ticket.scanned_by.email if ticket.scanned_by else None,
-            'notes': ticket.notes,
-            'is_unassigned': is_unassigned,
-            'is_caja_issued': is_caja_issued,
-            'caja_admin_name': caja_admin_name,
-            'order_type': ticket.order.get_order_type_display() if ticket.order.order_type else None,
-            'photos': [
-                {
-                    'id': photo.id,
-                    'url': photo.photo.url,
-                    'name': photo.photo.name.split('/')[-1],
-                    'uploaded_at': photo.created_at,
-                    'uploaded_by': f"{photo.uploaded_by.first_name} {photo.uploaded_by.last_name}".strip() if photo.uploaded_by else None
-                }
-                for photo in ticket.ticket_photos.all()
-            ],
-            'created_at': ticket.created_at,
-            'order_key': ticket.order.key if ticket.order else None,
-        }
-        tickets_data.append(ticket_data)
-    
-    # Calculate statistics
-    total_tickets = len(tickets_data)
-    used_tickets = len([t for t in tickets_data if t['is_used']])
-    unassigned_tickets = len([t for t in tickets_data if t['is_unassigned']])
-    unused_tickets = total_tickets - used_tickets - unassigned_tickets
-    caja_issued_tickets = len([t for t in tickets_data if t['is_caja_issued']])
-    
     context = {
         "event": event,
         "current_admin_event": event,
@@ -2635,20 +2523,60 @@ def bonus_report_view(request, event_slug):
         "nav_secondary": f"bonus_report_{event.slug}",
         "my_ticket": my_ticket.get_dto(user=request.user) if my_ticket else None,
         "now": timezone.now(),
-        "tickets": tickets_data,
-        "stats": {
-            "total_tickets": total_tickets,
-            "used_tickets": used_tickets,
-            "unused_tickets": unused_tickets,
-            "unassigned_tickets": unassigned_tickets,
-            "caja_issued_tickets": caja_issued_tickets,
-            "usage_percentage": (used_tickets / total_tickets * 100) if total_tickets > 0 else 0,
-        }
+        "tickets": [serialize_ticket_with_photos(ticket, event) for ticket in tickets],
+        "next_cursor": next_cursor,
+        "ticket_types": TicketType.objects.filter(event=event).order_by('name').values('id', 'name'),
+        "stats": bonus_report_stats(event),
     }
     
     return render(request, "mi_fuego/bonus_report.html", context)
 
 
+@login_required
+def bonus_report_api(request, event_slug):
+    """
+    Página del reporte de bonos en JSON, con los mismos filtros que la vista
+    (status, origin, ticket_type, q). Paginado por cursor: pasar `next_cursor`
+    de la respuesta anterior como ?cursor= para la página siguiente.
+    """
+    event, error = _bonus_report_event(request, event_slug)
+    if error:
+        return JsonResponse({"error": "No tienes permisos para ver este evento"}, status=403)
+    
+    try:
+        limit = int(request.GET.get('limit') or BONUS_REPORT_PAGE_SIZE)
+        tickets, next_cursor = bonus_report_page(
+            bonus_report_queryset(event, **_bonus_report_filters(request)),
+            cursor=request.GET.get('cursor'),
+            limit=limit,
+        )
+    except (ValueError, InvalidCursor):
+        return JsonResponse({"error": "Parámetros inválidos"}, status=400)
+    
+    rows = [serialize_ticket_with_photos(ticket, event) for ticket in tickets]
+    fragment_context = {"tickets": rows, "event": event}
+    return JsonResponse({
+        "tickets": rows,
+        "next_cursor": next_cursor,
+        # Mismo markup que la primera página, para que el template no lo duplique en JS
+        "cards_html": render_to_string("mi_fuego/partials/bonus_report_cards.html", fragment_context, request),
+        "rows_html": render_to_string("mi_fuego/partials/bonus_report_rows.html", fragment_context, request),
+    })
+
+
+@login_required
+def bonus_report_csv(request, event_slug):
+    """CSV del reporte de bonos (con los filtros de la vista), generado a medida que se descarga."""
+    event, error = _bonus_report_event(request, event_slug)
+    if error:
+        return error
+    
+    tickets = bonus_report_queryset(event, **_bonus_report_filters(request))
+    response = StreamingHttpResponse(iter_bonus_report_csv(event, tickets), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="bonos_{event.slug}.csv"'
+    return response
+
+
 @login_required
 def my_tickets_ajax(request, event_slug=None):
     """AJAX endpoint to get updated ticket status for auto-refresh"""
@@ -2666,23 +2594,19 @@ def my_tickets_ajax(request, event_slug=None):
                 return JsonResponse({"error": "Event not found"}, status=404)
                 
             # Get tickets for this specific event
-            all_tickets = NewTicket.objects.filter(
+            all_tickets = list(NewTicket.objects.filter(
                 holder=request.user, 
                 event=current_event
-            ).order_by("owner").all()
+            ).order_by("owner"))
             
             # Also get tickets that were transferred from this user (completed transfers)
-            from tickets.models import NewTicketTransfer
-            transferred_tickets = NewTicketTransfer.objects.filter(
-                tx_from=request.user,
-                status='COMPLETED',
-                ticket__event=current_event
-            ).select_related('ticket').all()
-            
-            # Add transferred tickets to the list
-            for transfer in transferred_tickets:
-                if transfer.ticket not in all_tickets:
-                    all_tickets = list(all_tickets) + [transfer.ticket]
+            transferred_tickets = NewTicket.objects.filter(
+                newtickettransfer__tx_from=request.user,
+                newtickettransfer__status='COMPLETED',
+                event=current_event,
+            ).exclude(pk__in=[ticket.pk for ticket in all_tickets]).distinct()
+            all_tickets.extend(transferred_tickets)
+            assembler = TicketDTOAssembler(all_tickets, request.user)
             
             # Get the first ticket for this event (for backward compatibility)
             my_ticket = NewTicket.objects.filter(
@@ -2702,60 +2626,14 @@ def my_tickets_ajax(request, event_slug=None):
             # Organize tickets for this event
             tickets_dto = []
             for ticket in all_tickets:
-                ticket_dto = ticket.get_dto(user=request.user)
+                ticket_dto = assembler.build(ticket)
                 
                 # Add initial state information
                 ticket_dto['is_used'] = ticket.is_used
                 ticket_dto['used_at'] = ticket.used_at.isoformat() if ticket.used_at else None
                 
-                # Verificar si el usuario del ticket tiene ingreso anticipado o late checkout
-                from events.models import GrupoMiembro
-                grupo_miembro = None
-                
-                # Primero intentamos con el holder
-                if ticket.holder:
-                    grupo_miembro = GrupoMiembro.objects.filter(
-                        grupo__event=ticket.event,
-                        user=ticket.holder
-                    ).select_related('grupo').first()
-                
-                # Si no encontramos grupo con el holder, intentamos con el owner
-                if not grupo_miembro and ticket.owner:
-                    grupo_miembro = GrupoMiembro.objects.filter(
-                        grupo__event=ticket.event,
-                        user=ticket.owner
-                    ).select_related('grupo').first()
-                
-                if grupo_miembro:
-                    ticket_dto['has_ingreso_anticipado'] = grupo_miembro.ingreso_anticipado or bool(grupo_miembro.ingreso_anticipado_fecha)
-                    if grupo_miembro.ingreso_anticipado_fecha:
-                        ticket_dto['ingreso_anticipado_fecha'] = grupo_miembro.ingreso_anticipado_fecha.strftime("%d/%m/%Y")
-                    else:
-                        ticket_dto['ingreso_anticipado_fecha'] = None
-                    if grupo_miembro.grupo.ingreso_anticipado_desde:
-                        ticket_dto['ingreso_anticipado_desde'] = timezone.localtime(grupo_miembro.grupo.ingreso_anticipado_desde).strftime("%d/%m/%Y %H:%M")
-                    else:
-                        ticket_dto['ingreso_anticipado_desde'] = None
-                    ticket_dto['has_late_checkout'] = grupo_miembro.late_checkout
-                    if grupo_miembro.grupo.late_checkout_hasta:
-                        ticket_dto['late_checkout_hasta'] = timezone.localtime(grupo_miembro.grupo.late_checkout_hasta).strftime("%d/%m/%Y %H:%M")
-                    else:
-                        ticket_dto['late_checkout_hasta'] = None
-                    ticket_dto['restriccion'] = grupo_miembro.restriccion
-                    ticket_dto['restriccion_display'] = dict(grupo_miembro.RESTRICCION_CHOICES).get(grupo_miembro.restriccion, grupo_miembro.restriccion)
-                    ticket_dto['grupo_id'] = grupo_miembro.grupo.id
-                    ticket_dto['grupo_miembro_id'] = grupo_miembro.id
-                else:
-                    ticket_dto['has_ingreso_anticipado'] = False
-                    ticket_dto['ingreso_anticipado_fecha'] = None
-                    ticket_dto['ingreso_anticipado_desde'] = None
-                    ticket_dto['has_late_checkout'] = False
-                    ticket_dto['late_checkout_hasta'] = None
-                    ticket_dto['restriccion'] = None
-                    ticket_dto['restriccion_display'] = None
-                    ticket_dto['grupo_id'] = None
-                    ticket_dto['grupo_miembro_id'] = None
-                    
+                # Ingreso anticipado / late checkout: primero el grupo del holder, luego el del owner
+                ticket_dto.update(assembler.grupo_fields(ticket))
                 tickets_dto.append(ticket_dto)
             
             return JsonResponse({
@@ -0,0 +1,62 @@
+import json
+
+from auditlog.diff import get_field_value
+from auditlog.middleware import threadlocal
+from auditlog.models import LogEntry
+from django.contrib.contenttypes.models import ContentType
+from django.utils.encoding import smart_str
+
+
+def _current_remote_addr():
+    return getattr(threadlocal, 'auditlog', {}).get('remote_addr')
+
+
+def bulk_log_create(instances, actor=None):
+    """
+    Escribe las entradas CREATE de auditlog para filas insertadas con bulk_create,
+    que no dispara las señales post_save. Un solo INSERT para todas las instancias.
+
+    Solo se miran los campos concretos: las FKs deben venir ya cacheadas en la
+    instancia para no disparar una query por fila al armar el repr.
+    """
+    entries = []
+    for instance in instances:
+        changes = {}
+        for field in instance._meta.concrete_fields:
+            value = get_field_value(instance, field)
+            if value != 'None' and value is not None:
+                changes[field.name] = ['None', smart_str(value)]
+        entries.append(_log_entry(instance, LogEntry.Action.CREATE, changes, actor))
+    return LogEntry.objects.bulk_create(entries)
+
+
+def bulk_log_update(changes_by_instance, actor=None):
+    """
+    Entradas UPDATE para filas modificadas con queryset.update() o bulk_update.
+
+    changes_by_instance: iterable de (instancia, {campo: (viejo, nuevo)}).
+    """
+    entries = [
+        _log_entry(
+            instance,
+            LogEntry.Action.UPDATE,
+            {name: [smart_str(old), smart_str(new)] for name, (old, new) in changes.items()},
+            actor,
+        )
+        for instance, changes in changes_by_instance
+        if changes
+    ]
+    return LogEntry.objects.bulk_create(entries)
+
+
+def _log_entry(instance, action, changes, actor):
+    return LogEntry(
+        content_type=ContentType.objects.get_for_model(instance),
+        object_pk=smart_str(instance.pk),
+        object_id=instance.pk if isinstance(instance.pk, int) else None,
+        object_repr=smart_str(instance),
+        action=action,
+        changes=json.dumps(changes),
+        actor=actor,
+        remote_addr=_current_remote_addr(),
+    )
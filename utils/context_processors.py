@@ -3,7 +3,7 @@ import hmac
 
 from deprepagos import settings
 from events.models import Event, EventTermsAndConditions, EventTermsAndConditionsAcceptance
-from tickets.models import NewTicket, TicketType, NewTicketTransfer
+from tickets.ticket_summary import get_ticket_context
 
 
 def current_event(request):
@@ -25,64 +25,10 @@ def current_event(request):
             except Exception:
                 event = Event.objects.latest("id")
 
-    # Check if there are multiple active events
-    active_events = Event.get_active_events()
-    has_multiple_events = active_events.count() > 1
-    
-    context = {
-        "event": event,
-        "has_multiple_events": has_multiple_events,
-    }
-    if request.user.is_authenticated:
-
-        tickets = NewTicket.objects.filter(
-            holder=request.user, event=event
-        ).all()
-
-        owns_ticket = NewTicket.objects.filter(
-            holder=request.user, event=event, owner=request.user
-        ).exists()
-
-        tickets_dto = []
-
-        for ticket in tickets:
-            tickets_dto.append(ticket.get_dto(user=request.user))
-
-        has_unassigned_tickets = any(
-            ticket["is_owners"] is False for ticket in tickets_dto
-        )
-        has_transfer_pending = any(
-            ticket["is_transfer_pending"] is True for ticket in tickets_dto
-        )
-
-        shared_tickets = NewTicketTransfer.objects.filter(
-            tx_from=request.user, status="COMPLETED").count()
-
-        # Count holding_tickets based on attendee_must_be_registered
-        if event.attendee_must_be_registered:
-            holding_tickets = NewTicket.objects.filter(
-                holder=request.user, event=event, owner__isnull=True
-            ).count()
-        else:
-            holding_tickets = len(tickets)
-
-
-        # Count total tickets across all active events
-        total_tickets = NewTicket.objects.filter(
-            event__in=active_events, holder=request.user
-        ).count()
-
-        context.update(
-            {
-                "has_unassigned_tickets": has_unassigned_tickets,
-                "has_transfer_pending": has_transfer_pending,
-                "has_available_tickets": TicketType.objects.get_available_ticket_types_for_current_events().filter(event=event).exists(),
-                "holding_tickets": holding_tickets,
-                "shared_tickets": shared_tickets,
-                "owns_ticket": owns_ticket,
-                "total_tickets": total_tickets,
-            }
-        )
+    # Un único get_many al cache; se invalida desde tickets.signals
+    context = {"event": event}
+    user = request.user if request.user.is_authenticated else None
+    context.update(get_ticket_context(event, user))
     return context
 
 
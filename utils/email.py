@@ -1,14 +1,108 @@
+import copy
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.mail import get_connection
+from django.db import connections as db_connections
 
-from templated_email import send_templated_mail
-import logging
+from templated_email import get_connection as get_templated_connection
 
+# Conexiones SMTP abiertas que se mantienen vivas (y envíos en paralelo de send_mass_templated)
+EMAIL_POOL_SIZE = int(os.environ.get('EMAIL_POOL_SIZE', '4'))
+# Una conexión sin usar por más de esto se cierra y se abre otra (los servidores cortan las ociosas)
+EMAIL_POOL_MAX_IDLE_SECONDS = int(os.environ.get('EMAIL_POOL_MAX_IDLE_SECONDS', '60'))
+# Mensajes que send_mass_templated manda seguidos por una misma conexión
+EMAIL_BATCH_SIZE = int(os.environ.get('EMAIL_BATCH_SIZE', '50'))
 
-def send_mail(*args, **kwargs):
+
+class EmailConnectionPool:
     """
-    Wrapper around send_templated_mail cause context_processors don't work
+    Hasta `size` conexiones del EMAIL_BACKEND abiertas y autenticadas, compartidas
+    entre threads. Funciona igual con smtp, locmem o file (en esos open() no hace nada).
+
+        with email_pool.connection() as connection:
+            connection.send_messages(messages)
     """
+
+    def __init__(self, size=EMAIL_POOL_SIZE, max_idle_seconds=EMAIL_POOL_MAX_IDLE_SECONDS):
+        self.size = max(1, size)
+        self.max_idle_seconds = max_idle_seconds
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._backend = None
+        self._lock = threading.Lock()
+
+    def _check_backend(self):
+        # Si cambió EMAIL_BACKEND (override_settings en tests) las conexiones viejas no sirven
+        with self._lock:
+            if self._backend != settings.EMAIL_BACKEND:
+                self._backend = settings.EMAIL_BACKEND
+                self._drain()
+
+    def _drain(self):
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(connection)
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except Exception:
+            logging.warning('Could not close email connection', exc_info=True)
+
+    def _acquire(self):
+        while True:
+            try:
+                connection, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if time.monotonic() - last_used <= self.max_idle_seconds:
+                return connection
+            self._close(connection)
+        connection = get_connection()
+        connection.open()
+        return connection
+
+    @contextmanager
+    def connection(self):
+        """Una conexión del pool; si el envío falla se descarta en vez de devolverla."""
+        self._check_backend()
+        self._slots.acquire()
+        connection = None
+        try:
+            connection = self._acquire()
+            yield connection
+        except Exception:
+            if connection is not None:
+                self._close(connection)
+                connection = None
+            raise
+        finally:
+            if connection is not None:
+                self._idle.put((connection, time.monotonic()))
+            self._slots.release()
+
+    def close_all(self):
+        with self._lock:
+            self._drain()
+
+
+email_pool = EmailConnectionPool()
+
+
+def _with_base_context(kwargs):
     if 'context' not in kwargs:
         kwargs['context'] = {}
 
@@ -18,15 +112,145 @@ def send_mail(*args, **kwargs):
 
     if 'from_email' not in kwargs:
         kwargs['from_email'] = settings.DEFAULT_FROM_EMAIL
+    return kwargs
+
+
+def _with_pooled_connection(send):
+    """send(connection) con una conexión del pool; si el servidor ya la había cerrado, una vez más con otra."""
+    try:
+        with email_pool.connection() as connection:
+            return send(connection)
+    except smtplib.SMTPServerDisconnected:
+        with email_pool.connection() as connection:
+            return send(connection)
+
+
+def send_message(message):
+    """Envía un EmailMessage ya armado por una conexión del pool."""
+    return _with_pooled_connection(lambda connection: connection.send_messages([message]))
+
+
+def send_mail(*args, email_connection=None, **kwargs):
+    """
+    Wrapper around send_templated_mail cause context_processors don't work
+
+    email_connection: Django mail connection to reuse (e.g. one SMTP connection for a whole batch).
+    Without it, a connection from email_pool is used instead of opening one per email.
+    send_templated_mail's own "connection" argument is the template backend, not the mail one.
+    """
+    kwargs = _with_base_context(kwargs)
 
     logging.info('Sending email to %s', kwargs['recipient_list'])
-    send_templated_mail(*args, **kwargs)
+    if email_connection is not None:
+        get_templated_connection().send(*args, connection=email_connection, **kwargs)
+    else:
+        _with_pooled_connection(lambda connection: get_templated_connection().send(*args, connection=connection, **kwargs))
     logging.info('Email sent')
 
 
+def _render(message, templated, rendered):
+    """
+    EmailMessage de un mensaje de send_mass_templated. Los que comparten template
+    y el mismo dict de context (y no llevan adjuntos) se renderizan una sola vez;
+    sólo cambia el destinatario.
+    """
+    context = message.get('context') or {}
+    key = (message['template_name'], id(context), message.get('from_email'))
+    email = rendered.get(key) if not message.get('attachments') else None
+    if email is None:
+        kwargs = {'context': dict(context)}
+        if message.get('from_email'):
+            kwargs['from_email'] = message['from_email']
+        kwargs = _with_base_context(kwargs)
+        email = templated.get_email_message(
+            message['template_name'], kwargs['context'], from_email=kwargs['from_email'],
+            to=message['recipient_list'], attachments=message.get('attachments'),
+        )
+        if not message.get('attachments'):
+            rendered[key] = email
+    email = copy.copy(email)
+    email.to = list(message['recipient_list'])
+    email.extra_headers = dict(email.extra_headers)
+    return email
+
+
+def send_mass_templated(messages, batch_size=EMAIL_BATCH_SIZE, pool=None, on_sent=None):
+    """
+    Envía muchos mails templados por las conexiones del pool: lotes de
+    `batch_size` mensajes, tantos lotes en paralelo como conexiones tenga el pool.
+
+    Cada mensaje es un dict con template_name, recipient_list, context y,
+    opcionalmente, from_email y attachments. Devuelve (errores, lotes): errores
+    alineado con `messages` (None si salió bien) y, por lote, cuántos mensajes
+    tenía, cuántos salieron y cuánto tardó.
+
+    on_sent(index) se llama apenas sale cada mensaje, desde el hilo de su lote,
+    para registrar el envío sin esperar al final (si el proceso muere a mitad de
+    un lote, lo ya enviado queda registrado).
+    """
+    pool = pool or email_pool
+    messages = list(messages)
+    errors = [None] * len(messages)
+    emails = [None] * len(messages)
+    templated = get_templated_connection()
+    rendered = {}
+    for index, message in enumerate(messages):
+        try:
+            emails[index] = _render(message, templated, rendered)
+        except Exception as e:
+            logging.error(f"Error rendering email to {message['recipient_list']}: {e}")
+            errors[index] = f'Render: {e}'
+
+    pending = [index for index in range(len(messages)) if emails[index] is not None]
+    batch_size = max(1, batch_size)
+    batches = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+
+    def send_batch(batch):
+        started = time.perf_counter()
+        done = set()
+        try:
+            with pool.connection() as connection:
+                for index in batch:
+                    try:
+                        connection.send_messages([emails[index]])
+                    except smtplib.SMTPServerDisconnected:
+                        raise
+                    except Exception as e:
+                        logging.error(f"Error sending email to {messages[index]['recipient_list']}: {e}")
+                        errors[index] = str(e)
+                    done.add(index)
+                    if on_sent is not None and errors[index] is None:
+                        try:
+                            on_sent(index)
+                        except Exception as e:
+                            logging.error(f"Error recording email sent to {messages[index]['recipient_list']}: {e}")
+        except Exception as e:
+            # Se cayó la conexión (o no se pudo abrir): el resto del lote queda con error
+            logging.error(f'Email batch aborted after {len(done)} of {len(batch)} messages: {e}')
+            for index in batch:
+                if index not in done:
+                    errors[index] = str(e)
+        finally:
+            if on_sent is not None:
+                # on_sent puede usar la DB: se cierra la conexión que abrió este hilo
+                db_connections.close_all()
+        sent = sum(1 for index in batch if errors[index] is None)
+        return {'size': len(batch), 'sent': sent, 'seconds': time.perf_counter() - started}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(pool.size, len(batches)))) as executor:
+        stats = list(executor.map(send_batch, batches))
+
+    for number, batch in enumerate(stats, 1):
+        logging.info(
+            'Email batch %s/%s: %s/%s sent in %.2fs (%.1f emails/s)', number, len(stats), batch['sent'],
+            batch['size'], batch['seconds'], batch['sent'] / batch['seconds'] if batch['seconds'] else 0,
+        )
+    return errors, stats
+
+
 def send_staff_mail(*args, **kwargs):
     """
     Send email to is_staff=True users
     """
     kwargs['recipient_list'] = User.objects.filter(is_staff=True).values_list('email', flat=True)
-    send_mail(*args, **kwargs)
\ No newline at end of file
+    send_mail(*args, **kwargs)
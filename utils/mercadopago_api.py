@@ -0,0 +1,133 @@
+import logging
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+MP_API_BASE_URL = 'https://api.mercadopago.com'
+MP_API_HOST = 'api.mercadopago.com'
+API_RETRY_ATTEMPTS = 4
+API_RETRY_BASE_SECONDS = 0.75
+TRANSIENT_STATUSES = (429, 500, 502, 503, 504)
+# Requests por segundo por host, compartido entre todos los threads del proceso
+API_RATE_PER_SECOND = float(os.environ.get('MERCADOPAGO_API_RATE_PER_SECOND', '10'))
+HTTP_POOL_SIZE = int(os.environ.get('MERCADOPAGO_HTTP_POOL_SIZE', '16'))
+
+
+class HostRateLimiter:
+    """Token bucket por host. acquire() bloquea hasta que haya un token libre."""
+
+    def __init__(self, rate_per_second, burst=None):
+        self.rate = max(rate_per_second, 0.1)
+        self.burst = burst or max(1, int(self.rate))
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, updated = self._buckets.get(host, (self.burst, now))
+                tokens = min(self.burst, tokens + (now - updated) * self.rate)
+                if tokens >= 1:
+                    self._buckets[host] = (tokens - 1, now)
+                    return
+                self._buckets[host] = (tokens, now)
+                wait = (1 - tokens) / self.rate
+            time.sleep(wait)
+
+
+rate_limiter = HostRateLimiter(API_RATE_PER_SECOND)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """requests.Session compartida con pool de conexiones keep-alive."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def retry_delay_seconds(attempt, response=None):
+    # Honor Retry-After if SDK exposes headers, otherwise exponential backoff + jitter.
+    headers = (response or {}).get('headers') or {}
+    retry_after = headers.get('Retry-After') or headers.get('retry-after')
+    if retry_after:
+        try:
+            return float(retry_after)
+        except (TypeError, ValueError):
+            pass
+    return API_RETRY_BASE_SECONDS * (2 ** attempt) + random.uniform(0, 0.25)
+
+
+def call_with_backoff(call_fn, params, host=MP_API_HOST, attempts=API_RETRY_ATTEMPTS):
+    """
+    Llama call_fn(params) respetando el rate limit del host y reintenta 429/5xx
+    y errores de red con backoff. call_fn devuelve un dict estilo SDK de MP
+    ({'status': ..., 'response': ..., 'headers': ...}).
+    """
+    last_response = None
+    for attempt in range(attempts):
+        rate_limiter.acquire(host)
+        try:
+            response = call_fn(params)
+        except requests.exceptions.RequestException as e:
+            if attempt + 1 >= attempts:
+                raise
+            delay = retry_delay_seconds(attempt)
+            logger.warning(
+                'MP network error for %s: %s. Retry %d/%d in %.2fs',
+                params, e, attempt + 1, attempts, delay,
+            )
+            time.sleep(delay)
+            continue
+        status = response.get('status')
+        last_response = response
+        if status == 200:
+            return response
+        if status in TRANSIENT_STATUSES and attempt + 1 < attempts:
+            delay = retry_delay_seconds(attempt, response=response)
+            logger.warning(
+                'MP transient error %s for %s. Retry %d/%d in %.2fs',
+                status,
+                params,
+                attempt + 1,
+                attempts,
+                delay,
+            )
+            time.sleep(delay)
+            continue
+        return response
+    return last_response or {'status': 500, 'response': {'message': 'No response'}}
+
+
+def api_get(url, params=None, access_token=None, timeout=10):
+    """GET sobre la sesión compartida, con la respuesta en el mismo formato que el SDK."""
+    headers = {'Content-Type': 'application/json'}
+    if access_token:
+        headers['Authorization'] = f'Bearer {access_token}'
+
+    def _get(query):
+        response = get_session().get(url, params=query, headers=headers, timeout=timeout)
+        try:
+            body = response.json()
+        except ValueError:
+            body = {'message': response.text}
+        return {'status': response.status_code, 'response': body, 'headers': dict(response.headers)}
+
+    return call_with_backoff(_get, params or {}, host=urlparse(url).hostname or MP_API_HOST)
@@ -0,0 +1,79 @@
+import base64
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import qrcode
+import qrcode.image.svg
+
+# Formato de los QR que se muestran en la web ('png' o 'svg'). Los PDFs siempre usan PNG.
+QR_IMAGE_FORMAT = os.environ.get('QR_IMAGE_FORMAT', 'png')
+# Imágenes que se guardan en memoria por proceso
+QR_MEMORY_CACHE_SIZE = int(os.environ.get('QR_MEMORY_CACHE_SIZE', '512'))
+# Cuánto guarda el navegador la imagen servida por tickets.views.new_ticket.ticket_qr (privada)
+QR_BROWSER_CACHE_SECONDS = int(os.environ.get('QR_BROWSER_CACHE_SECONDS', '86400'))
+
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+
+class _LRU:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+_images = _LRU(QR_MEMORY_CACHE_SIZE)
+
+
+def _render(payload, fmt):
+    buffer = io.BytesIO()
+    if fmt == 'svg':
+        qrcode.make(payload, image_factory=qrcode.image.svg.SvgPathImage).save(buffer)
+    else:
+        qrcode.make(payload).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def qr_image_bytes(payload, fmt='png'):
+    """
+    Imagen del QR, generada una vez por proceso. No se guarda en el storage: el QR
+    de un bono es la credencial de entrada y no puede quedar en una URL pública.
+    """
+    payload = str(payload)
+    key = (fmt, payload)
+    data = _images.get(key)
+    if data is None:
+        data = _render(payload, fmt)
+        _images.set(key, data)
+    return data
+
+
+def qr_etag(payload, fmt):
+    # La imagen depende sólo del payload y el formato; el hash no deja reconstruir la key
+    return '"%s"' % hashlib.sha256(f'{fmt}:{payload}'.encode('utf-8')).hexdigest()[:32]
+
+
+def qr_data_url(payload, fmt=None):
+    fmt = fmt or QR_IMAGE_FORMAT
+    encoded = base64.b64encode(qr_image_bytes(payload, fmt)).decode('ascii')
+    return f'data:{CONTENT_TYPES[fmt]};base64,{encoded}'
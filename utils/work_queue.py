@@ -0,0 +1,67 @@
+"""
+Andamiaje común de las colas en tabla (tickets.email_outbox, tickets.webhook_inbox):
+reclamar un lote con SKIP LOCKED y un lease, backoff de reintentos y drenar la
+cola de a lotes. Cada cola define su modelo, cómo procesa un lote y qué resume.
+"""
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempts):
+    """Espera antes del próximo intento: 2, 4, 8... minutos, hasta 64."""
+    return timedelta(minutes=2 ** min(attempts, 6))
+
+
+def claim_batch(model, batch_size, lease):
+    """
+    Reclama hasta `batch_size` filas PENDING disponibles (SKIP LOCKED, así varios
+    workers no se pisan): les suma un intento y las corre `lease` hacia adelante,
+    para que si el worker muere vuelvan a estar disponibles pasado ese tiempo.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            model.objects.select_for_update(skip_locked=True)
+            .filter(status=model.Status.PENDING, available_at__lte=now)
+            .order_by('available_at', 'id')[:batch_size]
+        )
+        if rows:
+            model.objects.filter(pk__in=[row.pk for row in rows]).update(
+                attempts=F('attempts') + 1,
+                available_at=now + lease,
+                updated_at=now,
+            )
+    for row in rows:
+        row.attempts += 1
+    return rows
+
+
+def drain(process_batch, batch_size, max_batches=None):
+    """
+    Llama a process_batch(batch_size) hasta vaciar la cola (o hasta max_batches)
+    y suma sus resúmenes. Cada resumen trae 'claimed'; un lote incompleto corta.
+    """
+    totals = {}
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        summary = process_batch(batch_size)
+        batches += 1
+        for key, value in summary.items():
+            totals[key] = totals.get(key, 0) + value
+        if summary['claimed'] < batch_size:
+            break
+    return totals
+
+
+def dispatch(worker, name):
+    """Dispara el worker de una cola al commitear; si no se puede, la cola queda para el cron."""
+    try:
+        worker()
+    except Exception:
+        logger.exception('No se pudo disparar el worker de %s; queda para el cron', name)